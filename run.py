@@ -3,13 +3,17 @@ from pathlib import Path
 import click
 
 import src.configs as conf_geral
-from src.aquisicao.executa import executa_etl
-from src.aquisicao.executa import executa_etl_por_ano
 from src.aquisicao.opcoes import ETL_ANUAL
 from src.aquisicao.opcoes import EnumETL
+from src.benchmark.config import ESCALA_REGRESSAO
+from src.benchmark.config import ESCALAS
+from src.benchmark.config import REPETICOES_MACRO
+from src.benchmark.config import REPETICOES_MICRO
 from src.datamart.config import DMGran
-from src.datamart.executa import executa_datamart
-from src.utils.logs import configura_logs
+
+# Os módulos de execução (e com eles pandas, pyarrow, geopandas, requests, ...)
+# são importados dentro de cada comando, de forma que a inicialização da CLI
+# e a ajuda (--help) não dependam deles
 
 
 @click.group()
@@ -67,6 +71,10 @@ def processa_dado(
     :param nao_criar_caminho: flag indicando se devemos criar os caminhos
     :param nao_reprocessar: Flag indicando se nós devemos forçar o reprocessamento dos dados
     """
+    from src.aquisicao.executa import executa_etl
+    from src.utils.instrumentacao import imprime_resumo
+    from src.utils.logs import configura_logs
+
     configura_logs()
     executa_etl(
         etl=etl,
@@ -75,6 +83,7 @@ def processa_dado(
         criar_caminho=not nao_criar_caminho,
         reprocessar=not nao_reprocessar,
     )
+    imprime_resumo()
 
 
 @aquisicao.command()
@@ -112,6 +121,19 @@ def processa_dado(
     show_default=True,
     help="Flag indicando se nós devemos forçar o reprocessamento dos dados",
 )
+@click.option(
+    "--particionar-uf",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se as saídas do censo escolar devem ser particionadas por UF",
+)
+@click.option(
+    "--estagiar",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se os arquivos do censo escolar devem ser gravados no "
+    "estágio (Arrow sem compressão) para acelerar as próximas execuções",
+)
 def processa_etl_anual(
     etl: str,
     ano: str,
@@ -119,6 +141,8 @@ def processa_etl_anual(
     saida: str,
     nao_criar_caminho: bool,
     nao_reprocessar: bool,
+    particionar_uf: bool,
+    estagiar: bool,
 ) -> None:
     """
     Executa o pipeline de ETL de um dado que é alterado anualmente
@@ -129,7 +153,13 @@ def processa_etl_anual(
     :param saida: string com caminho para pasta de saída
     :param nao_criar_caminho: flag indicando se devemos criar os caminhos
     :param nao_reprocessar: Flag indicando se nós devemos forçar o reprocessamento dos dados
+    :param particionar_uf: flag indicando se as saídas devem ser particionadas por UF
+    :param estagiar: flag indicando se os arquivos do censo devem ser gravados no estágio
     """
+    from src.aquisicao.executa import executa_etl_por_ano
+    from src.utils.instrumentacao import imprime_resumo
+    from src.utils.logs import configura_logs
+
     configura_logs()
     executa_etl_por_ano(
         etl=etl,
@@ -138,7 +168,269 @@ def processa_etl_anual(
         saida=saida,
         criar_caminho=not nao_criar_caminho,
         reprocessar=not nao_reprocessar,
+        particionar_uf=particionar_uf,
+        estagiar=estagiar,
+    )
+    imprime_resumo()
+
+
+@aquisicao.command()
+@click.option(
+    "--etl",
+    type=click.Choice([s.value for s in ETL_ANUAL]),
+    help="Nome do ETL a ser executado",
+)
+@click.option(
+    "--anos",
+    type=click.STRING,
+    help="Anos das bases a serem processadas (ex: 2007-2021 ou 2019,2020)",
+)
+@click.option(
+    "--processos",
+    "--workers",
+    "processos",
+    type=click.INT,
+    default=None,
+    help="Número máximo de processos em paralelo (padrão é o número de CPUs)",
+)
+@click.option(
+    "--entrada",
+    default=conf_geral.PASTA_ENTRADA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para extração dos dados de aquisição",
+)
+@click.option(
+    "--saida",
+    default=conf_geral.PASTA_SAIDA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para carregamento dos dados de aquisição",
+)
+@click.option(
+    "--nao-criar-caminho",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se devemos criar os caminhos",
+)
+@click.option(
+    "--nao-reprocessar",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se nós devemos forçar o reprocessamento dos dados",
+)
+@click.option(
+    "--particionar-uf",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se as saídas do censo escolar devem ser particionadas por UF",
+)
+@click.option(
+    "--estagiar",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se os arquivos do censo escolar devem ser gravados no "
+    "estágio (Arrow sem compressão) para acelerar as próximas execuções",
+)
+@click.option(
+    "--memoria",
+    type=click.FLOAT,
+    default=None,
+    help="Orçamento de memória em GB para os anos executados simultaneamente",
+)
+def processa_etl_anos(
+    etl: str,
+    anos: str,
+    processos: int,
+    entrada: str,
+    saida: str,
+    nao_criar_caminho: bool,
+    nao_reprocessar: bool,
+    particionar_uf: bool,
+    estagiar: bool,
+    memoria: float,
+) -> None:
+    """
+    Executa o pipeline de ETL de um dado que é alterado anualmente para
+    vários anos em paralelo
+
+    :param etl: nome do ETL a ser executado
+    :param anos: anos das bases a serem processadas (ex: 2007-2021)
+    :param processos: número máximo de processos em paralelo
+    :param entrada: string com caminho para pasta de entrada
+    :param saida: string com caminho para pasta de saída
+    :param nao_criar_caminho: flag indicando se devemos criar os caminhos
+    :param nao_reprocessar: Flag indicando se nós devemos forçar o reprocessamento dos dados
+    :param particionar_uf: flag indicando se as saídas devem ser particionadas por UF
+    :param estagiar: flag indicando se os arquivos do censo devem ser gravados no estágio
+    :param memoria: orçamento de memória em GB
+    """
+    from src.aquisicao.executa import executa_etl_anos
+    from src.utils.instrumentacao import imprime_resumo
+    from src.utils.logs import configura_logs
+
+    configura_logs()
+    executa_etl_anos(
+        etl=etl,
+        anos=anos,
+        entrada=entrada,
+        saida=saida,
+        criar_caminho=not nao_criar_caminho,
+        reprocessar=not nao_reprocessar,
+        particionar_uf=particionar_uf,
+        processos=processos,
+        estagiar=estagiar,
+        memoria=memoria,
+    )
+    imprime_resumo()
+
+
+@aquisicao.command()
+@click.option(
+    "--ano",
+    default="ultimo",
+    help="Ano da base a ser processado",
+)
+@click.option(
+    "--entrada",
+    default=conf_geral.PASTA_ENTRADA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para extração dos dados de aquisição",
+)
+@click.option(
+    "--saida",
+    default=conf_geral.PASTA_SAIDA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para carregamento dos dados de aquisição",
+)
+@click.option(
+    "--nao-criar-caminho",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se devemos criar os caminhos",
+)
+@click.option(
+    "--nao-reprocessar",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se nós devemos forçar o reprocessamento dos dados",
+)
+@click.option(
+    "--particionar-uf",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se as saídas do censo escolar devem ser particionadas por UF",
+)
+@click.option(
+    "--processos",
+    type=click.INT,
+    default=None,
+    help="Número máximo de processos em paralelo (padrão é o número de CPUs)",
+)
+@click.option(
+    "--memoria",
+    type=click.FLOAT,
+    default=None,
+    help="Orçamento de memória em GB para os arquivos convertidos simultaneamente",
+)
+def processa_censo_anual(
+    ano: str,
+    entrada: str,
+    saida: str,
+    nao_criar_caminho: bool,
+    nao_reprocessar: bool,
+    particionar_uf: bool,
+    processos: int,
+    memoria: float,
+) -> None:
+    """
+    Executa os pipelines de ETL de todas as tabelas do censo escolar de um
+    ano, extraindo o zip do ano uma única vez
+
+    :param ano: ano da base a ser processada
+    :param entrada: string com caminho para pasta de entrada
+    :param saida: string com caminho para pasta de saída
+    :param nao_criar_caminho: flag indicando se devemos criar os caminhos
+    :param nao_reprocessar: Flag indicando se nós devemos forçar o reprocessamento dos dados
+    :param particionar_uf: flag indicando se as saídas devem ser particionadas por UF
+    :param processos: número máximo de processos em paralelo
+    :param memoria: orçamento de memória em GB
+    """
+    from src.aquisicao.executa import executa_censo_por_ano
+    from src.utils.instrumentacao import imprime_resumo
+    from src.utils.logs import configura_logs
+
+    configura_logs()
+    executa_censo_por_ano(
+        ano=ano,
+        entrada=entrada,
+        saida=saida,
+        criar_caminho=not nao_criar_caminho,
+        reprocessar=not nao_reprocessar,
+        particionar_uf=particionar_uf,
+        processos=processos,
+        memoria=memoria,
     )
+    imprime_resumo()
+
+
+@aquisicao.command()
+@click.option(
+    "--entrada",
+    default=conf_geral.PASTA_ENTRADA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para extração dos dados de aquisição",
+)
+@click.option(
+    "--sem-metadados",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se não devemos consultar o tamanho e data dos arquivos",
+)
+def atualiza_catalogo(entrada: str, sem_metadados: bool) -> None:
+    """
+    Atualiza o catálogo de fontes do INEP utilizado pelos ETLs
+
+    :param entrada: string com caminho para pasta de entrada
+    :param sem_metadados: flag indicando se não devemos consultar o tamanho e data dos arquivos
+    """
+    from src.aquisicao.executa import executa_atualiza_catalogo
+    from src.utils.logs import configura_logs
+
+    configura_logs()
+    executa_atualiza_catalogo(entrada=entrada, metadados=not sem_metadados)
+
+
+@aquisicao.command()
+@click.option(
+    "--ano",
+    type=click.INT,
+    default=None,
+    help="Ano a ser removido (padrão remove todos os anos)",
+)
+@click.option(
+    "--entrada",
+    default=conf_geral.PASTA_ENTRADA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para extração dos dados de aquisição",
+)
+@click.option(
+    "--saida",
+    default=conf_geral.PASTA_SAIDA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para carregamento dos dados de aquisição",
+)
+def limpa_cache(ano: int, entrada: str, saida: str) -> None:
+    """
+    Remove os arquivos de estágio e os CSVs descompactados do censo escolar
+
+    :param ano: ano a ser removido
+    :param entrada: string com caminho para pasta de entrada
+    :param saida: string com caminho para pasta de saída
+    """
+    from src.aquisicao.executa import executa_limpa_caches
+    from src.utils.logs import configura_logs
+
+    configura_logs()
+    executa_limpa_caches(entrada=entrada, saida=saida, ano=ano)
 
 
 @cli.group()
@@ -179,8 +471,19 @@ def datamart():
     type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
     help="Pasta para carregamento dos dados de aquisição",
 )
+@click.option(
+    "--memoria",
+    type=click.FLOAT,
+    default=None,
+    help="Orçamento de memória em GB, acima dele os resultados parciais vão ao disco",
+)
 def processa_datamart(
-    granularidade: str, ano: str, aquis_entrada: Path, aquis_saida: Path, saida: Path
+    granularidade: str,
+    ano: str,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    saida: Path,
+    memoria: float,
 ) -> None:
     """
     Constrói um datamart a um determinado nível de granularidade para um
@@ -191,9 +494,317 @@ def processa_datamart(
     :param aquis_entrada: caminho para entrada de aquisição
     :param aquis_saida: caminho para saída de aquisição
     :param saida: caminho para pasta de saída
+    :param memoria: orçamento de memória em GB
     """
+    from src.datamart.executa import executa_datamart
+    from src.utils.instrumentacao import imprime_resumo
+    from src.utils.logs import configura_logs
+
     configura_logs()
-    executa_datamart(granularidade, ano, aquis_entrada, aquis_saida, saida)
+    executa_datamart(granularidade, ano, aquis_entrada, aquis_saida, saida, memoria)
+    imprime_resumo()
+
+
+@datamart.command()
+@click.option(
+    "--granularidade",
+    type=click.Choice([s.value for s in DMGran]),
+    help="Nome do ETL a ser executado",
+)
+@click.option(
+    "--anos",
+    type=click.STRING,
+    help="Anos dos dados a serem processados (ex: 2007-2021 ou 2019,2020)",
+)
+@click.option(
+    "--processos",
+    type=click.INT,
+    default=None,
+    help="Número máximo de processos em paralelo (padrão é o número de CPUs)",
+)
+@click.option(
+    "--memoria",
+    type=click.FLOAT,
+    default=None,
+    help="Orçamento de memória em GB para os anos em execução simultânea",
+)
+@click.option(
+    "--aquis-entrada",
+    default=conf_geral.PASTA_ENTRADA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para extração dos dados de aquisição",
+)
+@click.option(
+    "--aquis-saida",
+    default=conf_geral.PASTA_SAIDA_AQUISICAO,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para carregamento dos dados de aquisição",
+)
+@click.option(
+    "--saida",
+    default=conf_geral.PASTA_SAIDA_DATAMART,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta para carregamento dos dados de aquisição",
+)
+def processa_datamart_anos(
+    granularidade: str,
+    anos: str,
+    processos: int,
+    memoria: float,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    saida: Path,
+) -> None:
+    """
+    Constrói um datamart a um determinado nível de granularidade para
+    vários anos de dados em paralelo
+
+    :param granularidade: nível do datamart a ser gerado
+    :param anos: anos dos dados a serem processados (ex: 2007-2021)
+    :param processos: número máximo de processos em paralelo
+    :param memoria: orçamento de memória em GB
+    :param aquis_entrada: caminho para entrada de aquisição
+    :param aquis_saida: caminho para saída de aquisição
+    :param saida: caminho para pasta de saída
+    """
+    from src.datamart.executa import executa_datamart_anos
+    from src.utils.instrumentacao import imprime_resumo
+    from src.utils.logs import configura_logs
+
+    configura_logs()
+    executa_datamart_anos(
+        granularidade, anos, aquis_entrada, aquis_saida, saida, processos, memoria
+    )
+    imprime_resumo()
+
+
+@cli.command()
+@click.option(
+    "--arquivo",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True, path_type=Path),
+    help="Arquivo JSON lines de métricas gerado junto ao log da execução",
+)
+def resumo_metricas(arquivo: Path) -> None:
+    """
+    Apresenta a tabela resumo das métricas por etapa de uma execução
+
+    :param arquivo: caminho do arquivo de métricas
+    """
+    from src.utils.instrumentacao import carrega_metricas
+    from src.utils.instrumentacao import imprime_resumo
+    from src.utils.logs import configura_logs
+
+    configura_logs(arquivo=False)
+    imprime_resumo(carrega_metricas(arquivo))
+
+
+@cli.group()
+def benchmark():
+    """
+    Grupo de comandos que executam os benchmarks sobre dados sintéticos
+    """
+    pass
+
+
+@benchmark.command()
+@click.option(
+    "--escalas",
+    type=click.STRING,
+    default=",".join(str(e) for e in ESCALAS),
+    help="Fatores de escala do censo sintético separados por vírgula",
+)
+@click.option(
+    "--ano",
+    type=click.INT,
+    default=2019,
+    help="Ano do censo sintético",
+)
+@click.option(
+    "--semente",
+    type=click.INT,
+    default=0,
+    help="Semente do gerador de números aleatórios",
+)
+@click.option(
+    "--pasta",
+    default=conf_geral.PASTA_BENCHMARK,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta de trabalho e de resultados do benchmark",
+)
+@click.option(
+    "--manter-dados",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se devemos manter os dados sintéticos gerados",
+)
+def executa(
+    escalas: str, ano: int, semente: int, pasta: Path, manter_dados: bool
+) -> None:
+    """
+    Executa os ETLs do censo escolar e o datamart de escola sobre censos
+    sintéticos em cada escala e registra o tempo e o pico de memória
+
+    :param escalas: fatores de escala separados por vírgula (ex: 1,10,100)
+    :param ano: ano do censo sintético
+    :param semente: semente do gerador de números aleatórios
+    :param pasta: pasta de trabalho e de resultados do benchmark
+    :param manter_dados: flag indicando se devemos manter os dados sintéticos
+    """
+    from src.benchmark.executa import carrega_resultados
+    from src.benchmark.executa import executa_benchmark
+    from src.benchmark.executa import resume_resultados
+    from src.utils.logs import configura_logs
+
+    configura_logs()
+    executa_benchmark(
+        [float(e) for e in escalas.split(",")],
+        pasta,
+        ano=ano,
+        semente=semente,
+        manter_dados=manter_dados,
+    )
+    click.echo(resume_resultados(carrega_resultados(pasta / "resultados.jsonl")))
+
+
+@benchmark.command()
+@click.option(
+    "--pasta",
+    default=conf_geral.PASTA_BENCHMARK,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta de trabalho e de resultados do benchmark",
+)
+@click.option(
+    "--metrica",
+    type=click.Choice(["tempo_parede", "tempo_cpu", "pico_memoria"]),
+    default="tempo_parede",
+    help="Métrica a ser apresentada",
+)
+def historico(pasta: Path, metrica: str) -> None:
+    """
+    Apresenta a métrica de cada benchmark nos commits executados
+
+    :param pasta: pasta de trabalho e de resultados do benchmark
+    :param metrica: métrica a ser apresentada
+    """
+    from src.benchmark.executa import carrega_resultados
+    from src.benchmark.executa import resume_resultados
+
+    click.echo(
+        resume_resultados(carrega_resultados(pasta / "resultados.jsonl"), metrica)
+    )
+
+
+@benchmark.command()
+@click.option(
+    "--baseline",
+    default=f"{conf_geral.PASTA_BENCHMARK}/baseline.json",
+    type=click.Path(dir_okay=False, resolve_path=True, path_type=Path),
+    help="Arquivo JSON com a baseline de desempenho",
+)
+@click.option(
+    "--atualizar-baseline",
+    is_flag=True,
+    show_default=True,
+    help="Flag indicando se devemos salvar a execução atual como baseline",
+)
+@click.option(
+    "--escala",
+    type=click.FLOAT,
+    default=ESCALA_REGRESSAO,
+    show_default=True,
+    help="Fator de escala do censo sintético",
+)
+@click.option(
+    "--repeticoes-micro",
+    type=click.INT,
+    default=REPETICOES_MICRO,
+    show_default=True,
+    help="Número de repetições dos micro benchmarks",
+)
+@click.option(
+    "--repeticoes-macro",
+    type=click.INT,
+    default=REPETICOES_MACRO,
+    show_default=True,
+    help="Número de repetições dos macro benchmarks",
+)
+@click.option(
+    "--pasta",
+    default=conf_geral.PASTA_BENCHMARK,
+    type=click.Path(file_okay=False, resolve_path=True, path_type=Path),
+    help="Pasta de trabalho do benchmark",
+)
+def regressao(
+    baseline: Path,
+    atualizar_baseline: bool,
+    escala: float,
+    repeticoes_micro: int,
+    repeticoes_macro: int,
+    pasta: Path,
+) -> None:
+    """
+    Executa os micro e macro benchmarks e compara os resultados com a
+    baseline, falhando se houver alguma regressão de desempenho
+
+    :param baseline: arquivo JSON com a baseline de desempenho
+    :param atualizar_baseline: flag indicando se devemos salvar a execução como baseline
+    :param escala: fator de escala do censo sintético
+    :param repeticoes_micro: número de repetições dos micro benchmarks
+    :param repeticoes_macro: número de repetições dos macro benchmarks
+    :param pasta: pasta de trabalho do benchmark
+    """
+    from src.benchmark.regressao import REGRESSAO
+    from src.benchmark.regressao import carrega_baseline
+    from src.benchmark.regressao import compara_baseline
+    from src.benchmark.regressao import executa_regressao
+    from src.benchmark.regressao import formata_relatorio
+    from src.benchmark.regressao import salva_baseline
+    from src.utils.logs import configura_logs
+
+    if not atualizar_baseline and not baseline.exists():
+        raise click.ClickException(
+            f"A baseline {baseline} não existe, execute o comando com "
+            f"--atualizar-baseline para criá-la"
+        )
+
+    configura_logs()
+    atual = executa_regressao(
+        pasta / "regressao",
+        escala=escala,
+        repeticoes_micro=repeticoes_micro,
+        repeticoes_macro=repeticoes_macro,
+    )
+    if atualizar_baseline:
+        salva_baseline(atual, baseline)
+        click.echo(f"Baseline salva em {baseline}")
+        return
+
+    base = carrega_baseline(baseline)
+    comparacao = compara_baseline(atual, base)
+    click.echo(formata_relatorio(comparacao, atual, base))
+    if (comparacao["status"] == REGRESSAO).any():
+        raise click.ClickException("Foram encontradas regressões de desempenho")
+
+
+@benchmark.command()
+@click.option(
+    "--repeticoes",
+    type=click.INT,
+    default=REPETICOES_MICRO,
+    show_default=True,
+    help="Número de repetições de cada comando",
+)
+def inicializacao(repeticoes: int) -> None:
+    """
+    Mede o tempo de inicialização dos principais comandos da CLI e lista
+    os módulos pesados importados por eles
+
+    :param repeticoes: número de repetições de cada comando
+    """
+    from src.benchmark.inicializacao import resume_inicializacao
+
+    click.echo(resume_inicializacao(repeticoes).to_string(index=False))
 
 
 if __name__ == "__main__":
@@ -2,10 +2,26 @@ import abc
 import logging
 import os
 import typing
+from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 
+from src.utils.instrumentacao import mede_etapa
+from src.utils.manifesto import descreve_saida
+from src.utils.manifesto import entradas_atualizadas
+from src.utils.manifesto import escreve_manifesto
+from src.utils.manifesto import hash_arquivo
+from src.utils.manifesto import hash_objeto
+from src.utils.manifesto import impressao_arquivo
+from src.utils.manifesto import le_manifesto
+from src.utils.manifesto import saidas_existem
+from src.utils.manifesto import versao_codigo
+from src.utils.parquet import escreve_parquet
+
+# pasta dentro da saída com os manifestos de execução dos ETLs
+PASTA_MANIFESTOS = "_manifestos"
+
 
 class _BaseETL(abc.ABC):
     """
@@ -37,6 +53,11 @@ class _BaseETL(abc.ABC):
     indisponíveis, ou porque a flag reprocessar está ativada. Se houver necessidade
     de gerar os dados, então as etapas do processo serão executadas
 
+    Ao exportar as bases, o load grava um manifesto com os hashes das entradas,
+    das configurações e do código, além das linhas, esquema e arquivos de cada
+    saída e dos tempos de execução. As saídas são consideradas desatualizadas
+    (e geradas novamente) quando o manifesto diverge do estado atual
+
     Por definição cada objeto irá definir o conjunto de métodos:
     - bases_entrada: Lista as bases que fazem parte da entrada do objeto
     - bases_saida: Lista as bases que fazem parte da saída do objeto
@@ -50,6 +71,7 @@ class _BaseETL(abc.ABC):
     reprocessar: bool
     _dados_entrada: typing.Dict[str, pd.DataFrame]
     _dados_saida: typing.Dict[str, pd.DataFrame]
+    _tempos: typing.Dict[str, float]
     _logger: logging.Logger
 
     def __init__(
@@ -77,6 +99,7 @@ class _BaseETL(abc.ABC):
 
         self._dados_entrada = dict()
         self._dados_saida = dict()
+        self._tempos = dict()
 
         self._logger = logging.getLogger(__name__)
 
@@ -132,7 +155,20 @@ class _BaseETL(abc.ABC):
     def tem_dados_saida(self) -> bool:
         """
         Verifica se o objeto ETL possuí todos os dados que fazem
-        parte da sua saída
+        parte da sua saída. Quando existe um manifesto, os arquivos
+        registrados nele são consultados diretamente, sem listar as pastas
+
+        :return: True se os dados estiver disponíveis
+        """
+        manifesto = le_manifesto(self.caminho_manifesto)
+        if manifesto is not None and set(manifesto["saidas"]) == set(self.bases_saida):
+            return saidas_existem(manifesto["saidas"])
+        return self.procura_saidas()
+
+    def procura_saidas(self) -> bool:
+        """
+        Procura pelos dados de saída nas pastas de saída, utilizado
+        quando as saídas não possuem manifesto
 
         :return: True se os dados estiver disponíveis
         """
@@ -153,18 +189,125 @@ class _BaseETL(abc.ABC):
             }
 
     @property
-    def precisa_reprocessar(self) -> bool:
+    def chave_manifesto(self) -> str:
         """
-        Indica se há necessidade de reprocessar os dados
+        Identificador do manifesto do objeto, único para cada conjunto
+        de saídas (ex: a tabela e o ano processados)
 
-        :return: True se algum dado está faltando
+        :return: nome do manifesto
+        """
+        return str(self)
+
+    @property
+    def caminho_manifesto(self) -> Path:
+        """
+        Caminho do manifesto de execução do objeto
+
+        :return: caminho do arquivo JSON
+        """
+        return self.caminho_saida / PASTA_MANIFESTOS / f"{self.chave_manifesto}.json"
+
+    @property
+    def configuracao(self) -> typing.Dict[str, typing.Any]:
+        """
+        Configurações do objeto que alteram o conteúdo das saídas
+
+        :return: dicionário serializável com as configurações
+        """
+        return dict()
+
+    def caminhos_entrada(self) -> typing.List[Path]:
+        """
+        Lista os caminhos dos arquivos de entrada
+
+        :return: lista de caminhos
+        """
+        return [self.caminho_entrada / b for b in self.bases_entrada]
+
+    def caminhos_saida(self) -> typing.Dict[str, Path]:
+        """
+        Lista os caminhos (pastas ou arquivos) de cada base de saída
+
+        :return: dicionário com a base de saída e o seu caminho
+        """
+        return {b: self.caminho_saida / b for b in self.bases_saida}
+
+    def escreve_manifesto(self) -> None:
+        """
+        Grava o manifesto das saídas exportadas pelo objeto
+        """
+        saidas = {
+            b: descreve_saida(caminho, self._dados_saida.get(b))
+            for b, caminho in self.caminhos_saida().items()
+            if caminho.exists()
+        }
+        entradas = {
+            str(c): dict(**impressao_arquivo(c), sha1=hash_arquivo(c))
+            for c in self.caminhos_entrada()
+            if c.exists()
+        }
+        escreve_manifesto(
+            self.caminho_manifesto,
+            dict(
+                etl=str(self),
+                criado_em=datetime.now().isoformat(timespec="seconds"),
+                versao_codigo=versao_codigo(type(self)),
+                configuracao=self.configuracao,
+                hash_configuracao=hash_objeto(self.configuracao),
+                entradas=entradas,
+                saidas=saidas,
+                tempos=self._tempos,
+            ),
+        )
+
+    def saidas_atualizadas(self) -> bool:
+        """
+        Verifica pelo manifesto se as saídas foram geradas com as entradas,
+        configurações e código atuais e se não foram alteradas desde então.
+        Saídas sem manifesto (geradas por versões anteriores) são consideradas
+        atualizadas
+
+        :return: True se as saídas estão atualizadas
+        """
+        manifesto = le_manifesto(self.caminho_manifesto)
+        if manifesto is None:
+            return True
+
+        motivo = None
+        if manifesto["versao_codigo"] != versao_codigo(type(self)):
+            motivo = "o código foi alterado"
+        elif manifesto["hash_configuracao"] != hash_objeto(self.configuracao):
+            motivo = "as configurações foram alteradas"
+        elif not entradas_atualizadas(manifesto["entradas"], self.caminhos_entrada()):
+            motivo = "as entradas foram alteradas"
+        elif not saidas_existem(manifesto["saidas"], mesmas=True):
+            motivo = "as saídas foram alteradas"
+
+        if motivo is not None:
+            self._logger.info(f"Saídas de {self} desatualizadas: {motivo}")
+        return motivo is None
+
+    def precisa_gerar_saidas(self) -> bool:
+        """
+        Indica se as saídas precisam ser geradas novamente
+
+        :return: True se alguma saída está faltando ou desatualizada
         """
         return (
-            not self.tem_dados_entrada()
-            or not self.tem_dados_saida()
+            not self.tem_dados_saida()
             or self.reprocessar
+            or not self.saidas_atualizadas()
         )
 
+    @property
+    def precisa_reprocessar(self) -> bool:
+        """
+        Indica se há necessidade de reprocessar os dados
+
+        :return: True se algum dado está faltando ou desatualizado
+        """
+        return not self.tem_dados_entrada() or self.precisa_gerar_saidas()
+
     @property
     def dados_saida(self) -> typing.Dict[str, pd.DataFrame]:
         """
@@ -203,34 +346,43 @@ class _BaseETL(abc.ABC):
         Método load protegido que carrega as bases de saída
         """
         for arq, df in self.dados_saida.items():
-            df.to_parquet(self.caminho_saida / f"{arq}.parquet", index=False)
+            escreve_parquet(df, self.caminho_saida / f"{arq}.parquet", arq, index=False)
 
     def extract(self) -> None:
         """
         Extraí os dados do objeto
         """
         self._logger.info(f"EXTRAINDO DADOS DO OBJETO > {self}")
-        if not self.tem_dados_entrada() or self.reprocessar:
-            self._download()
-        self._extract()
+        with mede_etapa(f"{self}.extract") as etapa:
+            if not self.tem_dados_entrada() or self.reprocessar:
+                self._download()
+            self._extract()
+            etapa["saida"] = self._dados_entrada
+        self._tempos["extract"] = etapa["tempo_parede"]
 
     def transform(self) -> None:
         """
         Extraí os dados do objeto
         """
         self._logger.info(f"TRANSFORMANDO DADOS DO OBJETO > {self}")
-        if not self.tem_dados_saida() or self.reprocessar:
-            self._transform()
-        else:
-            self.carrega_saidas()
+        with mede_etapa(f"{self}.transform") as etapa:
+            if self.precisa_gerar_saidas():
+                self._transform()
+            else:
+                self.carrega_saidas()
+            etapa["saida"] = self._dados_saida
+        self._tempos["transform"] = etapa["tempo_parede"]
 
     def load(self) -> None:
         """
         Exporta os dados transformados
         """
         self._logger.info(f"CARREGANDO DADOS DO OBJETO > {self}")
-        if not self.tem_dados_saida() or self.reprocessar:
-            self._load()
+        if self.precisa_gerar_saidas():
+            with mede_etapa(f"{self}.load", self._dados_saida) as etapa:
+                self._load()
+            self._tempos["load"] = etapa["tempo_parede"]
+            self.escreve_manifesto()
 
     def pipeline(self) -> None:
         """
@@ -1,8 +1,47 @@
+import json
+import logging
+import os
+import time
+import typing
+from datetime import datetime
 from pathlib import Path
 
-from src.aquisicao.opcoes import ETL_DICT
+from src.aquisicao.opcoes import ETL_CENSO
 from src.aquisicao.opcoes import EnumETL
+from src.aquisicao.opcoes import obtem_etl
 from src.utils.logs import log_erros
+from src.utils.paralelo import executa_em_paralelo
+from src.utils.paralelo import interpreta_anos
+from src.utils.paralelo import limita_threads
+
+# pasta dentro da saída com os resumos das execuções de vários anos
+PASTA_EXECUCOES = "_execucoes"
+
+# fator de expansão entre o tamanho do zip do censo escolar de um ano e a
+# memória utilizada pelo ETL de uma tabela deste ano
+FATOR_MEMORIA = 10
+
+
+def estima_memoria_etl(etl: str, entrada: Path, ano: int) -> float:
+    """
+    Estima a memória necessária para executar um ETL do censo escolar em um
+    ano a partir do tamanho do zip do ano, local ou registrado no catálogo
+
+    :param etl: nome do ETL
+    :param entrada: string com caminho para pasta de entrada
+    :param ano: ano do inep a ser processado
+    :return: estimativa de memória em bytes (0 quando não é possível estimar)
+    """
+    from src.aquisicao.inep.catalogo import le_fonte
+
+    if EnumETL(etl) not in ETL_CENSO:
+        return 0.0
+    caminho = Path(entrada) / "censo_escolar" / f"{ano}.zip"
+    if caminho.exists():
+        return float(caminho.stat().st_size * FATOR_MEMORIA)
+    fonte = le_fonte(entrada, "censo_escolar") or dict(arquivos=dict())
+    tamanho = fonte["arquivos"].get(f"{ano}.zip", dict()).get("tamanho")
+    return float(tamanho * FATOR_MEMORIA) if tamanho else 0.0
 
 
 @log_erros
@@ -18,7 +57,7 @@ def executa_etl(
     :param criar_caminho: flag indicando se devemos criar os caminhos
     :param reprocessar: flag indicando se devemos reprocessar a base
     """
-    objeto = ETL_DICT[EnumETL(etl)](entrada, saida, criar_caminho, reprocessar)
+    objeto = obtem_etl(etl)(entrada, saida, criar_caminho, reprocessar)
     objeto.pipeline()
 
 
@@ -30,6 +69,8 @@ def executa_etl_por_ano(
     saida: Path,
     criar_caminho: bool,
     reprocessar: bool,
+    particionar_uf: bool = False,
+    estagiar: bool = False,
 ) -> None:
     """
     Executa o pipeline de ETL de uma determinada fonte
@@ -40,6 +81,283 @@ def executa_etl_por_ano(
     :param saida: string com caminho para pasta de saída
     :param criar_caminho: flag indicando se devemos criar os caminhos
     :param reprocessar: flag indicando se devemos reprocessar a base
+    :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+    :param estagiar: flag se os arquivos do censo devem ser gravados no estágio
+    """
+    _executa_etl_ano(
+        etl, ano, entrada, saida, criar_caminho, reprocessar, particionar_uf, estagiar
+    )
+
+
+def _executa_etl_ano(
+    etl: str,
+    ano: typing.Union[int, str],
+    entrada: Path,
+    saida: Path,
+    criar_caminho: bool,
+    reprocessar: bool,
+    particionar_uf: bool = False,
+    estagiar: bool = False,
+) -> float:
     """
-    objeto = ETL_DICT[EnumETL(etl)](entrada, saida, ano, criar_caminho, reprocessar)
+    Executa o pipeline de ETL de uma fonte para um ano
+
+    :param etl: nome do ETL a ser executado
+    :param ano: ano do inep a ser processado
+    :param entrada: string com caminho para pasta de entrada
+    :param saida: string com caminho para pasta de saída
+    :param criar_caminho: flag indicando se devemos criar os caminhos
+    :param reprocessar: flag indicando se devemos reprocessar a base
+    :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+    :param estagiar: flag se os arquivos do censo devem ser gravados no estágio
+    :return: tempo de execução em segundos
+    """
+    inicio = time.perf_counter()
+    kwargs = dict()
+    if particionar_uf:
+        if EnumETL(etl) not in ETL_CENSO:
+            raise ValueError(
+                f"O ETL {etl} não suporta o particionamento das saídas por UF"
+            )
+        kwargs["particionar_uf"] = True
+    if estagiar:
+        if EnumETL(etl) not in ETL_CENSO:
+            raise ValueError(f"O ETL {etl} não suporta a gravação do estágio")
+        kwargs["estagiar"] = True
+    objeto = obtem_etl(etl)(entrada, saida, ano, criar_caminho, reprocessar, **kwargs)
     objeto.pipeline()
+    return time.perf_counter() - inicio
+
+
+@log_erros
+def executa_etl_anos(
+    etl: str,
+    anos: str,
+    entrada: Path,
+    saida: Path,
+    criar_caminho: bool,
+    reprocessar: bool,
+    particionar_uf: bool = False,
+    processos: typing.Optional[int] = None,
+    estagiar: bool = False,
+    memoria: typing.Optional[float] = None,
+) -> typing.Dict[int, typing.Dict[str, typing.Any]]:
+    """
+    Executa o pipeline de ETL de uma fonte para vários anos, distribuindo
+    os anos entre um pool de processos.
+
+    O catálogo de fontes é atualizado uma única vez antes da distribuição,
+    de forma que os processos apenas o leem. As configurações de cada tabela
+    ficam em cache em cada processo (não são compartilhadas entre processos),
+    sendo lidas uma única vez por processo e não uma vez por ano.
+
+    Quando há orçamento de memória um ano só é iniciado se a soma das
+    estimativas dos anos em execução couber no orçamento, e os anos sem
+    estimativa são executados sozinhos. As threads internas de cada processo
+    são limitadas para que processos * threads não ultrapasse o número de
+    processadores. As falhas são isoladas por ano e um resumo com a situação
+    e o tempo de cada ano é gravado na pasta de saída
+
+    :param etl: nome do ETL a ser executado
+    :param anos: anos a serem processados (ex: 2007-2021 ou 2019,2020)
+    :param entrada: string com caminho para pasta de entrada
+    :param saida: string com caminho para pasta de saída
+    :param criar_caminho: flag indicando se devemos criar os caminhos
+    :param reprocessar: flag indicando se devemos reprocessar a base
+    :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+    :param processos: número máximo de processos (padrão é o número de CPUs)
+    :param estagiar: flag se os arquivos do censo devem ser gravados no estágio
+    :param memoria: orçamento de memória em GB para os anos em execução
+    :return: dicionário com o resumo da execução de cada ano
+    """
+    from src.aquisicao.inep.catalogo import obtem_fonte
+
+    logger = logging.getLogger(__name__)
+    lista_anos = interpreta_anos(anos)
+    if particionar_uf and EnumETL(etl) not in ETL_CENSO:
+        raise ValueError(f"O ETL {etl} não suporta o particionamento das saídas por UF")
+    if estagiar and EnumETL(etl) not in ETL_CENSO:
+        raise ValueError(f"O ETL {etl} não suporta a gravação do estágio")
+
+    if EnumETL(etl) in ETL_CENSO:
+        for base, url in _fontes_inep().items():
+            obtem_fonte(entrada, base, url)
+
+    processos = processos or os.cpu_count() or 1
+    estimativas = {a: estima_memoria_etl(etl, entrada, a) for a in lista_anos}
+    if memoria is not None:
+        sem_estimativa = [a for a, e in estimativas.items() if e <= 0]
+        if len(sem_estimativa) > 0:
+            logger.warning(
+                f"Não foi possível estimar a memória dos anos {sem_estimativa}, "
+                f"que serão executados um de cada vez"
+            )
+        estimativas.update({a: memoria * 1024**3 for a in sem_estimativa})
+
+    logger.info(f"Executando o ETL {etl} para os anos {lista_anos}")
+    inicio = time.perf_counter()
+    resultados = executa_em_paralelo(
+        func=_executa_etl_ano,
+        tarefas={
+            a: (
+                etl,
+                a,
+                entrada,
+                saida,
+                criar_caminho,
+                reprocessar,
+                particionar_uf,
+                estagiar,
+            )
+            for a in lista_anos
+        },
+        processos=processos,
+        memoria=memoria * 1024**3 if memoria is not None else None,
+        estimativas=estimativas,
+        inicializador=limita_threads,
+        args_inicializador=(max((os.cpu_count() or 1) // processos, 1),),
+    )
+
+    resumo = {
+        a: dict(status="erro", erro=repr(r))
+        if isinstance(r, BaseException)
+        else dict(status="ok", tempo=r)
+        for a, r in sorted(resultados.items())
+    }
+    caminho = (
+        Path(saida) / PASTA_EXECUCOES / f"{etl}_{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, "w") as f:
+        json.dump(
+            dict(
+                etl=etl,
+                anos=resumo,
+                processos=processos,
+                memoria=memoria,
+                tempo_total=time.perf_counter() - inicio,
+            ),
+            f,
+            indent=2,
+        )
+    logger.info(
+        f"Resumo da execução do ETL {etl} (gravado em {caminho}):\n"
+        + "\n".join(
+            f"{a}: {r['status']} "
+            + (f"{r['tempo']:.1f}s" if r["status"] == "ok" else r["erro"])
+            for a, r in resumo.items()
+        )
+    )
+
+    falhas = [a for a, r in resumo.items() if r["status"] == "erro"]
+    if len(falhas) > 0:
+        raise ValueError(f"Não foi possível executar o ETL {etl} dos anos {falhas}")
+    return resumo
+
+
+@log_erros
+def executa_censo_por_ano(
+    ano: str,
+    entrada: Path,
+    saida: Path,
+    criar_caminho: bool,
+    reprocessar: bool,
+    particionar_uf: bool = False,
+    processos: typing.Optional[int] = None,
+    memoria: typing.Optional[float] = None,
+) -> None:
+    """
+    Executa os pipelines de ETL de todas as tabelas do censo escolar de um
+    ano. Os arquivos de todas as tabelas são extraídos do zip do ano em uma
+    única passada e convertidos em paralelo para o estágio, de onde cada
+    ETL os carrega
+
+    :param ano: ano do inep a ser processado
+    :param entrada: string com caminho para pasta de entrada
+    :param saida: string com caminho para pasta de saída
+    :param criar_caminho: flag indicando se devemos criar os caminhos
+    :param reprocessar: flag indicando se devemos reprocessar a base
+    :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+    :param processos: número máximo de processos na conversão dos arquivos
+    :param memoria: orçamento de memória em GB para as conversões simultâneas
+    """
+    from src.aquisicao.inep.estagio import estagia_ano
+
+    logger = logging.getLogger(__name__)
+    etls = list()
+    for etl in ETL_CENSO:
+        try:
+            objeto = obtem_etl(etl)(
+                entrada,
+                saida,
+                ano,
+                criar_caminho,
+                reprocessar,
+                particionar_uf=particionar_uf,
+            )
+        except ValueError as e:
+            # tabelas que não existem no ano (ex: gestor antes de 2019)
+            logger.warning(f"O ETL {etl.value} não será executado para {ano} -> {e}")
+            continue
+        if objeto.precisa_reprocessar:
+            etls.append(objeto)
+    if len(etls) == 0:
+        return
+
+    # todas as tabelas estão no mesmo zip, que é baixado uma única vez
+    if not etls[0].tem_dados_entrada() or reprocessar:
+        etls[0]._download()
+    estagia_ano(
+        etls,
+        processos=processos,
+        memoria=int(memoria * 1024**3) if memoria is not None else None,
+    )
+
+    for etl in etls:
+        etl.pipeline()
+
+
+@log_erros
+def executa_limpa_caches(
+    entrada: Path, saida: Path, ano: typing.Optional[int] = None
+) -> None:
+    """
+    Remove os arquivos de estágio e os CSVs descompactados do censo escolar
+
+    :param entrada: string com caminho para pasta de entrada
+    :param saida: string com caminho para pasta de saída
+    :param ano: ano a ser removido (None remove todos os anos)
+    """
+    from src.aquisicao.inep.estagio import limpa_caches
+
+    limpa_caches(entrada, saida, ano)
+
+
+def _fontes_inep() -> typing.Dict[str, str]:
+    """
+    Lista as bases do INEP presentes no catálogo de fontes
+
+    :return: dicionário com o nome de cada base e a url da sua página
+    """
+    from src.aquisicao.inep._micro import _BaseINEPETL
+
+    return {"censo_escolar": f"{_BaseINEPETL.URL}/censo-escolar"}
+
+
+@log_erros
+def executa_atualiza_catalogo(entrada: Path, metadados: bool = True) -> None:
+    """
+    Atualiza o catálogo de fontes do INEP utilizado pelos ETLs
+
+    :param entrada: string com caminho para pasta de entrada
+    :param metadados: flag se devemos consultar o tamanho e data dos arquivos
+    """
+    from src.aquisicao.inep.catalogo import atualiza_catalogo
+
+    fontes = _fontes_inep()
+    catalogo = atualiza_catalogo(entrada, fontes, metadados=metadados)
+    for base in fontes:
+        anos = sorted(catalogo[base]["arquivos"])
+        logging.getLogger(__name__).info(
+            f"Catálogo de {base} atualizado com {len(anos)} arquivos: {', '.join(anos)}"
+        )
@@ -4,6 +4,7 @@ import re
 import typing
 from pathlib import Path
 
+import bs4
 import geopandas as gpd
 import pandas as pd
 
@@ -12,6 +13,7 @@ from src.utils import obtem_extensao
 from src.utils.info import carrega_csv
 from src.utils.web import download_dados_web
 from src.utils.web import obtem_pagina
+from src.utils.web import obtem_paginas
 
 
 def extrai_link(url: str) -> typing.List[str]:
@@ -21,9 +23,16 @@ def extrai_link(url: str) -> typing.List[str]:
     :param url: página do FTP para processar
     :return: links para dados na página
     """
-    # carrega a página HTML
-    soup = obtem_pagina(url)
+    return links_pagina(obtem_pagina(url))
 
+
+def links_pagina(soup: bs4.BeautifulSoup) -> typing.List[str]:
+    """
+    Obtém todos os links de uma página do FTP do IBGE já carregada
+
+    :param soup: página do FTP
+    :return: links para dados na página
+    """
     # encontra todos os elementos da página
     return [
         td.find("a").attrs["href"]
@@ -35,29 +44,32 @@ def extrai_link(url: str) -> typing.List[str]:
 
 def lista_arquivos_ftp(url: str) -> typing.Dict[str, str]:
     """
-    Lista todos os arquivos contidos em um link para um FTP do IBGE
+    Lista todos os arquivos contidos em um link para um FTP do IBGE. As
+    pastas de um mesmo nível da árvore são lidas de forma concorrente
 
     :param url: caminho para página no FTP
     :return: dicionário com nome do arquivo e link para download
     """
-    if url[-1] != "/":
-        url = f"{url}/"
-
     # carrega a lista de formatos
     formatos = carrega_csv("formato_arquivos.csv")["Formato"].values
 
-    # percorre todos os potenciais arquivos
+    # percorre as pastas nível a nível
     arquivos = dict()
-    for link in extrai_link(url):
-        # adiciona o arquivo a lista
-        ext = obtem_extensao(link)
-        if ext in formatos:
-            arquivos[link] = f"{url}{link}"
-
-        # se for um diretório chama essa função novamente
-        # com o link atualizado
-        else:
-            arquivos.update(lista_arquivos_ftp(f"{url}{link}"))
+    pastas = [url]
+    while len(pastas) > 0:
+        pastas = [p if p[-1] == "/" else f"{p}/" for p in pastas]
+        sub_pastas = list()
+        for pasta, soup in zip(pastas, obtem_paginas(pastas)):
+            for link in links_pagina(soup):
+                # adiciona o arquivo a lista
+                ext = obtem_extensao(link)
+                if ext in formatos:
+                    arquivos[link] = f"{pasta}{link}"
+
+                # se for um diretório ele é lido no próximo nível
+                else:
+                    sub_pastas.append(f"{pasta}{link}")
+        pastas = sub_pastas
 
     return arquivos
 
@@ -80,10 +80,10 @@ class _BaseMalhaIBGE(_BaseFTPIBGE, abc.ABC):
             reprocessar=reprocessar,
         )
 
-    def tem_dados_saida(self) -> bool:
+    def procura_saidas(self) -> bool:
         """
-        Verifica se o objeto ETL possuí todos os dados que fazem
-        parte da sua saída
+        Procura pelos dados de saída nas pastas de saída, utilizado
+        quando as saídas não possuem manifesto
 
         :return: True se os dados estiver disponíveis
         """
@@ -137,6 +137,41 @@ class _BaseMalhaIBGE(_BaseFTPIBGE, abc.ABC):
                     raise ValueError(f"Não conseguimos processar ano={self._ano}")
         return self._ano
 
+    @property
+    def chave_manifesto(self) -> str:
+        """
+        Identificador do manifesto do objeto (nome do objeto e ano)
+
+        :return: nome do manifesto
+        """
+        return f"{self}_{self.ano}"
+
+    @property
+    def configuracao(self) -> typing.Dict[str, typing.Any]:
+        """
+        Configurações do objeto que alteram o conteúdo das saídas
+
+        :return: dicionário serializável com as configurações
+        """
+        return dict(granularidade=self._granularidade)
+
+    def caminhos_entrada(self) -> typing.List[Path]:
+        """
+        Lista os caminhos dos arquivos de entrada (o zip da malha do ano),
+        sem consultar o FTP do IBGE
+
+        :return: lista de caminhos
+        """
+        return [self.caminho_entrada / self._base]
+
+    def caminhos_saida(self) -> typing.Dict[str, Path]:
+        """
+        Lista as partições de cada base de saída no ano do objeto
+
+        :return: dicionário com a base de saída e a sua partição
+        """
+        return {b: self.caminho_saida / f"{b}/ANO={self.ano}" for b in self.bases_saida}
+
     def _load(self) -> None:
         """
         Exporta os dados transformados
@@ -1,17 +1,214 @@
 import abc
+import contextlib
+import csv
+import json
+import logging
+import os
 import re
+import shutil
+import subprocess
+import sys
+import tempfile
 import typing
 import zipfile
-from io import BytesIO
+import zlib
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
 import rarfile
 
 from src.aquisicao.inep._micro import _BaseINEPETL
 from src.utils.info import carrega_excel
 from src.utils.info import carrega_yaml
+from src.utils.instrumentacao import instrumenta
+from src.utils.manifesto import hash_objeto
+from src.utils.paralelo import obtem_threads
+
+# no windows é utilizado o unrar distribuído junto ao projeto
+if sys.platform.startswith("win"):
+    rarfile.UNRAR_TOOL = str(Path(__file__).parents[3] / "suporte/WinRAR/unrar.exe")
+
+# pasta (dentro da pasta de entrada) com os arquivos aninhados já descompactados.
+# Ocupa o tamanho dos CSVs descompactados (vários GB por ano para a matrícula)
+PASTA_EXTRAIDOS = "_extraidos"
+
+# pasta (dentro da pasta de saída) com os arquivos do censo convertidos para Arrow
+# IPC. Os arquivos não são comprimidos e ocupam aproximadamente o tamanho das
+# colunas carregadas em memória, por isso o estágio só é gravado quando pedido
+# (ver estagiar e estagia_ano). As duas pastas podem ser removidas com limpa_caches
+PASTA_ESTAGIO = "_estagio"
+
+# chave dos metadados do arquivo de estágio com o seu registro
+_CHAVE_ESTAGIO = b"estagio_censo"
+
+# arquivo com o registro de cada extração
+_MANIFESTO = "_extracao.json"
+
+# representação das colunas de texto armazenadas pelo arrow. As colunas de texto
+# do DADOS_SCHEMA / DEPARA_SCHEMA podem ser declaradas como "str" (objetos do
+# python), TEXTO_ARROW (indicado para textos de alta cardinalidade, como nomes
+# e identificadores) ou "category" (indicado para textos de baixa cardinalidade)
+TEXTO_ARROW = "string[pyarrow]"
+
+# BOM que alguns arquivos do INEP possuem no início do cabeçalho
+_BOM = b"\xef\xbb\xbf"
+
+
+def descompacta(compactado: Path, destino: Path) -> None:
+    """
+    Descompacta todo o conteúdo de um arquivo zip ou rar em {destino}. Os
+    arquivos rar são descompactados com o unrar (ou 7z) utilizando as threads
+    disponíveis ao processo e, caso nenhum deles exista, pelo rarfile
+
+    :param compactado: caminho do arquivo compactado
+    :param destino: pasta de destino
+    """
+    destino.mkdir(parents=True, exist_ok=True)
+    if zipfile.is_zipfile(compactado):
+        with zipfile.ZipFile(compactado) as z:
+            z.extractall(destino)
+        return
+
+    threads = obtem_threads()
+    unrar = shutil.which(rarfile.UNRAR_TOOL)
+    sete = shutil.which("7z") or shutil.which("7za")
+    if unrar is not None:
+        cmd = [unrar, "x", f"-mt{threads}", "-o+", "-idq", "-y"]
+        cmd += [str(compactado), f"{destino}{os.sep}"]
+    elif sete is not None:
+        cmd = [sete, "x", "-y", f"-mmt{threads}", f"-o{destino}", str(compactado)]
+    else:
+        with rarfile.RarFile(compactado) as z:
+            z.extractall(destino)
+        return
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+
+
+def _crc32(caminho: Path) -> int:
+    """
+    Calcula o CRC32 de um arquivo lendo-o em blocos
+
+    :param caminho: caminho do arquivo
+    :return: CRC32 do conteúdo
+    """
+    crc = 0
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(bloco, crc)
+    return crc
+
+
+def extrai_csv(z: zipfile.ZipFile, arq: str, pasta: Path) -> Path:
+    """
+    Descompacta o arquivo compactado {arq} contido em {z} na pasta de cache
+    {pasta}/<zip>/<arquivo>, registrando o CRC do arquivo de origem e o
+    CRC32 do CSV extraído. Enquanto o arquivo de origem não mudar e o CSV
+    já extraído possuir o mesmo CRC32 ele é reaproveitado, inclusive por
+    outros ETLs do mesmo ano
+
+    :param z: arquivo zip do censo
+    :param arq: nome do arquivo compactado dentro de {z}
+    :param pasta: pasta de cache das extrações
+    :return: caminho do CSV extraído (primeiro CSV de {arq})
+    """
+    logger = logging.getLogger(__name__)
+    info = z.getinfo(arq)
+    destino = pasta / Path(str(z.filename)).stem / Path(arq).stem
+    manifesto = destino / _MANIFESTO
+    if manifesto.exists():
+        with open(manifesto) as f:
+            reg = json.load(f)
+        extraido = destino / reg["arquivo"]
+        if (
+            reg["crc_origem"] == info.CRC
+            and reg["tamanho_origem"] == info.file_size
+            and extraido.exists()
+            and extraido.stat().st_size == reg["tamanho"]
+        ):
+            if _crc32(extraido) == reg["crc32"]:
+                return extraido
+            logger.warning(f"O CRC32 de {extraido} não confere e ele será extraído")
+
+    logger.info(f"Descompactando {arq} em {destino}")
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temp = Path(tempfile.mkdtemp(prefix=f".{destino.name}_", dir=destino.parent))
+    try:
+        compactado = temp / Path(arq).name
+        with z.open(arq) as entrada, open(compactado, "wb") as saida:
+            shutil.copyfileobj(entrada, saida, 1024 * 1024)
+        leitor = zipfile.ZipFile if zipfile.is_zipfile(compactado) else rarfile.RarFile
+        with leitor(compactado) as n:
+            csvs = [m for m in n.namelist() if m.lower().endswith(".csv")]
+        if len(csvs) == 0:
+            raise ValueError(f"O arquivo {arq} não possuí um CSV")
+        nome = csvs[0]
+        descompacta(compactado, temp / "dados")
+        compactado.unlink()
+
+        with open(temp / "dados" / _MANIFESTO, "w") as f:
+            json.dump(
+                dict(
+                    origem=arq,
+                    crc_origem=info.CRC,
+                    tamanho_origem=info.file_size,
+                    arquivo=nome,
+                    tamanho=(temp / "dados" / nome).stat().st_size,
+                    crc32=_crc32(temp / "dados" / nome),
+                ),
+                f,
+            )
+
+        # substitui a extração anterior apenas com a nova completa
+        shutil.rmtree(destino, ignore_errors=True)
+        os.replace(temp / "dados", destino)
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+    return destino / nome
+
+
+@contextlib.contextmanager
+def abre_arquivo(
+    z: zipfile.ZipFile, arq: str, pasta: Path
+) -> typing.Iterator[typing.IO[bytes]]:
+    """
+    Abre um fluxo de leitura do CSV {arq} contido em {z}. Quando {arq} é
+    outro arquivo compactado ele é extraído na pasta de cache {pasta} e o
+    fluxo é o do CSV extraído
+
+    :param z: arquivo zip do censo
+    :param arq: arquivo a ser aberto
+    :param pasta: pasta de cache onde os arquivos compactados são extraídos
+    :return: fluxo de bytes do CSV
+    """
+    if ".csv" in arq.lower():
+        with z.open(arq) as f:
+            yield f
+    elif ".zip" in arq.lower() or ".rar" in arq.lower():
+        with open(extrai_csv(z, arq, pasta), "rb") as f:
+            yield f
+    else:
+        raise ValueError(f"Não sabemos como processar o arquivo {arq}")
+
+
+def le_cabecalho(
+    f: typing.IO[bytes], encoding: str = "latin-1", sep: str = "|"
+) -> typing.List[str]:
+    """
+    Lê apenas a linha de cabeçalho do fluxo, deixando-o posicionado no
+    início dos dados
+
+    :param f: fluxo de bytes do CSV
+    :param encoding: codificação do arquivo
+    :param sep: separador das colunas
+    :return: lista com os nomes das colunas
+    """
+    linha = f.readline()
+    if linha.startswith(_BOM):
+        linha = linha[len(_BOM) :]
+    return next(csv.reader([linha.decode(encoding).rstrip("\r\n")], delimiter=sep))
 
 
 class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
@@ -22,6 +219,7 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
 
     _ano: typing.Union[str, int]
     _tabela: str
+    _estagiar: bool
     _configs: typing.Dict[str, typing.Any]
     _regioes: str
     _carrega_cols: typing.List[str]
@@ -38,6 +236,10 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
         criar_caminho: bool = True,
         reprocessar: bool = False,
         regioes: typing.Sequence[str] = ("CO", "NORDESTE", "NORTE", "SUDESTE", "SUL"),
+        particionar_uf: bool = False,
+        ufs: typing.Optional[typing.Sequence[int]] = None,
+        fontes: typing.Optional[typing.Dict[str, str]] = None,
+        estagiar: bool = False,
     ) -> None:
         """
         Instância o objeto de ETL Censo Escolar
@@ -49,6 +251,10 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
         :param criar_caminho: flag indicando se devemos criar os caminhos
         :param reprocessar: flag se devemos reprocessar o conteúdo do ETL
         :param regioes: lista de regiões que devem ser processadas
+        :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+        :param ufs: códigos das UFs a serem carregadas das saídas (None carrega todas)
+        :param fontes: arquivos disponíveis e links para download (None utiliza o catálogo)
+        :param estagiar: flag se os arquivos lidos do zip devem ser gravados no estágio
         """
         super().__init__(
             entrada=entrada,
@@ -57,8 +263,12 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
             ano=ano,
             criar_caminho=criar_caminho,
             reprocessar=reprocessar,
+            particionar_uf=particionar_uf,
+            ufs=ufs,
+            fontes=fontes,
         )
         self._tabela = tabela
+        self._estagiar = estagiar
 
         # carrega o arquivo YAML de configurações
         self._configs = carrega_yaml(f"aquis_censo_{tabela}.yml")
@@ -70,19 +280,27 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
         ano = self.ano
         while ano > 2006:
             try:
-                self._carrega_cols = (
-                    carrega_excel(
-                        f"aquis_censo_{tabela}_cols.xlsx", sheet_name=str(ano)
-                    )
-                    .loc[lambda f: f["USAR"] == 1, "COLUNA"]
-                    .to_list()
+                cols = carrega_excel(
+                    f"aquis_censo_{tabela}_cols.xlsx", sheet_name=str(ano)
                 )
+                self._carrega_cols = cols.loc[
+                    lambda f: f["USAR"] == 1, "COLUNA"
+                ].to_list()
             except NameError:
                 self._logger.warning(
                     f"Ano {ano} não encontrado na configuração de colunas, utilizando ano anteiror"
                 )
                 ano -= 1
             else:
+                # para particionar as saídas carrega a UF quando ela não puder
+                # ser obtida a partir do município
+                if (
+                    particionar_uf
+                    and "CO_MUNICIPIO" not in self._carrega_cols
+                    and "CO_UF" not in self._carrega_cols
+                    and "CO_UF" in cols["COLUNA"].to_list()
+                ):
+                    self._carrega_cols.append("CO_UF")
                 break
 
         # obtém o de-para de tipo e de nome
@@ -90,6 +308,13 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
         self._dtype = dict(zip(dtype["COLUNA"].to_list(), dtype["DTYPE"].to_list()))
         self._rename = dict(zip(dtype["COLUNA"].to_list(), dtype["RENAME"].to_list()))
 
+        # as colunas de texto declaradas como TEXTO_ARROW no schema já são
+        # lidas do CSV nesta representação
+        schema = {**self._configs["DEPARA_SCHEMA"], **self._configs["DADOS_SCHEMA"]}
+        for col, nome in self._rename.items():
+            if self._dtype.get(col) == "str" and schema.get(nome) == TEXTO_ARROW:
+                self._dtype[col] = TEXTO_ARROW
+
         # gera uma lista com todas as colunas do tipo IN_
         self._cols_in = (
             dtype.loc[lambda f: f["RENAME"].str.startswith("IN_"), "RENAME"]
@@ -97,76 +322,213 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
             .to_list()
         )
 
-    @staticmethod
-    def carrega_arquivo(
-        arq: str, buffer: typing.Union[str, Path, typing.IO[bytes], BytesIO], **kwargs
-    ) -> pd.DataFrame:
+    @property
+    def etls_extracao(self) -> typing.List["_BaseCensoEscolarETL"]:
+        """
+        Lista os objetos que extraem os arquivos do zip do censo para este
+        ETL (o próprio objeto ou, no caso de matrícula, os ETLs de cada região)
+
+        :return: lista de objetos de ETL
         """
-        Le os dados de um arquivo contido em um buffer
+        return [self]
 
+    def arquivos_entrada(self, nomes: typing.Iterable[str]) -> typing.List[str]:
+        """
+        Seleciona dentre os arquivos do zip do censo aqueles que pertencem
+        à tabela e às regiões do objeto
+
+        :param nomes: nomes dos arquivos contidos no zip do censo
+        :return: lista de arquivos do objeto
+        """
+        padrao_comp = (
+            f"({self._tabela.lower()}|{self._tabela.upper()}|{self._tabela.lower().title()})"
+            f"({self._regioes})?"
+            f"[.](csv|CSV|rar|RAR|zip|ZIP)"
+        )
+        return [f for f in nomes if re.search(padrao_comp, f.lower()) is not None]
+
+    def le_arquivo(self, z: zipfile.ZipFile, arq: str) -> pd.DataFrame:
+        """
+        Carrega um arquivo do zip do censo descompactando-o uma única vez:
+        o cabeçalho é lido do fluxo, comparado contra as configurações e o
+        restante do fluxo é lido com os nomes das colunas já obtidos
+
+        :param z: arquivo zip do censo
         :param arq: arquivo a ser carregado
-        :param buffer: buffer para o arquivo
-        :return: data-frame
-        """
-        # e este arquivo for um CSV
-        if ".csv" in arq.lower():
-            return pd.read_csv(buffer, **kwargs)
-
-        # caso seja outro arquivo zip
-        elif ".zip" in arq.lower():
-            with zipfile.ZipFile(buffer) as z:
-                arq = z.namelist()[0]
-                return pd.read_csv(z.open(arq), **kwargs)
-
-        # caso seja um arquivo winrar
-        elif ".rar" in arq.lower():
-            with rarfile.RarFile(buffer) as z:
-                arq = z.namelist()[0]
-                return pd.read_csv(z.open(arq), **kwargs)
-        else:
-            raise ValueError(f"Não sabemos como processar o arquivo {arq}")
+        :return: data frame com as colunas já renomeadas
+        """
+        conf: typing.Dict[str, typing.Any] = dict(encoding="latin-1", sep="|")
+        with abre_arquivo(z, arq, self.caminho_entrada / PASTA_EXTRAIDOS) as f:
+            cabecalho = le_cabecalho(f, **conf)
+            total_cols = set(cabecalho)
+            if len(total_cols - set(self._dtype)) > 0:
+                self._logger.warning(
+                    f"As colunas {total_cols - set(self._dtype)} foram adicionadas ao dataset, "
+                    f"avalie se não é necessário adiciona-las ao arquivo de configuração"
+                )
 
-    def _extract(self) -> None:
+            df = pd.read_csv(
+                f,
+                header=None,
+                names=cabecalho,
+                usecols=self._carrega_cols,
+                dtype=self._dtype,
+                **conf,
+            )
+        df.rename(columns=self._rename, inplace=True)
+        return df
+
+    @property
+    def hash_configuracao(self) -> str:
         """
-        Extraí os dados do objeto
+        Hash das configurações de carregamento (colunas, tipos e nomes),
+        registrado nos arquivos de estágio gerados com estas configurações
+
+        :return: hash de 12 caracteres
         """
-        # para cada arquivo do censo
-        with zipfile.ZipFile(self.caminho_entrada / f"{self.ano}.zip") as z:
-            # gera o padrão de pesquisa
-            padrao_comp = (
-                f"({self._tabela.lower()}|{self._tabela.upper()}|{self._tabela.lower().title()})"
-                f"({self._regioes})?"
-                f"[.](csv|CSV|rar|RAR|zip|ZIP)"
+        conf = dict(colunas=self._carrega_cols, dtype=self._dtype, rename=self._rename)
+        return hash_objeto(conf)[:12]
+
+    @property
+    def configuracao(self) -> typing.Dict[str, typing.Any]:
+        """
+        Configurações do objeto que alteram o conteúdo das saídas: as
+        configurações de carregamento, que ligam cada coluna do censo à
+        coluna de saída, e o YAML de tratamento da tabela
+
+        :return: dicionário serializável com as configurações
+        """
+        return dict(
+            super().configuracao,
+            colunas=self._carrega_cols,
+            dtype=self._dtype,
+            rename=self._rename,
+            regioes=self._regioes,
+            tratamento=self._configs,
+        )
+
+    def caminho_estagio(self, arq: str) -> Path:
+        """
+        Caminho do arquivo de estágio (Arrow IPC) de um arquivo do zip do
+        censo, identificado pelo ano, tabela e arquivo (que contém a região).
+        Existe um único estágio por arquivo, que é substituído quando as
+        configurações de carregamento mudam
+
+        :param arq: arquivo do zip do censo
+        :return: caminho do arquivo de estágio
+        """
+        return (
+            self.caminho_saida
+            / PASTA_ESTAGIO
+            / self._sub_pasta
+            / str(self.ano)
+            / self._tabela
+            / f"{Path(arq).stem}.arrow"
+        )
+
+    def _registro_estagio(self, info: zipfile.ZipInfo) -> bytes:
+        """
+        Gera o registro gravado junto ao arquivo de estágio, que identifica
+        o arquivo de origem e as configurações de carregamento
+
+        :param info: informações do arquivo de origem no zip do censo
+        :return: registro serializado
+        """
+        return json.dumps(
+            dict(
+                origem=info.filename,
+                crc_origem=info.CRC,
+                tamanho_origem=info.file_size,
+                configuracao=self.hash_configuracao,
             )
-            conf: typing.Dict[str, typing.Any] = dict(encoding="latin-1", sep="|")
+        ).encode()
 
-            # lista os conteúdos dos arquivos zip que contém o padrão
-            arqs = [
-                f for f in z.namelist() if re.search(padrao_comp, f.lower()) is not None
-            ]
+    def escreve_estagio(self, df: pd.DataFrame, z: zipfile.ZipFile, arq: str) -> Path:
+        """
+        Grava os dados carregados de um arquivo do zip do censo no estágio.
+        O arquivo é escrito sem compressão para poder ser mapeado em memória
 
-            # para cada arquivo a ser carregado
-            for arq in arqs:
-                # carrega uma versão dummy dos dados e compara contra os valores reais
-                dummy = self.carrega_arquivo(arq, z.open(arq), nrows=10, **conf)
-                total_cols = set(dummy.columns)
-                if len(total_cols - set(self._dtype)) > 0:
-                    self._logger.warning(
-                        f"As colunas {total_cols - set(self._dtype)} foram adicionadas ao dataset, "
-                        f"avalie se não é necessário adiciona-las ao arquivo de configuração"
-                    )
+        :param df: dados carregados de {arq}
+        :param z: arquivo zip do censo
+        :param arq: arquivo do zip do censo
+        :return: caminho do arquivo de estágio
+        """
+        caminho = self.caminho_estagio(arq)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(tabela.schema.metadata or {})
+        meta[_CHAVE_ESTAGIO] = self._registro_estagio(z.getinfo(arq))
+
+        temp = caminho.with_name(f".{caminho.name}.{os.getpid()}")
+        feather.write_feather(
+            tabela.replace_schema_metadata(meta), temp, compression="uncompressed"
+        )
+        os.replace(temp, caminho)
+        return caminho
+
+    def estagia(self, z: zipfile.ZipFile, arq: str) -> Path:
+        """
+        Carrega um arquivo do zip do censo e o grava no estágio
 
-            # adiciona as configurações de carregamento
-            conf["usecols"] = self._carrega_cols
-            conf["dtype"] = self._dtype
+        :param z: arquivo zip do censo
+        :param arq: arquivo a ser estagiado
+        :return: caminho do arquivo de estágio
+        """
+        return self.escreve_estagio(self.le_arquivo(z, arq), z, arq)
+
+    def estagio_atualizado(self, z: zipfile.ZipFile, arq: str) -> bool:
+        """
+        Verifica se o estágio de um arquivo existe e foi gerado a partir do
+        mesmo arquivo de origem e com as mesmas configurações de carregamento
 
-            # carrega os dados
+        :param z: arquivo zip do censo
+        :param arq: arquivo do zip do censo
+        :return: True se o estágio pode ser utilizado
+        """
+        caminho = self.caminho_estagio(arq)
+        if not caminho.exists():
+            return False
+        with pa.memory_map(str(caminho)) as f:
+            meta = pa.ipc.open_file(f).schema.metadata or {}
+        return meta.get(_CHAVE_ESTAGIO) == self._registro_estagio(z.getinfo(arq))
+
+    def le_estagio(self, z: zipfile.ZipFile, arq: str) -> typing.Optional[pd.DataFrame]:
+        """
+        Carrega um arquivo do estágio caso ele esteja atualizado. O arquivo
+        é mapeado em memória, de forma que a tabela Arrow não é copiada na
+        leitura (a conversão para o pandas ainda gera os blocos editáveis
+        utilizados pelas transformações)
+
+        :param z: arquivo zip do censo
+        :param arq: arquivo do zip do censo
+        :return: data frame ou None caso o estágio não exista ou esteja desatualizado
+        """
+        if not self.estagio_atualizado(z, arq):
+            return None
+
+        caminho = self.caminho_estagio(arq)
+        self._logger.debug(f"Carregando {arq} do estágio {caminho}")
+        tabela = feather.read_table(caminho, memory_map=True)
+        with pd.option_context("mode.string_storage", "pyarrow"):
+            return tabela.to_pandas()
+
+    def _extract(self) -> None:
+        """
+        Extraí os dados do objeto
+        """
+        # para cada arquivo do censo
+        with zipfile.ZipFile(self.caminho_entrada / f"{self.ano}.zip") as z:
+            # carrega os dados do estágio atualizado ou do zip e, se pedido,
+            # os grava no estágio para que as próximas execuções não leiam o CSV
             data = list()
-            for arq in arqs:
-                df = self.carrega_arquivo(arq, z.open(arq), **conf)
-                if df is not None:
-                    df.rename(columns=self._rename, inplace=True)
-                    data.append(df)
+            for arq in self.arquivos_entrada(z.namelist()):
+                df = self.le_estagio(z, arq)
+                if df is None:
+                    df = self.le_arquivo(z, arq)
+                    if self._estagiar:
+                        self.escreve_estagio(df, z, arq)
+                data.append(df)
 
             # verifica se algum dado foi carregado
             if len(data) == 0:
@@ -235,6 +597,7 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
                 func = _BaseCensoEscolarETL.obtem_operacao(operacao)
                 base[coluna] = func(base, colunas_origem).astype("int")
 
+    @instrumenta()
     def gera_dt_nascimento(self, base: pd.DataFrame) -> None:
         """
         Cria a coluna de data de nascimento
@@ -259,6 +622,7 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
                     format="%Y%m",
                 )
 
+    @instrumenta()
     def processa_dt(self, base: pd.DataFrame) -> None:
         """
         Realiza a conversão das colunas de datas de texto para datetime
@@ -272,6 +636,7 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
             except ValueError:
                 base[c] = pd.to_datetime(base[c], format="%d%b%Y:00:00:00")
 
+    @instrumenta()
     def processa_qt(self, base: pd.DataFrame) -> None:
         """
         Realiza o processamento das colunas de quantidades
@@ -283,6 +648,7 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
                 if c in base:
                     base[c] = base[c].replace({88888: np.nan})
 
+    @instrumenta()
     def processa_in(self, base: pd.DataFrame) -> None:
         """
         Realiza o processamento das colunas indicadoras
@@ -311,6 +677,7 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
         # realiza o tratamento das colunas IN_ a partir das configurações
         self.gera_coluna_por_comparacao(base, self._configs["TRATAMENTO_IN"])
 
+    @instrumenta()
     def processa_tp(self, base: pd.DataFrame) -> None:
         """
         Realiza o processamento das colunas de tipo
@@ -340,6 +707,7 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
                 # realiza a conversão da coluna
                 base[c] = base[c].replace(d).astype(cat)
 
+    @instrumenta()
     def remove_duplicatas(self, base: pd.DataFrame) -> typing.Union[None, pd.DataFrame]:
         """
         Remove duplicatas na base devido a uma chave secundária que gera um de-para entre
@@ -352,16 +720,21 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
             return None
 
         cols = [self._configs["COL_ID"], "ANO"] + self._configs["COLS_DEPARA"]
+        if "CO_UF" in base:
+            cols.append("CO_UF")
         base_id = base.reindex(columns=cols)
 
         self._logger.debug(base, base.shape)
         base.drop(columns=self._configs["COLS_DEPARA"], errors="ignore", inplace=True)
-        base.drop_duplicates(inplace=True)
+
+        # a entidade fica na UF do seu primeiro vínculo
+        base.drop_duplicates(subset=[c for c in base if c != "CO_UF"], inplace=True)
 
         self._logger.debug(base, base.shape)
 
         return base_id
 
+    @instrumenta()
     def ajusta_schema(
         self,
         base: pd.DataFrame,
@@ -421,18 +794,25 @@ class _BaseCensoEscolarETL(_BaseINEPETL, abc.ABC):
         self._logger.info("Processando colunas TP_")
         self.processa_tp(base)
 
+        fill = self._configs["PREENCHER_NULOS"]
+        schema = self._configs["DADOS_SCHEMA"]
+        schema_depara = self._configs["DEPARA_SCHEMA"]
+        if self._particionar_uf:
+            self._logger.info("Gerando coluna CO_UF para particionamento")
+            if "CO_MUNICIPIO" in base:
+                base["CO_UF"] = base["CO_MUNICIPIO"] // 100000
+            fill = {**fill, "CO_UF": 0}
+            schema = {**schema, "CO_UF": "uint8"}
+            schema_depara = {**schema_depara, "CO_UF": "uint8"}
+
         self._logger.info("Removendo informações duplicadas")
         base_id = self.remove_duplicatas(base)
 
         self._logger.info("Realizando ajustes finais na base")
         self._dados_saida[self.bases_saida[0]] = self.ajusta_schema(
-            base=base,
-            fill=self._configs["PREENCHER_NULOS"],
-            schema=self._configs["DADOS_SCHEMA"],
+            base=base, fill=fill, schema=schema
         )
         if base_id is not None:
             self._dados_saida[self.bases_saida[1]] = self.ajusta_schema(
-                base=base_id,
-                fill=self._configs["PREENCHER_NULOS"],
-                schema=self._configs["DEPARA_SCHEMA"],
+                base=base_id, fill=fill, schema=schema_depara
             )
@@ -1,13 +1,20 @@
 import abc
 import os
+import shutil
 import typing
 from pathlib import Path
 
 import pandas as pd
+import pyarrow.parquet as pq
 
 from src.aquisicao._base import _BaseETL
+from src.aquisicao.inep.catalogo import obtem_fonte
+from src.utils.parquet import escreve_parquet
 from src.utils.web import download_dados_web
-from src.utils.web import obtem_pagina
+
+# arquivos já baixados pelo processo, que não são baixados novamente pelos
+# demais ETLs que os utilizam (ex: as tabelas do censo de um mesmo ano)
+_BAIXADOS: typing.Set[Path] = set()
 
 
 class _BaseINEPETL(_BaseETL, abc.ABC):
@@ -23,6 +30,8 @@ class _BaseINEPETL(_BaseETL, abc.ABC):
     _base: str  # lista de bases que devem ser baixadas
     _url: str  # URL completa a lista de micro-dados
     _inep: typing.Dict[str, str]  # dicionário de links por base de dados
+    _particionar_uf: bool  # flag se as saídas são particionadas por CO_UF
+    _ufs: typing.Optional[typing.List[int]]  # UFs carregadas das saídas
 
     def __init__(
         self,
@@ -32,6 +41,9 @@ class _BaseINEPETL(_BaseETL, abc.ABC):
         ano: typing.Union[int, str] = "ultimo",
         criar_caminho: bool = True,
         reprocessar: bool = False,
+        particionar_uf: bool = False,
+        ufs: typing.Optional[typing.Sequence[int]] = None,
+        fontes: typing.Optional[typing.Dict[str, str]] = None,
     ) -> None:
         """
         Instância o objeto de ETL INEP
@@ -42,8 +54,15 @@ class _BaseINEPETL(_BaseETL, abc.ABC):
         :param ano: ano da pesquisa a ser processado (pode ser um inteiro ou 'ultimo')
         :param criar_caminho: flag indicando se devemos criar os caminhos
         :param reprocessar: flag para forçar o re-processamento das bases de dados
+        :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+        :param ufs: códigos das UFs a serem carregadas das saídas (None carrega todas)
+        :param fontes: arquivos disponíveis e links para download (None utiliza o catálogo)
         """
         super().__init__(entrada, saida, criar_caminho, reprocessar)
+        self._particionar_uf = particionar_uf
+        self._ufs = None if ufs is None else [int(uf) for uf in ufs]
+        if fontes is not None:
+            self._inep = dict(fontes)
 
         self._sub_pasta = base.replace("-", "_").replace(" ", "_")
         self._base = base.replace("-", "_")
@@ -55,24 +74,20 @@ class _BaseINEPETL(_BaseETL, abc.ABC):
         if criar_caminho:
             self.caminho_entrada.mkdir(parents=True, exist_ok=True)
 
-    def tem_dados_saida(self) -> bool:
+    def procura_saidas(self) -> bool:
         """
-        Verifica se o objeto ETL possuí todos os dados que fazem
-        parte da sua saída
+        Procura pelos dados de saída nas pastas de saída, utilizado
+        quando as saídas não possuem manifesto
 
         :return: True se os dados estiver disponíveis
         """
+        if not self.caminho_saida.is_dir():
+            return False
         saidas = set(os.listdir(self.caminho_saida))
         if saidas.issuperset(set(self.bases_saida)):
-            for b in self.bases_saida:
-                sub = os.listdir(self.caminho_saida / b)
-                if f"ANO={self.ano}" not in sub:
-                    return False
-                elif f"{self.ano}.parquet" not in os.listdir(
-                    self.caminho_saida / f"{b}/ANO={self.ano}"
-                ):
-                    return False
-            return True
+            return all(
+                self.tem_particao(self.caminho_particao(b)) for b in self.bases_saida
+            )
         else:
             return False
 
@@ -83,28 +98,196 @@ class _BaseINEPETL(_BaseETL, abc.ABC):
         """
         if self.tem_dados_saida():
             self._dados_saida = {
-                arq: pd.read_parquet(
-                    self.caminho_saida / f"{arq}/ANO={self.ano}"
-                ).assign(ANO=self.ano)
+                arq: self.le_particao(self.caminho_particao(arq)).assign(ANO=self.ano)
                 for arq in self.bases_saida
             }
 
+    @property
+    def chave_manifesto(self) -> str:
+        """
+        Identificador do manifesto do objeto (nome do objeto e ano)
+
+        :return: nome do manifesto
+        """
+        return f"{self}_{self.ano}"
+
+    @property
+    def configuracao(self) -> typing.Dict[str, typing.Any]:
+        """
+        Configurações do objeto que alteram o conteúdo das saídas
+
+        :return: dicionário serializável com as configurações
+        """
+        return dict(particionar_uf=self._particionar_uf)
+
+    def caminhos_entrada(self) -> typing.List[Path]:
+        """
+        Lista os caminhos dos arquivos de entrada (o zip do ano), sem
+        consultar a página do INEP
+
+        :return: lista de caminhos
+        """
+        return [self.caminho_entrada / f"{self.ano}.zip"]
+
+    def caminhos_saida(self) -> typing.Dict[str, Path]:
+        """
+        Lista as partições de cada base de saída no ano do objeto
+
+        :return: dicionário com a base de saída e a sua partição
+        """
+        return {b: self.caminho_particao(b) for b in self.bases_saida}
+
+    def caminho_particao(self, base: str) -> Path:
+        """
+        Caminho da pasta com os dados de uma base de saída no ano do objeto
+
+        :param base: nome da base de saída
+        :return: caminho da partição
+        """
+        return self.caminho_saida / f"{base}/ANO={self.ano}"
+
+    def tem_particao(self, caminho: Path) -> bool:
+        """
+        Verifica se uma partição de saída possuí dados, seja no formato
+        simples ({ano}.parquet) ou particionada por UF (CO_UF=*/{ano}.parquet)
+
+        :param caminho: caminho da partição
+        :return: True se os dados estiverem disponíveis
+        """
+        if not caminho.is_dir():
+            return False
+        conteudo = os.listdir(caminho)
+        if f"{self.ano}.parquet" in conteudo:
+            return True
+        ufs = [c for c in conteudo if c.startswith("CO_UF=")]
+        return len(ufs) > 0 and all(
+            f"{self.ano}.parquet" in os.listdir(caminho / uf) for uf in ufs
+        )
+
+    def colunas_saida(self, base: str) -> typing.List[str]:
+        """
+        Lista as colunas de uma base de saída no ano do objeto a partir
+        do esquema dos seus arquivos, sem carregar os dados (a não ser que
+        a partição ainda não tenha sido gerada)
+
+        :param base: nome da base de saída
+        :return: nomes das colunas
+        """
+        caminho = self.caminho_particao(base)
+        for raiz, _, arquivos in os.walk(caminho):
+            if f"{self.ano}.parquet" in arquivos:
+                return pq.read_schema(Path(raiz) / f"{self.ano}.parquet").names
+        return self.le_saida(base).columns.tolist()
+
+    def le_saida(
+        self, base: str, colunas: typing.Optional[typing.Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Lê uma base de saída no ano do objeto. Quando a partição ainda não
+        foi gerada os dados são processados pelo objeto (dados_saida), sem
+        serem exportados, e retornados com as mesmas colunas da partição
+
+        :param base: nome da base de saída
+        :param colunas: colunas a serem lidas (None lê todas)
+        :return: data frame com os dados da base
+        """
+        caminho = self.caminho_particao(base)
+        if self.tem_particao(caminho):
+            return self.le_particao(caminho, colunas)
+
+        self._logger.info(f"A partição {caminho} não existe, processando {base}")
+        df = self.dados_saida[base]
+        if self._ufs is not None:
+            ufs = df["CO_UF"] if "CO_UF" in df else df["CO_MUNICIPIO"] // 100000
+            df = df.loc[ufs.isin(self._ufs).values]
+        # as colunas de ano e UF não são escritas nos arquivos da partição
+        df = df.drop(columns=["ANO", "CO_UF"], errors="ignore")
+        df = df if colunas is None else df[list(colunas)]
+        return df.reset_index(drop=True)
+
+    def le_particao(
+        self, caminho: Path, colunas: typing.Optional[typing.Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Lê uma partição de saída, filtrando as UFs do objeto. Quando a partição
+        é particionada por UF apenas os arquivos das UFs selecionadas são lidos
+
+        :param caminho: caminho da partição
+        :param colunas: colunas a serem lidas (None lê todas)
+        :return: data frame com os dados da partição
+        """
+        colunas = None if colunas is None else list(colunas)
+        if any(c.startswith("CO_UF=") for c in os.listdir(caminho)):
+            filtros = None if self._ufs is None else [("CO_UF", "in", self._ufs)]
+            with pd.option_context("mode.string_storage", "pyarrow"):
+                df = pd.read_parquet(caminho, columns=colunas, filters=filtros)
+            return df.drop(columns="CO_UF", errors="ignore")
+
+        # o município é necessário para filtrar as UFs
+        extra = (
+            colunas is not None
+            and self._ufs is not None
+            and "CO_MUNICIPIO" not in colunas
+        )
+        # as colunas de texto do arrow (string[pyarrow]) continuam no arrow
+        with pd.option_context("mode.string_storage", "pyarrow"):
+            df = pd.read_parquet(
+                caminho, columns=colunas + ["CO_MUNICIPIO"] if extra else colunas
+            )
+        if self._ufs is not None:
+            if "CO_MUNICIPIO" not in df:
+                raise ValueError(
+                    f"A base {caminho} não está particionada por UF e não possuí "
+                    f"a coluna CO_MUNICIPIO para filtrar as UFs {self._ufs}"
+                )
+            df = df.loc[lambda f: (f["CO_MUNICIPIO"] // 100000).isin(self._ufs)]
+        return df.drop(columns="CO_MUNICIPIO") if extra else df
+
+    def escreve_particao(self, df: pd.DataFrame, caminho: Path, base: str) -> None:
+        """
+        Escreve uma base de saída em sua partição, substituindo o conteúdo
+        anterior. Se o objeto particionar as saídas por UF cada valor de
+        CO_UF é escrito em sua própria pasta (CO_UF=*/{ano}.parquet)
+
+        :param df: base de saída
+        :param caminho: caminho da partição
+        :param base: nome da base de saída
+        """
+        shutil.rmtree(caminho, ignore_errors=True)
+        caminho.mkdir(parents=True, exist_ok=True)
+
+        df = df.drop(columns="ANO")
+        if not self._particionar_uf:
+            escreve_parquet(
+                df.drop(columns="CO_UF", errors="ignore"),
+                caminho / f"{self.ano}.parquet",
+                base,
+                index=False,
+            )
+            return
+
+        ufs = df["CO_UF"].fillna(0).astype("int")
+        for uf, sub in df.drop(columns="CO_UF").groupby(ufs.values, sort=True):
+            (caminho / f"CO_UF={uf}").mkdir()
+            escreve_parquet(
+                sub, caminho / f"CO_UF={uf}/{self.ano}.parquet", base, index=False
+            )
+
     @property
     def inep(self) -> typing.Dict[str, str]:
         """
-        Realiza o web-scraping da página de dados do INEP e popula
+        Obtém do catálogo de fontes (compartilhado por todos os ETLs e
+        atualizado pelo web-scraping da página do INEP quando necessário)
         um dicionário com o nome de cada base disponível e o link
-        para baixar os dados
+        para baixar os dados, a não ser que as fontes tenham sido
+        informadas na criação do objeto
 
         :return: dicionário com nome do arquivo e link para a página
         """
-
         if not hasattr(self, "_inep"):
-            soup = obtem_pagina(self._url)
-            self._inep = {
-                tag.text[::-1][:4][::-1] + ".zip": tag["href"]
-                for tag in soup.find_all("a", {"class": "external-link"})
-            }
+            self._inep = obtem_fonte(
+                self.caminho_entrada.parent, self._sub_pasta, self._url
+            )
         return self._inep
 
     @property
@@ -139,20 +322,16 @@ class _BaseINEPETL(_BaseETL, abc.ABC):
         Realiza o download das bases de dados que serão utilizadas pelo objeto
         """
         base = f"{self.ano}.zip"
+        if self.caminho_entrada / base in _BAIXADOS:
+            return
         link = self.inep[base]
         if base not in os.listdir(self.caminho_entrada) or self.reprocessar:
             download_dados_web(self.caminho_entrada / base, link)
+            _BAIXADOS.add(self.caminho_entrada / base)
 
     def _load(self) -> None:
         """
         Exporta os dados transformados
         """
         for arq, df in self.dados_saida.items():
-            (self.caminho_saida / f"{arq}/ANO={self.ano}").mkdir(
-                parents=True, exist_ok=True
-            )
-
-            df.drop(columns="ANO").to_parquet(
-                self.caminho_saida / f"{arq}/ANO={self.ano}/{self.ano}.parquet",
-                index=False,
-            )
+            self.escreve_particao(df, self.caminho_particao(arq), arq)
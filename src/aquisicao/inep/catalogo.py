@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import threading
+import time
+import typing
+from pathlib import Path
+
+import bs4
+import requests
+
+from src.utils.web import obtem_cabecalhos
+from src.utils.web import obtem_paginas
+
+# pasta do catálogo de fontes, gravada na pasta de entrada da aquisição.
+# Cada base possuí o seu próprio arquivo, de forma que atualizações
+# concorrentes de bases diferentes não sobrescrevem umas às outras
+PASTA_CATALOGO = "_catalogo_inep"
+
+# idade máxima (s) do catálogo de uma base antes de ser atualizado
+VALIDADE_CATALOGO: float = 7 * 24 * 60 * 60
+
+
+def caminho_catalogo(entrada: typing.Union[str, Path], base: str) -> Path:
+    """
+    Caminho do catálogo de uma base do INEP
+
+    :param entrada: pasta de entrada da aquisição
+    :param base: nome da base no catálogo
+    :return: caminho do arquivo JSON
+    """
+    return Path(entrada) / PASTA_CATALOGO / f"{base}.json"
+
+
+def le_fonte(
+    entrada: typing.Union[str, Path], base: str
+) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """
+    Lê o catálogo de uma base do INEP
+
+    :param entrada: pasta de entrada da aquisição
+    :param base: nome da base no catálogo
+    :return: dicionário com as informações da base (None se não existir)
+    """
+    try:
+        with open(caminho_catalogo(entrada, base)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def le_catalogo(entrada: typing.Union[str, Path]) -> typing.Dict[str, typing.Any]:
+    """
+    Lê o catálogo de fontes do INEP
+
+    :param entrada: pasta de entrada da aquisição
+    :return: dicionário com as informações de cada base (vazio se não existir)
+    """
+    pasta = Path(entrada) / PASTA_CATALOGO
+    if not pasta.is_dir():
+        return dict()
+    catalogo = {a.stem: le_fonte(entrada, a.stem) for a in pasta.glob("*.json")}
+    return {b: f for b, f in catalogo.items() if f is not None}
+
+
+def grava_catalogo(
+    entrada: typing.Union[str, Path], catalogo: typing.Dict[str, typing.Any]
+) -> None:
+    """
+    Grava o catálogo das bases informadas, mantendo as demais. O arquivo de
+    cada base é escrito em um arquivo temporário e substituído apenas quando
+    o novo estiver completo
+
+    :param entrada: pasta de entrada da aquisição
+    :param catalogo: dicionário com as informações de cada base
+    """
+    for base, fonte in catalogo.items():
+        caminho = caminho_catalogo(entrada, base)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temp = caminho.with_name(
+            f".{caminho.name}.{os.getpid()}.{threading.get_ident()}"
+        )
+        with open(temp, "w") as f:
+            json.dump(fonte, f, indent=2, sort_keys=True)
+        os.replace(temp, caminho)
+
+
+def extrai_links_inep(soup: bs4.BeautifulSoup) -> typing.Dict[str, str]:
+    """
+    Extraí os links de download de uma página de micro-dados do INEP,
+    identificados pelo ano no final do texto de cada link
+
+    :param soup: página de micro-dados
+    :return: dicionário com nome do arquivo ({ano}.zip) e link para download
+    """
+    return {
+        tag.text[::-1][:4][::-1] + ".zip": tag["href"]
+        for tag in soup.find_all("a", {"class": "external-link"})
+    }
+
+
+def atualiza_catalogo(
+    entrada: typing.Union[str, Path],
+    fontes: typing.Dict[str, str],
+    metadados: bool = True,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Atualiza o catálogo de algumas bases do INEP a partir das suas páginas
+    de micro-dados, que são lidas de forma concorrente. Para cada arquivo
+    são registrados o link e, se {metadados}, o tamanho e a data de
+    modificação informados pelo servidor
+
+    :param entrada: pasta de entrada da aquisição
+    :param fontes: dicionário com o nome de cada base e a url da sua página
+    :param metadados: flag se devemos consultar o tamanho e data dos arquivos
+    :return: catálogo das bases atualizadas
+    """
+    bases = list(fontes)
+    paginas = obtem_paginas([fontes[b] for b in bases], validade=0)
+    links = {b: extrai_links_inep(p) for b, p in zip(bases, paginas)}
+
+    urls = [u for b in bases for u in links[b].values()]
+    cabecalhos = dict(zip(urls, obtem_cabecalhos(urls) if metadados else []))
+
+    catalogo = dict()
+    for b in bases:
+        arquivos = dict()
+        for arq, url in links[b].items():
+            cab = cabecalhos.get(url, dict())
+            tamanho = cab.get("Content-Length")
+            arquivos[arq] = dict(
+                url=url,
+                tamanho=int(tamanho) if tamanho is not None else None,
+                modificado=cab.get("Last-Modified"),
+            )
+        catalogo[b] = dict(url=fontes[b], atualizado_em=time.time(), arquivos=arquivos)
+    grava_catalogo(entrada, catalogo)
+    return catalogo
+
+
+def obtem_fonte(
+    entrada: typing.Union[str, Path],
+    base: str,
+    url: str,
+    validade: float = VALIDADE_CATALOGO,
+) -> typing.Dict[str, str]:
+    """
+    Obtém os arquivos disponíveis de uma base do INEP pelo catálogo, que é
+    atualizado apenas quando não possuí a base ou ela é mais antiga que
+    {validade}. Caso a atualização falhe o catálogo anterior é utilizado
+
+    :param entrada: pasta de entrada da aquisição
+    :param base: nome da base no catálogo
+    :param url: url da página de micro-dados da base
+    :param validade: idade máxima (s) do catálogo da base
+    :return: dicionário com nome do arquivo e link para download
+    """
+    fonte = le_fonte(entrada, base)
+    if (
+        fonte is None
+        or fonte["url"] != url
+        or time.time() - fonte["atualizado_em"] > validade
+    ):
+        try:
+            fonte = atualiza_catalogo(entrada, {base: url})[base]
+        except requests.RequestException as erro:
+            if fonte is None:
+                raise
+            logging.getLogger(__name__).warning(
+                f"Não foi possível atualizar o catálogo de {base} ({erro}), "
+                f"utilizando a versão anterior"
+            )
+    return {arq: info["url"] for arq, info in fonte["arquivos"].items()}
+
+
+def anos_disponiveis(entrada: typing.Union[str, Path], base: str) -> typing.List[int]:
+    """
+    Lista os anos de uma base disponíveis no catálogo, sem atualizá-lo
+
+    :param entrada: pasta de entrada da aquisição
+    :param base: nome da base no catálogo
+    :return: lista ordenada de anos (vazia se a base não estiver no catálogo)
+    """
+    fonte = le_fonte(entrada, base) or dict(arquivos=dict())
+    return sorted(int(arq[:4]) for arq in fonte["arquivos"] if arq[:4].isnumeric())
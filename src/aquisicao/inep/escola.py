@@ -20,6 +20,10 @@ class EscolaETL(_BaseCensoEscolarETL):
         ano: typing.Union[int, str] = "ultimo",
         criar_caminho: bool = True,
         reprocessar: bool = False,
+        particionar_uf: bool = False,
+        ufs: typing.Optional[typing.Sequence[int]] = None,
+        fontes: typing.Optional[typing.Dict[str, str]] = None,
+        estagiar: bool = False,
     ) -> None:
         """
         Instância o objeto de ETL de dados de Escola
@@ -29,6 +33,10 @@ class EscolaETL(_BaseCensoEscolarETL):
         :param ano: ano da pesquisa a ser processado (pode ser um inteiro ou 'ultimo')
         :param criar_caminho: flag indicando se devemos criar os caminhos
         :param reprocessar: flag se devemos reprocessar o conteúdo do ETL
+        :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+        :param ufs: códigos das UFs a serem carregadas das saídas (None carrega todas)
+        :param fontes: arquivos disponíveis e links para download (None utiliza o catálogo)
+        :param estagiar: flag se os arquivos lidos do zip devem ser gravados no estágio
         """
         super().__init__(
             entrada=entrada,
@@ -37,6 +45,10 @@ class EscolaETL(_BaseCensoEscolarETL):
             ano=ano,
             criar_caminho=criar_caminho,
             reprocessar=reprocessar,
+            particionar_uf=particionar_uf,
+            ufs=ufs,
+            fontes=fontes,
+            estagiar=estagiar,
         )
 
     @property
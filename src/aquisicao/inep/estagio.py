@@ -0,0 +1,145 @@
+import logging
+import os
+import shutil
+import typing
+import zipfile
+from pathlib import Path
+
+from src.aquisicao.inep._censo import PASTA_ESTAGIO
+from src.aquisicao.inep._censo import PASTA_EXTRAIDOS
+from src.aquisicao.inep._censo import _BaseCensoEscolarETL
+from src.utils.paralelo import executa_em_paralelo
+
+# zip do censo aberto uma única vez em cada processo de estágio
+_ZIP: typing.Optional[zipfile.ZipFile] = None
+
+
+def _abre_zip(caminho: Path) -> None:
+    """
+    Abre o zip do censo no processo
+
+    :param caminho: caminho do zip do censo
+    """
+    global _ZIP
+    _ZIP = zipfile.ZipFile(caminho)
+
+
+def _estagia_arquivo(etl: _BaseCensoEscolarETL, arq: str) -> Path:
+    """
+    Estagia um arquivo do zip do censo aberto por _abre_zip
+
+    :param etl: objeto de ETL dono do arquivo
+    :param arq: arquivo do zip do censo
+    :return: caminho do arquivo de estágio
+    """
+    if _ZIP is None:
+        raise ValueError("O zip do censo não foi aberto no processo")
+    return etl.estagia(_ZIP, arq)
+
+
+def estagia_ano(
+    etls: typing.Sequence[_BaseCensoEscolarETL],
+    processos: typing.Optional[int] = None,
+    memoria: typing.Optional[float] = None,
+) -> typing.Dict[str, Path]:
+    """
+    Converte para Arrow IPC, em uma única passada pelo zip do censo de um ano,
+    os arquivos de todas as tabelas dos {etls}. Cada arquivo do zip é
+    direcionado ao ETL que o carrega e convertido em paralelo, de forma que
+    a extração de cada ETL passa a ler apenas o seu arquivo de estágio.
+
+    Os arquivos cujo estágio já está atualizado não são convertidos novamente.
+    O estágio não é comprimido e ocupa aproximadamente o tamanho das colunas
+    carregadas em memória, podendo ser removido com limpa_caches
+
+    :param etls: objetos de ETL do censo escolar de um mesmo ano
+    :param processos: número máximo de processos (padrão é o número de CPUs)
+    :param memoria: orçamento de memória em bytes para as conversões simultâneas
+    :return: dicionário com o arquivo do zip e o caminho do seu estágio
+    """
+    logger = logging.getLogger(__name__)
+    folhas = [e for etl in etls for e in etl.etls_extracao]
+    if len(folhas) == 0:
+        return dict()
+
+    anos = {e.ano for e in folhas}
+    if len(anos) > 1:
+        raise ValueError(f"Os ETLs devem ser de um único ano e não de {anos}")
+
+    caminho = folhas[0].caminho_entrada / f"{folhas[0].ano}.zip"
+    tarefas: typing.Dict[str, typing.Tuple[_BaseCensoEscolarETL, str]] = dict()
+    estimativas: typing.Dict[str, float] = dict()
+    estagios: typing.Dict[str, Path] = dict()
+    with zipfile.ZipFile(caminho) as z:
+        nomes = z.namelist()
+        for etl in folhas:
+            for arq in etl.arquivos_entrada(nomes):
+                if arq in tarefas or arq in estagios:
+                    continue
+                if etl.estagio_atualizado(z, arq):
+                    estagios[arq] = etl.caminho_estagio(arq)
+                else:
+                    tarefas[arq] = (etl, arq)
+                    estimativas[arq] = float(z.getinfo(arq).file_size)
+
+    logger.info(
+        f"Estagiando {len(tarefas)} arquivos de {caminho} "
+        f"({len(estagios)} já estão atualizados)"
+    )
+    resultados = executa_em_paralelo(
+        func=_estagia_arquivo,
+        tarefas=tarefas,
+        processos=processos or min(len(tarefas), os.cpu_count() or 1) or 1,
+        memoria=memoria,
+        estimativas=estimativas,
+        inicializador=_abre_zip,
+        args_inicializador=(caminho,),
+    )
+
+    # com um único processo o zip foi aberto no processo atual
+    global _ZIP
+    if _ZIP is not None:
+        _ZIP.close()
+        _ZIP = None
+
+    falhas = [a for a, res in resultados.items() if isinstance(res, BaseException)]
+    if len(falhas) > 0:
+        raise ValueError(f"Não foi possível estagiar os arquivos {falhas}")
+    estagios.update(resultados)
+    return estagios
+
+
+def limpa_caches(
+    entrada: typing.Union[str, Path],
+    saida: typing.Union[str, Path],
+    ano: typing.Optional[int] = None,
+) -> int:
+    """
+    Remove os caches em disco do censo escolar: os arquivos de estágio
+    (Arrow IPC sem compressão) da pasta de saída e os CSVs descompactados
+    dos arquivos aninhados da pasta de entrada. Os zips baixados e as saídas
+    dos ETLs são mantidos
+
+    :param entrada: pasta de entrada da aquisição
+    :param saida: pasta de saída da aquisição
+    :param ano: ano a ser removido (None remove todos os anos)
+    :return: número de bytes liberados
+    """
+    pastas = [
+        Path(saida) / PASTA_ESTAGIO / "censo_escolar",
+        Path(entrada) / "censo_escolar" / PASTA_EXTRAIDOS,
+    ]
+    if ano is not None:
+        pastas = [p / str(ano) for p in pastas]
+
+    total = 0
+    for pasta in pastas:
+        if not pasta.is_dir():
+            continue
+        for raiz, _, arquivos in os.walk(pasta):
+            total += sum(os.path.getsize(Path(raiz) / a) for a in arquivos)
+        shutil.rmtree(pasta)
+    logging.getLogger(__name__).info(
+        f"Caches do censo escolar removidos ({total / 1024 ** 2:.1f} MB liberados)"
+    )
+    return total
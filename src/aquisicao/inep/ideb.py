@@ -192,48 +192,102 @@ class IDEBETL(_BaseETL):
         # transforma o de-para em um data frame
         return pd.DataFrame(proc)
 
+    @staticmethod
+    def converte_valores(bloco: pd.DataFrame) -> np.ndarray:
+        """
+        Converte um bloco de colunas brutas do IDEB em uma matriz float32,
+        removendo as marcações (*), ajustando o separador decimal e tratando
+        os valores não disponíveis (- e ND) como nulos
+
+        :param bloco: data frame com as colunas de valores do IDEB
+        :return: matriz float32 com as mesmas dimensões do bloco
+        """
+        valores = pd.Series(bloco.to_numpy(dtype=object).ravel())
+
+        # a maior parte dos valores já é numérica, então apenas os textos
+        # que não puderam ser convertidos diretamente passam pela limpeza
+        numeros = pd.to_numeric(valores, errors="coerce")
+        pendentes = numeros.isnull() & valores.notnull()
+        if pendentes.any():
+            numeros[pendentes] = (
+                valores[pendentes]
+                .astype(str)
+                .str.replace("*", "", regex=False)
+                .str.replace(",", ".", regex=False)
+                .replace({"-": np.nan, "ND": np.nan})
+                .astype("float32")
+            )
+
+        return numeros.to_numpy(dtype="float32").reshape(bloco.shape)
+
     @staticmethod
     def formata_resultados(df: pd.DataFrame, dados: pd.DataFrame) -> pd.DataFrame:
         """
         Formata o dataframe para as saídas esperadas da base de IDEB
+
+        As colunas de cada ano são agrupadas a partir do de-para de métricas
+        e empilhadas diretamente em uma matriz de valores, sem gerar uma
+        base intermediária no formato longo
+
         :param df: data frame com os dados processados
         :param dados: de-para de coluna e métrica/ano
         :return: base de saída formatada
         """
-        return (
-            df.melt(id_vars="ID_ESCOLA", var_name="COLUNA", value_name="VALOR")
-            .merge(dados)
-            .assign(
-                VALOR=lambda f: f["VALOR"]
-                .astype(str)
-                .str.replace("[*]", "")
-                .str.replace("[,]", ".")
-                .replace({"-": np.nan, "ND": np.nan})
-                .astype("float32")
-            )
-            .pivot_table(
-                index=["ID_ESCOLA", "ANO"],
-                columns=["METRICA"],
-                values="VALOR",
-                aggfunc="first",
-            )
-            .reset_index()
-        )
+        dados = dados.reset_index(drop=True)
+        metricas = sorted(dados["METRICA"].unique())
+        pos_metrica = {m: i for i, m in enumerate(metricas)}
+        anos = sorted(dados["ANO"].unique())
+        n = df.shape[0]
+
+        # converte todas as colunas de valores de uma única vez
+        valores = IDEBETL.converte_valores(df[dados["COLUNA"].to_list()])
+
+        # preenche o bloco de cada ano com as colunas das suas métricas; uma
+        # métrica com mais de uma coluna recebe, em cada escola, o primeiro
+        # valor não nulo das suas colunas
+        matriz = np.full((n * len(anos), len(metricas)), np.nan, dtype="float32")
+        for i, ano in enumerate(anos):
+            grupo = dados.loc[lambda f: f["ANO"] == ano]
+            primeiras = grupo.drop_duplicates("METRICA")
+            bloco = matriz[i * n : (i + 1) * n]
+            bloco[:, primeiras["METRICA"].map(pos_metrica).values] = valores[
+                :, primeiras.index.values
+            ]
+            for coluna, metrica in grupo.drop(primeiras.index)["METRICA"].items():
+                nulos = np.isnan(bloco[:, pos_metrica[metrica]])
+                bloco[nulos, pos_metrica[metrica]] = valores[nulos, coluna]
+
+        # remove as combinações de escola e ano sem qualquer resultado
+        ids = np.tile(df["ID_ESCOLA"].to_numpy(), len(anos))
+        col_ano = np.repeat(np.array(anos, dtype="int64"), n)
+        manter = ~np.isnan(matriz).all(axis=1)
+        ordem = np.lexsort((col_ano[manter], ids[manter]))
+
+        res = pd.DataFrame(matriz[manter][ordem], columns=metricas)
+        res.insert(0, "ANO", col_ano[manter][ordem])
+        res.insert(0, "ID_ESCOLA", ids[manter][ordem])
+        return res
 
     @staticmethod
     def concatena_saidas(saidas: typing.List[pd.DataFrame]) -> pd.DataFrame:
         """
-        Concatena as bases de dados de IDEB
+        Concatena as bases de dados de IDEB por meio de uma única junção
+        de todas as bases pela chave de escola e ano
+
         :param saidas: lista com bases de IDEB
         :return: base concatenada única
         """
-        df = pd.DataFrame()
-        for s in saidas:
-            if df.shape[0] == 0:
-                df = s
-            else:
-                df = df.merge(s, on=["ID_ESCOLA", "ANO"], how="outer")
-        return df
+        if len(saidas) == 0:
+            return pd.DataFrame()
+        return (
+            pd.concat(
+                [s.set_index(["ID_ESCOLA", "ANO"]) for s in saidas],
+                axis=1,
+                join="outer",
+            )
+            .reset_index()
+            .astype({"ID_ESCOLA": saidas[0]["ID_ESCOLA"].dtype})
+        )
 
     def _transform(self) -> None:
         """
@@ -253,7 +307,7 @@ class IDEBETL(_BaseETL):
             # extraí as métricas reportadas na base
             dados = self.obtem_metricas(df, turma)
 
-            # realiza o melt dos dados e obtém os nomes de campo ajustados
+            # empilha os dados de cada ano com os nomes de campo ajustados
             df = self.formata_resultados(df, dados)
             saidas.append(df)
 
@@ -1,4 +1,3 @@
-import os
 import typing
 from pathlib import Path
 
@@ -26,6 +25,10 @@ class _MatriculaRegiaoETL(_BaseCensoEscolarETL):
         ano: typing.Union[int, str] = "ultimo",
         criar_caminho: bool = True,
         reprocessar: bool = False,
+        particionar_uf: bool = False,
+        ufs: typing.Optional[typing.Sequence[int]] = None,
+        fontes: typing.Optional[typing.Dict[str, str]] = None,
+        estagiar: bool = False,
     ) -> None:
         """
         Instância o objeto de ETL de dados de Matrícula
@@ -36,6 +39,10 @@ class _MatriculaRegiaoETL(_BaseCensoEscolarETL):
         :param ano: ano da pesquisa a ser processado (pode ser um inteiro ou 'ultimo')
         :param criar_caminho: flag indicando se devemos criar os caminhos
         :param reprocessar: flag se devemos reprocessar o conteúdo do ETL
+        :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+        :param ufs: códigos das UFs a serem carregadas das saídas (None carrega todas)
+        :param fontes: arquivos disponíveis e links para download (None utiliza o catálogo)
+        :param estagiar: flag se os arquivos lidos do zip devem ser gravados no estágio
         """
         super().__init__(
             entrada=entrada,
@@ -45,6 +52,10 @@ class _MatriculaRegiaoETL(_BaseCensoEscolarETL):
             criar_caminho=criar_caminho,
             reprocessar=reprocessar,
             regioes=[regiao],
+            particionar_uf=particionar_uf,
+            ufs=ufs,
+            fontes=fontes,
+            estagiar=estagiar,
         )
         self.reg = regiao.upper()
 
@@ -52,6 +63,15 @@ class _MatriculaRegiaoETL(_BaseCensoEscolarETL):
     def bases_saida(self) -> typing.List[str]:
         return ["aluno.parquet", "matricula.parquet"]
 
+    @property
+    def chave_manifesto(self) -> str:
+        """
+        Identificador do manifesto do objeto (nome do objeto, ano e região)
+
+        :return: nome do manifesto
+        """
+        return f"{self}_{self.ano}_{self.reg}"
+
     def carrega_saidas(self) -> None:
         """
         Carrega os dados de saída no dicionário de dados de saída
@@ -59,36 +79,21 @@ class _MatriculaRegiaoETL(_BaseCensoEscolarETL):
         """
         if self.tem_dados_saida():
             self._dados_saida = {
-                arq: pd.read_parquet(
-                    self.caminho_saida / f"{arq}/ANO={self.ano}/REGIAO={self.reg}"
-                ).assign(ANO=self.ano, REGIAO=self.reg)
+                arq: self.le_particao(self.caminho_particao(arq)).assign(
+                    ANO=self.ano, REGIAO=self.reg
+                )
                 for arq in self.bases_saida
             }
 
-    def tem_dados_saida(self) -> bool:
+    def caminho_particao(self, base: str) -> Path:
         """
-        Verifica se o objeto ETL possuí todos os dados que fazem
-        parte da sua saída
+        Caminho da pasta com os dados de uma base de saída no ano e
+        na região do objeto
 
-        :return: True se os dados estiver disponíveis
+        :param base: nome da base de saída
+        :return: caminho da partição
         """
-        saidas = set(os.listdir(self.caminho_saida))
-        if saidas.issuperset(set(self.bases_saida)):
-            for b in self.bases_saida:
-                sub = os.listdir(self.caminho_saida / b)
-                if f"ANO={self.ano}" not in sub:
-                    return False
-                elif f"REGIAO={self.reg}" not in os.listdir(
-                    self.caminho_saida / f"{b}/ANO={self.ano}"
-                ):
-                    return False
-                elif f"{self.ano}.parquet" not in os.listdir(
-                    self.caminho_saida / f"{b}/ANO={self.ano}/REGIAO={self.reg}"
-                ):
-                    return False
-            return True
-        else:
-            return False
+        return self.caminho_saida / f"{base}/ANO={self.ano}/REGIAO={self.reg}"
 
     def processa_tp(self, base: pd.DataFrame) -> None:
         """
@@ -107,15 +112,8 @@ class _MatriculaRegiaoETL(_BaseCensoEscolarETL):
         Exporta os dados transformados
         """
         for arq, df in self.dados_saida.items():
-            (self.caminho_saida / f"{arq}/ANO={self.ano}/REGIAO={self.reg}").mkdir(
-                parents=True, exist_ok=True
-            )
-
-            df.drop(columns="ANO").to_parquet(
-                self.caminho_saida
-                / f"{arq}/ANO={self.ano}/REGIAO={self.reg}/{self.ano}.parquet",
-                index=False,
-            )
+            self.escreve_particao(df, self.caminho_particao(arq), arq)
+        self.escreve_manifesto()
 
 
 class MatriculaETL(_BaseCensoEscolarETL):
@@ -133,6 +131,10 @@ class MatriculaETL(_BaseCensoEscolarETL):
         ano: typing.Union[int, str] = "ultimo",
         criar_caminho: bool = True,
         reprocessar: bool = False,
+        particionar_uf: bool = False,
+        ufs: typing.Optional[typing.Sequence[int]] = None,
+        fontes: typing.Optional[typing.Dict[str, str]] = None,
+        estagiar: bool = False,
     ) -> None:
         """
         Instância o objeto de ETL de dados de Matrícula
@@ -142,6 +144,10 @@ class MatriculaETL(_BaseCensoEscolarETL):
         :param ano: ano da pesquisa a ser processado (pode ser um inteiro ou 'ultimo')
         :param criar_caminho: flag indicando se devemos criar os caminhos
         :param reprocessar: flag se devemos reprocessar o conteúdo do ETL
+        :param particionar_uf: flag se as saídas devem ser particionadas por CO_UF
+        :param ufs: códigos das UFs a serem carregadas das saídas (None carrega todas)
+        :param fontes: arquivos disponíveis e links para download (None utiliza o catálogo)
+        :param estagiar: flag se os arquivos lidos do zip devem ser gravados no estágio
         """
         super().__init__(
             entrada=entrada,
@@ -150,6 +156,10 @@ class MatriculaETL(_BaseCensoEscolarETL):
             ano=ano,
             criar_caminho=criar_caminho,
             reprocessar=reprocessar,
+            particionar_uf=particionar_uf,
+            ufs=ufs,
+            fontes=fontes,
+            estagiar=estagiar,
         )
         self._etls = [
             _MatriculaRegiaoETL(
@@ -159,6 +169,10 @@ class MatriculaETL(_BaseCensoEscolarETL):
                 ano=self.ano,
                 criar_caminho=criar_caminho,
                 reprocessar=reprocessar,
+                particionar_uf=particionar_uf,
+                ufs=ufs,
+                fontes=fontes,
+                estagiar=estagiar,
             )
             for reg in ["CO", "NORDESTE", "NORTE", "SUDESTE", "SUL"]
         ]
@@ -167,6 +181,26 @@ class MatriculaETL(_BaseCensoEscolarETL):
     def bases_saida(self) -> typing.List[str]:
         return ["aluno.parquet", "matricula.parquet"]
 
+    @property
+    def etls_extracao(self) -> typing.List[_BaseCensoEscolarETL]:
+        return list(self._etls)
+
+    def tem_dados_saida(self) -> bool:
+        """
+        Verifica se os ETLs de todas as regiões possuem os seus dados de saída
+
+        :return: True se os dados estiver disponíveis
+        """
+        return all(etl.tem_dados_saida() for etl in self._etls)
+
+    def saidas_atualizadas(self) -> bool:
+        """
+        Verifica se as saídas dos ETLs de todas as regiões estão atualizadas
+
+        :return: True se as saídas estão atualizadas
+        """
+        return all(etl.saidas_atualizadas() for etl in self._etls)
+
     def extract(self) -> None:
         """
         Extraí os dados do objeto
@@ -1,14 +1,9 @@
+import importlib
+import typing
 from enum import Enum
 
-from src.aquisicao.ibge.malha_br import MalhaBRIBGE
-from src.aquisicao.ibge.malha_mun import MalhaMunIBGE
-from src.aquisicao.ibge.malha_uf import MalhaUFIBGE
-from src.aquisicao.inep.docente import DocenteETL
-from src.aquisicao.inep.escola import EscolaETL
-from src.aquisicao.inep.gestor import GestorETL
-from src.aquisicao.inep.ideb import IDEBETL
-from src.aquisicao.inep.matricula import MatriculaETL
-from src.aquisicao.inep.turma import TurmaETL
+if typing.TYPE_CHECKING:
+    from src.aquisicao._base import _BaseETL
 
 
 class EnumETL(Enum):
@@ -35,17 +30,39 @@ ETL_ANUAL = [
     EnumETL.malha_br,
 ]
 
+# lista os objetos ETL do censo escolar, cujas saídas podem ser particionadas por UF
+ETL_CENSO = [
+    EnumETL.escola,
+    EnumETL.gestor,
+    EnumETL.turma,
+    EnumETL.docente,
+    EnumETL.matricula,
+]
+
 
 # chave = Enum
-# valor = Classe de objeto ETL
+# valor = (módulo, classe) do objeto ETL
+# os módulos são importados apenas quando o ETL é utilizado, já que eles
+# carregam bibliotecas pesadas (pandas, geopandas, requests, ...)
 ETL_DICT = {
-    EnumETL.escola: EscolaETL,
-    EnumETL.gestor: GestorETL,
-    EnumETL.turma: TurmaETL,
-    EnumETL.docente: DocenteETL,
-    EnumETL.matricula: MatriculaETL,
-    EnumETL.ideb: IDEBETL,
-    EnumETL.malha_mun: MalhaMunIBGE,
-    EnumETL.malha_uf: MalhaUFIBGE,
-    EnumETL.malha_br: MalhaBRIBGE,
+    EnumETL.escola: ("src.aquisicao.inep.escola", "EscolaETL"),
+    EnumETL.gestor: ("src.aquisicao.inep.gestor", "GestorETL"),
+    EnumETL.turma: ("src.aquisicao.inep.turma", "TurmaETL"),
+    EnumETL.docente: ("src.aquisicao.inep.docente", "DocenteETL"),
+    EnumETL.matricula: ("src.aquisicao.inep.matricula", "MatriculaETL"),
+    EnumETL.ideb: ("src.aquisicao.inep.ideb", "IDEBETL"),
+    EnumETL.malha_mun: ("src.aquisicao.ibge.malha_mun", "MalhaMunIBGE"),
+    EnumETL.malha_uf: ("src.aquisicao.ibge.malha_uf", "MalhaUFIBGE"),
+    EnumETL.malha_br: ("src.aquisicao.ibge.malha_br", "MalhaBRIBGE"),
 }
+
+
+def obtem_etl(etl: typing.Union[EnumETL, str]) -> typing.Type["_BaseETL"]:
+    """
+    Obtém a classe do objeto ETL, importando o seu módulo
+
+    :param etl: ETL (ou o seu nome)
+    :return: classe do objeto ETL
+    """
+    modulo, classe = ETL_DICT[EnumETL(etl)]
+    return getattr(importlib.import_module(modulo), classe)
@@ -0,0 +1,88 @@
+# Quantidade de escolas geradas na escala 1x do censo sintético
+ESCOLAS_POR_ESCALA = 200
+
+# Proporções entre as entidades do censo sintético
+TURMAS_POR_ESCOLA = 10
+MATRICULAS_POR_TURMA = 20
+MATRICULAS_POR_ALUNO = 1.05
+DOCENTES_POR_TURMA = 1.5
+TURMAS_POR_DOCENTE = 2
+GESTORES_POR_ESCOLA = 1.2
+
+# Códigos de UF por código de região e nome da região nos arquivos do censo
+UFS_POR_REGIAO = {
+    1: [11, 12, 13, 14, 15, 16, 17],
+    2: [21, 22, 23, 24, 25, 26, 27, 28, 29],
+    3: [31, 32, 33, 35],
+    4: [41, 42, 43],
+    5: [50, 51, 52, 53],
+}
+NOME_REGIAO = {1: "NORTE", 2: "NORDESTE", 3: "SUDESTE", 4: "SUL", 5: "CO"}
+MUNICIPIOS_POR_UF = 50
+
+# Valores sorteados com maior probabilidade em colunas específicas
+# chave = coluna, valor = (código preferido, probabilidade)
+VALORES_PREFERIDOS = {
+    "TP_SITUACAO_FUNCIONAMENTO": ("1", 0.9),
+}
+
+# Fração de nulos gerada nas colunas numéricas de ponto flutuante
+FRACAO_NULOS = 0.1
+
+# Métricas e etapas do IDEB sintético utilizado no datamart de escola
+METRICAS_IDEB = [
+    "APROVACAO",
+    "IDEB",
+    "IDEB_META",
+    "NOTA_MATEMATICA",
+    "NOTA_MEDIA",
+    "NOTA_PORTUGUES",
+    "REND",
+]
+ETAPAS_IDEB = ["AI", "AF", "EM"]
+
+# Escalas executadas por padrão pelo benchmark
+ESCALAS = [1, 10, 100]
+
+# Escala do censo sintético utilizado pelo teste de regressão de desempenho
+ESCALA_REGRESSAO = 5
+
+# Número de repetições de cada benchmark no teste de regressão
+REPETICOES_MICRO = 15
+REPETICOES_MACRO = 3
+
+# Número de linhas da base sintética de IDEB utilizada em formata_resultados
+LINHAS_IDEB = 10_000
+
+# Estrutura do FTP local servido ao benchmark de lista_arquivos_ftp
+# (pastas por nível e arquivos por pasta)
+PASTAS_FTP = [4, 4, 3]
+ARQUIVOS_FTP = 5
+
+# Tolerâncias de regressão por métrica: uma execução é considerada uma
+# regressão quando a mediana atual excede
+# mediana_base * (1 + RELATIVA) + FATOR_RUIDO * desvio + ABSOLUTA
+# onde desvio é o maior desvio absoluto mediano entre base e execução atual
+TOLERANCIA_RELATIVA = {"tempo": 0.25, "pico_memoria": 0.15}
+TOLERANCIA_ABSOLUTA = {"tempo": 0.005, "pico_memoria": 20 * 1024**2}
+FATOR_RUIDO = 3
+
+# Comandos da CLI (argumentos do run.py) cuja inicialização é medida e
+# módulos pesados que não devem ser importados por eles
+COMANDOS_INICIALIZACAO = [
+    "--help",
+    "aquisicao processa-etl-anual --help",
+    "datamart processa-datamart --help",
+    "benchmark regressao --help",
+]
+MODULOS_PESADOS = [
+    "pandas",
+    "numpy",
+    "pyarrow",
+    "geopandas",
+    "shapely",
+    "pyproj",
+    "requests",
+    "bs4",
+    "rarfile",
+]
@@ -0,0 +1,258 @@
+import json
+import logging
+import multiprocessing
+import shutil
+import subprocess
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from src.aquisicao.opcoes import EnumETL
+from src.aquisicao.opcoes import obtem_etl
+from src.benchmark.sintetico import gera_censo_sintetico
+from src.benchmark.sintetico import gera_ideb_sintetico
+from src.datamart.escola import carrega_cursos
+from src.datamart.escola import carrega_etapa_ensino
+from src.datamart.escola import controi_datamart_escola
+from src.utils.instrumentacao import mede_etapa
+
+# ETLs executados pelo benchmark sobre o censo sintético
+BENCHMARKS_ETL = [
+    EnumETL.escola,
+    EnumETL.turma,
+    EnumETL.docente,
+    EnumETL.gestor,
+    EnumETL.matricula,
+]
+
+
+def obtem_commit() -> typing.Optional[str]:
+    """
+    Obtém o hash do commit atual do repositório
+
+    :return: hash do commit ou None se não estivermos em um repositório git
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executa_etl_sintetico(
+    etl: str, pasta: Path, ano: int
+) -> typing.Dict[str, typing.Any]:
+    """
+    Executa um ETL do censo escolar sobre os dados sintéticos de {pasta}
+
+    :param etl: nome do ETL a ser executado
+    :param pasta: pasta com a entrada sintética (externo) e a saída (aquisicao)
+    :param ano: ano do censo sintético
+    :return: métricas da execução
+    """
+    # a entrada sintética já está disponível, então não há web-scraping do INEP
+    objeto = obtem_etl(etl)(
+        pasta / "externo",
+        pasta / "aquisicao",
+        ano,
+        True,
+        False,
+        fontes={f"{ano}.zip": ""},
+    )
+
+    with mede_etapa(f"ETL {etl}") as etapa:
+        objeto.extract()
+        objeto.transform()
+        objeto.load()
+        # ETLs compostos (matrícula) mantêm as saídas nos ETLs de cada região
+        etapa["saida"] = {
+            f"{o}.{base}": df
+            for o in [objeto] + list(getattr(objeto, "_etls", []))
+            for base, df in (o._dados_saida or dict()).items()
+        }
+    return etapa
+
+
+def executa_datamart_sintetico(
+    pasta: Path, ano: int, semente: int = 0
+) -> typing.Dict[str, typing.Any]:
+    """
+    Constrói o datamart de escola a partir das saídas dos ETLs sintéticos,
+    utilizando uma base sintética de IDEB
+
+    :param pasta: pasta com as saídas de aquisição sintéticas
+    :param ano: ano do censo sintético
+    :param semente: semente do gerador de números aleatórios
+    :return: métricas da execução
+    """
+    escolas = pd.read_parquet(
+        pasta / f"aquisicao/escola.parquet/ANO={ano}", columns=["ID_ESCOLA"]
+    )["ID_ESCOLA"]
+    fontes = dict(
+        etapa_ensino=carrega_etapa_ensino(),
+        cursos=carrega_cursos(),
+        ideb=gera_ideb_sintetico(escolas, ano, semente),
+    )
+    with mede_etapa("DATAMART ESCOLA") as etapa:
+        controi_datamart_escola(
+            ano, pasta / "externo", pasta / "aquisicao", pasta / "datamart", fontes
+        )
+    etapa["linhas_saida"] = ds.dataset(
+        pasta / f"datamart/escola.parquet/ANO={ano}", format="parquet"
+    ).count_rows()
+    return etapa
+
+
+def executa_isolado(
+    func: typing.Callable[..., typing.Dict[str, typing.Any]],
+    *args: typing.Any,
+    isolar: bool = True,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Executa um benchmark em um processo novo, de forma que o pico de memória
+    medido seja apenas o do benchmark
+
+    :param func: função do benchmark
+    :param args: argumentos da função
+    :param isolar: se False executa no processo atual
+    :return: métricas da execução
+    """
+    if not isolar:
+        return func(*args)
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return pool.submit(func, *args).result()
+
+
+def registra_resultados(
+    resultados: typing.List[typing.Dict[str, typing.Any]], arquivo: Path
+) -> None:
+    """
+    Adiciona os resultados de uma execução do benchmark ao histórico
+
+    :param resultados: lista de métricas por benchmark
+    :param arquivo: arquivo JSON lines com o histórico de resultados
+    """
+    arquivo = Path(arquivo)
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    with open(arquivo, "a", encoding="utf-8") as f:
+        for r in resultados:
+            f.write(json.dumps(r, default=str) + "\n")
+
+
+def carrega_resultados(arquivo: Path) -> pd.DataFrame:
+    """
+    Carrega o histórico de resultados do benchmark
+
+    :param arquivo: arquivo JSON lines com o histórico de resultados
+    :return: data frame com uma linha por benchmark executado
+    """
+    with open(arquivo, encoding="utf-8") as f:
+        return pd.DataFrame([json.loads(linha) for linha in f if linha.strip() != ""])
+
+
+def resume_resultados(
+    resultados: pd.DataFrame, metrica: str = "tempo_parede"
+) -> pd.DataFrame:
+    """
+    Gera uma tabela com a {metrica} de cada benchmark e escala (linhas)
+    em cada commit (colunas, em ordem de execução), considerando a última
+    execução de cada commit
+
+    :param resultados: histórico de resultados do benchmark
+    :param metrica: métrica a ser apresentada
+    :return: data frame com a métrica por commit
+    """
+    commits = resultados.drop_duplicates("commit", keep="last")["commit"].to_list()
+    return (
+        resultados.drop_duplicates(["commit", "benchmark", "escala"], keep="last")
+        .pivot(index=["benchmark", "escala"], columns="commit", values=metrica)
+        .reindex(columns=commits)
+    )
+
+
+def executa_benchmark(
+    escalas: typing.Sequence[float],
+    pasta: Path,
+    ano: int = 2019,
+    semente: int = 0,
+    arquivo: typing.Optional[Path] = None,
+    manter_dados: bool = False,
+    isolar: bool = True,
+) -> pd.DataFrame:
+    """
+    Executa o benchmark dos ETLs do censo escolar e do datamart de escola
+    sobre censos sintéticos em cada uma das {escalas}, registrando o tempo
+    e o pico de memória de cada etapa no histórico de resultados
+
+    :param escalas: fatores de escala do censo sintético
+    :param pasta: pasta de trabalho do benchmark
+    :param ano: ano do censo sintético
+    :param semente: semente do gerador de números aleatórios
+    :param arquivo: arquivo do histórico (padrão é {pasta}/resultados.jsonl)
+    :param manter_dados: se True mantém os dados sintéticos gerados
+    :param isolar: se True executa cada benchmark em um processo novo
+    :return: data frame com os resultados da execução
+    """
+    logger = logging.getLogger(__name__)
+    pasta = Path(pasta)
+    commit = obtem_commit()
+    data = datetime.now().isoformat(timespec="seconds")
+
+    resultados = list()
+    for escala in escalas:
+        pasta_escala = pasta / f"escala_{escala}"
+        shutil.rmtree(pasta_escala, ignore_errors=True)
+
+        logger.info(f"Gerando censo sintético na escala {escala}x")
+        gera_censo_sintetico(
+            pasta_escala / f"externo/censo_escolar/{ano}.zip", ano, escala, semente
+        )
+
+        tarefas: typing.List[typing.Tuple[str, typing.Callable, tuple]] = [
+            (f"ETL {e.value}", executa_etl_sintetico, (e.value, pasta_escala, ano))
+            for e in BENCHMARKS_ETL
+        ]
+        tarefas.append(
+            (
+                "DATAMART ESCOLA",
+                executa_datamart_sintetico,
+                (pasta_escala, ano, semente),
+            )
+        )
+        for nome, func, args in tarefas:
+            logger.info(f"Executando {nome} na escala {escala}x")
+            metricas = executa_isolado(func, *args, isolar=isolar)
+            resultados.append(
+                dict(
+                    commit=commit,
+                    data=data,
+                    benchmark=nome,
+                    escala=escala,
+                    tempo_parede=metricas["tempo_parede"],
+                    tempo_cpu=metricas["tempo_cpu"],
+                    pico_memoria=metricas["pico_memoria"],
+                    aumento_pico_memoria=metricas["aumento_pico_memoria"],
+                    linhas_saida=metricas["linhas_saida"],
+                )
+            )
+            logger.info(
+                f"{nome} ({escala}x): {metricas['tempo_parede']:.2f}s, "
+                f"pico de memória {(metricas['pico_memoria'] or 0) / 1024 ** 2:.0f}MB"
+            )
+
+        if not manter_dados:
+            shutil.rmtree(pasta_escala, ignore_errors=True)
+
+    registra_resultados(resultados, arquivo or pasta / "resultados.jsonl")
+    return pd.DataFrame(resultados)
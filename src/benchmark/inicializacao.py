@@ -0,0 +1,99 @@
+import re
+import subprocess
+import sys
+import time
+import typing
+from pathlib import Path
+
+import pandas as pd
+
+from src.benchmark.config import COMANDOS_INICIALIZACAO
+from src.benchmark.config import MODULOS_PESADOS
+
+# script da CLI na raiz do projeto
+CLI = Path(__file__).parents[2] / "run.py"
+
+
+def executa_cli(argumentos: typing.Sequence[str], *opcoes: str) -> str:
+    """
+    Executa a CLI em um processo novo, como seria executada por um usuário
+
+    :param argumentos: argumentos do run.py (ex: ["datamart", "--help"])
+    :param opcoes: opções do interpretador python (ex: -X importtime)
+    :return: saída de erro do processo
+    """
+    processo = subprocess.run(
+        [sys.executable, *opcoes, str(CLI), *argumentos],
+        cwd=CLI.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return processo.stderr
+
+
+def mede_inicializacao(
+    argumentos: typing.Sequence[str], repeticoes: int
+) -> typing.List[float]:
+    """
+    Mede o tempo de parede de {repeticoes} execuções de um comando da CLI,
+    incluindo a inicialização do interpretador
+
+    :param argumentos: argumentos do run.py
+    :param repeticoes: número de repetições
+    :return: tempo de cada repetição em segundos
+    """
+    tempos = list()
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        executa_cli(argumentos)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def modulos_importados(argumentos: typing.Sequence[str]) -> typing.Set[str]:
+    """
+    Lista os módulos importados por um comando da CLI (python -X importtime)
+
+    :param argumentos: argumentos do run.py
+    :return: nomes completos dos módulos importados
+    """
+    saida = executa_cli(argumentos, "-X", "importtime")
+    return {
+        m.group(1)
+        for m in re.finditer(r"^import time:\s*\d+ \|\s*\d+ \|\s*(\S+)", saida, re.M)
+    }
+
+
+def modulos_pesados(argumentos: typing.Sequence[str]) -> typing.List[str]:
+    """
+    Lista os módulos de MODULOS_PESADOS importados por um comando da CLI
+
+    :param argumentos: argumentos do run.py
+    :return: módulos pesados importados
+    """
+    importados = {m.split(".")[0] for m in modulos_importados(argumentos)}
+    return [m for m in MODULOS_PESADOS if m in importados]
+
+
+def resume_inicializacao(repeticoes: int) -> pd.DataFrame:
+    """
+    Mede a inicialização de cada comando de COMANDOS_INICIALIZACAO
+
+    :param repeticoes: número de repetições por comando
+    :return: data frame com o tempo mediano e os módulos pesados por comando
+    """
+    linhas = list()
+    for comando in COMANDOS_INICIALIZACAO:
+        argumentos = comando.split()
+        tempos = pd.Series(mede_inicializacao(argumentos, repeticoes))
+        linhas.append(
+            dict(
+                comando=comando,
+                mediana_ms=round(tempos.median() * 1000, 1),
+                minimo_ms=round(tempos.min() * 1000, 1),
+                modulos_pesados=", ".join(modulos_pesados(argumentos)) or "-",
+            )
+        )
+    return pd.DataFrame(linhas)
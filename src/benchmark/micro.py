@@ -0,0 +1,210 @@
+import contextlib
+import http.server
+import threading
+import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import src.datamart.funcoes as fn
+from src.aquisicao.ibge._base import lista_arquivos_ftp
+from src.aquisicao.inep.ideb import IDEBETL
+from src.aquisicao.inep.turma import TurmaETL
+from src.benchmark.config import ARQUIVOS_FTP
+from src.benchmark.config import FRACAO_NULOS
+from src.benchmark.config import LINHAS_IDEB
+from src.benchmark.config import PASTAS_FTP
+
+# função medida e função que prepara os seus argumentos a cada repetição
+# (o preparo não entra na medição do tempo)
+Benchmark = typing.Tuple[typing.Callable[..., typing.Any], typing.Callable[[], tuple]]
+
+
+def gera_paginas_ftp(
+    pastas: typing.Sequence[int], arquivos: int
+) -> typing.Dict[str, bytes]:
+    """
+    Gera as páginas HTML de um FTP no formato das listagens do IBGE,
+    com {pastas[i]} sub-pastas em cada pasta do nível i e {arquivos}
+    arquivos zip em cada pasta (com nomes únicos, como no IBGE)
+
+    :param pastas: número de sub-pastas por nível da árvore
+    :param arquivos: número de arquivos por pasta
+    :return: dicionário com o caminho da pasta e o conteúdo da sua página
+    """
+    paginas = dict()
+    nivel = ["/"]
+    for i in range(len(pastas) + 1):
+        proximo = list()
+        for caminho in nivel:
+            links = [f"arquivo_{len(paginas)}_{j}.zip" for j in range(arquivos)]
+            if i < len(pastas):
+                links += [f"pasta_{j}/" for j in range(pastas[i])]
+                proximo += [f"{caminho}pasta_{j}/" for j in range(pastas[i])]
+            linhas = "".join(
+                f'<tr><td><a href="{link}">{link}</a></td><td>1K</td></tr>'
+                for link in links
+            )
+            paginas[caminho] = (
+                "<html><body><table>"
+                '<tr><td><a href="../">Parent Directory</a></td></tr>'
+                f"{linhas}</table></body></html>"
+            ).encode("utf-8")
+        nivel = proximo
+    return paginas
+
+
+class _ManipuladorFTP(http.server.BaseHTTPRequestHandler):
+    """
+    Manipulador HTTP que responde com as páginas de um FTP sintético
+    """
+
+    paginas: typing.Dict[str, bytes] = dict()
+
+    def do_GET(self) -> None:
+        pagina = self.paginas.get(self.path)
+        if pagina is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(pagina)))
+        self.end_headers()
+        self.wfile.write(pagina)
+
+    def log_message(self, *args: typing.Any) -> None:
+        pass
+
+
+@contextlib.contextmanager
+def servidor_ftp_local(
+    pastas: typing.Sequence[int] = tuple(PASTAS_FTP), arquivos: int = ARQUIVOS_FTP
+) -> typing.Generator[str, None, None]:
+    """
+    Sobe um servidor HTTP local que simula as listagens do FTP do IBGE,
+    de forma que lista_arquivos_ftp possa ser medido sem acesso à rede
+
+    :param pastas: número de sub-pastas por nível da árvore
+    :param arquivos: número de arquivos por pasta
+    :return: url da raiz do FTP local
+    """
+    manipulador = type(
+        "ManipuladorFTP",
+        (_ManipuladorFTP,),
+        dict(paginas=gera_paginas_ftp(pastas, arquivos)),
+    )
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{servidor.server_address[1]}/"
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        thread.join()
+
+
+def gera_ideb_bruto(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Gera uma base sintética de IDEB no formato dos arquivos do INEP, com
+    valores em texto (vírgula decimal, - e ND) em cada coluna de métrica e ano
+
+    :param n: número de escolas
+    :param rng: gerador de números aleatórios
+    :return: data frame com ID_ESCOLA e colunas VL_ por métrica e ano
+    """
+    dados: typing.Dict[str, typing.Any] = dict(ID_ESCOLA=11000000 + np.arange(n))
+    for ano in range(2005, 2021, 2):
+        metricas = ["INDICADOR_REND", "NOTA_MATEMATICA", "NOTA_PORTUGUES"]
+        metricas += ["NOTA_MEDIA", "OBSERVADO"] + (["PROJECAO"] if ano > 2005 else [])
+        for m in metricas:
+            valores = pd.Series(np.round(rng.random(n) * 10, 1)).astype(str)
+            valores = valores.str.replace(".", ",", regex=False)
+            sorteio = rng.random(n)
+            valores[sorteio < FRACAO_NULOS] = "-"
+            valores[sorteio > 1 - FRACAO_NULOS / 5] = "ND"
+            dados[f"VL_{m}_{ano}"] = valores.values
+    return pd.DataFrame(dados)
+
+
+@contextlib.contextmanager
+def micro_benchmarks(
+    pasta: Path, ano: int, semente: int = 0
+) -> typing.Generator[typing.Dict[str, Benchmark], None, None]:
+    """
+    Prepara os micro benchmarks das funções de processamento mais
+    utilizadas pelos ETLs e datamarts. As entradas vêm do censo sintético
+    em {pasta} (que já deve ter a saída dos ETLs), de uma base sintética
+    de IDEB e de um FTP local
+
+    :param pasta: pasta com o censo sintético (externo) e a saída (aquisicao)
+    :param ano: ano do censo sintético
+    :param semente: semente do gerador de números aleatórios
+    :return: dicionário com o nome e o benchmark
+    """
+    rng = np.random.default_rng(semente)
+
+    # reproduz o processamento do ETL de turmas até as etapas medidas
+    etl = TurmaETL(
+        pasta / "externo",
+        pasta / "aquisicao",
+        ano,
+        False,
+        False,
+        fontes={f"{ano}.zip": ""},
+    )
+    etl.extract()
+    base = etl.dados_entrada[str(ano)]
+    etl.gera_dt_nascimento(base)
+    etl.processa_dt(base)
+    etl.processa_qt(base)
+    etl.processa_in(base)
+    base_tp = base.copy()
+    etl.processa_tp(base)
+    etl.remove_duplicatas(base)
+
+    turma = TurmaETL(
+        pasta / "externo",
+        pasta / "aquisicao",
+        ano,
+        False,
+        False,
+        fontes={f"{ano}.zip": ""},
+    )
+    saida = turma.dados_saida[turma.bases_saida[0]]
+
+    ideb = gera_ideb_bruto(LINHAS_IDEB, rng)
+    dados_ideb = IDEBETL.obtem_metricas(ideb, "AI")
+
+    with servidor_ftp_local() as url:
+        yield {
+            "processa_coluna_tp": (
+                fn.processa_coluna_tp,
+                lambda: (
+                    saida,
+                    "ID_ESCOLA",
+                    "TP_MEDIACAO_DIDATICO_PEDAGO",
+                    "ID_TURMA",
+                    "TURMA_MEDIACAO",
+                ),
+            ),
+            "processa_coluna_in": (
+                fn.processa_coluna_in,
+                lambda: (saida, "ID_ESCOLA", "ID_TURMA", "TURMA"),
+            ),
+            "processa_tp": (etl.processa_tp, lambda: (base_tp.copy(),)),
+            "ajusta_schema": (
+                etl.ajusta_schema,
+                lambda: (
+                    base.copy(),
+                    etl._configs["PREENCHER_NULOS"],
+                    etl._configs["DADOS_SCHEMA"],
+                ),
+            ),
+            "formata_resultados": (
+                IDEBETL.formata_resultados,
+                lambda: (ideb, dados_ideb),
+            ),
+            "lista_arquivos_ftp": (lista_arquivos_ftp, lambda: (url,)),
+        }
@@ -0,0 +1,336 @@
+import json
+import logging
+import platform
+import shutil
+import time
+import typing
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.aquisicao.inep.estagio import limpa_caches
+from src.aquisicao.opcoes import EnumETL
+from src.aquisicao.opcoes import obtem_etl
+from src.benchmark.config import ESCALA_REGRESSAO
+from src.benchmark.config import FATOR_RUIDO
+from src.benchmark.config import REPETICOES_MACRO
+from src.benchmark.config import REPETICOES_MICRO
+from src.benchmark.config import TOLERANCIA_ABSOLUTA
+from src.benchmark.config import TOLERANCIA_RELATIVA
+from src.benchmark.executa import BENCHMARKS_ETL
+from src.benchmark.executa import executa_datamart_sintetico
+from src.benchmark.executa import executa_etl_sintetico
+from src.benchmark.executa import executa_isolado
+from src.benchmark.executa import obtem_commit
+from src.benchmark.inicializacao import mede_inicializacao
+from src.benchmark.micro import micro_benchmarks
+from src.benchmark.sintetico import gera_censo_sintetico
+
+# ETL medido pelo macro benchmark (o datamart de escola é sempre medido)
+ETL_REGRESSAO = EnumETL.turma
+
+# status da comparação de um benchmark com a baseline
+REGRESSAO = "REGRESSÃO"
+MELHORIA = "MELHORIA"
+OK = "OK"
+NOVO = "NOVO"
+AUSENTE = "AUSENTE"
+
+
+def resume_amostras(amostras: typing.Sequence[float]) -> typing.Dict[str, typing.Any]:
+    """
+    Resume as medições repetidas de uma métrica pela mediana e pelo
+    desvio absoluto mediano, que são pouco sensíveis a execuções atípicas
+
+    :param amostras: valores medidos em cada repetição
+    :return: dicionário com mediana, desvio, mínimo e amostras
+    """
+    valores = np.array(amostras, dtype="float64")
+    mediana = float(np.median(valores))
+    return dict(
+        mediana=mediana,
+        desvio=float(np.median(np.abs(valores - mediana))),
+        minimo=float(valores.min()),
+        amostras=[float(v) for v in valores],
+    )
+
+
+def mede_repeticoes(
+    func: typing.Callable[..., typing.Any],
+    preparo: typing.Callable[[], tuple],
+    repeticoes: int,
+) -> typing.List[float]:
+    """
+    Mede o tempo de parede de {repeticoes} execuções de {func}, preparando
+    os argumentos fora da medição a cada repetição
+
+    :param func: função a ser medida
+    :param preparo: função que gera os argumentos de {func}
+    :param repeticoes: número de repetições
+    :return: tempo de cada repetição em segundos
+    """
+    tempos = list()
+    for _ in range(repeticoes):
+        args = preparo()
+        inicio = time.perf_counter()
+        func(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def remove_saidas_etl(etl: str, pasta: Path, ano: int) -> None:
+    """
+    Remove as saídas de um ETL sintético do ano e os caches do censo (estágio
+    e CSVs descompactados), forçando o seu processamento a partir do zip na
+    próxima execução, como nas baselines anteriores ao estágio
+
+    :param etl: nome do ETL
+    :param pasta: pasta com a entrada sintética (externo) e a saída (aquisicao)
+    :param ano: ano do censo sintético
+    """
+    objeto = obtem_etl(etl)(
+        pasta / "externo",
+        pasta / "aquisicao",
+        ano,
+        False,
+        False,
+        fontes={f"{ano}.zip": ""},
+    )
+    for base in objeto.bases_saida:
+        shutil.rmtree(pasta / f"aquisicao/{base}/ANO={ano}", ignore_errors=True)
+    limpa_caches(pasta / "externo", pasta / "aquisicao", ano)
+
+
+def executa_regressao(
+    pasta: Path,
+    ano: int = 2019,
+    semente: int = 0,
+    escala: float = ESCALA_REGRESSAO,
+    repeticoes_micro: int = REPETICOES_MICRO,
+    repeticoes_macro: int = REPETICOES_MACRO,
+    isolar: bool = True,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Executa o conjunto fixo de benchmarks do teste de regressão sobre um
+    censo sintético: micro benchmarks das funções de processamento e da
+    inicialização da CLI (tempo) e macro benchmarks de um ETL e de um ano do datamart de escola
+    (tempo e pico de memória, cada repetição em um processo novo)
+
+    :param pasta: pasta de trabalho (removida ao final)
+    :param ano: ano do censo sintético
+    :param semente: semente do gerador de números aleatórios
+    :param escala: fator de escala do censo sintético
+    :param repeticoes_micro: número de repetições dos micro benchmarks
+    :param repeticoes_macro: número de repetições dos macro benchmarks
+    :param isolar: se True executa cada repetição dos macro benchmarks em um processo novo
+    :return: dicionário com a descrição da execução e o resumo dos benchmarks
+    """
+    logger = logging.getLogger(__name__)
+    pasta = Path(pasta)
+    shutil.rmtree(pasta, ignore_errors=True)
+
+    resultado: typing.Dict[str, typing.Any] = dict(
+        commit=obtem_commit(),
+        data=datetime.now().isoformat(timespec="seconds"),
+        python=platform.python_version(),
+        plataforma=platform.platform(),
+        escala=escala,
+        ano=ano,
+        benchmarks=dict(),
+    )
+    benchmarks = resultado["benchmarks"]
+
+    try:
+        logger.info(f"Gerando censo sintético na escala {escala}x")
+        gera_censo_sintetico(
+            pasta / f"externo/censo_escolar/{ano}.zip", ano, escala, semente
+        )
+        for e in BENCHMARKS_ETL:
+            executa_etl_sintetico(e.value, pasta, ano)
+
+        with micro_benchmarks(pasta, ano, semente) as micros:
+            for nome, (func, preparo) in micros.items():
+                logger.info(f"Executando o micro benchmark {nome}")
+                tempos = mede_repeticoes(func, preparo, repeticoes_micro)
+                benchmarks[nome] = dict(tempo=resume_amostras(tempos))
+
+        logger.info("Executando o benchmark de inicialização da CLI")
+        tempos = mede_inicializacao(["--help"], repeticoes_micro)
+        benchmarks["INICIALIZACAO CLI"] = dict(tempo=resume_amostras(tempos))
+
+        macros: typing.Dict[str, typing.Tuple[typing.Callable, tuple]] = {
+            f"ETL {ETL_REGRESSAO.value}": (
+                executa_etl_sintetico,
+                (ETL_REGRESSAO.value, pasta, ano),
+            ),
+            "DATAMART ESCOLA": (executa_datamart_sintetico, (pasta, ano, semente)),
+        }
+        for nome, (func, args) in macros.items():
+            logger.info(f"Executando o macro benchmark {nome}")
+            metricas = list()
+            for _ in range(repeticoes_macro):
+                if func is executa_etl_sintetico:
+                    remove_saidas_etl(ETL_REGRESSAO.value, pasta, ano)
+                metricas.append(executa_isolado(func, *args, isolar=isolar))
+            benchmarks[nome] = dict(
+                tempo=resume_amostras([m["tempo_parede"] for m in metricas])
+            )
+            if all(m["pico_memoria"] is not None for m in metricas):
+                benchmarks[nome]["pico_memoria"] = resume_amostras(
+                    [m["pico_memoria"] for m in metricas]
+                )
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return resultado
+
+
+def salva_baseline(resultado: typing.Dict[str, typing.Any], arquivo: Path) -> None:
+    """
+    Salva o resultado de uma execução do teste de regressão como baseline
+
+    :param resultado: resultado de executa_regressao
+    :param arquivo: arquivo JSON da baseline
+    """
+    arquivo = Path(arquivo)
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    with open(arquivo, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+
+def carrega_baseline(arquivo: Path) -> typing.Dict[str, typing.Any]:
+    """
+    Carrega a baseline do teste de regressão
+
+    :param arquivo: arquivo JSON da baseline
+    :return: resultado salvo como baseline
+    """
+    with open(arquivo, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compara_baseline(
+    atual: typing.Dict[str, typing.Any], baseline: typing.Dict[str, typing.Any]
+) -> pd.DataFrame:
+    """
+    Compara as métricas da execução atual com as da baseline.
+
+    Uma métrica regride quando a sua mediana excede
+    mediana_base * (1 + TOLERANCIA_RELATIVA) + FATOR_RUIDO * desvio
+    + TOLERANCIA_ABSOLUTA, onde desvio é o maior desvio absoluto mediano
+    entre as duas execuções; a melhoria é avaliada de forma simétrica
+
+    :param atual: resultado da execução atual
+    :param baseline: resultado salvo como baseline
+    :return: data frame com uma linha por benchmark e métrica
+    """
+    linhas = list()
+    nomes = list(baseline["benchmarks"])
+    nomes += [n for n in atual["benchmarks"] if n not in nomes]
+    for nome in nomes:
+        base = baseline["benchmarks"].get(nome, dict())
+        novo = atual["benchmarks"].get(nome, dict())
+        for metrica in list(base) + [m for m in novo if m not in base]:
+            b, a = base.get(metrica), novo.get(metrica)
+            linha: typing.Dict[str, typing.Any] = dict(
+                benchmark=nome,
+                metrica=metrica,
+                base=b["mediana"] if b is not None else np.nan,
+                atual=a["mediana"] if a is not None else np.nan,
+                variacao=np.nan,
+                limite=np.nan,
+            )
+            if b is None:
+                linha["status"] = NOVO
+            elif a is None:
+                linha["status"] = AUSENTE
+            else:
+                folga = (
+                    b["mediana"] * TOLERANCIA_RELATIVA[metrica]
+                    + FATOR_RUIDO * max(b["desvio"], a["desvio"])
+                    + TOLERANCIA_ABSOLUTA[metrica]
+                )
+                linha["limite"] = b["mediana"] + folga
+                linha["variacao"] = (
+                    a["mediana"] / b["mediana"] - 1 if b["mediana"] > 0 else np.nan
+                )
+                if a["mediana"] > b["mediana"] + folga:
+                    linha["status"] = REGRESSAO
+                elif a["mediana"] < b["mediana"] - folga:
+                    linha["status"] = MELHORIA
+                else:
+                    linha["status"] = OK
+            linhas.append(linha)
+
+    return pd.DataFrame(
+        linhas,
+        columns=[
+            "benchmark",
+            "metrica",
+            "base",
+            "atual",
+            "variacao",
+            "limite",
+            "status",
+        ],
+    )
+
+
+def formata_relatorio(
+    comparacao: pd.DataFrame,
+    atual: typing.Dict[str, typing.Any],
+    baseline: typing.Dict[str, typing.Any],
+) -> str:
+    """
+    Gera o relatório em texto da comparação com a baseline
+
+    :param comparacao: resultado de compara_baseline
+    :param atual: resultado da execução atual
+    :param baseline: resultado salvo como baseline
+    :return: relatório
+    """
+
+    def formata(valor: float, metrica: str) -> str:
+        if pd.isnull(valor):
+            return "-"
+        if metrica == "pico_memoria":
+            return f"{valor / 1024 ** 2:.1f}MB"
+        return f"{valor * 1000:.1f}ms" if valor < 1 else f"{valor:.2f}s"
+
+    tabela = comparacao.copy()
+    for c in ["base", "atual", "limite"]:
+        tabela[c] = [formata(v, m) for v, m in zip(tabela[c], tabela["metrica"])]
+    tabela["variacao"] = [
+        "-" if pd.isnull(v) else f"{v:+.1%}" for v in tabela["variacao"]
+    ]
+
+    linhas = [
+        f"Baseline: commit {baseline.get('commit')} de {baseline.get('data')}"
+        f" (escala {baseline.get('escala')}x)",
+        f"Atual:    commit {atual.get('commit')} de {atual.get('data')}"
+        f" (escala {atual.get('escala')}x)",
+    ]
+    for chave in ["plataforma", "python", "escala"]:
+        if baseline.get(chave) != atual.get(chave):
+            linhas.append(
+                f"ATENÇÃO: {chave} da baseline ({baseline.get(chave)}) é diferente"
+                f" da execução atual ({atual.get(chave)}), a comparação pode não"
+                f" ser válida"
+            )
+    linhas += ["", tabela.to_string(index=False), ""]
+
+    regressoes = comparacao.loc[lambda f: f["status"] == REGRESSAO]
+    if len(regressoes) == 0:
+        linhas.append("Nenhuma regressão de desempenho encontrada")
+    else:
+        linhas.append(f"{len(regressoes)} regressão(ões) de desempenho encontrada(s):")
+        for _, r in regressoes.iterrows():
+            linhas.append(
+                f"- {r['benchmark']} ({r['metrica']}): "
+                f"{formata(r['base'], r['metrica'])} -> "
+                f"{formata(r['atual'], r['metrica'])} "
+                f"(limite {formata(r['limite'], r['metrica'])})"
+            )
+    return "\n".join(linhas)
@@ -0,0 +1,399 @@
+import io
+import logging
+import typing
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.benchmark.config import DOCENTES_POR_TURMA
+from src.benchmark.config import ESCOLAS_POR_ESCALA
+from src.benchmark.config import ETAPAS_IDEB
+from src.benchmark.config import FRACAO_NULOS
+from src.benchmark.config import GESTORES_POR_ESCOLA
+from src.benchmark.config import MATRICULAS_POR_ALUNO
+from src.benchmark.config import MATRICULAS_POR_TURMA
+from src.benchmark.config import METRICAS_IDEB
+from src.benchmark.config import MUNICIPIOS_POR_UF
+from src.benchmark.config import NOME_REGIAO
+from src.benchmark.config import TURMAS_POR_DOCENTE
+from src.benchmark.config import TURMAS_POR_ESCOLA
+from src.benchmark.config import UFS_POR_REGIAO
+from src.benchmark.config import VALORES_PREFERIDOS
+from src.utils.info import carrega_excel
+from src.utils.info import carrega_yaml
+
+
+def carrega_definicao(tabela: str, ano: int) -> typing.Dict[str, typing.Any]:
+    """
+    Carrega a definição de uma tabela do censo escolar a partir das
+    configurações do ETL: colunas do ano (ou do ano anterior mais próximo),
+    tipos de dados, renomeação e domínios das colunas TP_
+
+    :param tabela: tabela do censo escolar (escolas, turmas, docentes...)
+    :param ano: ano do censo a ser gerado
+    :return: dicionário com colunas, dtype, rename, depara_tp e cols_depara
+    """
+    colunas = None
+    ano_cols = ano
+    while ano_cols > 2006 and colunas is None:
+        try:
+            colunas = carrega_excel(
+                f"aquis_censo_{tabela}_cols.xlsx", sheet_name=str(ano_cols)
+            )["COLUNA"].to_list()
+        except ValueError:
+            ano_cols -= 1
+    if colunas is None:
+        raise ValueError(f"Não há configuração de colunas da tabela {tabela}")
+
+    dtype = carrega_excel(f"aquis_censo_{tabela}_cols.xlsx", sheet_name="dtype")
+    configs = carrega_yaml(f"aquis_censo_{tabela}.yml")
+    return dict(
+        colunas=colunas,
+        dtype=dict(zip(dtype["COLUNA"], dtype["DTYPE"])),
+        rename=dict(zip(dtype["COLUNA"], dtype["RENAME"])),
+        depara_tp=configs["DEPARA_TP"],
+        cols_depara=configs["COLS_DEPARA"],
+        col_id=configs["COL_ID"],
+    )
+
+
+def gera_valores(
+    coluna: str,
+    nome: str,
+    dtype: str,
+    n: int,
+    ano: int,
+    rng: np.random.Generator,
+    dominio: typing.Optional[typing.Sequence[typing.Any]] = None,
+) -> typing.Union[np.ndarray, pd.arrays.IntegerArray]:
+    """
+    Gera {n} valores sintéticos para uma coluna do censo escolar seguindo
+    o prefixo do nome da coluna, o seu tipo de dado e o seu domínio
+
+    :param coluna: nome da coluna no arquivo do censo
+    :param nome: nome da coluna após a renomeação do ETL
+    :param dtype: tipo de dado da coluna na configuração do ETL
+    :param n: número de valores a serem gerados
+    :param ano: ano do censo a ser gerado
+    :param rng: gerador de números aleatórios
+    :param dominio: lista de valores possíveis da coluna
+    :return: vetor de valores
+    """
+    if dominio is not None:
+        valores = np.asarray(list(dominio), dtype=object)[
+            rng.integers(0, len(dominio), n)
+        ]
+        if coluna in VALORES_PREFERIDOS:
+            preferido, prob = VALORES_PREFERIDOS[coluna]
+            valores[rng.random(n) < prob] = preferido
+        return valores
+    elif coluna.startswith("IN_"):
+        return rng.integers(0, 2, n)
+    elif coluna.startswith("QT_"):
+        return rng.integers(0, 30, n)
+    elif coluna.startswith("DT_"):
+        meses = rng.integers(1, 13, n)
+        dias = rng.integers(1, 29, n)
+        return np.array(
+            [f"{d:02d}/{m:02d}/{ano}" for d, m in zip(dias, meses)], dtype=object
+        )
+    elif coluna.startswith("NO_") or dtype == "str":
+        return np.array([f"{nome} {i}" for i in rng.integers(0, 1000, n)], dtype=object)
+    elif coluna.startswith("TX_"):
+        return rng.integers(0, 24, n)
+    elif coluna.startswith("NU_IDADE"):
+        return rng.integers(4, 70, n)
+    elif coluna == "NU_ANO":
+        return ano - rng.integers(4, 70, n)
+    elif coluna == "NU_MES":
+        return rng.integers(1, 13, n)
+    elif coluna == "NU_DIA":
+        return rng.integers(1, 29, n)
+    elif coluna.startswith("NU_ANO_"):
+        valores = ano - rng.integers(0, 30, n)
+    elif coluna.startswith("CO_UF"):
+        ufs = [uf for lista in UFS_POR_REGIAO.values() for uf in lista]
+        valores = np.asarray(ufs)[rng.integers(0, len(ufs), n)]
+    elif coluna.startswith("CO_MUNICIPIO"):
+        ufs = [uf for lista in UFS_POR_REGIAO.values() for uf in lista]
+        valores = np.asarray(ufs)[rng.integers(0, len(ufs), n)] * 100000 + (
+            rng.integers(1, MUNICIPIOS_POR_UF + 1, n) * 10
+        )
+    elif coluna == "CO_PAIS_ORIGEM":
+        return np.full(n, 76)
+    else:
+        valores = rng.integers(0, 5 if coluna.startswith("TP_") else 1000, n)
+
+    # colunas de ponto flutuante podem conter nulos
+    if dtype.startswith("float"):
+        return pd.array(
+            np.where(rng.random(n) < FRACAO_NULOS, np.nan, valores), dtype="Int64"
+        )
+    return valores
+
+
+def gera_tabela(
+    tabela: str,
+    ano: int,
+    base: pd.DataFrame,
+    rng: np.random.Generator,
+    dominios: typing.Optional[typing.Dict[str, typing.Sequence[typing.Any]]] = None,
+) -> pd.DataFrame:
+    """
+    Gera uma tabela sintética do censo escolar com as colunas do ano.
+
+    As colunas de {base} (chaves e atributos herdados de escolas e turmas)
+    são mantidas. As demais colunas são geradas uma vez por registro da
+    entidade (COL_ID) e repetidas em cada linha da entidade, com exceção
+    das colunas de de-para que são geradas por linha
+
+    :param tabela: tabela do censo escolar (escolas, turmas, docentes...)
+    :param ano: ano do censo a ser gerado
+    :param base: data frame com as colunas conhecidas de cada linha
+    :param rng: gerador de números aleatórios
+    :param dominios: domínios de colunas específicas
+    :return: data frame com as colunas do arquivo do censo
+    """
+    definicao = carrega_definicao(tabela, ano)
+    dominios = dominios or dict()
+    rename = definicao["rename"]
+    depara_tp = definicao["depara_tp"]
+
+    # identifica a coluna de id da entidade e os registros únicos
+    col_id = next(
+        (c for c in definicao["colunas"] if rename.get(c) == definicao["col_id"]),
+        None,
+    )
+    if col_id in base:
+        entidades, posicao = np.unique(base[col_id].values, return_inverse=True)
+    else:
+        entidades, posicao = np.arange(len(base)), np.arange(len(base))
+
+    dados: typing.Dict[str, typing.Any] = dict()
+    for c in definicao["colunas"]:
+        nome = rename.get(c, c)
+        if c in base:
+            dados[c] = base[c].values
+        elif nome == "ANO":
+            dados[c] = np.full(len(base), ano)
+        else:
+            dominio = dominios.get(c, dominios.get(nome))
+            if dominio is None and nome in depara_tp:
+                dominio = list(depara_tp[nome])
+            por_linha = nome in definicao["cols_depara"]
+            valores = gera_valores(
+                coluna=c,
+                nome=nome,
+                dtype=definicao["dtype"].get(c, "float32"),
+                n=len(base) if por_linha else len(entidades),
+                ano=ano,
+                rng=rng,
+                dominio=dominio,
+            )
+            dados[c] = valores if por_linha else valores[posicao]
+
+    return pd.DataFrame(dados, index=base.index)
+
+
+def herda_colunas(
+    base: pd.DataFrame, origem: pd.DataFrame, chave: str, tabela: str, ano: int
+) -> pd.DataFrame:
+    """
+    Adiciona a {base} as colunas de {origem} que também fazem parte
+    do arquivo da {tabela} (ex: atributos da escola na base de turmas)
+
+    :param base: data frame com a coluna chave
+    :param origem: data frame com os atributos indexados pela chave
+    :param chave: coluna de junção
+    :param tabela: tabela do censo escolar que receberá os atributos
+    :param ano: ano do censo a ser gerado
+    :return: data frame com as colunas herdadas
+    """
+    colunas = set(carrega_definicao(tabela, ano)["colunas"])
+    herdar = [
+        c
+        for c in origem
+        if c in colunas and c not in base and c != chave and c != "NU_ANO_CENSO"
+    ]
+    return base.join(origem.set_index(chave)[herdar], on=chave)
+
+
+def gera_chaves_escola(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    Gera as chaves e a localização geográfica das escolas sintéticas,
+    distribuindo as escolas entre todas as regiões
+
+    :param n: número de escolas
+    :param rng: gerador de números aleatórios
+    :return: data frame com as chaves das escolas
+    """
+    regiao = np.arange(n) % len(UFS_POR_REGIAO) + 1
+    uf = np.array(
+        [
+            UFS_POR_REGIAO[r][k % len(UFS_POR_REGIAO[r])]
+            for r, k in zip(regiao, rng.integers(0, 100, n))
+        ]
+    )
+    municipio = uf * 100000 + rng.integers(1, MUNICIPIOS_POR_UF + 1, n) * 10
+    return pd.DataFrame(
+        dict(
+            CO_ENTIDADE=11000000 + np.arange(n),
+            CO_REGIAO=regiao,
+            CO_UF=uf,
+            CO_MUNICIPIO=municipio,
+            CO_MESORREGIAO=uf * 100 + rng.integers(1, 10, n),
+            CO_MICRORREGIAO=uf * 1000 + rng.integers(1, 100, n),
+            CO_DISTRITO=municipio * 100 + 5,
+        )
+    )
+
+
+def escreve_csv(z: zipfile.ZipFile, nome: str, df: pd.DataFrame) -> None:
+    """
+    Escreve um data frame como CSV no formato do censo escolar
+    (separado por | e codificado em latin-1) dentro de um arquivo zip
+
+    :param z: arquivo zip aberto para escrita
+    :param nome: nome do arquivo dentro do zip
+    :param df: data frame a ser escrito
+    """
+    with z.open(nome, "w", force_zip64=True) as f:
+        with io.TextIOWrapper(f, encoding="latin-1", errors="replace") as texto:
+            df.to_csv(texto, sep="|", index=False)
+
+
+def gera_censo_sintetico(
+    caminho: Path, ano: int, escala: float = 1, semente: int = 0
+) -> pd.DataFrame:
+    """
+    Gera um arquivo zip sintético do censo escolar no mesmo formato do
+    arquivo publicado pelo INEP, com escolas, turmas, docentes e matrículas
+    por região e gestores consistentes entre si
+
+    :param caminho: caminho do arquivo zip a ser gerado
+    :param ano: ano do censo a ser gerado
+    :param escala: fator de escala (1 = ESCOLAS_POR_ESCALA escolas)
+    :param semente: semente do gerador de números aleatórios
+    :return: data frame com as chaves das escolas geradas
+    """
+    logger = logging.getLogger(__name__)
+    rng = np.random.default_rng(semente)
+    pasta = f"microdados_educacao_basica_{ano}/DADOS"
+    etapas = carrega_excel("censo_escolar_etapa_ensino.xlsx")["CO_ETAPA_ENSINO"]
+    cursos = carrega_excel("censo_escolar_cursos.xlsx")["CO_CURSO"]
+    dominios = dict(
+        CO_ETAPA_ENSINO=etapas.to_list(),
+        CO_CURSO_1=cursos.to_list(),
+        CO_CURSO_2=cursos.to_list(),
+        CO_CURSO_3=cursos.to_list(),
+    )
+
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(caminho, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        n_escolas = max(int(round(ESCOLAS_POR_ESCALA * escala)), len(NOME_REGIAO))
+        logger.info(f"Gerando {n_escolas} escolas sintéticas")
+        chaves = gera_chaves_escola(n_escolas, rng)
+        escolas = gera_tabela("escolas", ano, chaves, rng, dominios)
+        escreve_csv(z, f"{pasta}/ESCOLAS.CSV", escolas)
+
+        n_turmas = n_escolas * TURMAS_POR_ESCOLA
+        logger.info(f"Gerando {n_turmas} turmas sintéticas")
+        base = pd.DataFrame(
+            dict(
+                ID_TURMA=np.arange(1, n_turmas + 1),
+                CO_ENTIDADE=chaves["CO_ENTIDADE"].values[
+                    np.arange(n_turmas) % n_escolas
+                ],
+            )
+        )
+        base = herda_colunas(base, escolas, "CO_ENTIDADE", "turmas", ano)
+        turmas = gera_tabela("turmas", ano, base, rng, dominios)
+        escreve_csv(z, f"{pasta}/TURMAS.CSV", turmas)
+
+        n_gestores = int(round(n_escolas * GESTORES_POR_ESCOLA))
+        logger.info(f"Gerando {n_gestores} gestores sintéticos")
+        base = pd.DataFrame(
+            dict(
+                ID_GESTOR=[
+                    f"G{i:012d}" for i in rng.integers(0, n_gestores, n_gestores)
+                ],
+                CO_ENTIDADE=chaves["CO_ENTIDADE"].values[
+                    np.arange(n_gestores) % n_escolas
+                ],
+            )
+        ).drop_duplicates()
+        base = herda_colunas(base, escolas, "CO_ENTIDADE", "gestor", ano)
+        escreve_csv(
+            z, f"{pasta}/GESTOR.CSV", gera_tabela("gestor", ano, base, rng, dominios)
+        )
+
+        # docentes e matrículas são separados em arquivos por região
+        n_linhas = int(round(n_turmas * DOCENTES_POR_TURMA))
+        n_docentes = max(int(round(n_linhas / TURMAS_POR_DOCENTE)), 1)
+        logger.info(f"Gerando {n_linhas} registros sintéticos de docentes")
+        base = pd.DataFrame(
+            dict(
+                ID_DOCENTE=[
+                    f"D{i:012d}" for i in rng.integers(0, n_docentes, n_linhas)
+                ],
+                ID_TURMA=turmas["ID_TURMA"].values[np.arange(n_linhas) % n_turmas],
+            )
+        ).drop_duplicates()
+        base = herda_colunas(base, turmas, "ID_TURMA", "docentes", ano)
+        docentes = gera_tabela("docentes", ano, base, rng, dominios)
+        for cod, reg in NOME_REGIAO.items():
+            escreve_csv(
+                z,
+                f"{pasta}/DOCENTES_{reg}.CSV",
+                docentes.loc[lambda f: f["CO_REGIAO"] == cod],
+            )
+        del docentes
+
+        n_matriculas = n_turmas * MATRICULAS_POR_TURMA
+        n_alunos = max(int(round(n_matriculas / MATRICULAS_POR_ALUNO)), 1)
+        logger.info(f"Gerando {n_matriculas} matrículas sintéticas")
+        base = pd.DataFrame(
+            dict(
+                ID_ALUNO=[
+                    f"A{i:012d}" for i in rng.integers(0, n_alunos, n_matriculas)
+                ],
+                ID_MATRICULA=np.arange(1, n_matriculas + 1),
+                ID_TURMA=turmas["ID_TURMA"].values[np.arange(n_matriculas) % n_turmas],
+            )
+        )
+        base = herda_colunas(base, turmas, "ID_TURMA", "matricula", ano)
+        matriculas = gera_tabela("matricula", ano, base, rng, dominios)
+        for cod, reg in NOME_REGIAO.items():
+            escreve_csv(
+                z,
+                f"{pasta}/MATRICULA_{reg}.CSV",
+                matriculas.loc[lambda f: f["CO_REGIAO"] == cod],
+            )
+
+    return chaves
+
+
+def gera_ideb_sintetico(escolas: pd.Series, ano: int, semente: int = 0) -> pd.DataFrame:
+    """
+    Gera uma base sintética de IDEB no formato de saída do IDEBETL
+    para as escolas informadas, no ano de IDEB mais próximo de {ano}
+
+    :param escolas: série com os códigos das escolas
+    :param ano: ano do censo
+    :param semente: semente do gerador de números aleatórios
+    :return: data frame com ID_ESCOLA, ANO e as métricas do IDEB
+    """
+    rng = np.random.default_rng(semente)
+    n = len(escolas)
+    dados: typing.Dict[str, typing.Any] = dict(
+        ID_ESCOLA=escolas.values,
+        ANO=np.full(n, ano if ano % 2 == 1 else ano - 1),
+    )
+    for etapa in ETAPAS_IDEB:
+        for metrica in METRICAS_IDEB:
+            escala = 400 if metrica.startswith("NOTA") else 10
+            dados[f"{metrica}_{etapa}"] = (rng.random(n) * escala).astype("float32")
+    return pd.DataFrame(dados)
@@ -4,3 +4,7 @@ PASTA_ENTRADA_AQUISICAO = f"{PASTA_DADOS}/externo"
 PASTA_SAIDA_AQUISICAO = f"{PASTA_DADOS}/aquisicao"
 
 PASTA_SAIDA_DATAMART = f"{PASTA_DADOS}/datamart"
+
+PASTA_BENCHMARK = f"{PASTA_DADOS}/benchmark"
+
+PASTA_CACHE_WEB = f"{PASTA_DADOS}/cache_web"
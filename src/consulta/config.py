@@ -0,0 +1,21 @@
+# Número de linhas lidas por lote na execução das consultas
+TAMANHO_LOTE = 500_000
+
+# Agregações disponíveis nas consultas e as agregações parciais que são
+# calculadas em cada lote para obtê-las. As parciais de todos os lotes são
+# combinadas ao final (ou sempre que ultrapassam TAMANHO_LOTE linhas)
+AGREGACOES = {
+    "sum": ["sum"],
+    "count": ["count"],
+    "min": ["min"],
+    "max": ["max"],
+    "mean": ["sum", "count"],
+}
+
+# Função utilizada para combinar cada agregação parcial entre lotes
+COMBINACAO_PARCIAL = {
+    "sum": "sum",
+    "count": "sum",
+    "min": "min",
+    "max": "max",
+}
@@ -0,0 +1,384 @@
+import copy
+import typing
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.consulta.config import AGREGACOES
+from src.consulta.config import COMBINACAO_PARCIAL
+from src.consulta.config import TAMANHO_LOTE
+
+# filtros no formato do pd.read_parquet (lista de tuplas, ou lista de listas
+# de tuplas para disjunções) ou expressões do pyarrow.dataset
+Filtro = typing.Union[
+    ds.Expression,
+    typing.List[typing.Tuple[str, str, typing.Any]],
+    typing.List[typing.List[typing.Tuple[str, str, typing.Any]]],
+]
+
+# tipos de junção disponíveis e o seu nome no pyarrow
+TIPOS_JUNCAO = {"left": "left outer", "inner": "inner"}
+
+# assim como no pandas, a soma de um grupo apenas com nulos é 0
+OPCOES_AGREGACAO = {"sum": pc.ScalarAggregateOptions(min_count=0)}
+
+
+def converte_filtro(filtros: Filtro) -> ds.Expression:
+    """
+    Converte um filtro para uma expressão do pyarrow.dataset
+
+    :param filtros: filtro no formato do pd.read_parquet ou expressão
+    :return: expressão de filtro
+    """
+    if isinstance(filtros, ds.Expression):
+        return filtros
+    return pq.filters_to_expression(filtros)
+
+
+def decodifica(tabela: pa.Table) -> pa.Table:
+    """
+    Converte as colunas codificadas por dicionário (categóricas) para o
+    tipo dos seus valores, já que as junções e agrupamentos do pyarrow
+    não combinam dicionários diferentes entre lotes
+
+    :param tabela: tabela a ser convertida
+    :return: tabela sem colunas de dicionário
+    """
+    for i, campo in enumerate(tabela.schema):
+        if pa.types.is_dictionary(campo.type):
+            tabela = tabela.set_column(
+                i, campo.name, tabela.column(i).cast(campo.type.value_type)
+            )
+    return tabela
+
+
+class Consulta:
+    """
+    Consulta sobre uma base do lago de dados (um pyarrow.dataset), construída
+    de forma encadeada e executada apenas quando os resultados são pedidos.
+
+    A seleção de colunas e os filtros aplicados antes de qualquer junção são
+    repassados para a leitura, de forma que apenas as partições, grupos de
+    linhas e colunas necessários são lidos do disco. A base é lida em lotes
+    de {tamanho_lote} linhas e cada lote passa pelas junções e filtros
+    seguintes, então apenas a tabela do lado direito das junções (já
+    filtrada) e o resultado do agrupamento são mantidos em memória
+    """
+
+    _dataset: ds.Dataset
+    _colunas: typing.Optional[typing.List[str]]
+    _filtro: typing.Optional[ds.Expression]
+    _etapas: typing.List[typing.Tuple[str, typing.Any]]
+    _agrupamento: typing.Optional[
+        typing.Tuple[typing.List[str], typing.Dict[str, typing.Tuple[str, str]]]
+    ]
+    _tamanho_lote: int
+
+    def __init__(
+        self,
+        dataset: ds.Dataset,
+        colunas: typing.Optional[typing.Sequence[str]] = None,
+        filtros: typing.Optional[Filtro] = None,
+        tamanho_lote: int = TAMANHO_LOTE,
+    ) -> None:
+        """
+        Instância a consulta sobre uma base
+
+        :param dataset: base a ser consultada
+        :param colunas: colunas a serem lidas (None lê todas)
+        :param filtros: filtro aplicado na leitura
+        :param tamanho_lote: número de linhas lidas por lote
+        """
+        self._dataset = dataset
+        self._colunas = None if colunas is None else list(colunas)
+        self._filtro = None if filtros is None else converte_filtro(filtros)
+        self._etapas = list()
+        self._agrupamento = None
+        self._tamanho_lote = tamanho_lote
+
+    def _copia(self) -> "Consulta":
+        """
+        Cria uma cópia da consulta para ser modificada, de forma que cada
+        operação encadeada gere uma nova consulta
+
+        :return: cópia da consulta
+        """
+        if self._agrupamento is not None:
+            raise ValueError(
+                "A consulta já foi agrupada, não é possível adicionar operações"
+            )
+        nova = copy.copy(self)
+        nova._etapas = list(self._etapas)
+        return nova
+
+    def seleciona(self, colunas: typing.Sequence[str]) -> "Consulta":
+        """
+        Seleciona as colunas da consulta. Antes de qualquer junção a seleção
+        é feita na leitura da base
+
+        :param colunas: colunas a serem mantidas
+        :return: nova consulta
+        """
+        nova = self._copia()
+        if len(nova._etapas) == 0:
+            nova._colunas = list(colunas)
+        else:
+            nova._etapas.append(("seleciona", list(colunas)))
+        return nova
+
+    def filtra(self, filtros: Filtro) -> "Consulta":
+        """
+        Filtra as linhas da consulta. Antes de qualquer junção o filtro
+        é feito na leitura da base
+
+        :param filtros: filtro no formato do pd.read_parquet ou expressão
+        :return: nova consulta
+        """
+        nova = self._copia()
+        expressao = converte_filtro(filtros)
+        if len(nova._etapas) > 0:
+            nova._etapas.append(("filtra", expressao))
+        elif nova._filtro is None:
+            nova._filtro = expressao
+        else:
+            nova._filtro = nova._filtro & expressao
+        return nova
+
+    def junta(
+        self,
+        outra: "Consulta",
+        chaves: typing.Union[str, typing.List[str]],
+        chaves_direita: typing.Optional[typing.Union[str, typing.List[str]]] = None,
+        tipo: str = "left",
+    ) -> "Consulta":
+        """
+        Junta a consulta a uma {outra}, que é executada uma única vez e mantida
+        em memória, portanto ela deve ser a menor das duas (ex: atributos de
+        escola para uma consulta de matrículas). As colunas da {outra} que já
+        existem na consulta são descartadas
+
+        :param outra: consulta do lado direito da junção
+        :param chaves: colunas chave da consulta
+        :param chaves_direita: colunas chave da {outra} (None usa {chaves})
+        :param tipo: tipo de junção (left ou inner)
+        :return: nova consulta
+        """
+        if tipo not in TIPOS_JUNCAO:
+            raise ValueError(
+                f"O tipo de junção {tipo} não faz parte das opções {list(TIPOS_JUNCAO)}"
+            )
+        nova = self._copia()
+        chaves = [chaves] if isinstance(chaves, str) else list(chaves)
+        if chaves_direita is None:
+            chaves_direita = chaves
+        elif isinstance(chaves_direita, str):
+            chaves_direita = [chaves_direita]
+        nova._etapas.append(("junta", (outra, chaves, list(chaves_direita), tipo)))
+        return nova
+
+    def agrupa(
+        self,
+        chaves: typing.Union[str, typing.List[str]],
+        **agregacoes: typing.Tuple[str, str],
+    ) -> "Consulta":
+        """
+        Agrupa a consulta pelas {chaves}, calculando as {agregacoes} no
+        formato do pandas (nome=(coluna, função)). As funções disponíveis
+        são sum, count, min, max e mean
+
+        :param chaves: colunas de agrupamento
+        :param agregacoes: agregações a serem calculadas
+        :return: nova consulta
+        """
+        for nome, (_, funcao) in agregacoes.items():
+            if funcao not in AGREGACOES:
+                raise ValueError(
+                    f"A agregação {funcao} de {nome} não faz parte das opções "
+                    f"{list(AGREGACOES)}"
+                )
+        nova = self._copia()
+        chaves = [chaves] if isinstance(chaves, str) else list(chaves)
+        nova._agrupamento = (chaves, dict(agregacoes))
+        return nova
+
+    def colunas_leitura(self) -> typing.Optional[typing.List[str]]:
+        """
+        Obtém as colunas que precisam ser lidas da base
+
+        :return: lista de colunas (None lê todas)
+        """
+        if self._colunas is not None:
+            return self._colunas
+        if self._agrupamento is not None and len(self._etapas) == 0:
+            chaves, agregacoes = self._agrupamento
+            colunas = chaves + [c for c, _ in agregacoes.values()]
+            return list(dict.fromkeys(colunas))
+        return None
+
+    def _processa(self) -> typing.Generator[pa.Table, None, None]:
+        """
+        Lê a base em lotes e aplica as etapas da consulta em cada um,
+        gerando sempre ao menos uma tabela (que pode estar vazia)
+
+        :return: gerador de tabelas com o resultado de cada lote
+        """
+        scanner = self._dataset.scanner(
+            columns=self.colunas_leitura(),
+            filter=self._filtro,
+            batch_size=self._tamanho_lote,
+        )
+
+        # o lado direito das junções é executado uma única vez
+        direitas = dict()
+        for i, (etapa, args) in enumerate(self._etapas):
+            if etapa == "junta":
+                direitas[i] = decodifica(args[0].para_tabela())
+
+        vazio = True
+        for lote in scanner.to_batches():
+            if lote.num_rows == 0:
+                continue
+            tabela = self._aplica_etapas(pa.Table.from_batches([lote]), direitas)
+            if tabela.num_rows > 0:
+                vazio = False
+                yield tabela
+
+        if vazio:
+            tabela = scanner.projected_schema.empty_table()
+            yield self._aplica_etapas(tabela, direitas)
+
+    def _aplica_etapas(
+        self, tabela: pa.Table, direitas: typing.Dict[int, pa.Table]
+    ) -> pa.Table:
+        """
+        Aplica as etapas de seleção, filtro e junção a um lote da base
+
+        :param tabela: lote da base
+        :param direitas: tabelas do lado direito das junções por etapa
+        :return: lote processado
+        """
+        for i, (etapa, args) in enumerate(self._etapas):
+            if etapa == "seleciona":
+                tabela = tabela.select(args)
+            elif etapa == "filtra":
+                tabela = tabela.filter(args)
+            elif etapa == "junta":
+                _, chaves, chaves_direita, tipo = args
+                direita = direitas[i]
+                direita = direita.drop(
+                    [
+                        c
+                        for c in direita.column_names
+                        if c in tabela.column_names and c not in chaves_direita
+                    ]
+                )
+                tabela = decodifica(tabela).join(
+                    direita,
+                    keys=chaves,
+                    right_keys=chaves_direita,
+                    join_type=TIPOS_JUNCAO[tipo],
+                )
+        return tabela
+
+    def _agrega(self) -> pa.Table:
+        """
+        Calcula o agrupamento combinando agregações parciais de cada lote
+
+        :return: tabela agregada
+        """
+        chaves, agregacoes = self._agrupamento
+        parciais_cols = list(
+            dict.fromkeys(
+                (coluna, parcial)
+                for coluna, funcao in agregacoes.values()
+                for parcial in AGREGACOES[funcao]
+            )
+        )
+
+        colunas = list(dict.fromkeys(chaves + [c for c, _ in parciais_cols]))
+        nomes = {
+            f"{c}_{p}_{COMBINACAO_PARCIAL[p]}": f"{c}_{p}" for c, p in parciais_cols
+        }
+
+        def combina(tabelas: typing.List[pa.Table]) -> pa.Table:
+            # combina as parciais mantendo os seus nomes
+            combinada = (
+                pa.concat_tables(tabelas)
+                .group_by(chaves)
+                .aggregate(
+                    [
+                        (f"{c}_{p}", COMBINACAO_PARCIAL[p], OPCOES_AGREGACAO.get(p))
+                        for c, p in parciais_cols
+                    ]
+                )
+            )
+            return combinada.rename_columns(
+                [nomes.get(n, n) for n in combinada.column_names]
+            )
+
+        parciais: typing.List[pa.Table] = list()
+        linhas = 0
+        for tabela in self._processa():
+            tabela = decodifica(tabela.select(colunas))
+            parcial = tabela.group_by(chaves).aggregate(
+                [(c, p, OPCOES_AGREGACAO.get(p)) for c, p in parciais_cols]
+            )
+            parciais.append(parcial)
+            linhas += parcial.num_rows
+            # limita a memória das parciais combinando-as
+            if linhas > self._tamanho_lote and len(parciais) > 1:
+                parciais = [combina(parciais)]
+                linhas = parciais[0].num_rows
+
+        total = combina(parciais)
+        resultado = {c: total.column(c) for c in chaves}
+        for nome, (coluna, funcao) in agregacoes.items():
+            if funcao == "mean":
+                resultado[nome] = pc.divide(
+                    total.column(f"{coluna}_sum").cast(pa.float64()),
+                    total.column(f"{coluna}_count").cast(pa.float64()),
+                )
+            else:
+                resultado[nome] = total.column(f"{coluna}_{funcao}")
+        return pa.table(resultado)
+
+    def lotes(self) -> typing.Generator[pa.Table, None, None]:
+        """
+        Executa a consulta gerando o resultado em lotes
+
+        :return: gerador de tabelas com o resultado
+        """
+        if self._agrupamento is not None:
+            yield self._agrega()
+        else:
+            yield from self._processa()
+
+    def para_tabela(self) -> pa.Table:
+        """
+        Executa a consulta
+
+        :return: tabela com o resultado
+        """
+        return pa.concat_tables(self.lotes())
+
+    def para_pandas(self) -> pd.DataFrame:
+        """
+        Executa a consulta
+
+        :return: data frame com o resultado
+        """
+        return self.para_tabela().to_pandas()
+
+    def conta(self) -> int:
+        """
+        Conta o número de linhas do resultado da consulta. Quando há apenas
+        leitura e filtro a contagem é feita a partir dos metadados dos arquivos
+
+        :return: número de linhas
+        """
+        if len(self._etapas) == 0 and self._agrupamento is None:
+            return self._dataset.count_rows(filter=self._filtro)
+        return sum(t.num_rows for t in self.lotes())
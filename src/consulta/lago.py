@@ -0,0 +1,183 @@
+import logging
+import os
+import typing
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import src.configs as conf_geral
+from src.consulta.config import TAMANHO_LOTE
+from src.consulta.consulta import Consulta
+from src.consulta.consulta import Filtro
+
+
+def lista_arquivos(caminho: Path) -> typing.List[Path]:
+    """
+    Lista os arquivos parquet de uma base, que pode ser particionada
+    em pastas ou um único arquivo
+
+    :param caminho: caminho da base (ex: dados/aquisicao/escola.parquet)
+    :return: lista ordenada de arquivos
+    """
+    if caminho.is_file():
+        return [caminho]
+    arquivos = list()
+    for raiz, _, nomes in os.walk(caminho):
+        arquivos += [Path(raiz) / n for n in nomes if n.endswith(".parquet")]
+    return sorted(arquivos)
+
+
+def gera_particionamento(
+    caminho: Path, arquivos: typing.List[Path], esquema: pa.Schema
+) -> ds.Partitioning:
+    """
+    Gera o particionamento no formato hive (ANO=, REGIAO=, CO_UF=) de uma
+    base a partir das pastas dos seus arquivos. As chaves que também são
+    colunas dos arquivos utilizam o tipo da coluna, as demais são inteiras
+    quando todos os valores forem numéricos e texto caso contrário
+
+    :param caminho: caminho da base
+    :param arquivos: arquivos da base
+    :param esquema: esquema dos arquivos da base
+    :return: particionamento da base
+    """
+    chaves: typing.Dict[str, typing.List[str]] = dict()
+    for arq in arquivos:
+        for parte in arq.relative_to(caminho).parts[:-1]:
+            if "=" in parte:
+                chave, valor = parte.split("=", 1)
+                chaves.setdefault(chave, list()).append(valor)
+
+    campos = list()
+    for chave, valores in chaves.items():
+        if chave in esquema.names:
+            tipo = esquema.field(chave).type
+        elif all(v.lstrip("-").isnumeric() for v in valores):
+            tipo = pa.int32()
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(chave, tipo))
+    return ds.partitioning(pa.schema(campos), flavor="hive")
+
+
+def registra_base(caminho: Path) -> ds.Dataset:
+    """
+    Registra uma base particionada do lago como um pyarrow.dataset.
+
+    O esquema é a união dos esquemas de todos os arquivos (colunas que
+    existem apenas em alguns anos são nulas nos demais); caso os tipos de
+    uma coluna sejam incompatíveis entre arquivos é utilizado o esquema
+    do arquivo mais recente
+
+    :param caminho: caminho da base
+    :return: dataset da base
+    """
+    arquivos = lista_arquivos(caminho)
+    if len(arquivos) == 0:
+        raise ValueError(f"A base {caminho} não possuí arquivos parquet")
+
+    esquemas = [pq.read_schema(a) for a in arquivos]
+    try:
+        esquema = pa.unify_schemas(esquemas)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as erro:
+        logging.getLogger(__name__).warning(
+            f"Os esquemas dos arquivos de {caminho} são incompatíveis ({erro}), "
+            f"utilizando o esquema de {arquivos[-1]}"
+        )
+        esquema = esquemas[-1]
+    esquema = esquema.remove_metadata()
+
+    particionamento = gera_particionamento(caminho, arquivos, esquema)
+    return ds.dataset(
+        caminho,
+        schema=pa.unify_schemas([esquema, particionamento.schema]),
+        format="parquet",
+        partitioning=particionamento,
+    )
+
+
+class Lago:
+    """
+    Catálogo das bases parquet geradas pela aquisição e pelos datamarts,
+    que permite consulta-las sem carregar anos inteiros em memória.
+
+    As bases de aquisição são registradas pelo seu nome (ex: escola,
+    depara_docente_turma) e as dos datamarts com o prefixo dm_
+    (ex: dm_escola, dm_municipio)
+    """
+
+    _bases: typing.Dict[str, Path]
+    _datasets: typing.Dict[str, ds.Dataset]
+
+    def __init__(
+        self,
+        aquis_saida: typing.Union[str, Path] = conf_geral.PASTA_SAIDA_AQUISICAO,
+        dm_saida: typing.Union[str, Path] = conf_geral.PASTA_SAIDA_DATAMART,
+    ) -> None:
+        """
+        Instância o catálogo listando as bases disponíveis
+
+        :param aquis_saida: caminho para saída de aquisição
+        :param dm_saida: caminho para saída do datamart
+        """
+        self._bases = dict()
+        self._datasets = dict()
+        for pasta, prefixo in [(Path(aquis_saida), ""), (Path(dm_saida), "dm_")]:
+            if not pasta.is_dir():
+                continue
+            for nome in sorted(os.listdir(pasta)):
+                if nome.endswith(".parquet"):
+                    self._bases[prefixo + nome[: -len(".parquet")]] = pasta / nome
+
+    @property
+    def bases(self) -> typing.List[str]:
+        """
+        Lista as bases disponíveis no lago
+
+        :return: nomes das bases
+        """
+        return list(self._bases)
+
+    def dataset(self, base: str) -> ds.Dataset:
+        """
+        Obtém o dataset de uma base, registrando-o no primeiro acesso
+
+        :param base: nome da base
+        :return: dataset da base
+        """
+        if base not in self._bases:
+            raise ValueError(
+                f"A base {base} não faz parte do lago, as opções são {self.bases}"
+            )
+        if base not in self._datasets:
+            self._datasets[base] = registra_base(self._bases[base])
+        return self._datasets[base]
+
+    def esquema(self, base: str) -> pa.Schema:
+        """
+        Obtém o esquema de uma base (incluindo as colunas de partição)
+
+        :param base: nome da base
+        :return: esquema da base
+        """
+        return self.dataset(base).schema
+
+    def consulta(
+        self,
+        base: str,
+        colunas: typing.Optional[typing.Sequence[str]] = None,
+        filtros: typing.Optional[Filtro] = None,
+        tamanho_lote: int = TAMANHO_LOTE,
+    ) -> Consulta:
+        """
+        Cria uma consulta sobre uma base do lago
+
+        :param base: nome da base
+        :param colunas: colunas a serem lidas (None lê todas)
+        :param filtros: filtro aplicado na leitura (ex: [("ANO", "=", 2020)])
+        :param tamanho_lote: número de linhas lidas por lote
+        :return: consulta
+        """
+        return Consulta(self.dataset(base), colunas, filtros, tamanho_lote)
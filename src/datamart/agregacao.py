@@ -0,0 +1,238 @@
+import logging
+import os
+import re
+import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from src.datamart.config import DMGran
+from src.datamart.config import DM_AGREGADOS
+from src.datamart.config import PESOS_AGREGACAO
+from src.utils.instrumentacao import instrumenta
+from src.utils.parquet import escreve_parquet
+
+
+def obtem_peso(coluna: str) -> typing.Optional[str]:
+    """
+    Obtém a coluna utilizada como peso para agregar uma coluna de razão
+
+    :param coluna: nome da coluna de razão
+    :return: nome da coluna de peso ou None se a média deve ser simples
+    """
+    for padrao, peso in PESOS_AGREGACAO:
+        if re.search(padrao, coluna) is not None:
+            return peso
+    return None
+
+
+def define_regras(
+    colunas: typing.Sequence[str], chave: str, constantes: typing.Sequence[str]
+) -> typing.Dict[str, str]:
+    """
+    Define a regra de agregação de cada coluna do datamart de escola:
+    - constante: colunas que não variam dentro da chave (primeiro valor)
+    - soma: colunas QT_ e NU_ de somas
+    - minimo / maximo: colunas NU_ de mínimos e máximos
+    - media: colunas de razão (PC_, NU_ e IDEB) ponderadas pelo denominador
+    - indicador: colunas IN_ convertidas no percentual de escolas com a flag
+    - categoria: colunas TP_ convertidas na quantidade de escolas por categoria
+
+    As demais colunas (ID_, CO_, NO_, DT_) não são agregadas
+
+    :param colunas: lista de colunas do datamart de escola
+    :param chave: coluna com o nível de granularidade da agregação
+    :param constantes: colunas que não variam dentro da chave
+    :return: dicionário com a coluna e sua regra de agregação
+    """
+    regras = dict()
+    for c in colunas:
+        if c == chave:
+            continue
+        elif c in constantes:
+            regras[c] = "constante"
+        elif c.startswith("QT_") or (c.startswith("NU_") and "_SUM_" in c):
+            regras[c] = "soma"
+        elif c.startswith("NU_") and "_MIN_" in c:
+            regras[c] = "minimo"
+        elif c.startswith("NU_") and "_MAX_" in c:
+            regras[c] = "maximo"
+        elif c.startswith("IN_"):
+            regras[c] = "indicador"
+        elif c.startswith("TP_"):
+            regras[c] = "categoria"
+        elif c.startswith("PC_") or c.startswith("NU_") or obtem_peso(c) is not None:
+            regras[c] = "media"
+    return regras
+
+
+def agrega_datamart(
+    df: pd.DataFrame, chave: str, regras: typing.Dict[str, str]
+) -> pd.DataFrame:
+    """
+    Agrega o datamart de escola ao nível de {chave} aplicando as {regras}
+    de cada coluna. Todas as agregações compartilham o mesmo agrupamento,
+    de forma que as chaves são fatorizadas uma única vez
+
+    :param df: datamart de escola com as colunas necessárias
+    :param chave: coluna com o nível de granularidade da agregação
+    :param regras: dicionário com a coluna e sua regra de agregação
+    :return: datamart agregado com uma linha por {chave}
+    """
+    df = df.loc[lambda f: f[chave].notnull()]
+
+    # gera as colunas de entrada da agregação para cada tipo de operação
+    entradas: typing.Dict[str, typing.Dict[str, pd.Series]] = dict(
+        first=dict(), sum=dict(), min=dict(), max=dict()
+    )
+    categorias: typing.Dict[str, typing.List[str]] = dict()
+    for c, regra in regras.items():
+        if regra == "constante":
+            entradas["first"][c] = df[c]
+        elif regra == "soma":
+            entradas["sum"][c] = df[c].astype("float64")
+        elif regra == "minimo":
+            entradas["min"][c] = df[c].astype("float64")
+        elif regra == "maximo":
+            entradas["max"][c] = df[c].astype("float64")
+        elif regra == "indicador":
+            entradas["sum"][f"__NUM__{c}"] = df[c].astype("float64")
+            entradas["sum"][f"__DEN__{c}"] = df[c].notnull().astype("float64")
+        elif regra == "media":
+            peso = obtem_peso(c)
+            if peso is not None and peso in df:
+                w = df[peso].astype("float64")
+            else:
+                w = pd.Series(1.0, index=df.index)
+            valido = df[c].notnull() & w.notnull()
+            entradas["sum"][f"__NUM__{c}"] = (df[c].astype("float64") * w).where(valido)
+            entradas["sum"][f"__DEN__{c}"] = w.where(valido)
+        elif regra == "categoria":
+            dummies = pd.get_dummies(df[c].astype("category"), dtype="float32")
+            categorias[c] = list(dummies.columns)
+            for cat in dummies:
+                entradas["sum"][f"__CAT__{c}__{cat}"] = dummies[cat]
+
+    # realiza a agregação de todas as colunas com o mesmo agrupamento
+    base = pd.concat(
+        [pd.DataFrame(e, index=df.index) for e in entradas.values()], axis=1
+    )
+    grupos = base.groupby(df[chave].values, sort=True)
+    agregado: typing.Dict[str, pd.DataFrame] = dict()
+    for op, e in entradas.items():
+        if len(e) > 0:
+            if op == "sum":
+                agregado[op] = grupos[list(e)].sum(min_count=1)
+            else:
+                agregado[op] = getattr(grupos[list(e)], op)()
+
+    # monta a base de saída a partir dos resultados agregados
+    index = grupos.size().index
+    saida: typing.Dict[str, typing.Any] = {"QT_ESCOLAS": grupos.size().values}
+    for c, regra in regras.items():
+        if regra == "constante":
+            saida[c] = agregado["first"][c].values
+        elif regra in ("soma", "minimo", "maximo"):
+            op = dict(soma="sum", minimo="min", maximo="max")[regra]
+            saida[c] = agregado[op][c].values
+        elif regra in ("indicador", "media"):
+            num = agregado["sum"][f"__NUM__{c}"].values
+            den = agregado["sum"][f"__DEN__{c}"].values
+            with np.errstate(divide="ignore", invalid="ignore"):
+                razao = np.where(den > 0, num / den, np.nan).astype("float32")
+            saida[f"PC_ESCOLAS_{c[3:]}" if regra == "indicador" else c] = razao
+        elif regra == "categoria":
+            for cat in categorias[c]:
+                nome = str(cat).replace(" ", "_").replace("-", "_").replace("___", "_")
+                saida[f"QT_ESCOLAS_{c[3:]}_{nome}"] = agregado["sum"][
+                    f"__CAT__{c}__{cat}"
+                ].values
+
+    res = pd.DataFrame(saida, index=index)
+    res.index.name = chave
+    return res.reset_index()
+
+
+def carrega_atributos_malha(
+    aquis_saida: Path, malha: str, ano: int
+) -> typing.Union[None, pd.DataFrame]:
+    """
+    Carrega os atributos (sem a geometria) da malha do IBGE mais próxima
+    do ano de processamento, dando preferência aos anos anteriores
+
+    :param aquis_saida: caminho para saída de aquisição
+    :param malha: nome da base de malha (malha_mun ou malha_uf)
+    :param ano: ano de processamento da base
+    :return: data frame com os atributos ou None se a malha não existir
+    """
+    logger = logging.getLogger(__name__)
+    caminho = Path(aquis_saida) / f"{malha}.parquet"
+    anos = (
+        sorted(
+            int(p.split("=")[1])
+            for p in os.listdir(caminho)
+            if p.startswith("ANO=") and p.split("=")[1].isnumeric()
+        )
+        if caminho.is_dir()
+        else []
+    )
+    if len(anos) == 0:
+        logger.warning(f"A malha {malha} não foi encontrada em {aquis_saida}")
+        return None
+
+    anteriores = [a for a in anos if a <= ano]
+    caminho = caminho / f"ANO={anteriores[-1] if len(anteriores) > 0 else anos[0]}"
+    colunas = [
+        c
+        for c in ds.dataset(caminho, format="parquet").schema.names
+        if c != "geometry" and not c.startswith("__")
+    ]
+    return pd.read_parquet(caminho, columns=colunas)
+
+
+@instrumenta()
+def controi_datamart_agregado(
+    gran: DMGran, ano: int, aquis_saida: Path, saida: Path
+) -> None:
+    """
+    Constrói um datamart geográfico (município ou estado) agregando o datamart
+    de escola do ano selecionado e adicionando os atributos da malha do IBGE
+
+    :param gran: granularidade do datamart a ser gerado
+    :param ano: ano de processamento da base
+    :param aquis_saida: caminho para saída de aquisição
+    :param saida: caminho para saída do datamart
+    """
+    logger = logging.getLogger(__name__)
+    chave, constantes, malha = DM_AGREGADOS[gran]
+
+    # carrega apenas as colunas do datamart de escola que serão agregadas
+    logger.info("Carregando datamart de escola")
+    caminho = Path(saida) / f"escola.parquet/ANO={ano}"
+    colunas = ds.dataset(caminho, format="parquet").schema.names
+    regras = define_regras(colunas, chave, constantes)
+    pesos = {obtem_peso(c) for c, r in regras.items() if r == "media"}
+    carregar = [c for c in colunas if c == chave or c in regras or c in pesos]
+    escola = pd.read_parquet(caminho, columns=carregar)
+
+    logger.info(f"Agregando dados ao nível de {chave}")
+    dm = agrega_datamart(escola, chave, regras)
+    dm[chave] = dm[chave].astype("int64")
+
+    logger.info(f"Adicionando atributos da {malha}")
+    atributos = carrega_atributos_malha(aquis_saida, malha, ano)
+    if atributos is not None:
+        atributos = atributos.drop(
+            columns=[c for c in atributos if c in dm and c != chave] + ["ANO"],
+            errors="ignore",
+        ).astype({chave: "int64"})
+        dm = dm.merge(atributos, on=chave, how="left")
+
+    logger.info("Exportando datamart")
+    saida = Path(saida) / f"{gran.value.lower()}.parquet/ANO={ano}"
+    saida.mkdir(exist_ok=True, parents=True)
+    escreve_parquet(
+        dm, saida / f"{ano}.parquet", f"dm_{gran.value.lower()}", index=False
+    )
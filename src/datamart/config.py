@@ -10,3 +10,141 @@ class DMGran(Enum):
     MATRICULA = "MATRICULA"
     MUNICIPIO = "MUNICIPIO"
     ESTADO = "ESTADO"
+
+
+# Datamarts construídos como agregação do datamart de escola
+# chave = granularidade
+# valor = (coluna chave, colunas constantes dentro da chave, malha do IBGE)
+DM_AGREGADOS = {
+    DMGran.MUNICIPIO: ("CO_MUNICIPIO", ["CO_UF", "CO_REGIAO"], "malha_mun"),
+    DMGran.ESTADO: ("CO_UF", ["CO_REGIAO"], "malha_uf"),
+}
+
+# Lista de pares (expressão regular, coluna de peso) utilizada para agregar as
+# colunas de razão do datamart de escola (PC_, NU_ e métricas do IDEB).
+# A razão agregada é a média da razão de cada escola ponderada pelo seu
+# denominador, o que equivale a recalcular a soma dos numeradores dividida pela
+# soma dos denominadores. A primeira expressão que bater com a coluna é usada
+PESOS_AGREGACAO = [
+    ("_POR_TURMA$", "QT_TURMAS"),
+    ("_POR_DOCENTE$", "QT_DOCENTES"),
+    ("_POR_ALUNO$", "QT_ALUNOS"),
+    ("^PC_ALUNO_", "QT_ALUNOS"),
+    ("^PC_RESP_TRANSP_", "QT_ALUNOS"),
+    ("^PC_MATRICULA_", "QT_MATRICULAS"),
+    ("^PC_DOCENTE_", "QT_DOCENTES"),
+    ("^PC_GESTOR_", "QT_GESTORES"),
+    ("^PC_TURMA_", "QT_TURMAS"),
+    ("^NU_(.*)TURMA_", "QT_TURMAS"),
+    ("^NU_(.*)ALUNO", "QT_ALUNOS"),
+    ("^(APROVACAO|IDEB|NOTA|REND)_", "QT_ALUNOS"),
+]
+
+# Métricas de razão geradas no datamart de escola a partir das suas colunas
+# (numerador, denominador, coluna de saída, tipo). As razões são calculadas em
+# um único bloco e são nulas quando o denominador é nulo ou zero
+METRICAS_RAZAO = [
+    ("QT_COMP_PORTATIL_ALUNO", "QT_ALUNOS", "NU_COMP_PORTATIL_ALUNO", "float32"),
+    ("QT_DESKTOP", "QT_ALUNOS", "NU_DESKTOP_TOTAL_POR_ALUNO", "float32"),
+    ("QT_DESKTOP_ADM", "QT_ALUNOS", "NU_DESKTOP_ADM_POR_ALUNO", "float32"),
+    ("QT_DESKTOP_ALUNO", "QT_ALUNOS", "NU_DESKTOP_ALUNO_POR_ALUNO", "float32"),
+    ("QT_TABLET_ALUNO", "QT_ALUNOS", "NU_TABLET_POR_ALUNO", "float32"),
+    ("QT_EQUIP_COPIADORA", "QT_ALUNOS", "NU_EQUIP_COPIADORA_POR_ALUNO", "float32"),
+    ("QT_EQUIP_DVD", "QT_ALUNOS", "NU_EQUIP_DVD_POR_ALUNO", "float32"),
+    ("QT_EQUIP_FAX", "QT_ALUNOS", "NU_EQUIP_FAX_POR_ALUNO", "float32"),
+    ("QT_EQUIP_FOTO", "QT_ALUNOS", "NU_EQUIP_FOTO_POR_ALUNO", "float32"),
+    ("QT_EQUIP_IMPRESSORA", "QT_ALUNOS", "NU_EQUIP_IMPRESSORA_POR_ALUNO", "float32"),
+    (
+        "QT_EQUIP_IMPRESSORA_MULT",
+        "QT_ALUNOS",
+        "NU_EQUIP_IMPRESSORA_MULT_POR_ALUNO",
+        "float32",
+    ),
+    (
+        "QT_EQUIP_LOUSA_DIGITAL",
+        "QT_ALUNOS",
+        "NU_EQUIP_LOUSA_DIGITAL_POR_ALUNO",
+        "float32",
+    ),
+    ("QT_EQUIP_MULTIMIDIA", "QT_ALUNOS", "NU_EQUIP_MULTIMIDIA_POR_ALUNO", "float32"),
+    ("QT_EQUIP_PARABOLICA", "QT_ALUNOS", "NU_EQUIP_PARABOLICA_POR_ALUNO", "float32"),
+    ("QT_EQUIP_RETRO", "QT_ALUNOS", "NU_EQUIP_RETRO_POR_ALUNO", "float32"),
+    ("QT_EQUIP_SOM", "QT_ALUNOS", "NU_EQUIP_SOM_POR_ALUNO", "float32"),
+    ("QT_EQUIP_TV", "QT_ALUNOS", "NU_EQUIP_TV_POR_ALUNO", "float32"),
+    (
+        "QT_EQUIP_VIDEOCASSETE",
+        "QT_ALUNOS",
+        "NU_EQUIP_VIDEOCASSETE_POR_ALUNO",
+        "float32",
+    ),
+    ("QT_FUNCIONARIOS", "QT_ALUNOS", "NU_FUNCIONARIOS_POR_ALUNO", "float32"),
+    ("QT_SALAS_EXISTENTES", "QT_ALUNOS", "NU_SALAS_POR_ALUNO", "float32"),
+    ("QT_SALAS_UTILIZADAS", "QT_ALUNOS", "NU_SALAS_UTILIZADAS_POR_ALUNO", "float32"),
+    (
+        "QT_SALAS_UTILIZADAS_ACESSIVEIS",
+        "QT_ALUNOS",
+        "NU_SALAS_UTILIZADAS_ACESSIVEIS_POR_ALUNO",
+        "float32",
+    ),
+    (
+        "QT_SALAS_UTILIZADAS_DENTRO",
+        "QT_ALUNOS",
+        "NU_SALAS_UTILIZADAS_DENTRO_POR_ALUNO",
+        "float32",
+    ),
+    (
+        "QT_SALAS_UTILIZADAS_FORA",
+        "QT_ALUNOS",
+        "NU_SALAS_UTILIZADAS_FORA_POR_ALUNO",
+        "float32",
+    ),
+    (
+        "QT_SALAS_UTILIZA_CLIMATIZADAS",
+        "QT_ALUNOS",
+        "NU_SALAS_UTILIZA_CLIMATIZADAS_POR_ALUNO",
+        "float32",
+    ),
+    ("QT_MATRICULAS", "QT_TURMAS", "NU_ALUNO_POR_TURMA", "float32"),
+    ("QT_ALUNOS", "QT_DOCENTES", "NU_ALUNO_POR_DOCENTE", "float32"),
+]
+
+# Regiões das bases de aluno e matrícula, processadas em paralelo no datamart de escola
+REGIOES = ["CO", "NORDESTE", "NORTE", "SUDESTE", "SUL"]
+
+# Prefixos das colunas de aluno e de matrícula lidas no datamart de escola
+COLUNAS_MATRICULA = [
+    ("ID_ALUNO", "CO_MUNICIPIO_END", "IN_", "TP_", "QT_", "NU_"),
+    ("ID_ALUNO", "ID_MATRICULA", "ID_TURMA", "IN_TRANSP", "IN_AEE_", "TP_RESP"),
+]
+
+# Datamarts construídos no nível de registro das bases do censo escolar por meio
+# de junções em fluxo com tabelas de consulta indexadas pela chave de junção
+# chave = granularidade
+# valor = (base principal de aquisição, base particionada por REGIAO)
+DM_REGISTROS = {
+    DMGran.TURMA: ("turma", False),
+    DMGran.DOCENTE: ("docente", False),
+    DMGran.GESTOR: ("gestor", False),
+    DMGran.ALUNO: ("aluno", True),
+    DMGran.MATRICULA: ("matricula", True),
+}
+
+# Atributos de escola e turma adicionados aos datamarts de registro
+ATRIBUTOS_ESCOLA = [
+    "CO_MUNICIPIO",
+    "TP_DEPENDENCIA",
+    "TP_LOCALIZACAO",
+    "TP_CATEGORIA_ESCOLA_PRIVADA",
+    "TP_SITUACAO_FUNCIONAMENTO",
+]
+ATRIBUTOS_TURMA = [
+    "ID_ESCOLA",
+    "CO_ETAPA_ENSINO",
+    "TP_MEDIACAO_DIDATICO_PEDAGO",
+    "TP_TIPO_ATENDIMENTO_TURMA",
+    "TP_TIPO_LOCAL_TURMA",
+    "NU_DURACAO_TURMA",
+]
+
+# Número de linhas lidas por lote nas junções em fluxo
+TAMANHO_LOTE = 500_000
@@ -1,9 +1,10 @@
 import logging
+import os
+import typing
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
 
 import src.datamart.funcoes as fn
 from src.aquisicao.inep.docente import DocenteETL
@@ -12,9 +13,118 @@ from src.aquisicao.inep.gestor import GestorETL
 from src.aquisicao.inep.ideb import IDEBETL
 from src.aquisicao.inep.matricula import _MatriculaRegiaoETL
 from src.aquisicao.inep.turma import TurmaETL
+from src.datamart.config import COLUNAS_MATRICULA
+from src.datamart.config import METRICAS_RAZAO
+from src.datamart.config import REGIOES
+from src.datamart.indice import Indice
+from src.datamart.indice import carrega_indice
+from src.datamart.indice import expande_pares
+from src.datamart.indice import gera_indice
+from src.datamart.indice import junta_indice
+from src.datamart.memoria import ResultadosParciais
 from src.utils.info import carrega_excel
+from src.utils.instrumentacao import instrumenta
+from src.utils.paralelo import executa_em_paralelo
+from src.utils.parquet import carrega_perfil
+from src.utils.parquet import escreve_parquet_blocos
+from src.utils.parquet import schema_pandas
 
+# bases de consulta compartilhadas pelas regiões no processamento de matrículas
+_TURMA_ESCOLA: typing.Optional[Indice] = None
+_ESCOLA_MUNICIPIO: typing.Optional[pd.DataFrame] = None
 
+
+def carrega_etapa_ensino() -> pd.DataFrame:
+    """
+    Carrega a tabela auxiliar de etapas de ensino do censo escolar
+
+    :return: data frame com as etapas de ensino
+    """
+    return carrega_excel("censo_escolar_etapa_ensino.xlsx")
+
+
+def carrega_cursos() -> pd.DataFrame:
+    """
+    Carrega a tabela auxiliar de cursos do censo escolar com as
+    colunas de grau e área convertidas para categorias
+
+    :return: data frame com os cursos
+    """
+    df_cr = carrega_excel("censo_escolar_cursos.xlsx")
+    df_cr["TP_GRAU_ACADEMICO"] = df_cr["TP_GRAU_ACADEMICO"].astype("category")
+    df_cr["TP_AREA_CURSO"] = df_cr["TP_AREA_CURSO"].astype("category")
+    return df_cr
+
+
+def carrega_ideb(aquis_entrada: Path, aquis_saida: Path) -> pd.DataFrame:
+    """
+    Carrega a base completa de IDEB (todos os anos)
+
+    :param aquis_entrada: caminho para entrada de aquisição
+    :param aquis_saida: caminho para saída de aquisição
+    :return: data frame com os dados de IDEB
+    """
+    etl = IDEBETL(
+        entrada=aquis_entrada,
+        saida=aquis_saida,
+        criar_caminho=False,
+        reprocessar=False,
+    )
+    return etl.dados_saida[etl.bases_saida[0]]
+
+
+def carrega_fontes_comuns(
+    aquis_entrada: Path, aquis_saida: Path
+) -> typing.Dict[str, pd.DataFrame]:
+    """
+    Carrega as bases que não dependem do ano do datamart, de forma
+    que possam ser compartilhadas na construção de vários anos
+
+    :param aquis_entrada: caminho para entrada de aquisição
+    :param aquis_saida: caminho para saída de aquisição
+    :return: dicionário com o nome da fonte e o data frame
+    """
+    return dict(
+        etapa_ensino=carrega_etapa_ensino(),
+        cursos=carrega_cursos(),
+        ideb=carrega_ideb(aquis_entrada, aquis_saida),
+    )
+
+
+def carrega_indice_turma(
+    aquis_entrada: Path, aquis_saida: Path, ano: int, persistir: bool = False
+) -> Indice:
+    """
+    Carrega o índice de ID_TURMA para ID_ESCOLA de um ano. Quando persistido
+    o índice é salvo junto da partição de turmas e só é gerado novamente
+    quando a partição for atualizada
+
+    :param aquis_entrada: caminho para entrada de aquisição
+    :param aquis_saida: caminho para saída de aquisição
+    :param ano: ano de processamento da base
+    :param persistir: flag se o índice deve ser persistido
+    :return: índice de ID_TURMA para ID_ESCOLA
+    """
+    etl = TurmaETL(
+        entrada=aquis_entrada,
+        saida=aquis_saida,
+        ano=ano,
+        criar_caminho=False,
+        reprocessar=False,
+    )
+    caminho = etl.caminho_particao(etl.bases_saida[0])
+
+    def gera() -> Indice:
+        turma = etl.le_saida(etl.bases_saida[0], ["ID_TURMA", "ID_ESCOLA"])
+        return gera_indice(turma["ID_TURMA"], turma["ID_ESCOLA"])
+
+    # sem a partição de turmas o índice é gerado a partir do ETL
+    if not persistir or not etl.tem_particao(caminho):
+        return gera()
+    return carrega_indice(caminho / "_indice_turma_escola.npz", gera, caminho)
+
+
+@instrumenta()
 def processa_censo_escola(
     aquis_entrada: Path, aquis_saida: Path, ano: int
 ) -> pd.DataFrame:
@@ -39,8 +149,14 @@ def processa_censo_escola(
     )
 
 
+@instrumenta()
 def processa_turmas(
-    dm: pd.DataFrame, aquis_entrada: Path, aquis_saida: Path, ano: int
+    dm: pd.DataFrame,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    ano: int,
+    fontes: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+    resultados: typing.Optional[ResultadosParciais] = None,
 ) -> pd.DataFrame:
     """
     Carrega a base de turmas e gera as seguintes métricas:
@@ -53,6 +169,9 @@ def processa_turmas(
     :param aquis_entrada: caminho para entrada de aquisição
     :param aquis_saida: caminho para saída de aquisição
     :param ano: ano de processamento da base
+    :param fontes: bases comuns a todos os anos já carregadas
+    :param resultados: armazenamento dos resultados parciais, quando informado
+        o resultado é adicionado a ele ao invés de incorporado ao datamart
     :return: data frame de escolas com dados de turma adicionados
     """
     # carrega os dados de turma
@@ -68,15 +187,14 @@ def processa_turmas(
     # soma todas as turmas
     res = turma.groupby(["ID_ESCOLA"]).agg({"ID_TURMA": "count"}).reset_index()
     res.columns = ["ID_ESCOLA", "QT_TURMAS"]
+    blocos = [res]
 
     # processa as colunas IN_
-    res = res.merge(
-        fn.processa_coluna_in(turma, "ID_ESCOLA", "ID_TURMA", "TURMA", perc=False),
-        how="left",
-    )
-    res["PC_TURMA_ESPECIAL_EXCLUSIVA"] = (
-        res["QT_TURMA_ESPECIAL_EXCLUSIVA"] / res["QT_TURMAS"]
-    )
+    df = fn.processa_coluna_in(turma, "ID_ESCOLA", "ID_TURMA", "TURMA", perc=False)
+    df["PC_TURMA_ESPECIAL_EXCLUSIVA"] = df["QT_TURMA_ESPECIAL_EXCLUSIVA"] / df[
+        "ID_ESCOLA"
+    ].map(res.set_index("ID_ESCOLA")["QT_TURMAS"])
+    blocos.append(df)
 
     # processa as colunas TP
     for (tp_col, pf) in [
@@ -86,14 +204,10 @@ def processa_turmas(
         ("TP_MOD_ENSINO", "TURMA_MOD"),
         ("TP_TIPO_TURMA", "TURMA_TIPO"),
     ]:
-        res = res.merge(
-            fn.processa_coluna_tp(turma, "ID_ESCOLA", tp_col, "ID_TURMA", pf),
-            on="ID_ESCOLA",
-            how="left",
-        )
+        blocos.append(fn.processa_coluna_tp(turma, "ID_ESCOLA", tp_col, "ID_TURMA", pf))
 
     # processa colunas numéricas
-    res = res.merge(
+    blocos.append(
         fn.processa_coluna_qt_nu(
             turma, "ID_ESCOLA", "TURMA", metricas=("mean", "median")
         ).rename(
@@ -102,8 +216,7 @@ def processa_turmas(
                 "NU_MEAN_TURMA_DURACAO_TURMA": "NU_TURMA_MEAN_DURACAO",
                 "NU_MEDIAN_TURMA_DURACAO_TURMA": "NU_TURMA_MEDIAN_DURACAO",
             }
-        ),
-        how="left",
+        )
     )
 
     # calcula as turmas com atividades complementares
@@ -111,11 +224,11 @@ def processa_turmas(
         [f"CO_TIPO_ATIVIDADE_{i}" for i in range(1, 7)]
     ].count()
     df["QT_TURMA_ATIVIDADE_COMP"] = df.sum(axis=1)
-    res = res.merge(df[["QT_TURMA_ATIVIDADE_COMP"]].reset_index(), how="left")
+    blocos.append(df[["QT_TURMA_ATIVIDADE_COMP"]].reset_index())
 
     # adiciona os dados de etapa ensino, e gera as colunas informando
     # os tipos de turmas disponíveis
-    df_ee = carrega_excel("censo_escolar_etapa_ensino.xlsx")
+    df_ee = fontes["etapa_ensino"] if fontes else carrega_etapa_ensino()
     df_qt = (
         turma.merge(df_ee, how="left")
         .groupby(["ID_ESCOLA"])[
@@ -141,17 +254,26 @@ def processa_turmas(
     )
     df_in.columns = ["ID_ESCOLA"] + [f"IN_TURMA_{c}" for c in df_in.columns[1:]]
     df_qt.columns = ["ID_ESCOLA"] + [f"QT_TURMA_{c}" for c in df_qt.columns[1:]]
-    res = res.merge(df_in, how="left")
-    res = res.merge(df_qt, how="left")
+    blocos += [df_in, df_qt]
+    res = fn.junta_blocos(blocos, "ID_ESCOLA")
 
     # adiciona os dados ao datamart
+    if resultados is not None:
+        resultados.adiciona("turma", res)
+        return dm
     dm = dm.merge(res, how="left")
 
     return dm
 
 
+@instrumenta()
 def processa_docentes(
-    dm: pd.DataFrame, aquis_entrada: Path, aquis_saida: Path, ano: int
+    dm: pd.DataFrame,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    ano: int,
+    resultados: typing.Optional[ResultadosParciais] = None,
+    indice_turma: typing.Optional[Indice] = None,
 ) -> pd.DataFrame:
     """
     Incorpora os dados de docentes ao datamart de escola
@@ -160,6 +282,9 @@ def processa_docentes(
     :param aquis_entrada: caminho para entrada de aquisição
     :param aquis_saida: caminho para saída de aquisição
     :param ano: ano de processamento da base
+    :param resultados: armazenamento dos resultados parciais, quando informado
+        o resultado é adicionado a ele ao invés de incorporado ao datamart
+    :param indice_turma: índice de ID_TURMA para ID_ESCOLA já carregado
     :return: datamart com dados de docente incorporados
     """
     # carrega os dados de docente
@@ -173,35 +298,27 @@ def processa_docentes(
     docente = doc_etl.dados_saida[doc_etl.bases_saida[0]]
     depara = doc_etl.dados_saida[doc_etl.bases_saida[1]]
 
-    # carrega os dados de turma
-    tum_etl = TurmaETL(
-        entrada=aquis_entrada,
-        saida=aquis_saida,
-        ano=ano,
-        criar_caminho=False,
-        reprocessar=False,
-    )
-    turma = tum_etl.dados_saida[tum_etl.bases_saida[0]]
-
     # adiciona os dados de escola ao depara
+    if indice_turma is None:
+        indice_turma = carrega_indice_turma(aquis_entrada, aquis_saida, ano)
     depara = (
-        depara.merge(turma[["ID_TURMA", "ID_ESCOLA"]])
+        junta_indice(depara, indice_turma, "ID_TURMA", "ID_ESCOLA")
         .drop(columns=["ID_TURMA"])
         .drop_duplicates()
     )
 
     # duplica linhas de docente por escola
-    docente = docente.merge(depara[["ID_ESCOLA", "ID_DOCENTE"]].drop_duplicates())
+    docente = expande_pares(
+        docente, depara[["ID_ESCOLA", "ID_DOCENTE"]].drop_duplicates(), "ID_DOCENTE"
+    )
 
     # soma o total de docentes por escola
     res = depara.groupby(["ID_ESCOLA"]).agg({"ID_DOCENTE": "nunique"}).reset_index()
     res.columns = ["ID_ESCOLA", "QT_DOCENTES"]
+    blocos = [res]
 
     # processa as colunas IN_
-    res = res.merge(
-        fn.processa_coluna_in(docente, "ID_ESCOLA", "ID_DOCENTE", "DOCENTE"),
-        how="left",
-    )
+    blocos.append(fn.processa_coluna_in(docente, "ID_ESCOLA", "ID_DOCENTE", "DOCENTE"))
 
     # processa as colunas TP com características pessoais do docente
     for (tp_col, pf, df) in [
@@ -215,17 +332,15 @@ def processa_docentes(
         ("TP_TIPO_CONTRATACAO", "DOCENTE_CONT", depara),
         ("TP_TIPO_DOCENTE", "DOCENTE_TIPO", depara),
     ]:
-        res = res.merge(
+        blocos.append(
             fn.processa_coluna_tp(
                 df, "ID_ESCOLA", tp_col, "ID_DOCENTE", pf, recriar=False
-            ),
-            on="ID_ESCOLA",
-            how="left",
+            )
         )
 
     # cria a coluna de docentes com formação complementar
     if docente["CO_AREA_COMPL_PEDAGOGICA_1"].count() > 0:
-        res = res.merge(
+        blocos.append(
             docente.reindex(
                 columns=["ID_DOCENTE", "ID_ESCOLA", "CO_AREA_COMPL_PEDAGOGICA_1"]
             )
@@ -237,15 +352,14 @@ def processa_docentes(
             )
             .groupby(["ID_ESCOLA"])["QT_DOCENTE_COMPL_PEDAGOGICA"]
             .sum()
-            .reset_index(),
-            how="left",
+            .reset_index()
         )
     else:
-        res["QT_DOCENTE_COMPL_PEDAGOGICA"] = np.nan
+        blocos.append(res[["ID_ESCOLA"]].assign(QT_DOCENTE_COMPL_PEDAGOGICA=np.nan))
 
     # verifica docentes que estão em municipios diferentes da escola
     if docente["CO_MUNICIPIO_END"].count() > 0:
-        res = res.merge(
+        blocos.append(
             docente[["ID_DOCENTE", "ID_ESCOLA", "CO_MUNICIPIO_END"]]
             .merge(dm[["ID_ESCOLA", "CO_MUNICIPIO"]], how="left")
             .assign(
@@ -256,11 +370,11 @@ def processa_docentes(
             )
             .groupby(["ID_ESCOLA"])["QT_DOCENTE_MUN_DIF"]
             .sum()
-            .reset_index(),
-            how="left",
+            .reset_index()
         )
     else:
-        res["QT_DOCENTE_MUN_DIF"] = np.nan
+        blocos.append(res[["ID_ESCOLA"]].assign(QT_DOCENTE_MUN_DIF=np.nan))
+    res = fn.junta_blocos(blocos, "ID_ESCOLA")
 
     # TODO: Construir um conjunto de colunas relacionadas a formação do docente
     # "CO_IES_1": "uint32"
@@ -270,13 +384,22 @@ def processa_docentes(
     # "NU_ANO_CONCLUSAO_1": "float32"
 
     # adiciona os dados ao datamart
+    if resultados is not None:
+        resultados.adiciona("docente", res)
+        return dm
     dm = dm.merge(res, how="left")
 
     return dm
 
 
+@instrumenta()
 def processa_gestor(
-    dm: pd.DataFrame, aquis_entrada: Path, aquis_saida: Path, ano: int
+    dm: pd.DataFrame,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    ano: int,
+    fontes: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+    resultados: typing.Optional[ResultadosParciais] = None,
 ) -> pd.DataFrame:
     """
     Incorpora os dados de gestores ao datamart de escola
@@ -285,6 +408,9 @@ def processa_gestor(
     :param aquis_entrada: caminho para entrada de aquisição
     :param aquis_saida: caminho para saída de aquisição
     :param ano: ano de processamento da base
+    :param fontes: bases comuns a todos os anos já carregadas
+    :param resultados: armazenamento dos resultados parciais, quando informado
+        o resultado é adicionado a ele ao invés de incorporado ao datamart
     :return: datamart de escola com os dados de gestor
     """
     # carrega os dados de gestor
@@ -304,17 +430,15 @@ def processa_gestor(
     # soma todos os gestores
     res = gestor.groupby(["ID_ESCOLA"]).agg({"ID_GESTOR": "count"}).reset_index()
     res.columns = ["ID_ESCOLA", "QT_GESTORES"]
+    blocos = [res]
 
     # processa as colunas IN_
-    res = res.merge(
-        fn.processa_coluna_in(gestor, "ID_ESCOLA", "ID_GESTOR", "GESTOR", perc=False),
-        how="left",
+    blocos.append(
+        fn.processa_coluna_in(gestor, "ID_ESCOLA", "ID_GESTOR", "GESTOR", perc=False)
     )
 
     # obtém a área do curso do gestor
-    df_cr = carrega_excel("censo_escolar_cursos.xlsx")
-    df_cr["TP_GRAU_ACADEMICO"] = df_cr["TP_GRAU_ACADEMICO"].astype("category")
-    df_cr["TP_AREA_CURSO"] = df_cr["TP_AREA_CURSO"].astype("category")
+    df_cr = fontes["cursos"] if fontes else carrega_cursos()
     gestor = gestor.merge(
         df_cr, left_on=["CO_CURSO_1"], right_on=["CO_CURSO"], how="left"
     ).drop(columns=["CO_CURSO"])
@@ -332,160 +456,215 @@ def processa_gestor(
         ("TP_TIPO_ACESSO_CARGO", "GESTOR_ACESSO", depara),
         ("TP_TIPO_CONTRATACAO", "GESTOR_CONT", depara),
     ]:
-        res = res.merge(
+        blocos.append(
             fn.processa_coluna_tp(
                 df, "ID_ESCOLA", tp_col, "ID_GESTOR", pf, recriar=False
-            ),
-            on="ID_ESCOLA",
-            how="left",
+            )
         )
+    res = fn.junta_blocos(blocos, "ID_ESCOLA")
 
     # adiciona os dados ao datamart
+    if resultados is not None:
+        resultados.adiciona("gestor", res)
+        return dm
     dm = dm.merge(res, how="left")
 
     return dm
 
 
-def processa_matricula(
-    dm: pd.DataFrame, aquis_entrada: Path, aquis_saida: Path, ano: int
+def _inicializa_matricula(indice_turma: Indice, escola_municipio: pd.DataFrame) -> None:
+    """
+    Registra no processo as bases de consulta compartilhadas pelas regiões
+    no processamento de matrículas
+
+    :param indice_turma: índice de ID_TURMA para ID_ESCOLA
+    :param escola_municipio: depara de ID_ESCOLA para CO_MUNICIPIO
+    """
+    global _TURMA_ESCOLA, _ESCOLA_MUNICIPIO
+    _TURMA_ESCOLA = indice_turma
+    _ESCOLA_MUNICIPIO = escola_municipio
+
+
+def _processa_matricula_regiao(
+    regiao: str, aquis_entrada: Path, aquis_saida: Path, ano: int
 ) -> pd.DataFrame:
     """
-    Incorpora os dados de alunos e matrículas ao datamart de escola
+    Gera as métricas de alunos e matrículas por escola de uma região,
+    utilizando as bases de consulta registradas por _inicializa_matricula
 
-    :param dm: datamart em seu estado atual
+    :param regiao: região dos dados de matrícula
     :param aquis_entrada: caminho para entrada de aquisição
     :param aquis_saida: caminho para saída de aquisição
     :param ano: ano de processamento da base
-    :return: datamart de escola com os dados de alunos e matriculas
+    :return: data frame com as métricas por escola da região
     """
-    # carrega o depara de turma e escola
-    # carrega o depara de turma e escola
-    etl = TurmaETL(
+    # carrega apenas as colunas de aluno e matrícula utilizadas nas métricas
+    mat_etl = _MatriculaRegiaoETL(
         entrada=aquis_entrada,
         saida=aquis_saida,
+        regiao=regiao,
         ano=ano,
         criar_caminho=False,
         reprocessar=False,
     )
-    turma_escola = etl.dados_saida[etl.bases_saida[0]].reindex(
-        columns=["ID_TURMA", "ID_ESCOLA"]
+    aluno, matricula = [
+        mat_etl.le_saida(
+            base, [c for c in mat_etl.colunas_saida(base) if c.startswith(prefixos)]
+        )
+        for base, prefixos in zip(mat_etl.bases_saida, COLUNAS_MATRICULA)
+    ]
+
+    # adiciona a informação de escola a base de alunos
+    matricula = junta_indice(matricula, _TURMA_ESCOLA, "ID_TURMA", "ID_ESCOLA")
+    aluno = expande_pares(
+        aluno, matricula[["ID_ALUNO", "ID_ESCOLA"]].drop_duplicates(), "ID_ALUNO"
     )
 
-    dados = list()
-    for regiao in tqdm(["CO", "NORDESTE", "NORTE", "SUDESTE", "SUL"]):
-        # carrega os dados de aluno
-        mat_etl = _MatriculaRegiaoETL(
-            entrada=aquis_entrada,
-            saida=aquis_saida,
-            regiao=regiao,
-            ano=ano,
-            criar_caminho=False,
-            reprocessar=False,
+    # soma todos os alunos e matriculas
+    res = aluno.groupby(["ID_ESCOLA"]).agg({"ID_ALUNO": "count"}).reset_index()
+    res.columns = ["ID_ESCOLA", "QT_ALUNOS"]
+    blocos = [
+        res,
+        matricula.groupby(["ID_ESCOLA"])
+        .agg({"ID_MATRICULA": "nunique"})
+        .reset_index()
+        .rename(columns={"ID_MATRICULA": "QT_MATRICULAS"}),
+    ]
+
+    # processa as colunas IN_
+    blocos.append(
+        fn.processa_coluna_in(aluno, "ID_ESCOLA", "ID_ALUNO", "ALUNO", perc=True)
+    )
+
+    # processa as colunas de transporte
+    blocos.append(
+        fn.processa_coluna_in(
+            df=matricula[
+                ["ID_ALUNO", "ID_ESCOLA"]
+                + [c for c in matricula.columns if c.startswith("IN_TRANSP")]
+            ].drop_duplicates(),
+            id_col="ID_ESCOLA",
+            val_col="ID_ALUNO",
+            prefixo="ALUNO",
+            perc=True,
         )
-        aluno = mat_etl.dados_saida[mat_etl.bases_saida[0]]
-        matricula = mat_etl.dados_saida[mat_etl.bases_saida[1]]
-
-        # adiciona a informação de escola a base de alunos
-        matricula = matricula.merge(turma_escola)
-        aluno = aluno.merge(matricula[["ID_ALUNO", "ID_ESCOLA"]].drop_duplicates())
-
-        # soma todos os alunos e matriculas
-        res = aluno.groupby(["ID_ESCOLA"]).agg({"ID_ALUNO": "count"}).reset_index()
-        res.columns = ["ID_ESCOLA", "QT_ALUNOS"]
-        res = res.merge(
-            matricula.groupby(["ID_ESCOLA"])
-            .agg({"ID_MATRICULA": "nunique"})
-            .reset_index()
-            .rename(columns={"ID_MATRICULA": "QT_MATRICULAS"}),
-            how="left",
+    )
+
+    # processa as colunas de matriculas AEE
+    blocos.append(
+        fn.processa_coluna_in(
+            df=matricula[
+                ["ID_MATRICULA", "ID_ESCOLA"]
+                + [c for c in matricula.columns if c.startswith("IN_AEE_")]
+            ].drop_duplicates(),
+            id_col="ID_ESCOLA",
+            val_col="ID_MATRICULA",
+            prefixo="MATRICULA",
+            perc=True,
         )
+    )
 
-        # processa as colunas IN_
-        res = res.merge(
-            fn.processa_coluna_in(aluno, "ID_ESCOLA", "ID_ALUNO", "ALUNO", perc=True),
-            how="left",
+    # processa as colunas TP
+    for (tp_col, pf, df) in [
+        ("TP_SEXO", "ALUNO_SEXO", aluno),
+        ("TP_COR_RACA", "ALUNO_COR", aluno),
+        ("TP_NACIONALIDADE", "ALUNO_NASC", aluno),
+        ("TP_ZONA_RESIDENCIAL", "ALUNO_ZONA", aluno),
+        ("TP_LOCAL_RESID_DIFERENCIADA", "ALUNO_LDIF", aluno),
+        ("TP_INGRESSO_FEDERAIS", "ALUNO_INGRESSO", aluno),
+        ("TP_RESPONSAVEL_TRANSPORTE", "RESP_TRANSP", matricula),
+    ]:
+        blocos.append(
+            fn.processa_coluna_tp(
+                df, "ID_ESCOLA", tp_col, "ID_ALUNO", pf, recriar=False
+            )
         )
 
-        # processa as colunas de transporte
-        res = res.merge(
-            fn.processa_coluna_in(
-                df=matricula[
-                    ["ID_ALUNO", "ID_ESCOLA"]
-                    + [c for c in matricula.columns if c.startswith("IN_TRANSP")]
-                ].drop_duplicates(),
-                id_col="ID_ESCOLA",
-                val_col="ID_ALUNO",
-                prefixo="ALUNO",
-                perc=True,
-            ),
-            how="left",
+    # verifica docentes que estão em municipios diferentes da escola
+    if aluno["CO_MUNICIPIO_END"].count() > 0:
+        blocos.append(
+            aluno[["ID_ALUNO", "ID_ESCOLA", "CO_MUNICIPIO_END"]]
+            .merge(_ESCOLA_MUNICIPIO, how="left")
+            .assign(
+                QT_ALUNO_MUN_DIF=lambda f: (
+                    (f["CO_MUNICIPIO_END"] != f["CO_MUNICIPIO"])
+                    & (f["CO_MUNICIPIO_END"].notnull())
+                ).astype("int")
+            )
+            .groupby(["ID_ESCOLA"])["QT_ALUNO_MUN_DIF"]
+            .sum()
+            .reset_index()
         )
+    else:
+        blocos.append(res[["ID_ESCOLA"]].assign(QT_ALUNO_MUN_DIF=np.nan))
 
-        # processa as colunas de matriculas AEE
-        res = res.merge(
-            fn.processa_coluna_in(
-                df=matricula[
-                    ["ID_MATRICULA", "ID_ESCOLA"]
-                    + [c for c in matricula.columns if c.startswith("IN_AEE_")]
-                ].drop_duplicates(),
-                id_col="ID_ESCOLA",
-                val_col="ID_MATRICULA",
-                prefixo="MATRICULA",
-                perc=True,
-            ),
-            how="left",
+    # gera a dispersão de idade
+    blocos.append(
+        fn.processa_coluna_qt_nu(
+            df=aluno,
+            id_col="ID_ESCOLA",
+            prefixo="ALUNO",
+            metricas=("min", "q1", "mean", "median", "q3", "max"),
         )
+    )
+    return fn.junta_blocos(blocos, "ID_ESCOLA")
 
-        # processa as colunas TP
-        for (tp_col, pf, df) in [
-            ("TP_SEXO", "ALUNO_SEXO", aluno),
-            ("TP_COR_RACA", "ALUNO_COR", aluno),
-            ("TP_NACIONALIDADE", "ALUNO_NASC", aluno),
-            ("TP_ZONA_RESIDENCIAL", "ALUNO_ZONA", aluno),
-            ("TP_LOCAL_RESID_DIFERENCIADA", "ALUNO_LDIF", aluno),
-            ("TP_INGRESSO_FEDERAIS", "ALUNO_INGRESSO", aluno),
-            ("TP_RESPONSAVEL_TRANSPORTE", "RESP_TRANSP", matricula),
-        ]:
-            res = res.merge(
-                fn.processa_coluna_tp(
-                    df, "ID_ESCOLA", tp_col, "ID_ALUNO", pf, recriar=False
-                ),
-                on="ID_ESCOLA",
-                how="left",
-            )
 
-        # verifica docentes que estão em municipios diferentes da escola
-        if aluno["CO_MUNICIPIO_END"].count() > 0:
-            res = res.merge(
-                aluno[["ID_ALUNO", "ID_ESCOLA", "CO_MUNICIPIO_END"]]
-                .merge(dm[["ID_ESCOLA", "CO_MUNICIPIO"]], how="left")
-                .assign(
-                    QT_ALUNO_MUN_DIF=lambda f: (
-                        (f["CO_MUNICIPIO_END"] != f["CO_MUNICIPIO"])
-                        & (f["CO_MUNICIPIO_END"].notnull())
-                    ).astype("int")
-                )
-                .groupby(["ID_ESCOLA"])["QT_ALUNO_MUN_DIF"]
-                .sum()
-                .reset_index(),
-                how="left",
+@instrumenta()
+def processa_matricula(
+    dm: pd.DataFrame,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    ano: int,
+    resultados: typing.Optional[ResultadosParciais] = None,
+    processos: typing.Optional[int] = None,
+    indice_turma: typing.Optional[Indice] = None,
+) -> pd.DataFrame:
+    """
+    Incorpora os dados de alunos e matrículas ao datamart de escola.
+
+    As regiões são independentes e processadas em paralelo, cada processo
+    recebe uma única vez o índice de turma e o depara de município das escolas
+
+    :param dm: datamart em seu estado atual
+    :param aquis_entrada: caminho para entrada de aquisição
+    :param aquis_saida: caminho para saída de aquisição
+    :param ano: ano de processamento da base
+    :param resultados: armazenamento dos resultados parciais, quando informado
+        o resultado de cada região é adicionado a ele ao invés de incorporado
+        ao datamart
+    :param processos: número máximo de processos (padrão é um por região)
+    :param indice_turma: índice de ID_TURMA para ID_ESCOLA já carregado
+    :return: datamart de escola com os dados de alunos e matriculas
+    """
+    # carrega o índice de turma e escola
+    if indice_turma is None:
+        indice_turma = carrega_indice_turma(aquis_entrada, aquis_saida, ano)
+
+    res_regioes = executa_em_paralelo(
+        func=_processa_matricula_regiao,
+        tarefas={r: (r, aquis_entrada, aquis_saida, ano) for r in REGIOES},
+        processos=processos or min(len(REGIOES), os.cpu_count() or 1),
+        inicializador=_inicializa_matricula,
+        args_inicializador=(indice_turma, dm[["ID_ESCOLA", "CO_MUNICIPIO"]]),
+    )
+    falhas = {r: e for r, e in res_regioes.items() if isinstance(e, BaseException)}
+    if len(falhas) > 0:
+        for r, e in falhas.items():
+            logging.getLogger(__name__).error(
+                f"Falha ao processar as matrículas de {r}",
+                exc_info=(type(e), e, e.__traceback__),
             )
-        else:
-            res["QT_ALUNO_MUN_DIF"] = np.nan
-
-        # gera a dispersão de idade
-        res = res.merge(
-            fn.processa_coluna_qt_nu(
-                df=aluno,
-                id_col="ID_ESCOLA",
-                prefixo="ALUNO",
-                metricas=("min", "q1", "mean", "median", "q3", "max"),
-            ),
-            how="left",
-        )
+        raise ValueError(
+            f"Não foi possível processar as matrículas de {list(falhas)}"
+        ) from next(iter(falhas.values()))
 
-        # adiciona a lista de dados
-        dados.append(res)
+    # adiciona a lista de dados
+    dados = [res_regioes[r] for r in REGIOES]
+    if resultados is not None:
+        for res in dados:
+            resultados.adiciona("matricula", res)
+        return dm
 
     # concatena os dados
     res = pd.concat(dados)
@@ -496,8 +675,14 @@ def processa_matricula(
     return dm
 
 
+@instrumenta()
 def processa_ideb(
-    dm: pd.DataFrame, aquis_entrada: Path, aquis_saida: Path, ano: int
+    dm: pd.DataFrame,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    ano: int,
+    fontes: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+    resultados: typing.Optional[ResultadosParciais] = None,
 ) -> pd.DataFrame:
     """
     Adiciona os dados de IDEB do último censo a base de escola
@@ -506,6 +691,9 @@ def processa_ideb(
     :param aquis_entrada: caminho para entrada de aquisição
     :param aquis_saida: caminho para saída de aquisição
     :param ano: ano de processamento da base
+    :param fontes: bases comuns a todos os anos já carregadas
+    :param resultados: armazenamento dos resultados parciais, quando informado
+        o resultado é adicionado a ele ao invés de incorporado ao datamart
     :return: datamart com os dados de IDEB incorporados
     """
     # carrega os dados de ideb, entretanto se o ano for par
@@ -513,119 +701,119 @@ def processa_ideb(
     # vamos pegar do ano em si. Isso é feito porque o IDEB ocorre
     # a cada 2 anos e apenas em anos ímpares
     ano = ano if ano % 2 == 1 else ano - 1
-    etl = IDEBETL(
-        entrada=aquis_entrada,
-        saida=aquis_saida,
-        criar_caminho=False,
-        reprocessar=False,
-    )
-    ideb = (
-        etl.dados_saida[etl.bases_saida[0]]
-        .loc[lambda f: f["ANO"] == ano]
-        .drop(columns=["ANO"])
-    )
+    ideb = fontes["ideb"] if fontes else carrega_ideb(aquis_entrada, aquis_saida)
+    ideb = ideb.loc[lambda f: f["ANO"] == ano].drop(columns=["ANO"])
 
+    if resultados is not None:
+        resultados.adiciona("ideb", ideb)
+        return dm
     return dm.merge(ideb, how="left")
 
 
+@instrumenta()
 def gera_metricas_adicionais(dm: pd.DataFrame) -> pd.DataFrame:
     """
-    Gera métricas cruzando dados da base de escola com as demais informações do censo
+    Gera métricas cruzando dados da base de escola com as demais informações do censo.
+
+    As métricas de razão (METRICAS_RAZAO) são calculadas em uma única divisão
+    do bloco de numeradores pelo bloco de denominadores, sendo nulas quando o
+    denominador é nulo ou zero
 
     :param dm: datamart em seu estado atual
     :return: datamart com métricas adicionais
     """
-    return dm.assign(
-        NU_COMP_PORTATIL_ALUNO=lambda f: f["QT_COMP_PORTATIL_ALUNO"] / f["QT_ALUNOS"],
-        NU_DESKTOP_TOTAL_POR_ALUNO=lambda f: f["QT_DESKTOP"] / f["QT_ALUNOS"],
-        NU_DESKTOP_ADM_POR_ALUNO=lambda f: f["QT_DESKTOP_ADM"] / f["QT_ALUNOS"],
-        NU_DESKTOP_ALUNO_POR_ALUNO=lambda f: f["QT_DESKTOP_ALUNO"] / f["QT_ALUNOS"],
-        NU_TABLET_POR_ALUNO=lambda f: f["QT_TABLET_ALUNO"] / f["QT_ALUNOS"],
-        NU_EQUIP_COPIADORA_POR_ALUNO=lambda f: f["QT_EQUIP_COPIADORA"] / f["QT_ALUNOS"],
-        NU_EQUIP_DVD_POR_ALUNO=lambda f: f["QT_EQUIP_DVD"] / f["QT_ALUNOS"],
-        NU_EQUIP_FAX_POR_ALUNO=lambda f: f["QT_EQUIP_FAX"] / f["QT_ALUNOS"],
-        NU_EQUIP_FOTO_POR_ALUNO=lambda f: f["QT_EQUIP_FOTO"] / f["QT_ALUNOS"],
-        NU_EQUIP_IMPRESSORA_POR_ALUNO=lambda f: f["QT_EQUIP_IMPRESSORA"]
-        / f["QT_ALUNOS"],
-        NU_EQUIP_IMPRESSORA_MULT_POR_ALUNO=lambda f: f["QT_EQUIP_IMPRESSORA_MULT"]
-        / f["QT_ALUNOS"],
-        NU_EQUIP_LOUSA_DIGITAL_POR_ALUNO=lambda f: f["QT_EQUIP_LOUSA_DIGITAL"]
-        / f["QT_ALUNOS"],
-        NU_EQUIP_MULTIMIDIA_POR_ALUNO=lambda f: f["QT_EQUIP_MULTIMIDIA"]
-        / f["QT_ALUNOS"],
-        NU_EQUIP_PARABOLICA_POR_ALUNO=lambda f: f["QT_EQUIP_PARABOLICA"]
-        / f["QT_ALUNOS"],
-        NU_EQUIP_RETRO_POR_ALUNO=lambda f: f["QT_EQUIP_RETRO"] / f["QT_ALUNOS"],
-        NU_EQUIP_SOM_POR_ALUNO=lambda f: f["QT_EQUIP_SOM"] / f["QT_ALUNOS"],
-        NU_EQUIP_TV_POR_ALUNO=lambda f: f["QT_EQUIP_TV"] / f["QT_ALUNOS"],
-        NU_EQUIP_VIDEOCASSETE_POR_ALUNO=lambda f: f["QT_EQUIP_VIDEOCASSETE"]
-        / f["QT_ALUNOS"],
-        NU_FUNCIONARIOS_POR_ALUNO=lambda f: f["QT_FUNCIONARIOS"] / f["QT_ALUNOS"],
-        NU_SALAS_POR_ALUNO=lambda f: f["QT_SALAS_EXISTENTES"] / f["QT_ALUNOS"],
-        NU_SALAS_UTILIZADAS_POR_ALUNO=lambda f: f["QT_SALAS_UTILIZADAS"]
-        / f["QT_ALUNOS"],
-        NU_SALAS_UTILIZADAS_ACESSIVEIS_POR_ALUNO=lambda f: f[
-            "QT_SALAS_UTILIZADAS_ACESSIVEIS"
-        ]
-        / f["QT_ALUNOS"],
-        NU_SALAS_UTILIZADAS_DENTRO_POR_ALUNO=lambda f: f["QT_SALAS_UTILIZADAS_DENTRO"]
-        / f["QT_ALUNOS"],
-        NU_SALAS_UTILIZADAS_FORA_POR_ALUNO=lambda f: f["QT_SALAS_UTILIZADAS_FORA"]
-        / f["QT_ALUNOS"],
-        NU_SALAS_UTILIZA_CLIMATIZADAS_POR_ALUNO=lambda f: f[
-            "QT_SALAS_UTILIZA_CLIMATIZADAS"
-        ]
-        / f["QT_ALUNOS"],
-        NU_ALUNO_POR_TURMA=lambda f: f["QT_MATRICULAS"] / f["QT_TURMAS"],
-        NU_ALUNO_POR_DOCENTE=lambda f: f["QT_ALUNOS"] / f["QT_DOCENTES"],
-        CO_REGIAO=lambda f: f["CO_MUNICIPIO"] // 1000000,
-        CO_UF=lambda f: f["CO_MUNICIPIO"] // 100000,
+    numeradores, denominadores, colunas, tipos = zip(*METRICAS_RAZAO)
+    num = dm[list(numeradores)].to_numpy(dtype="float64", na_value=np.nan)
+    den = dm[list(denominadores)].to_numpy(dtype="float64", na_value=np.nan)
+    razao = np.divide(num, den, out=np.full(num.shape, np.nan), where=den != 0)
+
+    metricas = pd.DataFrame(razao, columns=list(colunas), index=dm.index).astype(
+        dict(zip(colunas, tipos))
     )
+    metricas["CO_REGIAO"] = dm["CO_MUNICIPIO"] // 1000000
+    metricas["CO_UF"] = dm["CO_MUNICIPIO"] // 100000
+
+    return dm.assign(**metricas)
 
 
+@instrumenta()
 def controi_datamart_escola(
-    ano: int, aquis_entrada: Path, aquis_saida: Path, saida: Path
+    ano: int,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    saida: Path,
+    fontes: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+    orcamento: typing.Optional[int] = None,
+    processos: typing.Optional[int] = None,
 ) -> None:
     """
     Constrói o datamart de escola para o ano selecionado e exporta
-    os dados conforme a configuração do catalogo de dados
+    os dados conforme a configuração do catalogo de dados.
+
+    Os resultados de cada fonte são mantidos separados (e descarregados
+    em disco caso ultrapassem o orçamento de memória) e o datamart é
+    montado ao final por concatenações alinhadas pelo ID_ESCOLA, em
+    blocos de escolas que cabem no orçamento e são exportados um a um
 
     :param aquis_entrada: caminho para entrada de aquisição
     :param aquis_saida: caminho para saída de aquisição
     :param saida: caminho para saída do datamart
     :param ano: ano de processamento da base
+    :param fontes: bases comuns a todos os anos já carregadas
+    :param orcamento: orçamento de memória em bytes para os resultados parciais
+        e para os blocos do datamart
+    :param processos: número máximo de processos no processamento das regiões
     """
     logger = logging.getLogger(__name__)
 
     # carrega e processa as bases de dados
     logger.info("Carregando base de escola")
     dm = processa_censo_escola(aquis_entrada, aquis_saida, ano)
+    indice = carrega_indice_turma(aquis_entrada, aquis_saida, ano, persistir=True)
+
+    with ResultadosParciais(orcamento) as res:
+        logger.info("Processando dados de turmas")
+        processa_turmas(dm, aquis_entrada, aquis_saida, ano, fontes, res)
+
+        logger.info("Processando dados de docentes")
+        processa_docentes(dm, aquis_entrada, aquis_saida, ano, res, indice)
+
+        logger.info("Processando dados de gestor")
+        processa_gestor(dm, aquis_entrada, aquis_saida, ano, fontes, res)
+
+        logger.info("Processando dados de matricula")
+        processa_matricula(dm, aquis_entrada, aquis_saida, ano, res, processos, indice)
+
+        logger.info("Processando dados do IDEB")
+        processa_ideb(dm, aquis_entrada, aquis_saida, ano, fontes, res)
+
+        logger.info("Montando e exportando o datamart")
+        saida = saida / f"escola.parquet/ANO={ano}"
+        saida.mkdir(exist_ok=True, parents=True)
+        ordem = [c for c in carrega_perfil("dm_escola")["ORDENAR"] if c in dm]
+        dm = dm.sort_values(ordem, kind="stable", ignore_index=True)
+        # o schema é o mesmo em todos os blocos, independente dos seus valores
+        schema = schema_pandas(finaliza_bloco(res.estrutura(dm)), index=False)
+        escreve_parquet_blocos(
+            (finaliza_bloco(bloco) for bloco in res.monta_blocos(dm)),
+            saida / f"{ano}.parquet",
+            "dm_escola",
+            index=False,
+            schema=schema,
+        )
 
-    logger.info("Adicionando dados de turmas")
-    dm = processa_turmas(dm, aquis_entrada, aquis_saida, ano)
-
-    logger.info("Adicionando dados de docentes")
-    dm = processa_docentes(dm, aquis_entrada, aquis_saida, ano)
-
-    logger.info("Adicionando dados de gestor")
-    dm = processa_gestor(dm, aquis_entrada, aquis_saida, ano)
-
-    logger.info("Adicionando dados de matricula")
-    dm = processa_matricula(dm, aquis_entrada, aquis_saida, ano)
 
-    logger.info("Adicionando dados do IDEB")
-    dm = processa_ideb(dm, aquis_entrada, aquis_saida, ano)
+def finaliza_bloco(dm: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepara um bloco do datamart de escola para exportação: gera as
+    métricas adicionais, converte as colunas float16 (não suportadas
+    pelo parquet) e remove a coluna de partição ANO
 
-    logger.info("Gerando métricas adicionais")
+    :param dm: bloco do datamart montado
+    :return: bloco pronto para exportação
+    """
     dm = gera_metricas_adicionais(dm)
-
-    logger.info("Remove float16")
     for c in dm:
         if dm[c].dtype == "float16":
             dm[c] = dm[c].astype("float32")
-
-    logger.info("Exportando datamart")
-    saida = saida / f"escola.parquet/ANO={ano}"
-    saida.mkdir(exist_ok=True, parents=True)
-    dm.drop(columns=["ANO"], inplace=True)
-    dm.to_parquet(saida / f"{ano}.parquet")
+    return dm.drop(columns=["ANO"])
@@ -1,14 +1,161 @@
+import logging
 import os
+import typing
 from pathlib import Path
 
+import pandas as pd
+
+from src.datamart.agregacao import controi_datamart_agregado
 from src.datamart.config import DMGran
+from src.datamart.config import DM_AGREGADOS
+from src.datamart.escola import carrega_fontes_comuns
 from src.datamart.escola import controi_datamart_escola
+from src.datamart.registro import controi_datamart_registro
 from src.utils.logs import log_erros
+from src.utils.paralelo import executa_em_paralelo
+from src.utils.paralelo import interpreta_anos
+
+# fator de expansão entre o tamanho em disco dos dados de aquisição de um ano
+# e a memória utilizada durante a construção do datamart deste ano
+FATOR_MEMORIA = 10
+
+# bases comuns a todos os anos compartilhadas com os processos de construção
+_FONTES: typing.Optional[typing.Dict[str, pd.DataFrame]] = None
+
+
+def obtem_ultimo_ano(aquis_entrada: Path) -> int:
+    """
+    Obtém o último ano do censo escolar disponível localmente na pasta de
+    entrada. O catálogo de fontes não é utilizado pois pode conter anos
+    publicados pelo INEP que ainda não foram baixados e processados
+
+    :param aquis_entrada: caminho para entrada de aquisição
+    :return: último ano disponível
+    """
+    return max(
+        int(f.split(".")[0])
+        for f in os.listdir(Path(aquis_entrada) / "censo_escolar")
+        if f.split(".")[0].isnumeric()
+    )
+
+
+def estima_memoria_ano(aquis_saida: Path, ano: int) -> float:
+    """
+    Estima a memória necessária para construir o datamart de um ano
+    a partir do tamanho em disco das partições de aquisição daquele ano
+
+    :param aquis_saida: caminho para saída de aquisição
+    :param ano: ano de processamento da base
+    :return: estimativa de memória em bytes (0 quando não há partições do ano)
+    """
+    total = 0
+    if not Path(aquis_saida).is_dir():
+        return 0.0
+    for base in os.listdir(aquis_saida):
+        particao = Path(aquis_saida) / base / f"ANO={ano}"
+        if particao.is_dir():
+            for raiz, _, arquivos in os.walk(particao):
+                total += sum(os.path.getsize(Path(raiz) / a) for a in arquivos)
+    return float(total * FATOR_MEMORIA)
+
+
+def tem_datamart_escola(saida: Path, ano: int) -> bool:
+    """
+    Verifica se o datamart de escola de um ano já foi construído
+
+    :param saida: caminho para saída do datamart
+    :param ano: ano de processamento da base
+    :return: True se o datamart existir
+    """
+    return (Path(saida) / f"escola.parquet/ANO={ano}/{ano}.parquet").exists()
+
+
+def controi_datamart(
+    gran: DMGran,
+    ano: int,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    saida: Path,
+    fontes: typing.Optional[typing.Dict[str, pd.DataFrame]] = None,
+    orcamento: typing.Optional[int] = None,
+    processos: typing.Optional[int] = None,
+) -> None:
+    """
+    Constrói o datamart de uma granularidade para um ano. Os datamarts
+    geográficos são agregações do datamart de escola, que é construído
+    caso ainda não exista, e os datamarts de registro são junções em fluxo
+    das bases de aquisição
+
+    :param gran: granularidade do datamart a ser gerado
+    :param ano: ano de processamento da base
+    :param aquis_entrada: caminho para entrada de aquisição
+    :param aquis_saida: caminho para saída de aquisição
+    :param saida: caminho para pasta de saída
+    :param fontes: bases comuns a todos os anos já carregadas
+    :param orcamento: orçamento de memória em bytes do datamart de escola
+    :param processos: número máximo de processos das regiões do datamart de escola
+    """
+    if gran == DMGran.ESCOLA:
+        controi_datamart_escola(
+            ano, aquis_entrada, aquis_saida, saida, fontes, orcamento, processos
+        )
+    elif gran in DM_AGREGADOS:
+        if not tem_datamart_escola(saida, ano):
+            logging.getLogger(__name__).info(
+                f"O datamart de escola de {ano} não existe e será construído"
+            )
+            controi_datamart_escola(
+                ano, aquis_entrada, aquis_saida, saida, fontes, orcamento, processos
+            )
+        controi_datamart_agregado(gran, ano, aquis_saida, saida)
+    else:
+        controi_datamart_registro(gran, ano, aquis_saida, saida)
+
+
+def _inicializa_fontes(fontes: typing.Optional[typing.Dict[str, pd.DataFrame]]) -> None:
+    """
+    Registra as bases comuns no processo de construção do datamart
+
+    :param fontes: dicionário com as bases comuns a todos os anos
+    """
+    global _FONTES
+    _FONTES = fontes
+
+
+def _controi_datamart_ano(
+    gran: DMGran,
+    ano: int,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    saida: Path,
+    orcamento: typing.Optional[int] = None,
+) -> None:
+    """
+    Constrói o datamart de um ano utilizando as bases comuns
+    registradas no processo
+
+    :param gran: granularidade do datamart a ser gerado
+    :param ano: ano de processamento da base
+    :param aquis_entrada: caminho para entrada de aquisição
+    :param aquis_saida: caminho para saída de aquisição
+    :param saida: caminho para pasta de saída
+    :param orcamento: orçamento de memória em bytes do datamart de escola
+    """
+    # os anos já são construídos em paralelo, então as regiões de cada
+    # ano são processadas sequencialmente
+    controi_datamart(
+        gran, ano, aquis_entrada, aquis_saida, saida, _FONTES, orcamento, 1
+    )
 
 
 @log_erros
 def executa_datamart(
-    granularidade: str, ano: str, aquis_entrada: Path, aquis_saida: Path, saida: Path
+    granularidade: str,
+    ano: str,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    saida: Path,
+    memoria: typing.Optional[float] = None,
 ) -> None:
     """
     Constrói um datamart a um determinado nível de granularidade para um
@@ -19,18 +166,109 @@ def executa_datamart(
     :param aquis_entrada: caminho para entrada de aquisição
     :param aquis_saida: caminho para saída de aquisição
     :param saida: caminho para pasta de saída
+    :param memoria: orçamento de memória em GB para os resultados parciais
     """
     # obtém a granularidade
     gran = DMGran(granularidade)
 
     # obtém o ano
     if ano == "ultimo":
-        ano = os.listdir("dados/externo/censo_escolar")[-1].split(".")[0]
-    ano_int = int(ano)
-
-    if gran == DMGran.ESCOLA:
-        controi_datamart_escola(ano_int, aquis_entrada, aquis_saida, saida)
+        ano_int = obtem_ultimo_ano(aquis_entrada)
     else:
-        raise NotImplementedError(
-            f"Nós ainda temos que desenvolver o datamart para {granularidade}"
+        ano_int = int(ano)
+
+    controi_datamart(
+        gran,
+        ano_int,
+        aquis_entrada,
+        aquis_saida,
+        saida,
+        orcamento=int(memoria * 1024**3) if memoria is not None else None,
+    )
+
+
+@log_erros
+def executa_datamart_anos(
+    granularidade: str,
+    anos: str,
+    aquis_entrada: Path,
+    aquis_saida: Path,
+    saida: Path,
+    processos: typing.Optional[int] = None,
+    memoria: typing.Optional[float] = None,
+) -> None:
+    """
+    Constrói um datamart a um determinado nível de granularidade para
+    vários anos de dados.
+
+    As bases que não dependem do ano (IDEB, etapas de ensino e cursos) são
+    carregadas uma única vez e compartilhadas com os processos que constroem
+    cada ano em paralelo, respeitando o orçamento de memória informado.
+    Quando há orçamento, cada ano limita seus resultados parciais à sua
+    estimativa de memória. Anos sem partições de aquisição não possuem
+    estimativa e são construídos sozinhos e sem limite próprio
+
+    :param granularidade: nível do datamart a ser gerado
+    :param anos: anos a serem processados (ex: 2007-2021 ou 2019,2020)
+    :param aquis_entrada: caminho para entrada de aquisição
+    :param aquis_saida: caminho para saída de aquisição
+    :param saida: caminho para pasta de saída
+    :param processos: número máximo de processos (padrão é o número de CPUs)
+    :param memoria: orçamento de memória em GB para os anos em execução
+    """
+    logger = logging.getLogger(__name__)
+
+    # obtém a granularidade
+    gran = DMGran(granularidade)
+
+    # obtém a lista de anos
+    lista_anos = interpreta_anos(anos)
+
+    # as bases comuns só são necessárias se algum datamart de escola for construído
+    fontes = None
+    if gran == DMGran.ESCOLA or (
+        gran in DM_AGREGADOS
+        and not all(tem_datamart_escola(saida, a) for a in lista_anos)
+    ):
+        logger.info("Carregando bases comuns a todos os anos")
+        fontes = carrega_fontes_comuns(aquis_entrada, aquis_saida)
+
+    logger.info(f"Construindo datamarts para os anos {lista_anos}")
+    estimativas = {a: estima_memoria_ano(aquis_saida, a) for a in lista_anos}
+    orcamentos: typing.Dict[int, typing.Optional[int]] = {a: None for a in lista_anos}
+    if memoria is not None:
+        # sem partições o ano é processado a partir dos ETLs, com uso de memória
+        # desconhecido: ele não possuí limite próprio e reserva todo o orçamento
+        sem_estimativa = [a for a, e in estimativas.items() if e <= 0]
+        if len(sem_estimativa) > 0:
+            logger.warning(
+                f"Não há partições de aquisição para os anos {sem_estimativa}, "
+                f"que serão construídos sem limite de memória e um de cada vez"
+            )
+        orcamentos.update(
+            {a: int(e) for a, e in estimativas.items() if a not in sem_estimativa}
         )
+        estimativas.update({a: memoria * 1024**3 for a in sem_estimativa})
+    resultados = executa_em_paralelo(
+        func=_controi_datamart_ano,
+        tarefas={
+            a: (
+                gran,
+                a,
+                aquis_entrada,
+                aquis_saida,
+                saida,
+                orcamentos[a],
+            )
+            for a in lista_anos
+        },
+        processos=processos,
+        memoria=memoria * 1024**3 if memoria is not None else None,
+        estimativas=estimativas,
+        inicializador=_inicializa_fontes,
+        args_inicializador=(fontes,),
+    )
+
+    falhas = [a for a, r in resultados.items() if isinstance(r, BaseException)]
+    if len(falhas) > 0:
+        raise ValueError(f"Não foi possível construir o datamart dos anos {falhas}")
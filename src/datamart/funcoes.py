@@ -154,3 +154,44 @@ def processa_coluna_qt_nu(
     }
 
     return df.groupby([id_col]).agg(**agg).reset_index()
+
+
+def junta_blocos(blocos: typing.Sequence[pd.DataFrame], id_col: str) -> pd.DataFrame:
+    """
+    Junta blocos de colunas agregados por {id_col} ao primeiro bloco, de forma
+    equivalente a merges à esquerda sucessivos, porém alinhando todos os blocos
+    a um único índice das chaves do primeiro bloco e concatenando as colunas
+    uma única vez (sem copiar o resultado parcial a cada bloco)
+
+    :param blocos: data frames com a coluna {id_col} e chaves únicas
+    :param id_col: coluna com nível de granularidade dos blocos
+    :return: data frame com as colunas de todos os blocos
+    """
+    base = blocos[0].reset_index(drop=True)
+    indice = pd.Index(base[id_col])
+    if not indice.is_unique:
+        raise ValueError(f"O primeiro bloco possuí valores repetidos de {id_col}")
+
+    colunas = set(base.columns)
+    alinhados = [base]
+    for bloco in blocos[1:]:
+        repetidas = colunas.intersection(bloco.columns) - {id_col}
+        if len(repetidas) > 0:
+            raise ValueError(
+                f"As colunas {sorted(repetidas)} já existem em outro bloco"
+            )
+        colunas.update(bloco.columns)
+
+        # posição de cada linha do bloco no índice das chaves (-1 se não existe)
+        pos = indice.get_indexer(bloco[id_col])
+        if len(np.unique(pos[pos >= 0])) < (pos >= 0).sum():
+            raise ValueError(f"Um dos blocos possuí valores repetidos de {id_col}")
+
+        # linha do bloco correspondente a cada chave (-1 gera valores nulos)
+        linhas = np.full(len(base), -1)
+        linhas[pos[pos >= 0]] = np.flatnonzero(pos >= 0)
+        alinhado = bloco.drop(columns=[id_col]).reset_index(drop=True).reindex(linhas)
+        alinhado.index = base.index
+        alinhados.append(alinhado)
+
+    return pd.concat(alinhados, axis=1)
@@ -0,0 +1,131 @@
+import logging
+import os
+import typing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Índice de uma chave inteira: (chaves uint64 ordenadas, valores na mesma ordem)
+Indice = typing.Tuple[np.ndarray, np.ndarray]
+
+
+def gera_indice(chaves: pd.Series, valores: pd.Series) -> Indice:
+    """
+    Gera o índice de consulta de uma chave inteira para um valor, com as
+    chaves convertidas para uint64 e ordenadas
+
+    :param chaves: chaves do índice (inteiros não negativos e únicos)
+    :param valores: valor de cada chave
+    :return: tupla com as chaves ordenadas e os seus valores
+    """
+    chaves_np = chaves.to_numpy()
+    if len(chaves_np) > 0 and chaves_np.min() < 0:
+        raise ValueError(f"A chave {chaves.name} possuí valores negativos")
+    chaves_np = chaves_np.astype("uint64")
+
+    ordem = np.argsort(chaves_np, kind="stable")
+    chaves_np = chaves_np[ordem]
+    if (np.diff(chaves_np) == 0).any():
+        raise ValueError(f"A chave {chaves.name} possuí valores repetidos")
+    return chaves_np, valores.to_numpy()[ordem]
+
+
+def consulta_indice(
+    indice: Indice, chaves: pd.Series
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Consulta os valores de um conjunto de chaves no índice
+
+    :param indice: índice gerado por gera_indice
+    :param chaves: chaves a serem consultadas
+    :return: tupla com os valores e uma máscara das chaves encontradas
+        (o valor das chaves não encontradas é indefinido)
+    """
+    ordenadas, valores = indice
+    if len(ordenadas) == 0:
+        return valores[:0], np.zeros(len(chaves), dtype=bool)
+
+    # a tabela hash do pandas sobre as chaves uint64 é mais rápida que a busca
+    # binária (np.searchsorted) quando as chaves consultadas não estão ordenadas
+    pos = pd.Index(ordenadas).get_indexer(chaves.to_numpy().astype("uint64"))
+    return valores[pos], pos >= 0
+
+
+def junta_indice(
+    df: pd.DataFrame, indice: Indice, chave: str, coluna: str
+) -> pd.DataFrame:
+    """
+    Adiciona a {df} a {coluna} consultada no índice pela {chave}, mantendo
+    apenas as linhas encontradas (equivalente a um merge interno com a
+    tabela de chave e valor)
+
+    :param df: data frame com a coluna {chave}
+    :param indice: índice gerado por gera_indice
+    :param chave: coluna com as chaves do índice
+    :param coluna: nome da coluna com os valores do índice
+    :return: data frame com a coluna adicionada
+    """
+    valores, encontrados = consulta_indice(indice, df[chave])
+    if encontrados.all():
+        return df.assign(**{coluna: valores})
+    return df.loc[encontrados].assign(**{coluna: valores[encontrados]})
+
+
+def expande_pares(df: pd.DataFrame, pares: pd.DataFrame, chave: str) -> pd.DataFrame:
+    """
+    Replica as linhas de {df} para cada par de {pares} com a mesma {chave},
+    adicionando as demais colunas de {pares} (equivalente a df.merge(pares)
+    quando {chave} é única em {df}). A posição de cada chave em {df} é usada
+    como índice denso, de forma que apenas as linhas são copiadas
+
+    :param df: data frame com a coluna {chave} única
+    :param pares: data frame com a coluna {chave} e as colunas a adicionar
+    :param chave: coluna de junção
+    :return: data frame com uma linha por par encontrado
+    """
+    indice = pd.Index(df[chave])
+    if not indice.is_unique:
+        raise ValueError(f"A coluna {chave} possuí valores repetidos")
+    pos = indice.get_indexer(pares[chave])
+
+    # mantém a ordem das linhas de {df}, como no merge
+    encontrados = np.flatnonzero(pos >= 0)
+    encontrados = encontrados[np.argsort(pos[encontrados], kind="stable")]
+
+    res = df.take(pos[encontrados]).reset_index(drop=True)
+    extras = pares.drop(columns=[chave]).take(encontrados).reset_index(drop=True)
+    return pd.concat([res, extras], axis=1)
+
+
+def carrega_indice(
+    caminho: Path,
+    gera: typing.Callable[[], Indice],
+    origem: typing.Optional[Path] = None,
+) -> Indice:
+    """
+    Carrega um índice persistido em {caminho}, gerando-o caso ainda não
+    exista ou seja mais antigo que os arquivos da pasta {origem}
+
+    :param caminho: arquivo .npz do índice
+    :param gera: função que gera o índice
+    :param origem: pasta com os dados utilizados para gerar o índice
+    :return: índice
+    """
+    if caminho.exists():
+        atualizado = origem is None or all(
+            os.path.getmtime(Path(raiz) / a) <= os.path.getmtime(caminho)
+            for raiz, _, arquivos in os.walk(origem)
+            for a in arquivos
+            if a.endswith(".parquet")
+        )
+        if atualizado:
+            with np.load(caminho) as arq:
+                return arq["chaves"], arq["valores"]
+
+    logging.getLogger(__name__).debug(f"Gerando o índice {caminho}")
+    indice = gera()
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, "wb") as arq:
+        np.savez(arq, chaves=indice[0], valores=indice[1])
+    return indice
@@ -0,0 +1,371 @@
+import logging
+import shutil
+import tempfile
+import typing
+from pathlib import Path
+
+import pandas as pd
+
+# número de cópias de um bloco do datamart mantidas em memória durante a
+# sua montagem, geração de métricas e conversão para o arrow na escrita
+FATOR_MONTAGEM = 3
+
+
+class ResultadosParciais:
+    """
+    Armazena os resultados intermediários das fontes do datamart de escola
+    (turma, docente, gestor, matrícula e IDEB) respeitando um orçamento de
+    memória: sempre que os resultados em memória ultrapassam o orçamento
+    eles são escritos em arquivos parquet temporários.
+
+    Ao final o datamart é montado com uma única concatenação por colunas,
+    alinhando os resultados de cada fonte pelo ID_ESCOLA da base de escola,
+    ao invés de vários merges que copiam o datamart inteiro a cada fonte.
+    Com um orçamento a montagem é feita em blocos de linhas cujo tamanho
+    estimado cabe no orçamento. Os arquivos temporários são lidos uma única
+    vez e reorganizados por bloco, e todos os blocos possuem os mesmos tipos
+    de colunas do datamart montado em um único bloco.
+
+    Deve ser utilizado como gerenciador de contexto para que os arquivos
+    temporários sejam removidos ao final
+    """
+
+    orcamento: typing.Optional[int]
+    _pasta: typing.Optional[Path]
+    _memoria: typing.Dict[str, typing.List[pd.DataFrame]]
+    _disco: typing.Dict[str, typing.List[typing.Tuple[Path, pd.Series]]]
+    _blocos: typing.Dict[
+        str, typing.Dict[int, typing.List[typing.Tuple[Path, pd.Series]]]
+    ]
+    _tamanhos: typing.Dict[str, typing.Tuple[int, int]]
+    _vazios: typing.Dict[str, pd.DataFrame]
+    _tipos: typing.Dict[str, pd.Series]
+
+    def __init__(
+        self,
+        orcamento: typing.Optional[int] = None,
+        pasta: typing.Optional[Path] = None,
+    ) -> None:
+        """
+        Instância o armazenamento de resultados
+
+        :param orcamento: orçamento de memória em bytes (None não limita)
+        :param pasta: pasta onde os arquivos temporários são criados
+        """
+        self.orcamento = orcamento
+        self._pasta_base = pasta
+        self._pasta = None
+        self._memoria = dict()
+        self._disco = dict()
+        self._blocos = dict()
+        self._tamanhos = dict()
+        self._vazios = dict()
+        self._tipos = dict()
+        self._contador = 0
+
+    def __enter__(self) -> "ResultadosParciais":
+        self._pasta = Path(tempfile.mkdtemp(prefix="dm_escola_", dir=self._pasta_base))
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        if self._pasta is not None:
+            shutil.rmtree(self._pasta, ignore_errors=True)
+            self._pasta = None
+        self._memoria.clear()
+        self._disco.clear()
+        self._blocos.clear()
+        self._tamanhos.clear()
+        self._vazios.clear()
+        self._tipos.clear()
+
+    @property
+    def fontes(self) -> typing.List[str]:
+        """
+        Lista as fontes com resultados na ordem em que foram adicionadas
+
+        :return: nomes das fontes
+        """
+        return list(self._tamanhos)
+
+    @property
+    def tamanho(self) -> int:
+        """
+        Obtém o tamanho em bytes dos resultados mantidos em memória
+
+        :return: número de bytes
+        """
+        return int(
+            sum(
+                df.memory_usage(index=True, deep=True).sum()
+                for partes in self._memoria.values()
+                for df in partes
+            )
+        )
+
+    @property
+    def arquivos(self) -> typing.List[Path]:
+        """
+        Lista os arquivos temporários com resultados descarregados
+
+        :return: caminhos dos arquivos
+        """
+        return [arq for partes in self._disco.values() for arq, _ in partes]
+
+    def adiciona(self, fonte: str, df: pd.DataFrame) -> None:
+        """
+        Adiciona o resultado (ou parte dele, como uma região) de uma fonte.
+        O resultado deve possuir a coluna ID_ESCOLA
+
+        :param fonte: nome da fonte (ex: turma, matricula)
+        :param df: resultado da fonte
+        """
+        if "ID_ESCOLA" not in df.columns:
+            raise ValueError(f"O resultado de {fonte} não possuí a coluna ID_ESCOLA")
+        self._memoria.setdefault(fonte, list()).append(df)
+        tamanho, linhas = self._tamanhos.get(fonte, (0, 0))
+        self._tamanhos[fonte] = (
+            tamanho + int(df.memory_usage(index=True, deep=True).sum()),
+            linhas + len(df),
+        )
+        if self.orcamento is not None and self.tamanho > self.orcamento:
+            self.descarrega()
+
+    def descarrega(self) -> None:
+        """
+        Escreve os resultados em memória em arquivos parquet temporários,
+        guardando os tipos das colunas para restaura-los na leitura (o
+        parquet não suporta float16, que é escrito como float32)
+        """
+        if self._pasta is None:
+            raise ValueError("ResultadosParciais deve ser utilizado com o comando with")
+
+        logger = logging.getLogger(__name__)
+        for fonte, partes in self._memoria.items():
+            for df in partes:
+                arq = self._pasta / f"{fonte}_{self._contador}.parquet"
+                self._contador += 1
+                logger.debug(f"Descarregando {df.shape} de {fonte} em {arq}")
+                df.astype(
+                    {c: "float32" for c, t in df.dtypes.items() if t == "float16"}
+                ).to_parquet(arq, index=False)
+                self._disco.setdefault(fonte, list()).append((arq, df.dtypes))
+        self._memoria.clear()
+
+    def carrega(
+        self, fonte: str, escolas: typing.Optional[pd.Series] = None
+    ) -> pd.DataFrame:
+        """
+        Carrega o resultado de uma fonte, juntando as partes em memória e
+        em disco. Quando {escolas} é informado apenas as linhas dessas
+        escolas são carregadas (e lidas dos arquivos temporários)
+
+        :param fonte: nome da fonte
+        :param escolas: códigos ID_ESCOLA a serem carregados (None carrega todos)
+        :return: data frame com o resultado da fonte
+        """
+        return self._junta(fonte, self._disco.get(fonte, []), escolas)
+
+    def _junta(
+        self,
+        fonte: str,
+        arquivos: typing.List[typing.Tuple[Path, pd.Series]],
+        escolas: typing.Optional[pd.Series] = None,
+    ) -> pd.DataFrame:
+        """
+        Junta as partes em memória de uma fonte às partes lidas de {arquivos}
+
+        :param fonte: nome da fonte
+        :param arquivos: arquivos temporários da fonte e os tipos das suas colunas
+        :param escolas: códigos ID_ESCOLA a serem carregados (None carrega todos)
+        :return: data frame com o resultado da fonte
+        """
+        filtros = None if escolas is None else [("ID_ESCOLA", "in", escolas.tolist())]
+        partes = [
+            pd.read_parquet(arq, filters=filtros).astype(tipos)
+            for arq, tipos in arquivos
+        ]
+        partes += [
+            df if escolas is None else df.loc[df["ID_ESCOLA"].isin(escolas)]
+            for df in self._memoria.get(fonte, [])
+        ]
+        if len(partes) == 0:
+            raise ValueError(f"Não existem resultados para a fonte {fonte}")
+        return pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+    def estima_linha(self, base: pd.DataFrame) -> float:
+        """
+        Estima o tamanho em bytes de uma linha do datamart montado a partir
+        do tamanho da base e dos resultados adicionados de cada fonte
+
+        :param base: base de escolas com a coluna ID_ESCOLA
+        :return: número estimado de bytes por linha
+        """
+        linha = base.memory_usage(index=True, deep=True).sum() / max(len(base), 1)
+        for tamanho, linhas in self._tamanhos.values():
+            linha += tamanho / max(linhas, 1)
+        return float(linha)
+
+    def linhas_bloco(self, base: pd.DataFrame) -> int:
+        """
+        Calcula o número de linhas dos blocos do datamart de forma que as
+        FATOR_MONTAGEM cópias de um bloco caibam no orçamento
+
+        :param base: base de escolas com a coluna ID_ESCOLA
+        :return: número de linhas por bloco (todas as linhas sem orçamento)
+        """
+        if self.orcamento is None:
+            return max(len(base), 1)
+        linha = self.estima_linha(base) * FATOR_MONTAGEM
+        return max(min(int(self.orcamento // linha), len(base)), 1)
+
+    def _prepara(self, base: pd.DataFrame, linhas: int) -> None:
+        """
+        Prepara a montagem em blocos: lê cada arquivo temporário uma única
+        vez, reescrevendo as suas linhas em um arquivo por bloco (quando há
+        mais de um bloco), e define os tipos das colunas de cada fonte no
+        datamart montado, que são os mesmos em todos os blocos (as colunas
+        inteiras de uma fonte que não possuí todas as escolas são float64,
+        assim como em um merge à esquerda)
+
+        :param base: base de escolas com a coluna ID_ESCOLA e índice sequencial
+        :param linhas: número de linhas por bloco
+        """
+        numeros = pd.Series(
+            base.index.to_numpy() // linhas, index=base["ID_ESCOLA"].to_numpy()
+        )
+        particionar = len(base) > linhas
+        self._blocos.clear()
+        self._vazios.clear()
+        self._tipos.clear()
+        for fonte in self.fontes:
+            ids = [df["ID_ESCOLA"] for df in self._memoria.get(fonte, [])]
+            vazios = [df.iloc[:0] for df in self._memoria.get(fonte, [])]
+            arquivos = list()
+            blocos: typing.Dict[int, typing.List[typing.Tuple[Path, pd.Series]]]
+            blocos = dict()
+            for arq, tipos in self._disco.get(fonte, []):
+                vazios.append(pd.DataFrame(columns=tipos.index).astype(tipos))
+                if not particionar:
+                    ids.append(pd.read_parquet(arq, columns=["ID_ESCOLA"])["ID_ESCOLA"])
+                    arquivos.append((arq, tipos))
+                    continue
+
+                df = pd.read_parquet(arq)
+                ids.append(df["ID_ESCOLA"])
+                for numero, parte in df.groupby(df["ID_ESCOLA"].map(numeros)):
+                    novo = arq.with_name(f"{fonte}_{self._contador}.parquet")
+                    self._contador += 1
+                    parte.to_parquet(novo, index=False)
+                    arquivos.append((novo, tipos))
+                    blocos.setdefault(int(numero), list()).append((novo, tipos))
+                arq.unlink()
+            if fonte in self._disco:
+                self._disco[fonte] = arquivos
+            if particionar:
+                self._blocos[fonte] = blocos
+
+            # os tipos da fonte após o alinhamento com todas as escolas da base
+            vazio = (
+                pd.concat(vazios, ignore_index=True) if len(vazios) > 1 else vazios[0]
+            )
+            self._vazios[fonte] = vazio
+            if not base["ID_ESCOLA"].isin(pd.concat(ids)).all():
+                vazio = vazio.reindex([0])
+            self._tipos[fonte] = vazio.dtypes.drop("ID_ESCOLA")
+
+    def _alinha(
+        self, bloco: pd.DataFrame, numero: typing.Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Alinha os resultados de cada fonte às linhas de um bloco da base
+
+        :param bloco: linhas da base de escolas com índice sequencial
+        :param numero: número do bloco na montagem preparada por _prepara
+        :return: bloco do datamart
+        """
+        blocos = [bloco]
+        colunas = set(bloco.columns)
+        for fonte in self.fontes:
+            if fonte in self._blocos and numero is not None:
+                arquivos = self._blocos[fonte].get(numero, [])
+                if len(arquivos) == 0 and len(self._memoria.get(fonte, [])) == 0:
+                    # nenhuma escola do bloco possuí resultados da fonte
+                    df = self._vazios[fonte]
+                else:
+                    df = self._junta(fonte, arquivos, bloco["ID_ESCOLA"])
+            else:
+                df = self.carrega(fonte, bloco["ID_ESCOLA"])
+            if not df["ID_ESCOLA"].is_unique:
+                raise ValueError(f"O resultado de {fonte} possuí escolas duplicadas")
+            repetidas = colunas.intersection(df.columns) - {"ID_ESCOLA"}
+            if len(repetidas) > 0:
+                raise ValueError(
+                    f"As colunas {sorted(repetidas)} de {fonte} já existem no datamart"
+                )
+            colunas.update(df.columns)
+            df = (
+                df.set_index("ID_ESCOLA")
+                .reindex(bloco["ID_ESCOLA"])
+                .reset_index(drop=True)
+            )
+            if fonte in self._tipos:
+                df = df.astype(self._tipos[fonte])
+            blocos.append(df)
+        return pd.concat(blocos, axis=1)
+
+    def monta_blocos(
+        self, base: pd.DataFrame, linhas: typing.Optional[int] = None
+    ) -> typing.Iterator[pd.DataFrame]:
+        """
+        Monta o datamart em blocos de linhas consecutivas da base, alinhando
+        os resultados de cada fonte pelo ID_ESCOLA (equivalente a merges à
+        esquerda sucessivos). Apenas um bloco é mantido em memória por vez
+
+        :param base: base de escolas com a coluna ID_ESCOLA
+        :param linhas: número de linhas por bloco (None calcula pelo orçamento)
+        :return: iterador dos blocos do datamart
+        """
+        base = base.reset_index(drop=True)
+        linhas = linhas or self.linhas_bloco(base)
+        logging.getLogger(__name__).debug(
+            f"Montando {len(base)} escolas em blocos de {linhas} linhas"
+        )
+        self._prepara(base, linhas)
+        for numero, inicio in enumerate(range(0, max(len(base), 1), linhas)):
+            yield self._alinha(
+                base.iloc[inicio : inicio + linhas].reset_index(drop=True), numero
+            )
+
+    def estrutura(self, base: pd.DataFrame) -> pd.DataFrame:
+        """
+        Gera o datamart montado sem linhas, com as colunas e os tipos de
+        todos os blocos de monta_blocos
+
+        :param base: base de escolas com a coluna ID_ESCOLA
+        :return: data frame vazio com a estrutura do datamart
+        """
+        base = base.reset_index(drop=True)
+        self._prepara(base, max(len(base), 1))
+        blocos = [base.iloc[:0]] + [
+            self._vazios[f].drop(columns="ID_ESCOLA").astype(self._tipos[f])
+            for f in self.fontes
+        ]
+        return pd.concat(blocos, axis=1)
+
+    def monta(self, base: pd.DataFrame) -> pd.DataFrame:
+        """
+        Monta o datamart completo em um único bloco (equivalente a merges
+        à esquerda sucessivos). Caso o tamanho estimado do datamart não caiba
+        no orçamento é levantado um MemoryError e os blocos de monta_blocos
+        devem ser utilizados
+
+        :param base: base de escolas com a coluna ID_ESCOLA
+        :return: datamart com as colunas da base seguidas das colunas das fontes
+        """
+        estimativa = self.estima_linha(base) * len(base)
+        if self.orcamento is not None and estimativa > self.orcamento:
+            raise MemoryError(
+                f"O datamart estimado em {estimativa / 1024 ** 3:.2f} GB não cabe "
+                f"no orçamento de {self.orcamento / 1024 ** 3:.2f} GB"
+            )
+        return next(self.monta_blocos(base, max(len(base), 1)))
@@ -0,0 +1,235 @@
+import logging
+import os
+import typing
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.datamart.config import ATRIBUTOS_ESCOLA
+from src.datamart.config import ATRIBUTOS_TURMA
+from src.datamart.config import DMGran
+from src.datamart.config import DM_REGISTROS
+from src.datamart.config import TAMANHO_LOTE
+from src.utils.instrumentacao import instrumenta
+from src.utils.parquet import carrega_perfil
+from src.utils.parquet import opcoes_escrita
+from src.utils.parquet import ordena_tabela
+
+# par (coluna chave, tabela de consulta indexada pela chave)
+Consulta = typing.Tuple[str, pd.DataFrame]
+
+
+def carrega_consulta(
+    caminho: Path, chave: str, colunas: typing.Sequence[str], unica: bool = True
+) -> pd.DataFrame:
+    """
+    Carrega uma tabela de consulta indexada por {chave} lendo apenas
+    as {colunas} disponíveis na base
+
+    :param caminho: caminho para a partição da base de aquisição
+    :param chave: coluna utilizada como índice da tabela
+    :param colunas: colunas de atributos a serem carregadas
+    :param unica: se True mantém apenas uma linha por chave
+    :return: tabela de consulta indexada pela chave
+    """
+    disponiveis = ds.dataset(caminho, format="parquet").schema.names
+    carregar = [chave] + [c for c in colunas if c in disponiveis and c != chave]
+    df = pd.read_parquet(caminho, columns=carregar)
+    df = df.loc[lambda f: f[chave].notnull()]
+    df = df.drop_duplicates(chave) if unica else df.drop_duplicates()
+    return df.set_index(chave)
+
+
+def carrega_atributos_escola(aquis_saida: Path, ano: int) -> pd.DataFrame:
+    """
+    Carrega a tabela de consulta com os atributos de escola do ano,
+    adicionando os códigos de UF e região
+
+    :param aquis_saida: caminho para saída de aquisição
+    :param ano: ano de processamento da base
+    :return: tabela de consulta indexada por ID_ESCOLA
+    """
+    escola = carrega_consulta(
+        Path(aquis_saida) / f"escola.parquet/ANO={ano}", "ID_ESCOLA", ATRIBUTOS_ESCOLA
+    )
+    if "CO_MUNICIPIO" in escola:
+        escola["CO_UF"] = escola["CO_MUNICIPIO"] // 100000
+        escola["CO_REGIAO"] = escola["CO_MUNICIPIO"] // 1000000
+    return escola
+
+
+def carrega_vinculo_escola(
+    caminho: Path, chave: str, turma_escola: pd.Series
+) -> pd.DataFrame:
+    """
+    Carrega a tabela de consulta com os pares únicos de {chave} e escola
+    a partir de uma base que relaciona a chave com as turmas
+
+    :param caminho: caminho para a partição da base com chave e ID_TURMA
+    :param chave: coluna com a chave do registro (ID_ALUNO ou ID_DOCENTE)
+    :param turma_escola: série com o ID_ESCOLA indexada por ID_TURMA
+    :return: tabela de consulta com ID_ESCOLA indexada pela chave
+    """
+    df = pd.read_parquet(caminho, columns=[chave, "ID_TURMA"])
+    df["ID_ESCOLA"] = df["ID_TURMA"].map(turma_escola)
+    return (
+        df.loc[lambda f: f[chave].notnull() & f["ID_ESCOLA"].notnull()]
+        .drop_duplicates([chave, "ID_ESCOLA"])
+        .astype({"ID_ESCOLA": "int64"})
+        .set_index(chave)[["ID_ESCOLA"]]
+    )
+
+
+@instrumenta()
+def junta_em_fluxo(
+    origem: Path,
+    destino: Path,
+    consultas: typing.List[Consulta],
+    tamanho_lote: int = TAMANHO_LOTE,
+    nome_tabela: typing.Optional[str] = None,
+) -> int:
+    """
+    Lê a base de {origem} em lotes, junta cada lote às tabelas de {consultas}
+    (em ordem, por meio do índice de cada tabela) e escreve o resultado em
+    {destino} lote a lote, de forma que a base completa nunca é mantida
+    em memória.
+
+    As junções são à esquerda: se a chave não for única na tabela de consulta
+    o registro é repetido para cada correspondência. As colunas da consulta
+    que já existem na base são descartadas. Cada lote é ordenado e escrito
+    de acordo com o perfil de escrita da {nome_tabela}
+
+    :param origem: caminho para a partição da base principal
+    :param destino: caminho do arquivo parquet de saída
+    :param consultas: lista de pares (coluna chave, tabela de consulta)
+    :param tamanho_lote: número de linhas lidas por lote
+    :param nome_tabela: nome da base para seleção do perfil de escrita
+    :return: número de linhas escritas
+    """
+    dataset = ds.dataset(origem, format="parquet")
+    colunas = [
+        c
+        for c in dataset.schema.names
+        if c not in ("ANO", "REGIAO") and not c.startswith("__")
+    ]
+
+    # monta o schema de saída a partir da base e das tabelas de consulta
+    campos = [dataset.schema.field(c) for c in colunas]
+    nomes = set(colunas)
+    ajustadas = list()
+    for chave, tabela in consultas:
+        tabela = tabela.drop(columns=[c for c in tabela if c in nomes])
+        campos += list(pa.Schema.from_pandas(tabela, preserve_index=False))
+        nomes.update(tabela.columns)
+        ajustadas.append((chave, tabela))
+    schema = pa.schema(campos)
+    perfil = carrega_perfil(nome_tabela)
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    linhas = 0
+    with pq.ParquetWriter(
+        destino, schema, **opcoes_escrita(schema, perfil)
+    ) as escritor:
+        for lote in dataset.to_batches(columns=colunas, batch_size=tamanho_lote):
+            df = lote.to_pandas()
+            for chave, tabela in ajustadas:
+                df = df.join(tabela, on=chave)
+            escritor.write_table(
+                ordena_tabela(
+                    pa.Table.from_pandas(df, schema=schema, preserve_index=False),
+                    perfil,
+                ),
+                row_group_size=perfil["LINHAS_GRUPO"],
+            )
+            linhas += len(df)
+    return linhas
+
+
+@instrumenta()
+def controi_datamart_registro(
+    gran: DMGran, ano: int, aquis_saida: Path, saida: Path
+) -> None:
+    """
+    Constrói um datamart no nível de registro (turma, docente, gestor, aluno
+    ou matrícula) juntando a base principal aos atributos de turma e escola.
+
+    As bases de aluno e matrícula são processadas partição a partição (REGIAO),
+    de forma que a memória utilizada é limitada pela maior região
+
+    :param gran: granularidade do datamart a ser gerado
+    :param ano: ano de processamento da base
+    :param aquis_saida: caminho para saída de aquisição
+    :param saida: caminho para saída do datamart
+    """
+    logger = logging.getLogger(__name__)
+    base, regional = DM_REGISTROS[gran]
+    entrada = Path(aquis_saida) / f"{base}.parquet/ANO={ano}"
+    if not entrada.is_dir():
+        raise ValueError(f"A base {base} de {ano} não foi encontrada em {aquis_saida}")
+    destino = Path(saida) / f"{gran.value.lower()}.parquet/ANO={ano}"
+
+    logger.info("Carregando tabelas de consulta de escola e turma")
+    escola = carrega_atributos_escola(aquis_saida, ano)
+    turma: typing.Optional[pd.DataFrame] = None
+    if gran in (DMGran.DOCENTE, DMGran.ALUNO, DMGran.MATRICULA):
+        turma = carrega_consulta(
+            Path(aquis_saida) / f"turma.parquet/ANO={ano}", "ID_TURMA", ATRIBUTOS_TURMA
+        )
+
+    if regional:
+        assert turma is not None
+        regioes = sorted(
+            p.split("=")[1] for p in os.listdir(entrada) if p.startswith("REGIAO=")
+        )
+        for reg in regioes:
+            logger.info(f"Processando a região {reg}")
+            if gran == DMGran.ALUNO:
+                vinculo = carrega_vinculo_escola(
+                    Path(aquis_saida) / f"matricula.parquet/ANO={ano}/REGIAO={reg}",
+                    "ID_ALUNO",
+                    turma["ID_ESCOLA"],
+                )
+                consultas = [("ID_ALUNO", vinculo), ("ID_ESCOLA", escola)]
+            else:
+                consultas = [("ID_TURMA", turma), ("ID_ESCOLA", escola)]
+            linhas = junta_em_fluxo(
+                entrada / f"REGIAO={reg}",
+                destino / f"REGIAO={reg}/{ano}.parquet",
+                consultas,
+                nome_tabela=f"dm_{gran.value.lower()}",
+            )
+            logger.info(f"{linhas} linhas exportadas para a região {reg}")
+    else:
+        if gran == DMGran.DOCENTE:
+            assert turma is not None
+            vinculo = carrega_vinculo_escola(
+                Path(aquis_saida) / f"depara_docente_turma.parquet/ANO={ano}",
+                "ID_DOCENTE",
+                turma["ID_ESCOLA"],
+            )
+            consultas = [("ID_DOCENTE", vinculo), ("ID_ESCOLA", escola)]
+        elif gran == DMGran.GESTOR:
+            vinculo = carrega_consulta(
+                Path(aquis_saida) / f"depara_gestor_escola.parquet/ANO={ano}",
+                "ID_GESTOR",
+                [
+                    "ID_ESCOLA",
+                    "TP_CARGO_GESTOR",
+                    "TP_TIPO_ACESSO_CARGO",
+                    "TP_TIPO_CONTRATACAO",
+                ],
+                unica=False,
+            )
+            consultas = [("ID_GESTOR", vinculo), ("ID_ESCOLA", escola)]
+        else:
+            consultas = [("ID_ESCOLA", escola)]
+        linhas = junta_em_fluxo(
+            entrada,
+            destino / f"{ano}.parquet",
+            consultas,
+            nome_tabela=f"dm_{gran.value.lower()}",
+        )
+        logger.info(f"{linhas} linhas exportadas")
@@ -0,0 +1,115 @@
+import http.server
+import json
+import threading
+import time
+import typing
+from pathlib import Path
+
+import pytest
+import requests
+
+import src.aquisicao.inep.catalogo as catalogo
+from src.aquisicao.inep.escola import EscolaETL
+from src.datamart.executa import obtem_ultimo_ano
+
+
+@pytest.fixture()
+def entrada(dados_path: Path, test_path: Path) -> Path:
+    with open(dados_path / "externo/catalogo_inep_gravado.json") as f:
+        gravado = json.load(f)
+    gravado["censo_escolar"]["atualizado_em"] = time.time()
+
+    entrada = test_path / "catalogo"
+    catalogo.grava_catalogo(entrada, gravado)
+    return entrada
+
+
+def sem_rede(*args: typing.Any, **kwargs: typing.Any) -> None:
+    raise requests.ConnectionError("sem acesso à rede")
+
+
+def test_catalogo_gravado(
+    entrada: Path, test_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(catalogo, "obtem_paginas", sem_rede)
+
+    # o ano e os arquivos de entrada são resolvidos pelo catálogo
+    etl = EscolaETL(entrada, test_path / "catalogo_saida", "ultimo")
+    assert etl.ano == 2020
+    assert etl.bases_entrada == ["2020.zip"]
+    assert etl.inep["2007.zip"].endswith("microdados_censo_escolar_2007.zip")
+    assert catalogo.anos_disponiveis(entrada, "censo_escolar") == list(
+        range(2007, 2021)
+    )
+
+    # um catálogo vencido é utilizado quando não é possível atualizá-lo
+    fonte = catalogo.obtem_fonte(entrada, "censo_escolar", etl._url, validade=0)
+    assert fonte == etl.inep
+
+    # mas não há catálogo para uma base nova
+    with pytest.raises(requests.ConnectionError):
+        catalogo.obtem_fonte(entrada, "outra", etl._url)
+
+
+def test_ultimo_ano_local(entrada: Path) -> None:
+    # o datamart utiliza o último ano baixado, não o último ano publicado
+    (entrada / "censo_escolar").mkdir(parents=True, exist_ok=True)
+    for ano in [2018, 2019]:
+        (entrada / f"censo_escolar/{ano}.zip").touch()
+    assert catalogo.anos_disponiveis(entrada, "censo_escolar")[-1] == 2020
+    assert obtem_ultimo_ano(entrada) == 2019
+
+
+def test_grava_catalogo_por_base(entrada: Path) -> None:
+    # a gravação de uma base não altera o catálogo das demais
+    anterior = catalogo.le_catalogo(entrada)
+    outra = dict(url="outra", atualizado_em=time.time(), arquivos=dict())
+    catalogo.grava_catalogo(entrada, dict(outra=outra))
+    assert catalogo.le_catalogo(entrada) == {**anterior, "outra": outra}
+    assert catalogo.le_fonte(entrada, "censo_escolar") == anterior["censo_escolar"]
+    assert catalogo.caminho_catalogo(entrada, "outra").exists()
+
+
+class _ManipuladorINEP(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        url = f"http://{self.headers['Host']}"
+        corpo = "".join(
+            f'<a class="external-link" href="{url}/microdados_{a}.zip">Censo {a}</a>'
+            for a in [2019, 2020]
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "1024")
+        self.send_header("Last-Modified", "Mon, 27 Jun 2022 00:00:00 GMT")
+        self.end_headers()
+
+    def log_message(self, *args: typing.Any) -> None:
+        pass
+
+
+def test_atualiza_catalogo(test_path: Path) -> None:
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ManipuladorINEP)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}"
+    try:
+        entrada = test_path / "catalogo_atualizado"
+        fonte = catalogo.obtem_fonte(entrada, "censo_escolar", f"{url}/censo")
+    finally:
+        srv.shutdown()
+        srv.server_close()
+        thread.join()
+
+    assert fonte == {f"{a}.zip": f"{url}/microdados_{a}.zip" for a in [2019, 2020]}
+    gravado = catalogo.le_catalogo(entrada)["censo_escolar"]
+    assert gravado["url"] == f"{url}/censo"
+    assert gravado["arquivos"]["2020.zip"]["tamanho"] == 1024
+    assert gravado["arquivos"]["2020.zip"]["modificado"].startswith("Mon, 27 Jun")
+
+    # o catálogo recente é utilizado sem acessar o servidor
+    assert catalogo.obtem_fonte(entrada, "censo_escolar", f"{url}/censo") == fonte
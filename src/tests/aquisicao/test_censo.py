@@ -0,0 +1,108 @@
+import json
+import shutil
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import rarfile
+
+from src.aquisicao.inep._censo import abre_arquivo
+from src.aquisicao.inep._censo import extrai_csv
+from src.aquisicao.inep._censo import le_cabecalho
+
+
+def test_abre_arquivo(test_path: Path) -> None:
+    csv = "ID_ESCOLA|NO_ESCOLA|QT_SALAS\n1|Escola Á|3\n2|Escola B|5\n"
+    interno = BytesIO()
+    with zipfile.ZipFile(interno, "w") as z:
+        z.writestr("ESCOLAS.CSV", csv.encode("latin-1"))
+    caminho = test_path / "censo_aninhado.zip"
+    with zipfile.ZipFile(caminho, "w") as z:
+        z.writestr("DADOS/ESCOLAS.zip", interno.getvalue())
+        z.writestr("DADOS/escolas.CSV", csv.encode("utf-8-sig"))
+
+    esperado = pd.DataFrame(
+        {"ID_ESCOLA": [1, 2], "NO_ESCOLA": ["Escola Á", "Escola B"], "QT_SALAS": [3, 5]}
+    )
+    pasta = test_path / "extraidos_aninhados"
+    with zipfile.ZipFile(caminho) as z:
+        with abre_arquivo(z, "DADOS/ESCOLAS.zip", pasta) as f:
+            cabecalho = le_cabecalho(f)
+            df = pd.read_csv(
+                f, header=None, names=cabecalho, sep="|", encoding="latin-1"
+            )
+        assert cabecalho == ["ID_ESCOLA", "NO_ESCOLA", "QT_SALAS"]
+        pd.testing.assert_frame_equal(df, esperado)
+
+        # o BOM é removido do cabeçalho
+        with abre_arquivo(z, "DADOS/escolas.CSV", pasta) as f:
+            assert le_cabecalho(f, encoding="utf-8") == cabecalho
+
+    # apenas o arquivo aninhado é extraído na pasta de cache
+    assert (pasta / "censo_aninhado/ESCOLAS/ESCOLAS.CSV").exists()
+    assert not (pasta / "censo_aninhado/escolas").exists()
+
+
+def test_extrai_csv(test_path: Path) -> None:
+    pasta = test_path / "extraidos"
+    caminho = test_path / "censo_cache.zip"
+    for conteudo in [b"ID_ESCOLA\n1\n", b"ID_ESCOLA\n1\n2\n"]:
+        interno = BytesIO()
+        with zipfile.ZipFile(interno, "w") as z:
+            z.writestr("LEIAME/", b"")
+            z.writestr("LEIAME/LEIAME.txt", b"leia-me")
+            z.writestr("TURMAS.CSV", conteudo)
+        with zipfile.ZipFile(caminho, "w") as z:
+            z.writestr("DADOS/TURMAS.zip", interno.getvalue())
+
+        with zipfile.ZipFile(caminho) as z:
+            extraido = extrai_csv(z, "DADOS/TURMAS.zip", pasta)
+            assert extraido == pasta / "censo_cache/TURMAS/TURMAS.CSV"
+            assert extraido.read_bytes() == conteudo
+
+            # a extração é reaproveitada enquanto a origem não mudar
+            modificado = extraido.stat().st_mtime_ns
+            assert extrai_csv(z, "DADOS/TURMAS.zip", pasta) == extraido
+            assert extraido.stat().st_mtime_ns == modificado
+
+    with open(extraido.parent / "_extracao.json") as f:
+        reg = json.load(f)
+    assert reg["tamanho"] == len(conteudo)
+
+    # um CSV alterado com o mesmo tamanho é extraído novamente
+    extraido.write_bytes(conteudo.replace(b"2", b"3"))
+    with zipfile.ZipFile(caminho) as z:
+        assert extrai_csv(z, "DADOS/TURMAS.zip", pasta) == extraido
+    assert extraido.read_bytes() == conteudo
+
+
+@pytest.mark.parametrize("extrator", ["unrar", "rarfile"])
+def test_extrai_csv_rar(
+    dados_path: Path,
+    test_path: Path,
+    extrator: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    if extrator == "unrar" and shutil.which(rarfile.UNRAR_TOOL) is None:
+        pytest.skip("o unrar não está instalado")
+    if extrator == "rarfile":
+        # sem o unrar e o 7z a extração é feita pelo rarfile
+        monkeypatch.setattr(shutil, "which", lambda *args, **kwargs: None)
+
+    # o rar possuí um leia-me antes do CSV
+    caminho = test_path / f"censo_rar_{extrator}.zip"
+    with zipfile.ZipFile(caminho, "w") as z:
+        z.write(dados_path / "externo/aninhados/TURMAS.rar", "DADOS/TURMAS.rar")
+
+    pasta = test_path / f"extraidos_rar_{extrator}"
+    with zipfile.ZipFile(caminho) as z:
+        with abre_arquivo(z, "DADOS/TURMAS.rar", pasta) as f:
+            cabecalho = le_cabecalho(f)
+            df = pd.read_csv(
+                f, header=None, names=cabecalho, sep="|", encoding="latin-1"
+            )
+    assert cabecalho == ["ID_TURMA", "ID_ESCOLA", "NO_TURMA"]
+    assert df["NO_TURMA"].tolist() == ["Turma Á", "Turma B"]
+    assert (pasta / f"censo_rar_{extrator}/TURMAS/TURMAS.CSV").exists()
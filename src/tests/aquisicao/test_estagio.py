@@ -0,0 +1,116 @@
+import os
+import typing
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.aquisicao.inep.docente import DocenteETL
+from src.aquisicao.inep.escola import EscolaETL
+from src.aquisicao.inep.estagio import estagia_ano
+from src.aquisicao.inep.estagio import limpa_caches
+from src.aquisicao.inep.matricula import MatriculaETL
+
+
+@pytest.mark.parametrize("processos", [1, 2])
+def test_estagia_ano(cria_etl: typing.Callable, processos: int) -> None:
+    etls = [cria_etl(c, "estagio") for c in (EscolaETL, DocenteETL, MatriculaETL)]
+    estagios = estagia_ano(etls, processos=processos)
+
+    # cada arquivo do zip pertence a um único ETL
+    with zipfile.ZipFile(etls[0].caminho_entrada / f"{etls[0].ano}.zip") as z:
+        arqs = [
+            a
+            for e in etls
+            for f in e.etls_extracao
+            for a in f.arquivos_entrada(z.namelist())
+        ]
+    assert sorted(estagios) == sorted(arqs)
+    assert len(arqs) == 11
+    assert all(c.exists() for c in estagios.values())
+
+    # a extração lê o estágio e gera os mesmos dados que a leitura do zip
+    for etl in etls:
+        for folha in etl.etls_extracao:
+            folha._extract()
+            with zipfile.ZipFile(folha.caminho_entrada / f"{folha.ano}.zip") as z:
+                esperado = pd.concat(
+                    [
+                        folha.le_arquivo(z, a)
+                        for a in folha.arquivos_entrada(z.namelist())
+                    ]
+                )
+            pd.testing.assert_frame_equal(folha.dados_entrada[str(folha.ano)], esperado)
+
+
+def test_estagio_desatualizado(cria_etl: typing.Callable, pasta_info: Path) -> None:
+    etl = cria_etl(EscolaETL, "estagio")
+    estagia_ano([etl], processos=1)
+    with zipfile.ZipFile(etl.caminho_entrada / f"{etl.ano}.zip") as z:
+        arq = etl.arquivos_entrada(z.namelist())[0]
+        assert etl.estagio_atualizado(z, arq)
+
+        # o estágio depende das colunas carregadas
+        arquivo = pasta_info / "aquis_censo_escolas_cols.xlsx"
+        planilhas = pd.read_excel(arquivo, sheet_name=None)
+        cols = planilhas[str(etl.ano)]
+        cols.loc[cols.loc[cols["USAR"] == 1].index[-1], "USAR"] = 0
+        with pd.ExcelWriter(arquivo) as escritor:
+            for nome, planilha in planilhas.items():
+                planilha.to_excel(escritor, sheet_name=nome, index=False)
+
+        etl = cria_etl(EscolaETL, "estagio")
+        assert not etl.estagio_atualizado(z, arq)
+        assert etl.le_estagio(z, arq) is None
+
+        # e é substituído pelo estágio das novas configurações
+        etl.estagia(z, arq)
+        assert etl.estagio_atualizado(z, arq)
+        assert os.listdir(etl.caminho_estagio(arq).parent) == [
+            etl.caminho_estagio(arq).name
+        ]
+
+
+def test_extract_grava_estagio(cria_etl: typing.Callable) -> None:
+    etl = cria_etl(EscolaETL, "estagio_extract")
+    with zipfile.ZipFile(etl.caminho_entrada / f"{etl.ano}.zip") as z:
+        arq = etl.arquivos_entrada(z.namelist())[0]
+
+        # sem pedido o estágio não é gravado
+        etl._extract()
+        assert not etl.caminho_estagio(arq).exists()
+
+        # com pedido a primeira extração lê o zip e grava o estágio
+        etl = cria_etl(EscolaETL, "estagio_extract", estagiar=True)
+        etl._extract()
+        caminho = etl.caminho_estagio(arq)
+        assert caminho.name == f"{Path(arq).stem}.arrow"
+        assert etl.estagio_atualizado(z, arq)
+
+        # as próximas extrações leem o estágio
+        modificado = caminho.stat().st_mtime_ns
+        primeira = etl.dados_entrada[str(etl.ano)]
+        etl._extract()
+        assert caminho.stat().st_mtime_ns == modificado
+        pd.testing.assert_frame_equal(etl.dados_entrada[str(etl.ano)], primeira)
+
+    # os textos declarados como string[pyarrow] permanecem no arrow
+    assert etl._dtype["NO_ENTIDADE"] == "string[pyarrow]"
+    assert primeira["NO_ENTIDADE"].dtype.storage == "pyarrow"
+
+
+def test_limpa_caches(cria_etl: typing.Callable) -> None:
+    etl = cria_etl(EscolaETL, "estagio_limpeza")
+    estagios = estagia_ano([etl], processos=1)
+    assert all(c.exists() for c in estagios.values())
+
+    # a limpeza de outro ano não remove o estágio
+    entrada = etl.caminho_entrada.parent
+    assert limpa_caches(entrada, etl.caminho_saida, etl.ano + 1) == 0
+    assert all(c.exists() for c in estagios.values())
+
+    tamanho = sum(c.stat().st_size for c in estagios.values())
+    assert limpa_caches(entrada, etl.caminho_saida, etl.ano) >= tamanho
+    assert not any(c.exists() for c in estagios.values())
+    assert (etl.caminho_entrada / f"{etl.ano}.zip").exists()
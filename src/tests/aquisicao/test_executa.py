@@ -0,0 +1,81 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from src.aquisicao.executa import FATOR_MEMORIA
+from src.aquisicao.executa import PASTA_EXECUCOES
+from src.aquisicao.executa import _fontes_inep
+from src.aquisicao.executa import estima_memoria_etl
+from src.aquisicao.executa import executa_etl_anos
+from src.aquisicao.inep.catalogo import grava_catalogo
+from src.benchmark.sintetico import gera_censo_sintetico
+
+ANOS = [2019, 2020]
+
+
+@pytest.fixture(scope="module")
+def pasta(test_path: Path) -> Path:
+    pasta = test_path / "executa_anos"
+    for ano in ANOS:
+        gera_censo_sintetico(
+            pasta / f"externo/censo_escolar/{ano}.zip", ano, escala=0.02, semente=7
+        )
+
+    # o catálogo não possuí 2018, cuja execução deve falhar
+    grava_catalogo(
+        pasta / "externo",
+        {
+            base: dict(
+                url=url,
+                atualizado_em=time.time(),
+                arquivos={f"{a}.zip": dict(url="") for a in ANOS},
+            )
+            for base, url in _fontes_inep().items()
+        },
+    )
+    return pasta
+
+
+@pytest.mark.parametrize("processos", [1, 2])
+def test_executa_etl_anos(pasta: Path, processos: int) -> None:
+    saida = pasta / f"saida_{processos}"
+    resumo = executa_etl_anos(
+        "TURMA",
+        "2019-2020",
+        pasta / "externo",
+        saida,
+        True,
+        False,
+        processos=processos,
+        memoria=1e-6,
+    )
+    assert sorted(resumo) == ANOS
+    assert all(r["status"] == "ok" and r["tempo"] > 0 for r in resumo.values())
+    for ano in ANOS:
+        assert (saida / f"turma.parquet/ANO={ano}/{ano}.parquet").exists()
+
+    # as falhas são isoladas por ano e registradas no resumo
+    with pytest.raises(SystemExit):
+        executa_etl_anos(
+            "TURMA", "2018-2020", pasta / "externo", saida, True, False, processos
+        )
+    ultimo = sorted(os.listdir(saida / PASTA_EXECUCOES))[-1]
+    with open(saida / PASTA_EXECUCOES / ultimo) as f:
+        gravado = json.load(f)
+    assert gravado["etl"] == "TURMA"
+    assert gravado["anos"]["2018"]["status"] == "erro"
+    assert [gravado["anos"][str(a)]["status"] for a in ANOS] == ["ok", "ok"]
+
+
+def test_estima_memoria_etl(pasta: Path) -> None:
+    zip_2019 = pasta / "externo/censo_escolar/2019.zip"
+    assert estima_memoria_etl("TURMA", pasta / "externo", 2019) == (
+        zip_2019.stat().st_size * FATOR_MEMORIA
+    )
+
+    # sem o zip e sem o tamanho no catálogo não há estimativa
+    assert estima_memoria_etl("TURMA", pasta / "externo", 2018) == 0
+    assert estima_memoria_etl("IDEB", pasta / "externo", 2019) == 0
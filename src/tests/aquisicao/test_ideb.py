@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -84,6 +85,23 @@ def test_obtem_metricas(ideb_etl: IDEBETL, data: dict) -> None:
 
 
 @pytest.mark.run(order=5)
+def test_converte_valores(ideb_etl: IDEBETL) -> None:
+    bloco = pd.DataFrame(
+        {"A": [1, "5,2", "-", np.nan], "B": ["ND", 3.5, "4.1*", "7"]}, dtype=object
+    )
+    res = ideb_etl.converte_valores(bloco)
+
+    assert res.dtype == "float32"
+    assert res.shape == bloco.shape
+    np.testing.assert_array_equal(
+        np.isnan(res), [[False, True], [False, False], [True, False], [True, False]]
+    )
+    np.testing.assert_allclose(
+        res[[0, 1, 1, 2, 3], [0, 0, 1, 1, 1]], [1, 5.2, 3.5, 4.1, 7]
+    )
+
+
+@pytest.mark.run(order=6)
 def test_formata_resultados(ideb_etl: IDEBETL, data: dict) -> None:
     data["df"] = ideb_etl.formata_resultados(data["df"], data["dados"])
 
@@ -99,7 +117,33 @@ def test_formata_resultados(ideb_etl: IDEBETL, data: dict) -> None:
     )
 
 
-@pytest.mark.run(order=6)
+def test_formata_resultados_metrica_duplicada(ideb_etl: IDEBETL) -> None:
+    df = pd.DataFrame(
+        {
+            "ID_ESCOLA": [1, 2, 3],
+            "VL_A": ["-", "5,2", None],
+            "VL_B": ["4,5", "3,0", None],
+            "VL_C": ["1,0", "2,0", "3,0"],
+        }
+    )
+    dados = pd.DataFrame(
+        {
+            "COLUNA": ["VL_A", "VL_B", "VL_C"],
+            "METRICA": ["IDEB_AI", "IDEB_AI", "IDEB_AI"],
+            "ANO": [2019, 2019, 2017],
+        }
+    )
+    res = ideb_etl.formata_resultados(df, dados)
+
+    # a métrica recebe o primeiro valor não nulo das colunas duplicadas
+    ideb = res.set_index(["ID_ESCOLA", "ANO"])["IDEB_AI"]
+    assert ideb.loc[(1, 2019)] == np.float32(4.5)
+    assert ideb.loc[(2, 2019)] == np.float32(5.2)
+    assert (3, 2019) not in ideb.index
+    assert ideb.loc[(3, 2017)] == np.float32(3.0)
+
+
+@pytest.mark.run(order=7)
 def test_concatena_saidas(ideb_etl, data) -> None:
     df2 = ideb_etl.seleciona_dados(
         ideb_etl.dados_entrada["divulgacao_anos_iniciais_escolas_2019.zip"]
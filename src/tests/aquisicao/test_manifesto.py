@@ -0,0 +1,58 @@
+import json
+import os
+import shutil
+import typing
+from pathlib import Path
+
+from src.aquisicao.inep.escola import EscolaETL
+from src.utils.manifesto import hash_arquivo
+
+
+def test_manifesto(cria_etl: typing.Callable, pasta_info: Path) -> None:
+    etl = cria_etl(EscolaETL, "manifesto")
+    assert etl.precisa_reprocessar
+    etl.pipeline()
+
+    with open(etl.caminho_manifesto) as f:
+        manifesto = json.load(f)
+    zip_censo = etl.caminho_entrada / f"{etl.ano}.zip"
+    assert manifesto["entradas"][str(zip_censo)]["sha1"] == hash_arquivo(zip_censo)
+    assert set(manifesto["saidas"]) == set(etl.bases_saida)
+    for base, saida in manifesto["saidas"].items():
+        assert saida["linhas"] == len(etl.dados_saida[base])
+        assert list(saida["esquema"]) == etl.dados_saida[base].columns.tolist()
+        assert list(saida["arquivos"]) == [f"{etl.ano}.parquet"]
+    assert set(manifesto["tempos"]) == {"extract", "transform", "load"}
+
+    # as saídas estão atualizadas e são encontradas pelo manifesto
+    etl = cria_etl(EscolaETL, "manifesto")
+    assert etl.tem_dados_saida() and etl.saidas_atualizadas()
+    assert not etl.precisa_reprocessar
+
+    # uma entrada com o mesmo conteúdo e nova data não invalida as saídas
+    os.utime(zip_censo)
+    assert etl.saidas_atualizadas()
+
+    # configurações diferentes invalidam as saídas
+    configuracao = pasta_info / "aquis_censo_escolas.yml"
+    original = configuracao.read_text(encoding="UTF-8")
+    configuracao.write_text(original + "\nEXTRA: 1\n", encoding="UTF-8")
+    etl = cria_etl(EscolaETL, "manifesto")
+    assert not etl.saidas_atualizadas()
+    assert etl.precisa_reprocessar
+
+    # assim como saídas alteradas ou removidas
+    configuracao.write_text(original, encoding="UTF-8")
+    etl = cria_etl(EscolaETL, "manifesto")
+    assert etl.saidas_atualizadas()
+    saida = (
+        Path(manifesto["saidas"]["escola.parquet"]["caminho"]) / f"{etl.ano}.parquet"
+    )
+    os.utime(saida, ns=(0, 0))
+    assert etl.tem_dados_saida() and not etl.saidas_atualizadas()
+    shutil.rmtree(saida.parent)
+    assert not etl.tem_dados_saida()
+
+    # a execução gera as saídas novamente
+    etl.pipeline()
+    assert etl.saidas_atualizadas() and not etl.precisa_reprocessar
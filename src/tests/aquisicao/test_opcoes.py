@@ -0,0 +1,13 @@
+from src.aquisicao._base import _BaseETL
+from src.aquisicao.opcoes import ETL_DICT
+from src.aquisicao.opcoes import EnumETL
+from src.aquisicao.opcoes import obtem_etl
+
+
+def test_obtem_etl() -> None:
+    assert set(ETL_DICT) == set(EnumETL)
+    for etl, (_, classe) in ETL_DICT.items():
+        objeto = obtem_etl(etl)
+        assert objeto.__name__ == classe
+        assert issubclass(objeto, _BaseETL)
+    assert obtem_etl("TURMA") is obtem_etl(EnumETL.turma)
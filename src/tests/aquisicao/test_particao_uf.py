@@ -0,0 +1,90 @@
+import os
+import typing
+
+import pandas as pd
+import pytest
+
+from src.aquisicao.inep.docente import DocenteETL
+from src.aquisicao.inep.escola import EscolaETL
+
+
+@pytest.mark.parametrize("classe", [EscolaETL, DocenteETL])
+def test_particiona_uf(cria_etl: typing.Callable, classe: type) -> None:
+    cria_etl(classe, "simples").pipeline()
+    cria_etl(classe, "uf", particionar_uf=True).pipeline()
+
+    etl = cria_etl(classe, "uf")
+    assert etl.tem_dados_saida()
+    for base in etl.bases_saida:
+        conteudo = os.listdir(etl.caminho_particao(base))
+        assert len(conteudo) > 1
+        assert all(c.startswith("CO_UF=") for c in conteudo)
+
+    # as duas estruturas geram os mesmos dados
+    simples = cria_etl(classe, "simples")
+    simples.carrega_saidas()
+    etl.carrega_saidas()
+    for base, df in simples.dados_saida.items():
+        chave = list(df.columns[:2])
+        pd.testing.assert_frame_equal(
+            df.sort_values(chave, ignore_index=True),
+            etl.dados_saida[base][df.columns].sort_values(chave, ignore_index=True),
+        )
+
+    # apenas a UF selecionada é carregada
+    uf = int(sorted(os.listdir(etl.caminho_particao(etl.bases_saida[0])))[0][6:])
+    filtrado = cria_etl(classe, "uf", ufs=[uf])
+    filtrado.carrega_saidas()
+    for base, df in filtrado.dados_saida.items():
+        assert 0 < len(df) < len(etl.dados_saida[base])
+        assert list(df.columns) == list(etl.dados_saida[base].columns)
+
+        # leitura apenas das colunas selecionadas
+        colunas = filtrado.colunas_saida(base)[:2]
+        parcial = filtrado.le_particao(filtrado.caminho_particao(base), colunas)
+        pd.testing.assert_frame_equal(parcial, df[colunas])
+
+
+def test_filtra_uf_sem_particao(cria_etl: typing.Callable) -> None:
+    cria_etl(EscolaETL, "simples").pipeline()
+    etl = cria_etl(EscolaETL, "simples")
+    etl.carrega_saidas()
+    uf = int(etl.dados_saida["escola.parquet"]["CO_MUNICIPIO"].iloc[0] // 100000)
+
+    filtrado = cria_etl(EscolaETL, "simples", ufs=[uf])
+    filtrado.carrega_saidas()
+    escolas = filtrado.dados_saida["escola.parquet"]
+    assert len(escolas) > 0
+    assert (escolas["CO_MUNICIPIO"] // 100000 == uf).all()
+
+    # o município é lido para filtrar as UFs mesmo que não seja selecionado
+    parcial = filtrado.le_particao(
+        filtrado.caminho_particao("escola.parquet"), ["ID_ESCOLA"]
+    )
+    assert parcial["ID_ESCOLA"].tolist() == escolas["ID_ESCOLA"].tolist()
+
+    # sem partição e sem município não é possível filtrar as UFs
+    cria_etl(DocenteETL, "simples").pipeline()
+    docente = cria_etl(DocenteETL, "simples", ufs=[uf])
+    with pytest.raises(ValueError):
+        docente.carrega_saidas()
+
+
+@pytest.mark.parametrize("classe", [EscolaETL, DocenteETL])
+def test_le_saida_sem_particao(cria_etl: typing.Callable, classe: type) -> None:
+    cria_etl(classe, "simples").pipeline()
+    gerado = cria_etl(classe, "simples")
+
+    # sem a partição a base é processada pelo objeto, com as mesmas colunas
+    etl = cria_etl(classe, "nao_gerado")
+    for base in etl.bases_saida:
+        colunas = gerado.colunas_saida(base)
+        assert etl.colunas_saida(base) == colunas
+
+        chave = colunas[:2]
+        pd.testing.assert_frame_equal(
+            etl.le_saida(base, chave).sort_values(chave, ignore_index=True),
+            gerado.le_saida(base, chave).sort_values(chave, ignore_index=True),
+            check_dtype=False,
+        )
+    assert not etl.tem_dados_saida()
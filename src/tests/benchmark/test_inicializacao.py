@@ -0,0 +1,16 @@
+from src.benchmark.config import COMANDOS_INICIALIZACAO
+from src.benchmark.inicializacao import mede_inicializacao
+from src.benchmark.inicializacao import modulos_importados
+from src.benchmark.inicializacao import modulos_pesados
+
+
+def test_modulos_pesados() -> None:
+    assert "click" in modulos_importados(["--help"])
+    for comando in COMANDOS_INICIALIZACAO:
+        assert modulos_pesados(comando.split()) == []
+
+
+def test_mede_inicializacao() -> None:
+    tempos = mede_inicializacao(["datamart", "--help"], 2)
+    assert len(tempos) == 2
+    assert all(t > 0 for t in tempos)
@@ -0,0 +1,107 @@
+from pathlib import Path
+
+from src.aquisicao.ibge._base import lista_arquivos_ftp
+from src.aquisicao.inep.estagio import estagia_ano
+from src.aquisicao.inep.turma import TurmaETL
+from src.aquisicao.opcoes import EnumETL
+from src.benchmark.micro import servidor_ftp_local
+from src.benchmark.regressao import AUSENTE
+from src.benchmark.regressao import MELHORIA
+from src.benchmark.regressao import NOVO
+from src.benchmark.regressao import OK
+from src.benchmark.regressao import REGRESSAO
+from src.benchmark.regressao import carrega_baseline
+from src.benchmark.regressao import compara_baseline
+from src.benchmark.regressao import executa_regressao
+from src.benchmark.regressao import formata_relatorio
+from src.benchmark.regressao import remove_saidas_etl
+from src.benchmark.regressao import resume_amostras
+from src.benchmark.regressao import salva_baseline
+from src.benchmark.sintetico import gera_censo_sintetico
+
+
+def test_servidor_ftp_local() -> None:
+    with servidor_ftp_local(pastas=(2, 2), arquivos=3) as url:
+        arquivos = lista_arquivos_ftp(url)
+
+    assert len(arquivos) == (1 + 2 + 4) * 3
+    assert arquivos["arquivo_0_2.zip"] == f"{url}arquivo_0_2.zip"
+    assert arquivos["arquivo_6_0.zip"] == f"{url}pasta_1/pasta_1/arquivo_6_0.zip"
+
+
+def test_compara_baseline() -> None:
+    baseline = dict(
+        commit="a",
+        benchmarks=dict(
+            lento=dict(tempo=resume_amostras([1.0, 1.01, 0.99])),
+            ruidoso=dict(tempo=resume_amostras([1.0, 1.3, 0.7])),
+            rapido=dict(tempo=resume_amostras([1.0, 1.0, 1.0])),
+            removido=dict(tempo=resume_amostras([1.0])),
+        ),
+    )
+    atual = dict(
+        commit="b",
+        benchmarks=dict(
+            lento=dict(tempo=resume_amostras([2.0, 2.1, 1.9])),
+            ruidoso=dict(tempo=resume_amostras([1.8, 1.5, 1.2])),
+            rapido=dict(tempo=resume_amostras([0.5, 0.5, 0.5])),
+            novo=dict(tempo=resume_amostras([1.0])),
+        ),
+    )
+    comparacao = compara_baseline(atual, baseline).set_index("benchmark")
+
+    assert comparacao.loc["lento", "status"] == REGRESSAO
+    assert comparacao.loc["ruidoso", "status"] == OK
+    assert comparacao.loc["rapido", "status"] == MELHORIA
+    assert comparacao.loc["removido", "status"] == AUSENTE
+    assert comparacao.loc["novo", "status"] == NOVO
+
+    relatorio = formata_relatorio(comparacao.reset_index(), atual, baseline)
+    assert "1 regressão(ões)" in relatorio
+    assert "- lento (tempo): 1.00s -> 2.00s" in relatorio
+
+
+def test_remove_saidas_etl(test_path: Path) -> None:
+    pasta = test_path / "benchmark/remove_saidas"
+    gera_censo_sintetico(pasta / "externo/censo_escolar/2020.zip", 2020, 0.02, 0)
+    etl = TurmaETL(
+        pasta / "externo", pasta / "aquisicao", 2020, fontes={"2020.zip": ""}
+    )
+    estagios = estagia_ano([etl], processos=1)
+    assert all(c.exists() for c in estagios.values())
+
+    # o macro benchmark do ETL sempre parte do zip, sem o estágio
+    remove_saidas_etl(EnumETL.turma.value, pasta, 2020)
+    assert not any(c.exists() for c in estagios.values())
+    assert (pasta / "externo/censo_escolar/2020.zip").exists()
+
+
+def test_executa_regressao(test_path: Path) -> None:
+    pasta = test_path / "benchmark/regressao"
+    atual = executa_regressao(
+        pasta,
+        ano=2020,
+        escala=0.05,
+        repeticoes_micro=2,
+        repeticoes_macro=1,
+        isolar=False,
+    )
+
+    assert set(atual["benchmarks"]) == {
+        "processa_coluna_tp",
+        "processa_coluna_in",
+        "processa_tp",
+        "ajusta_schema",
+        "formata_resultados",
+        "lista_arquivos_ftp",
+        "INICIALIZACAO CLI",
+        "ETL TURMA",
+        "DATAMART ESCOLA",
+    }
+    assert len(atual["benchmarks"]["processa_tp"]["tempo"]["amostras"]) == 2
+    assert "pico_memoria" in atual["benchmarks"]["DATAMART ESCOLA"]
+    assert not pasta.exists()
+
+    salva_baseline(atual, test_path / "benchmark/baseline.json")
+    baseline = carrega_baseline(test_path / "benchmark/baseline.json")
+    assert (compara_baseline(atual, baseline)["status"] == OK).all()
@@ -0,0 +1,57 @@
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.benchmark.executa import carrega_resultados
+from src.benchmark.executa import executa_benchmark
+from src.benchmark.executa import resume_resultados
+from src.benchmark.sintetico import carrega_definicao
+from src.benchmark.sintetico import gera_censo_sintetico
+
+ANO = 2020
+
+
+@pytest.fixture(scope="module")
+def censo(test_path: Path) -> Path:
+    caminho = test_path / f"benchmark/sintetico/{ANO}.zip"
+    gera_censo_sintetico(caminho, ANO, escala=0.05, semente=1)
+    return caminho
+
+
+def test_gera_censo_sintetico(censo: Path) -> None:
+    pasta = f"microdados_educacao_basica_{ANO}/DADOS"
+    with zipfile.ZipFile(censo) as z:
+        arquivos = set(z.namelist())
+        assert f"{pasta}/ESCOLAS.CSV" in arquivos
+        assert f"{pasta}/MATRICULA_SUDESTE.CSV" in arquivos
+        assert f"{pasta}/DOCENTES_CO.CSV" in arquivos
+
+        with z.open(f"{pasta}/ESCOLAS.CSV") as f:
+            escolas = pd.read_csv(f, sep="|", encoding="latin-1")
+        with z.open(f"{pasta}/TURMAS.CSV") as f:
+            turmas = pd.read_csv(f, sep="|", encoding="latin-1")
+
+    assert list(escolas.columns) == carrega_definicao("escolas", ANO)["colunas"]
+    assert escolas["CO_ENTIDADE"].is_unique
+    assert turmas["ID_TURMA"].is_unique
+    assert turmas["CO_ENTIDADE"].isin(escolas["CO_ENTIDADE"]).all()
+
+    # anos sem configuração utilizam as colunas do último ano configurado
+    assert carrega_definicao("escolas", 2030)["colunas"] == list(escolas.columns)
+
+
+def test_executa_benchmark(test_path: Path) -> None:
+    pasta = test_path / "benchmark/execucao"
+    resultados = executa_benchmark([0.05], pasta, ano=ANO, isolar=False)
+
+    assert (resultados["tempo_parede"] > 0).all()
+    assert (resultados["linhas_saida"] > 0).all()
+    assert "DATAMART ESCOLA" in resultados["benchmark"].to_list()
+    assert not (pasta / "escala_0.05").exists()
+
+    historico = carrega_resultados(pasta / "resultados.jsonl")
+    assert len(historico) == len(resultados)
+    resumo = resume_resultados(historico)
+    assert resumo.shape == (len(resultados), 1)
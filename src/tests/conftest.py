@@ -25,6 +25,15 @@ def test_path() -> typing.Generator[Path, None, None]:
     shutil.rmtree(caminho)
 
 
+@pytest.fixture(scope="session", autouse=True)
+def cache_web(test_path: Path) -> Path:
+    from src.utils.web import configura_cache_web
+
+    caminho = test_path / "cache_web"
+    configura_cache_web(caminho)
+    return caminho
+
+
 @pytest.fixture(scope="session")
 def dados_path() -> Path:
     return Path(os.path.dirname(__file__)) / "dados"
@@ -38,3 +47,45 @@ def ano(dados_path: Path) -> int:
         if f >= "2019.zip"
     ]
     return random.choice(anos)
+
+
+@pytest.fixture(scope="session")
+def censo_sintetico(test_path: Path) -> Path:
+    from src.benchmark.sintetico import gera_censo_sintetico
+
+    pasta = test_path / "censo_sintetico"
+    gera_censo_sintetico(
+        pasta / "externo/censo_escolar/2020.zip", 2020, escala=0.05, semente=2
+    )
+    return pasta
+
+
+@pytest.fixture()
+def cria_etl(censo_sintetico: Path) -> typing.Callable[..., typing.Any]:
+    def cria(classe: type, saida: str, **kwargs: typing.Any) -> typing.Any:
+        return classe(
+            censo_sintetico / "externo",
+            censo_sintetico / saida,
+            2020,
+            True,
+            False,
+            fontes={"2020.zip": ""},
+            **kwargs,
+        )
+
+    return cria
+
+
+@pytest.fixture()
+def pasta_info(
+    test_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> typing.Generator[Path, None, None]:
+    import src.utils.info as info
+
+    caminho = test_path / "info"
+    shutil.copytree(info.CAMINHO_INFO, caminho)
+    monkeypatch.setattr(info, "CAMINHO_INFO", caminho)
+
+    yield caminho
+
+    shutil.rmtree(caminho)
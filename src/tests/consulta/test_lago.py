@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pytest
+
+from src.consulta.lago import Lago
+
+
+@pytest.fixture(scope="module")
+def lago(dados_path: Path, test_path: Path) -> Lago:
+    # datamart com a coluna ANO também dentro dos arquivos
+    caminho = test_path / "consulta/datamart/municipio.parquet"
+    for ano in [2019, 2020]:
+        (caminho / f"ANO={ano}").mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(
+            {"CO_MUNICIPIO": [1100015, 3550308], "ANO": ano, "QT_ESCOLAS": [3, ano]}
+        ).to_parquet(caminho / f"ANO={ano}/{ano}.parquet", index=False)
+    return Lago(dados_path / "aquisicao", test_path / "consulta/datamart")
+
+
+def test_registra_bases(lago: Lago) -> None:
+    assert {"escola", "turma", "matricula", "ideb", "dm_municipio"}.issubset(lago.bases)
+    assert {"ANO", "REGIAO"}.issubset(lago.esquema("matricula").names)
+
+    municipio = lago.consulta("dm_municipio", filtros=[("ANO", "=", 2020)])
+    assert municipio.conta() == 2
+    assert municipio.para_pandas()["QT_ESCOLAS"].tolist() == [3, 2020]
+
+    with pytest.raises(ValueError):
+        lago.consulta("nao_existe")
+
+
+def test_consulta_filtra(lago: Lago, dados_path: Path) -> None:
+    consulta = lago.consulta(
+        "matricula",
+        ["ID_MATRICULA", "ID_TURMA", "REGIAO"],
+        [("ANO", "=", 2019), ("REGIAO", "in", ["SUL", "NORTE"])],
+    )
+    df = consulta.para_pandas()
+
+    esperado = pd.concat(
+        pd.read_parquet(dados_path / f"aquisicao/matricula.parquet/ANO=2019/REGIAO={r}")
+        for r in ["NORTE", "SUL"]
+    )
+    assert list(df.columns) == ["ID_MATRICULA", "ID_TURMA", "REGIAO"]
+    assert consulta.conta() == len(df) == len(esperado)
+    assert set(df["ID_MATRICULA"]) == set(esperado["ID_MATRICULA"])
+    assert set(df["REGIAO"]) == {"SUL", "NORTE"}
+
+
+def test_consulta_junta_agrupa(lago: Lago, dados_path: Path) -> None:
+    turma = lago.consulta(
+        "turma",
+        ["ID_TURMA", "ID_ESCOLA", "TP_TIPO_ATENDIMENTO_TURMA"],
+        [("ANO", "=", 2019)],
+    )
+    consulta = (
+        lago.consulta("matricula", filtros=[("ANO", "=", 2019)], tamanho_lote=100)
+        .junta(turma, "ID_TURMA", tipo="inner")
+        .filtra(ds.field("ID_ESCOLA") > 0)
+        .agrupa(
+            ["ID_ESCOLA", "TP_TIPO_ATENDIMENTO_TURMA"],
+            QT_MATRICULAS=("ID_MATRICULA", "count"),
+            PC_TRANSPORTE=("IN_TRANSPORTE_PUBLICO", "mean"),
+            QT_TRANSPORTE=("IN_TRANSPORTE_PUBLICO", "sum"),
+        )
+    )
+    df = consulta.para_pandas().sort_values(["ID_ESCOLA", "TP_TIPO_ATENDIMENTO_TURMA"])
+
+    matricula = pd.read_parquet(dados_path / "aquisicao/matricula.parquet/ANO=2019")
+    turmas = pd.read_parquet(
+        dados_path / "aquisicao/turma.parquet/ANO=2019",
+        columns=["ID_TURMA", "ID_ESCOLA", "TP_TIPO_ATENDIMENTO_TURMA"],
+    ).astype({"TP_TIPO_ATENDIMENTO_TURMA": "str"})
+    esperado = (
+        matricula.merge(turmas, on="ID_TURMA")
+        .groupby(["ID_ESCOLA", "TP_TIPO_ATENDIMENTO_TURMA"])
+        .agg(
+            QT_MATRICULAS=("ID_MATRICULA", "count"),
+            PC_TRANSPORTE=("IN_TRANSPORTE_PUBLICO", "mean"),
+            QT_TRANSPORTE=("IN_TRANSPORTE_PUBLICO", "sum"),
+        )
+        .reset_index()
+    )
+    pd.testing.assert_frame_equal(
+        df.reset_index(drop=True), esperado, check_dtype=False
+    )
+
+    with pytest.raises(ValueError):
+        consulta.filtra([("ID_ESCOLA", ">", 0)])
+    with pytest.raises(ValueError):
+        lago.consulta("turma").agrupa("ID_ESCOLA", n=("ID_TURMA", "median"))
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.datamart.agregacao as dm_agregado
+
+
+@pytest.fixture(scope="module")
+def escola() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ID_ESCOLA": [1, 2, 3, 4],
+            "CO_MUNICIPIO": [1100015, 1100015, 1100023, np.nan],
+            "CO_UF": [11, 11, 11, 12],
+            "NO_ENTIDADE": ["A", "B", "C", "D"],
+            "QT_ALUNOS": [10, 30, 5, 1],
+            "QT_TURMAS": [2, 3, np.nan, 1],
+            "QT_MATRICULAS": [10, 30, 5, 1],
+            "NU_ALUNO_POR_TURMA": [5.0, 10.0, np.nan, 1.0],
+            "PC_ALUNO_SEXO_MASCULINO": [0.5, 0.1, 1.0, 0.0],
+            "NU_MIN_ALUNO_IDADE": [6, 4, 10, 7],
+            "NU_MAX_ALUNO_IDADE": [10, 14, 12, 7],
+            "IN_AGUA_POTAVEL": [1, 0, np.nan, 1],
+            "TP_DEPENDENCIA": pd.Categorical(
+                ["MUNICIPAL", "ESTADUAL", "MUNICIPAL", None]
+            ),
+        }
+    )
+
+
+def test_define_regras(escola: pd.DataFrame) -> None:
+    regras = dm_agregado.define_regras(escola.columns, "CO_MUNICIPIO", ["CO_UF"])
+
+    assert regras == {
+        "CO_UF": "constante",
+        "QT_ALUNOS": "soma",
+        "QT_TURMAS": "soma",
+        "QT_MATRICULAS": "soma",
+        "NU_ALUNO_POR_TURMA": "media",
+        "PC_ALUNO_SEXO_MASCULINO": "media",
+        "NU_MIN_ALUNO_IDADE": "minimo",
+        "NU_MAX_ALUNO_IDADE": "maximo",
+        "IN_AGUA_POTAVEL": "indicador",
+        "TP_DEPENDENCIA": "categoria",
+    }
+
+
+def test_agrega_datamart(escola: pd.DataFrame) -> None:
+    regras = dm_agregado.define_regras(escola.columns, "CO_MUNICIPIO", ["CO_UF"])
+    res = dm_agregado.agrega_datamart(escola, "CO_MUNICIPIO", regras).set_index(
+        "CO_MUNICIPIO"
+    )
+
+    assert list(res.index) == [1100015, 1100023]
+    assert list(res["QT_ESCOLAS"]) == [2, 1]
+    assert list(res["CO_UF"]) == [11, 11]
+    assert list(res["QT_ALUNOS"]) == [40, 5]
+    assert res["QT_TURMAS"].isnull().tolist() == [False, True]
+    np.testing.assert_allclose(res["NU_ALUNO_POR_TURMA"], [40 / 5, np.nan])
+    np.testing.assert_allclose(res["PC_ALUNO_SEXO_MASCULINO"], [8 / 40, 1.0])
+    assert list(res["NU_MIN_ALUNO_IDADE"]) == [4, 10]
+    assert list(res["NU_MAX_ALUNO_IDADE"]) == [14, 12]
+    np.testing.assert_allclose(res["PC_ESCOLAS_AGUA_POTAVEL"], [0.5, np.nan])
+    assert list(res["QT_ESCOLAS_DEPENDENCIA_MUNICIPAL"]) == [1, 1]
+    assert list(res["QT_ESCOLAS_DEPENDENCIA_ESTADUAL"]) == [1, 0]
+
+
+def test_carrega_atributos_malha(test_path: Path) -> None:
+    caminho = test_path / "malha_agregado"
+    assert dm_agregado.carrega_atributos_malha(caminho, "malha_uf", 2019) is None
+
+    for ano in [2015, 2018, 2020]:
+        (caminho / f"malha_uf.parquet/ANO={ano}").mkdir(parents=True)
+        pd.DataFrame({"CO_UF": [11], "NO_UF": [f"UF {ano}"]}).to_parquet(
+            caminho / f"malha_uf.parquet/ANO={ano}/{ano}.parquet"
+        )
+
+    assert list(
+        dm_agregado.carrega_atributos_malha(caminho, "malha_uf", 2019)["NO_UF"]
+    ) == ["UF 2018"]
+    assert list(
+        dm_agregado.carrega_atributos_malha(caminho, "malha_uf", 2010)["NO_UF"]
+    ) == ["UF 2015"]
@@ -1,10 +1,16 @@
+import shutil
+import time
 import typing
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 
 import src.datamart.escola as dm_escola
+from src.aquisicao.executa import _fontes_inep
+from src.aquisicao.inep.catalogo import grava_catalogo
+from src.datamart.config import METRICAS_RAZAO
 from src.utils.info import carrega_excel
 
 
@@ -248,6 +254,45 @@ def test_processa_matricula(
     assert set(nu_qt_cols).issubset(set(dados["dm"].columns))
 
 
+def test_processa_matricula_paralelo(dados_path: Path, ano: int) -> None:
+    kwargs = dict(
+        aquis_entrada=dados_path / "externo", aquis_saida=dados_path / "aquisicao"
+    )
+    dm = dm_escola.processa_censo_escola(ano=ano, **kwargs)
+
+    sequencial = dm_escola.processa_matricula(dm, ano=ano, processos=1, **kwargs)
+    paralelo = dm_escola.processa_matricula(dm, ano=ano, processos=3, **kwargs)
+    pd.testing.assert_frame_equal(sequencial, paralelo)
+
+
+def test_indice_turma_sem_particao(dados_path: Path, test_path: Path, ano: int) -> None:
+    # entrada apenas com o zip do ano e sem saídas de aquisição
+    entrada = test_path / "indice_sem_particao/externo"
+    (entrada / "censo_escolar").mkdir(parents=True, exist_ok=True)
+    shutil.copy(
+        dados_path / f"externo/censo_escolar/{ano}.zip", entrada / "censo_escolar"
+    )
+    grava_catalogo(
+        entrada,
+        {
+            b: dict(
+                url=u, atualizado_em=time.time(), arquivos={f"{ano}.zip": dict(url="")}
+            )
+            for b, u in _fontes_inep().items()
+        },
+    )
+    saida = test_path / "indice_sem_particao/aquisicao"
+
+    # o índice é gerado a partir do ETL de turmas, sem ser persistido
+    indice = dm_escola.carrega_indice_turma(entrada, saida, ano, persistir=True)
+    esperado = dm_escola.carrega_indice_turma(
+        dados_path / "externo", dados_path / "aquisicao", ano
+    )
+    for gerado, lido in zip(indice, esperado):
+        np.testing.assert_array_equal(gerado, lido)
+    assert not (saida / f"turma.parquet/ANO={ano}").exists()
+
+
 def test_processa_ideb(
     dados: typing.Dict[str, pd.DataFrame], dados_path: Path, ano: int
 ):
@@ -299,3 +344,20 @@ def test_gera_metricas_adicionais(dados: typing.Dict[str, pd.DataFrame]):
         "CO_REGIAO",
         "CO_UF",
     }.issubset(dados["dm"].columns)
+
+
+def test_gera_metricas_razao(dados_path: Path) -> None:
+    # saída de gera_metricas_adicionais gravada com a versão coluna a coluna
+    base = pd.read_parquet(dados_path / "datamart/metricas_adicionais_base.parquet")
+    colunas = {c for n, d, _, _ in METRICAS_RAZAO for c in (n, d)}
+    dm = base[sorted(colunas) + ["CO_MUNICIPIO"]]
+
+    res = dm_escola.gera_metricas_adicionais(dm)
+
+    # os valores são os mesmos, com razões nulas nos denominadores zero
+    esperado = base.replace([np.inf, -np.inf], np.nan).astype(
+        {c: t for _, _, c, t in METRICAS_RAZAO}
+    )
+    pd.testing.assert_frame_equal(res, esperado)
+    assert (dm["QT_ALUNOS"] == 0).any() and dm["QT_ALUNOS"].isna().any()
+    assert not np.isinf(res.filter(like="_POR_").to_numpy()).any()
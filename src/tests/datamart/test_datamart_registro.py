@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+import src.datamart.registro as dm_registro
+from src.datamart.config import DMGran
+
+
+def test_junta_em_fluxo(test_path: Path) -> None:
+    origem = test_path / "registro/origem.parquet"
+    origem.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(
+        {"ID_ALUNO": ["a", "b", "c", "d", "e"], "NU_IDADE": [7, 8, 9, 10, 11]}
+    ).to_parquet(origem, index=False)
+    vinculo = pd.DataFrame(
+        {"ID_ESCOLA": [1, 2, 1, 3]},
+        index=pd.Index(["a", "a", "b", "c"], name="ID_ALUNO"),
+    )
+    escola = pd.DataFrame(
+        {"CO_UF": [11, 12], "NU_IDADE": [0, 0]},
+        index=pd.Index([1, 2], name="ID_ESCOLA"),
+    )
+
+    destino = test_path / "registro/destino.parquet"
+    linhas = dm_registro.junta_em_fluxo(
+        origem,
+        destino,
+        [("ID_ALUNO", vinculo), ("ID_ESCOLA", escola)],
+        tamanho_lote=2,
+    )
+    df = pd.read_parquet(destino)
+
+    assert linhas == 6
+    assert list(df.columns) == ["ID_ALUNO", "NU_IDADE", "ID_ESCOLA", "CO_UF"]
+    assert list(df["ID_ALUNO"]) == ["a", "a", "b", "c", "d", "e"]
+    assert list(df["NU_IDADE"]) == [7, 7, 8, 9, 10, 11]
+    assert df["ID_ESCOLA"].tolist()[:4] == [1, 2, 1, 3]
+    assert df["CO_UF"].tolist()[:3] == [11, 12, 11]
+    assert df["CO_UF"].isnull().tolist()[3:] == [True, True, True]
+
+
+def test_controi_datamart_matricula(dados_path: Path, test_path: Path) -> None:
+    aquis_saida = dados_path / "aquisicao"
+    saida = test_path / "datamart"
+    dm_registro.controi_datamart_registro(DMGran.MATRICULA, 2019, aquis_saida, saida)
+
+    entrada = aquis_saida / "matricula.parquet/ANO=2019"
+    caminho = saida / "matricula.parquet/ANO=2019"
+    assert sorted(os.listdir(caminho)) == sorted(os.listdir(entrada))
+    for reg in os.listdir(entrada):
+        df = pd.read_parquet(caminho / reg)
+        assert len(df) == len(pd.read_parquet(entrada / reg))
+        assert "ID_ESCOLA" in df
+        assert "CO_ETAPA_ENSINO" in df
+        assert "TP_DEPENDENCIA" in df
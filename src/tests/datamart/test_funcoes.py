@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.datamart.funcoes as fn
+
+
+def test_junta_blocos() -> None:
+    base = pd.DataFrame({"ID_ESCOLA": [5, 3, 9, 1], "QT_TURMAS": [1, 2, 3, 4]})
+    blocos = [
+        base,
+        pd.DataFrame({"ID_ESCOLA": [9, 5], "QT_A": np.array([7, 8], dtype="uint8")}),
+        pd.DataFrame(
+            {"ID_ESCOLA": [1, 3, 5, 9, 7], "TP_B": pd.Categorical(list("xyxyz"))}
+        ),
+        pd.DataFrame({"ID_ESCOLA": [3, 1, 5, 9], "NU_C": [0.5, 1.5, 2.5, 3.5]}),
+    ]
+
+    esperado = base
+    for bloco in blocos[1:]:
+        esperado = esperado.merge(bloco, how="left")
+
+    pd.testing.assert_frame_equal(fn.junta_blocos(blocos, "ID_ESCOLA"), esperado)
+
+    with pytest.raises(ValueError):
+        fn.junta_blocos([base, base], "ID_ESCOLA")
+    with pytest.raises(ValueError):
+        fn.junta_blocos([base, pd.concat([blocos[1]] * 2)], "ID_ESCOLA")
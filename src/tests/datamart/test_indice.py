@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.datamart.indice import carrega_indice
+from src.datamart.indice import expande_pares
+from src.datamart.indice import gera_indice
+from src.datamart.indice import junta_indice
+
+
+def test_junta_indice() -> None:
+    turma = pd.DataFrame({"ID_TURMA": [30, 10, 20], "ID_ESCOLA": [3, 1, 2]})
+    matricula = pd.DataFrame(
+        {"ID_MATRICULA": range(5), "ID_TURMA": [20, 99, 10, 20, 30]}
+    )
+
+    indice = gera_indice(turma["ID_TURMA"], turma["ID_ESCOLA"])
+    assert indice[0].dtype == "uint64"
+    assert indice[0].tolist() == [10, 20, 30]
+
+    res = junta_indice(matricula, indice, "ID_TURMA", "ID_ESCOLA")
+    esperado = matricula.merge(turma).sort_values("ID_MATRICULA")
+    pd.testing.assert_frame_equal(res, esperado.set_index(res.index))
+
+    with pytest.raises(ValueError):
+        gera_indice(pd.Series([1, 1]), pd.Series([1, 2]))
+    with pytest.raises(ValueError):
+        gera_indice(pd.Series([-1, 1]), pd.Series([1, 2]))
+
+
+def test_expande_pares() -> None:
+    aluno = pd.DataFrame({"ID_ALUNO": ["c", "a", "b"], "NU_IDADE": [7, 8, 9]})
+    pares = pd.DataFrame({"ID_ALUNO": ["a", "c", "a", "x"], "ID_ESCOLA": [1, 2, 3, 4]})
+
+    pd.testing.assert_frame_equal(
+        expande_pares(aluno, pares, "ID_ALUNO"), aluno.merge(pares)
+    )
+    with pytest.raises(ValueError):
+        expande_pares(pd.concat([aluno, aluno]), pares, "ID_ALUNO")
+
+
+def test_carrega_indice(test_path: Path) -> None:
+    origem = test_path / "indice/turma.parquet/ANO=2020"
+    origem.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"ID_TURMA": [1, 2]}).to_parquet(origem / "2020.parquet")
+    caminho = origem / "_indice_turma_escola.npz"
+    caminho.unlink(missing_ok=True)
+
+    chamadas = list()
+
+    def gera():
+        chamadas.append(1)
+        return np.array([1, 2], dtype="uint64"), np.array([10, 20])
+
+    for _ in range(2):
+        chaves, valores = carrega_indice(caminho, gera, origem)
+        assert valores.tolist() == [10, 20]
+    assert len(chamadas) == 1
+
+    # o índice é gerado novamente quando os dados são mais novos
+    antigo = os.path.getmtime(caminho) - 10
+    os.utime(caminho, (antigo, antigo))
+    carrega_indice(caminho, gera, origem)
+    assert len(chamadas) == 2
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.datamart.memoria import FATOR_MONTAGEM
+from src.datamart.memoria import ResultadosParciais
+
+
+@pytest.fixture(scope="module")
+def fontes() -> dict:
+    escolas = np.arange(1, 201)
+    base = pd.DataFrame({"ID_ESCOLA": escolas[::-1], "CO_MUNICIPIO": 3550308})
+    turma = pd.DataFrame(
+        {
+            "ID_ESCOLA": escolas[::2],
+            "QT_TURMAS": np.arange(100, dtype="uint32"),
+            "NU_MEDIA": np.linspace(0, 1, 100).astype("float16"),
+        }
+    )
+    regioes = [
+        pd.DataFrame(
+            {
+                "ID_ESCOLA": escolas[i::3],
+                "QT_ALUNOS": escolas[i::3] * 10,
+                "TP_REDE": pd.Categorical(["A", "B"] * 34)[: len(escolas[i::3])],
+            }
+        )
+        for i in range(3)
+    ]
+    return dict(base=base, turma=turma, regioes=regioes)
+
+
+@pytest.mark.parametrize("orcamento", [None, 1])
+def test_monta_igual_merge(fontes: dict, orcamento: int) -> None:
+    esperado = fontes["base"].merge(fontes["turma"], how="left")
+    esperado = esperado.merge(pd.concat(fontes["regioes"]), how="left")
+
+    with ResultadosParciais(orcamento) as res:
+        res.adiciona("turma", fontes["turma"])
+        for df in fontes["regioes"]:
+            res.adiciona("matricula", df)
+        assert res.fontes == ["turma", "matricula"]
+        assert (len(res.arquivos) == 4) == (orcamento is not None)
+        pasta = res._pasta
+        if orcamento is None:
+            dm = res.monta(fontes["base"])
+        else:
+            # o datamart completo não cabe no orçamento
+            with pytest.raises(MemoryError):
+                res.monta(fontes["base"])
+            dm = pd.concat(res.monta_blocos(fontes["base"]), ignore_index=True)
+
+    pd.testing.assert_frame_equal(dm, esperado)
+    assert not pasta.exists()
+
+
+def test_monta_blocos(fontes: dict) -> None:
+    esperado = fontes["base"].merge(fontes["turma"], how="left")
+
+    with ResultadosParciais() as res:
+        res.adiciona("turma", fontes["turma"])
+        linha = res.estima_linha(fontes["base"])
+
+    # os blocos respeitam o orçamento, incluindo as cópias da montagem
+    with ResultadosParciais(int(np.ceil(linha * FATOR_MONTAGEM * 30))) as res:
+        res.adiciona("turma", fontes["turma"])
+        assert res.linhas_bloco(fontes["base"]) == 30
+        blocos = list(res.monta_blocos(fontes["base"]))
+
+    assert [len(b) for b in blocos] == [30] * 6 + [20]
+    pd.testing.assert_frame_equal(pd.concat(blocos, ignore_index=True), esperado)
+
+
+def test_monta_blocos_tipos(fontes: dict) -> None:
+    # apenas as escolas do primeiro bloco possuem resultados do ideb
+    ideb = pd.DataFrame(
+        {
+            "ID_ESCOLA": np.arange(200, 170, -1),
+            "NU_IDEB": np.arange(30, dtype="int64"),
+            "NO_METRICA": "IDEB",
+        }
+    )
+    esperado = fontes["base"].merge(fontes["turma"], how="left").merge(ideb, how="left")
+
+    with ResultadosParciais(1) as res:
+        res.adiciona("turma", fontes["turma"])
+        res.adiciona("ideb", ideb.iloc[:10])
+        res.adiciona("ideb", ideb.iloc[10:])
+        estrutura = res.estrutura(fontes["base"])
+        blocos = list(res.monta_blocos(fontes["base"], linhas=30))
+
+        # cada arquivo temporário foi lido uma única vez e dividido por bloco
+        assert sorted(res._blocos["ideb"]) == [0]
+        assert len(res.arquivos) == 2 + 7
+
+    # os tipos são os mesmos em todos os blocos, tenham ou não resultados
+    pd.testing.assert_series_equal(estrutura.dtypes, esperado.dtypes)
+    for bloco in blocos:
+        pd.testing.assert_series_equal(bloco.dtypes, esperado.dtypes)
+    pd.testing.assert_frame_equal(pd.concat(blocos, ignore_index=True), esperado)
+
+
+def test_monta_erros(fontes: dict) -> None:
+    with ResultadosParciais() as res:
+        with pytest.raises(ValueError):
+            res.adiciona("turma", fontes["turma"].drop(columns=["ID_ESCOLA"]))
+
+        res.adiciona("turma", pd.concat([fontes["turma"], fontes["turma"]]))
+        with pytest.raises(ValueError):
+            res.monta(fontes["base"])
+
+    with ResultadosParciais() as res:
+        res.adiciona("municipio", fontes["base"])
+        with pytest.raises(ValueError):
+            res.monta(fontes["base"])
@@ -0,0 +1,82 @@
+import json
+import typing
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import src.utils.instrumentacao as inst
+
+
+@pytest.fixture(scope="function")
+def arquivo(test_path: Path) -> typing.Generator[Path, None, None]:
+    caminho = test_path / "metricas/execucao.jsonl"
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.unlink(missing_ok=True)
+    inst.configura_metricas(caminho)
+    yield caminho
+    inst.configura_metricas(None)
+
+
+def test_mede_etapa(arquivo: Path) -> None:
+    df = pd.DataFrame({"A": range(10)})
+    with inst.mede_etapa("teste", df) as etapa:
+        etapa["saida"] = {"a": df.head(3), "b": df.head(2)}
+
+    with open(arquivo) as f:
+        registros = [json.loads(linha) for linha in f]
+
+    assert len(registros) == 1
+    reg = registros[0]
+    assert reg["etapa"] == "teste"
+    assert reg["status"] == "ok"
+    assert reg["linhas_entrada"] == 10
+    assert reg["linhas_saida"] == 5
+    assert reg["bytes_entrada"] > 0
+    assert reg["bytes_saida"] > 0
+    assert reg["tempo_parede"] >= 0
+    assert reg["tempo_cpu"] >= 0
+    assert "saida" not in reg
+
+
+def test_mede_etapa_erro(arquivo: Path) -> None:
+    with pytest.raises(ValueError):
+        with inst.mede_etapa("erro"):
+            raise ValueError("falhou")
+
+    assert inst.carrega_metricas(arquivo)[0]["status"] == "erro"
+
+
+def test_instrumenta(arquivo: Path) -> None:
+    class Objeto:
+        @inst.instrumenta()
+        def no_lugar(self, base: pd.DataFrame) -> None:
+            base["B"] = 1
+
+    @inst.instrumenta("filtra")
+    def filtra(base: pd.DataFrame) -> pd.DataFrame:
+        return base.head(4)
+
+    df = pd.DataFrame({"A": range(10)})
+    Objeto().no_lugar(df)
+    assert len(filtra(df)) == 4
+
+    registros = inst.carrega_metricas()
+    assert [r["etapa"] for r in registros] == ["Objeto.no_lugar", "filtra"]
+    assert [r["linhas_saida"] for r in registros] == [10, 4]
+
+
+def test_resume_metricas() -> None:
+    registros = [
+        dict(etapa="a", tempo_parede=1.0, tempo_cpu=0.5, pico_memoria=2 * 1024**2),
+        dict(etapa="b", tempo_parede=3.0, tempo_cpu=3.0, linhas_entrada=5),
+        dict(etapa="a", tempo_parede=1.5, tempo_cpu=1.0, pico_memoria=1024**2),
+    ]
+    resumo = inst.resume_metricas(registros)
+
+    assert list(resumo.index) == ["b", "a"]
+    assert list(resumo["execucoes"]) == [1, 2]
+    assert resumo.loc["a", "tempo_parede"] == 2.5
+    assert resumo.loc["a", "pico_memoria_mb"] == 2.0
+    assert resumo.loc["b", "linhas_entrada"] == 5
+    assert inst.resume_metricas([]).empty
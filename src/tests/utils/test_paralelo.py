@@ -0,0 +1,62 @@
+import pyarrow as pa
+import pytest
+
+from src.utils.paralelo import executa_em_paralelo
+from src.utils.paralelo import interpreta_anos
+from src.utils.paralelo import limita_threads
+from src.utils.paralelo import obtem_threads
+
+_BASE = 0
+
+
+def _inicializa(base: int) -> None:
+    global _BASE
+    _BASE = base
+
+
+def _soma(x: int) -> int:
+    if x < 0:
+        raise ValueError("Valor negativo")
+    return x + _BASE
+
+
+def test_interpreta_anos() -> None:
+    assert interpreta_anos("2019") == [2019]
+    assert interpreta_anos("2007-2010") == [2007, 2008, 2009, 2010]
+    assert interpreta_anos("2015,2007-2008, 2015") == [2007, 2008, 2015]
+
+    for invalido in ["", "ultimo", "2010-2007", "2007-"]:
+        with pytest.raises(ValueError):
+            interpreta_anos(invalido)
+
+
+@pytest.mark.parametrize("processos", [1, 2])
+def test_executa_em_paralelo(processos: int) -> None:
+    res = executa_em_paralelo(
+        func=_soma,
+        tarefas={i: (i,) for i in [-1, 1, 2, 3]},
+        processos=processos,
+        memoria=10,
+        estimativas={i: 6 for i in [-1, 1, 2, 3]},
+        inicializador=_inicializa,
+        args_inicializador=(10,),
+    )
+
+    assert set(res) == {-1, 1, 2, 3}
+    assert isinstance(res[-1], ValueError)
+    assert [res[i] for i in [1, 2, 3]] == [11, 12, 13]
+
+
+def _threads() -> tuple:
+    return obtem_threads(), pa.cpu_count()
+
+
+def test_limita_threads() -> None:
+    res = executa_em_paralelo(
+        func=_threads,
+        tarefas={i: () for i in range(2)},
+        processos=2,
+        inicializador=limita_threads,
+        args_inicializador=(1,),
+    )
+    assert res == {0: (1, 1), 1: (1, 1)}
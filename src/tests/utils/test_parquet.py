@@ -0,0 +1,118 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.utils.parquet import carrega_perfil
+from src.utils.parquet import escreve_parquet
+from src.utils.parquet import escreve_parquet_blocos
+from src.utils.parquet import schema_pandas
+
+
+def test_carrega_perfil() -> None:
+    padrao = carrega_perfil()
+    escola = carrega_perfil("escola.parquet")
+
+    assert carrega_perfil("nao_existe") == padrao
+    assert escola["ORDENAR"] == ["CO_MUNICIPIO", "ID_ESCOLA"]
+    assert escola["COMPRESSAO"] == padrao["COMPRESSAO"]
+
+
+def test_escreve_parquet(test_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    n = 100_000
+    df = pd.DataFrame(
+        dict(
+            ID_ESCOLA=rng.permutation(n) + 11000000,
+            CO_MUNICIPIO=rng.integers(1100015, 5300108, n),
+            NO_ENTIDADE=[f"ESCOLA {i}" for i in range(n)],
+            TP_DEPENDENCIA=pd.Categorical(
+                rng.choice(["FEDERAL", "ESTADUAL", "MUNICIPAL", "PRIVADA"], n)
+            ),
+            PC_ALUNO_FEMININO=rng.random(n).astype("float32"),
+            NU_TURMAS=rng.integers(1, 20, n).astype("int16"),
+        )
+    )
+    caminho = test_path / "parquet/dm_escola.parquet"
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    escreve_parquet(df, caminho, "dm_escola", index=False)
+
+    # os dados são os mesmos, ordenados pela chave do perfil
+    lido = pd.read_parquet(caminho)
+    esperado = df.sort_values(["CO_MUNICIPIO", "ID_ESCOLA"], ignore_index=True)
+    pd.testing.assert_frame_equal(lido, esperado)
+
+    meta = pq.ParquetFile(caminho).metadata
+    perfil = carrega_perfil("dm_escola")
+    assert meta.num_row_groups == int(np.ceil(n / perfil["LINHAS_GRUPO"]))
+
+    colunas = {meta.schema.column(i).name: i for i in range(meta.num_columns)}
+    grupo = meta.row_group(0)
+    assert grupo.column(colunas["NO_ENTIDADE"]).compression == "ZSTD"
+    assert grupo.column(colunas["PC_ALUNO_FEMININO"]).compression == "UNCOMPRESSED"
+    assert grupo.column(colunas["TP_DEPENDENCIA"]).compression == "SNAPPY"
+    assert not grupo.column(colunas["PC_ALUNO_FEMININO"]).has_dictionary_page
+    assert grupo.column(colunas["TP_DEPENDENCIA"]).has_dictionary_page
+
+    # as contagens inteiras continuam comprimidas e com dicionário
+    assert grupo.column(colunas["NU_TURMAS"]).compression == "SNAPPY"
+    assert grupo.column(colunas["NU_TURMAS"]).has_dictionary_page
+
+    # uma leitura filtrada por município só precisa de um grupo de linhas
+    municipio = int(esperado["CO_MUNICIPIO"].iloc[n // 2])
+    grupos = [
+        i
+        for i in range(meta.num_row_groups)
+        if meta.row_group(i).column(colunas["CO_MUNICIPIO"]).statistics.min
+        <= municipio
+        <= meta.row_group(i).column(colunas["CO_MUNICIPIO"]).statistics.max
+    ]
+    assert len(grupos) == 1
+
+
+def test_escreve_parquet_blocos(test_path: Path) -> None:
+    # a primeira escola não possuí nome nem nota
+    blocos = [
+        pd.DataFrame(
+            dict(
+                CO_MUNICIPIO=[1, 2],
+                ID_ESCOLA=[1, 2],
+                NO_ENTIDADE=pd.Series([None, None], dtype="object"),
+                NU_NOTA=pd.Series([None, None], dtype="object"),
+            )
+        ),
+        pd.DataFrame(
+            dict(
+                CO_MUNICIPIO=[3],
+                ID_ESCOLA=[3],
+                NO_ENTIDADE=["ESCOLA 3"],
+                NU_NOTA=[5.5],
+            )
+        ),
+    ]
+    caminho = test_path / "parquet/dm_escola_blocos.parquet"
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+
+    # o schema do primeiro bloco não comporta os valores dos demais
+    with pytest.raises((pa.ArrowInvalid, pa.ArrowTypeError)):
+        escreve_parquet_blocos(blocos, caminho, "dm_escola", index=False)
+
+    estrutura = pd.DataFrame(
+        dict(
+            CO_MUNICIPIO=pd.Series([], dtype="int64"),
+            ID_ESCOLA=pd.Series([], dtype="int64"),
+            NO_ENTIDADE=pd.Series([], dtype="object"),
+            NU_NOTA=pd.Series([], dtype="float64"),
+        )
+    )
+    schema = schema_pandas(estrutura, index=False)
+    assert schema.field("NO_ENTIDADE").type == pa.string()
+    escreve_parquet_blocos(blocos, caminho, "dm_escola", index=False, schema=schema)
+
+    assert pq.read_schema(caminho).remove_metadata() == schema.remove_metadata()
+    lido = pd.read_parquet(caminho)
+    assert lido["NO_ENTIDADE"].tolist() == [None, None, "ESCOLA 3"]
+    assert lido["NU_NOTA"].iloc[2] == 5.5
@@ -1,13 +1,94 @@
+import contextlib
+import http.server
 import os
+import threading
+import typing
 from io import BytesIO
 from pathlib import Path
 
 import bs4
+import pytest
+import requests
 
+import src.utils.web as web
 from src.utils.web import download_dados_web
 from src.utils.web import obtem_pagina
 
 
+class _Manipulador(http.server.BaseHTTPRequestHandler):
+    pedidos: typing.List[typing.Tuple[str, typing.Optional[str]]] = list()
+    falhas: int = 0
+
+    def do_GET(self) -> None:
+        self.pedidos.append((self.path, self.headers.get("If-None-Match")))
+        if self.falhas > 0:
+            type(self).falhas -= 1
+            self.send_error(503)
+        elif self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+        else:
+            corpo = f"<html><title>{self.path}</title></html>".encode()
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    def log_message(self, *args: typing.Any) -> None:
+        pass
+
+
+@contextlib.contextmanager
+def servidor() -> typing.Generator[typing.Tuple[str, type], None, None]:
+    manipulador = type("Manipulador", (_Manipulador,), dict(pedidos=list()))
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{srv.server_address[1]}", manipulador
+    finally:
+        srv.shutdown()
+        srv.server_close()
+        thread.join()
+
+
+def test_obtem_paginas_cache() -> None:
+    with servidor() as (url, manipulador):
+        urls = [f"{url}/{i}" for i in range(5)] + [f"{url}/0"]
+        paginas = web.obtem_paginas(urls)
+        assert [p.find("title").text for p in paginas] == [
+            f"/{i}" for i in [0, 1, 2, 3, 4, 0]
+        ]
+        assert len(manipulador.pedidos) == 5
+
+        # as respostas recentes são servidas pelo cache
+        web.obtem_paginas(urls)
+        assert len(manipulador.pedidos) == 5
+
+        # as antigas são revalidadas pelo ETag
+        paginas = web.obtem_paginas(urls, validade=0)
+        assert paginas[1].find("title").text == "/1"
+        assert sorted(manipulador.pedidos[5:]) == [(f"/{i}", '"v1"') for i in range(5)]
+
+
+def test_obtem_conteudo_retentativas(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(web, "ESPERA_RETENTATIVA", 0.0)
+    with servidor() as (url, manipulador):
+        manipulador.falhas = 2
+        assert b"/a" in web.obtem_conteudo(f"{url}/a", tentativas=3)
+        assert len(manipulador.pedidos) == 3
+
+        # sem cache as falhas são propagadas
+        manipulador.falhas = 3
+        with pytest.raises(requests.HTTPError):
+            web.obtem_conteudo(f"{url}/b", tentativas=3)
+
+        # com cache a última resposta é utilizada
+        manipulador.falhas = 3
+        assert b"/a" in web.obtem_conteudo(f"{url}/a", validade=0, tentativas=3)
+
+
 def test_obtem_pagina():
     pg = obtem_pagina("https://www.google.com/")
     assert isinstance(pg, bs4.BeautifulSoup)
@@ -1,3 +1,6 @@
+import copy
+import functools
+import os
 import typing
 from pathlib import Path
 
@@ -7,28 +10,66 @@ import yaml
 CAMINHO_INFO = Path(__file__).parent.parent / "info"
 
 
+@functools.lru_cache(maxsize=None)
+def _le_yaml(caminho: Path, modificado: int) -> typing.Dict[str, typing.Any]:
+    """
+    Lê um arquivo YAML, guardando o resultado pelo processo enquanto o
+    arquivo não for modificado
+
+    :param caminho: caminho do arquivo
+    :param modificado: data de modificação do arquivo (parte da chave do cache)
+    :return: dicionário com conteúdo do arquivo
+    """
+    with open(caminho, "r", encoding="UTF-8") as f:
+        return yaml.load(f, Loader=yaml.FullLoader)
+
+
+@functools.lru_cache(maxsize=None)
+def _le_planilha(
+    caminho: Path, modificado: int, sheet_name: typing.Union[str, int]
+) -> pd.DataFrame:
+    """
+    Lê uma planilha de um arquivo excel, guardando o resultado pelo processo
+    enquanto o arquivo não for modificado
+
+    :param caminho: caminho do arquivo
+    :param modificado: data de modificação do arquivo (parte da chave do cache)
+    :param sheet_name: nome ou posição da planilha
+    :return: data frame pandas com conteúdo
+    """
+    return pd.read_excel(caminho, sheet_name=sheet_name)
+
+
 def carrega_yaml(nome_yaml: str) -> typing.Dict[str, typing.Any]:
     """
-    Carrega arquivo YAML da pasta info da ferramenta
+    Carrega arquivo YAML da pasta info da ferramenta. O arquivo é lido uma
+    única vez por processo (ex: pelos ETLs de vários anos de uma tabela)
 
     :param nome_yaml: nome do arquivo yaml
     :return: dicionário com conteúdo do arquivo
     """
     global CAMINHO_INFO
-    with open(CAMINHO_INFO / f"{nome_yaml}", "r", encoding="UTF-8") as f:
-        return yaml.load(f, Loader=yaml.FullLoader)
+    caminho = CAMINHO_INFO / f"{nome_yaml}"
+    return copy.deepcopy(_le_yaml(caminho, os.stat(caminho).st_mtime_ns))
 
 
 def carrega_excel(nome_excel: str, **kwargs) -> pd.DataFrame:
     """
-    Carrega arquivo excel da pasta info da ferramenta
+    Carrega arquivo excel da pasta info da ferramenta. Quando apenas a
+    planilha é informada ela é lida uma única vez por processo
 
     :param nome_excel: nome do arquivo excel
     :param kwargs: argumentos de carregamento
     :return: data frame pandas com conteúdo
     """
     global CAMINHO_INFO
-    return pd.read_excel(CAMINHO_INFO / nome_excel, **kwargs)
+    caminho = CAMINHO_INFO / nome_excel
+    if set(kwargs).issubset({"sheet_name"}) and isinstance(
+        kwargs.get("sheet_name", 0), (str, int)
+    ):
+        modificado = os.stat(caminho).st_mtime_ns
+        return _le_planilha(caminho, modificado, kwargs.get("sheet_name", 0)).copy()
+    return pd.read_excel(caminho, **kwargs)
 
 
 def carrega_csv(nome_csv: str, **kwargs) -> pd.DataFrame:
@@ -0,0 +1,254 @@
+import contextlib
+import functools
+import json
+import logging
+import os
+import sys
+import time
+import typing
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (windows)
+    resource = None  # type: ignore
+
+# arquivo JSON lines onde as métricas das etapas são exportadas
+_ARQUIVO: typing.Optional[Path] = None
+
+# métricas registradas no processo atual
+_REGISTROS: typing.List[typing.Dict[str, typing.Any]] = list()
+
+
+def configura_metricas(arquivo: typing.Union[str, Path, None]) -> None:
+    """
+    Configura o arquivo JSON lines que receberá as métricas das etapas
+    e limpa as métricas registradas no processo
+
+    :param arquivo: caminho do arquivo de métricas (None desativa a exportação)
+    """
+    global _ARQUIVO
+    _ARQUIVO = Path(arquivo) if arquivo is not None else None
+    _REGISTROS.clear()
+
+
+def obtem_pico_memoria() -> typing.Optional[int]:
+    """
+    Obtém o pico de memória residente (RSS) do processo atual. No linux
+    utilizamos o VmHWM, que ao contrário do ru_maxrss não herda o pico
+    do processo pai quando o processo é criado por spawn
+
+    :return: pico de memória em bytes ou None se não for possível medir
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # o linux informa o valor em KB e o macOS em bytes
+    return int(pico) if sys.platform == "darwin" else int(pico) * 1024
+
+
+def mede_tamanho(
+    obj: typing.Any,
+) -> typing.Tuple[typing.Optional[int], typing.Optional[int]]:
+    """
+    Mede o número de linhas e o tamanho em memória (sem considerar o conteúdo
+    das colunas de objetos) de um data frame ou dicionário de data frames
+
+    :param obj: objeto a ser medido
+    :return: tupla com número de linhas e bytes (None se não for medível)
+    """
+    if isinstance(obj, pd.DataFrame):
+        return len(obj), int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, dict):
+        medidas = [mede_tamanho(v) for v in obj.values()]
+        medidas = [m for m in medidas if m[0] is not None]
+        if len(medidas) > 0:
+            return (
+                sum(m[0] for m in medidas),  # type: ignore
+                sum(m[1] for m in medidas),  # type: ignore
+            )
+    return None, None
+
+
+def registra_metrica(registro: typing.Dict[str, typing.Any]) -> None:
+    """
+    Registra as métricas de uma etapa no processo e no arquivo de métricas
+
+    :param registro: dicionário com as métricas da etapa
+    """
+    _REGISTROS.append(registro)
+    if _ARQUIVO is not None:
+        with open(_ARQUIVO, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, default=str) + "\n")
+
+
+@contextlib.contextmanager
+def mede_etapa(
+    nome: str, entrada: typing.Any = None
+) -> typing.Generator[typing.Dict[str, typing.Any], None, None]:
+    """
+    Mede o tempo de parede, o tempo de CPU, o pico de memória e o tamanho
+    dos dados de entrada e saída de uma etapa.
+
+    O dicionário retornado pode receber a chave "saida" com o data frame
+    (ou dicionário de data frames) gerado pela etapa
+
+    :param nome: nome da etapa
+    :param entrada: data frame ou dicionário de data frames de entrada
+    :return: dicionário com as métricas da etapa
+    """
+    linhas, tamanho = mede_tamanho(entrada)
+    registro: typing.Dict[str, typing.Any] = dict(
+        etapa=nome,
+        inicio=datetime.now().isoformat(timespec="seconds"),
+        pid=os.getpid(),
+        linhas_entrada=linhas,
+        bytes_entrada=tamanho,
+    )
+    pico_inicial = obtem_pico_memoria()
+    parede = time.perf_counter()
+    cpu = time.process_time()
+    status = "erro"
+    try:
+        yield registro
+        status = "ok"
+    finally:
+        linhas, tamanho = mede_tamanho(registro.pop("saida", None))
+        pico = obtem_pico_memoria()
+        registro.update(
+            status=status,
+            tempo_parede=time.perf_counter() - parede,
+            tempo_cpu=time.process_time() - cpu,
+            pico_memoria=pico,
+            aumento_pico_memoria=(
+                pico - pico_inicial
+                if pico is not None and pico_inicial is not None
+                else None
+            ),
+            linhas_saida=linhas,
+            bytes_saida=tamanho,
+        )
+        registra_metrica(registro)
+
+
+def instrumenta(
+    nome: typing.Optional[str] = None,
+) -> typing.Callable[[typing.Callable], typing.Callable]:
+    """
+    Cria um decorador que mede a execução da função com mede_etapa.
+
+    A entrada é o primeiro data frame (ou dicionário) passado para a função
+    e a saída é o seu retorno; funções que alteram a base no lugar e não
+    retornam nada têm a própria entrada medida como saída. Em métodos o nome
+    da etapa é prefixado pelo nome da classe do objeto
+
+    :param nome: nome da etapa (padrão é o nome da função)
+    :return: decorador
+    """
+
+    def decorador(func: typing.Callable) -> typing.Callable:
+        @functools.wraps(func)
+        def func_medida(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            etapa = nome or func.__qualname__
+            if nome is None and "." in func.__qualname__ and len(args) > 0:
+                etapa = f"{type(args[0]).__name__}.{func.__name__}"
+            entrada = next(
+                (
+                    a
+                    for a in list(args) + list(kwargs.values())
+                    if isinstance(a, (pd.DataFrame, dict))
+                ),
+                None,
+            )
+            with mede_etapa(etapa, entrada) as registro:
+                res = func(*args, **kwargs)
+                registro["saida"] = (
+                    res if isinstance(res, (pd.DataFrame, dict)) else entrada
+                )
+            return res
+
+        return func_medida
+
+    return decorador
+
+
+def carrega_metricas(
+    arquivo: typing.Union[str, Path, None] = None
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Carrega as métricas de um arquivo JSON lines. Se nenhum arquivo for
+    informado utiliza o arquivo configurado ou as métricas do processo
+
+    :param arquivo: caminho do arquivo de métricas
+    :return: lista de métricas por etapa
+    """
+    arquivo = arquivo if arquivo is not None else _ARQUIVO
+    if arquivo is None or not Path(arquivo).exists():
+        return list(_REGISTROS)
+    with open(arquivo, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip() != ""]
+
+
+def resume_metricas(
+    registros: typing.Optional[typing.List[typing.Dict[str, typing.Any]]] = None
+) -> pd.DataFrame:
+    """
+    Gera a tabela resumo das métricas por etapa, ordenada pelo tempo total
+
+    :param registros: lista de métricas (padrão são as métricas da execução)
+    :return: data frame com uma linha por etapa
+    """
+    colunas = [
+        "execucoes",
+        "tempo_parede",
+        "tempo_cpu",
+        "pico_memoria_mb",
+        "linhas_entrada",
+        "linhas_saida",
+    ]
+    registros = carrega_metricas() if registros is None else registros
+    if len(registros) == 0:
+        return pd.DataFrame(columns=colunas, index=pd.Index([], name="etapa"))
+
+    df = pd.DataFrame(registros)
+    for c in ["pico_memoria", "linhas_entrada", "linhas_saida"]:
+        df[c] = pd.to_numeric(df.get(c), errors="coerce")
+    return (
+        df.groupby("etapa", sort=False)
+        .agg(
+            execucoes=("etapa", "size"),
+            tempo_parede=("tempo_parede", "sum"),
+            tempo_cpu=("tempo_cpu", "sum"),
+            pico_memoria_mb=("pico_memoria", "max"),
+            linhas_entrada=("linhas_entrada", lambda s: s.sum(min_count=1)),
+            linhas_saida=("linhas_saida", lambda s: s.sum(min_count=1)),
+        )
+        .assign(pico_memoria_mb=lambda f: f["pico_memoria_mb"] / 1024**2)
+        .sort_values("tempo_parede", ascending=False)[colunas]
+    )
+
+
+def imprime_resumo(
+    registros: typing.Optional[typing.List[typing.Dict[str, typing.Any]]] = None
+) -> None:
+    """
+    Exporta para o log a tabela resumo das métricas por etapa
+
+    :param registros: lista de métricas (padrão são as métricas da execução)
+    """
+    resumo = resume_metricas(registros)
+    if len(resumo) > 0:
+        logging.getLogger(__name__).info(
+            "Resumo das etapas executadas:\n"
+            + resumo.to_string(float_format=lambda v: f"{v:.2f}")
+        )
@@ -5,6 +5,8 @@ import typing
 from datetime import datetime
 from pathlib import Path
 
+from src.utils.instrumentacao import configura_metricas
+
 
 def configura_logs(
     formato: str = "{asctime} {levelname} ({module}:{lineno:d}) {message}",
@@ -13,7 +15,8 @@ def configura_logs(
 ) -> str:
     """
     Inicia os objetos Logger e realiza as configurações de formatação,
-    nível e saída do log
+    nível e saída do log. Quando o log é exportado para arquivo, as métricas
+    das etapas são exportadas para um arquivo JSON lines ao lado do log
 
     :param formato: formatação dos logs
     :param arquivo: flag se devemos criar um stream para um arquivo
@@ -58,6 +61,9 @@ def configura_logs(
         fhandler.setFormatter(formatter)
         logger_raiz.addHandler(fhandler)
 
+        # configura o arquivo de métricas das etapas
+        configura_metricas(log_dir / f"{chave_de_execucao}.jsonl")
+
     # exporta o primeiro log
     logger = logging.getLogger(__name__)
     logger.info(f"Inicializando execução {chave_de_execucao}")
@@ -0,0 +1,198 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import typing
+from pathlib import Path
+
+# hashes já calculados pelo processo: (caminho, tamanho, modificação) -> hash
+_HASHES: typing.Dict[typing.Tuple[str, int, int], str] = dict()
+
+
+def impressao_arquivo(caminho: typing.Union[str, Path]) -> typing.Dict[str, int]:
+    """
+    Obtém a impressão barata de um arquivo (tamanho e data de modificação),
+    que pode ser comparada sem ler o seu conteúdo
+
+    :param caminho: caminho do arquivo
+    :return: dicionário com o tamanho e a data de modificação em nanossegundos
+    """
+    info = os.stat(caminho)
+    return dict(tamanho=info.st_size, modificado_ns=info.st_mtime_ns)
+
+
+def hash_arquivo(caminho: typing.Union[str, Path]) -> str:
+    """
+    Calcula o hash SHA-1 do conteúdo de um arquivo. O hash é guardado pelo
+    processo enquanto o arquivo não for modificado, de forma que os ETLs que
+    compartilham uma entrada (ex: as tabelas do censo) o calculam uma vez
+
+    :param caminho: caminho do arquivo
+    :return: hash hexadecimal
+    """
+    impressao = impressao_arquivo(caminho)
+    chave = (str(caminho), impressao["tamanho"], impressao["modificado_ns"])
+    if chave not in _HASHES:
+        sha = hashlib.sha1()
+        with open(caminho, "rb") as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(bloco)
+        _HASHES[chave] = sha.hexdigest()
+    return _HASHES[chave]
+
+
+def hash_objeto(obj: typing.Any) -> str:
+    """
+    Calcula o hash SHA-1 de um objeto serializável em JSON (ex: configurações)
+
+    :param obj: objeto a ser serializado
+    :return: hash hexadecimal
+    """
+    texto = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def versao_codigo(classe: type) -> str:
+    """
+    Calcula a versão do código de uma classe como o hash dos arquivos fonte
+    do projeto que definem a classe e as suas classes base
+
+    :param classe: classe a ser versionada
+    :return: hash hexadecimal
+    """
+    sha = hashlib.sha1()
+    arquivos = {
+        inspect.getsourcefile(c)
+        for c in classe.__mro__
+        if c.__module__.split(".")[0] == "src"
+    }
+    for arq in sorted(a for a in arquivos if a is not None):
+        with open(arq, "rb") as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def impressoes_pasta(
+    caminho: Path, sufixo: str = ".parquet"
+) -> typing.Dict[str, typing.Dict[str, int]]:
+    """
+    Lista as impressões dos arquivos de dados de uma pasta e das suas
+    sub-pastas (ex: partições por UF), com os caminhos relativos à pasta.
+    Os demais arquivos (ex: índices gerados pelo datamart) são ignorados
+
+    :param caminho: pasta a ser listada
+    :param sufixo: extensão dos arquivos de dados
+    :return: dicionário com o caminho relativo e a impressão de cada arquivo
+    """
+    return {
+        str((Path(raiz) / a).relative_to(caminho)): impressao_arquivo(Path(raiz) / a)
+        for raiz, _, arquivos in os.walk(caminho)
+        for a in sorted(arquivos)
+        if a.endswith(sufixo)
+    }
+
+
+def escreve_manifesto(caminho: Path, manifesto: typing.Dict[str, typing.Any]) -> None:
+    """
+    Escreve um manifesto em JSON substituindo o anterior apenas quando o
+    novo estiver completo
+
+    :param caminho: caminho do manifesto
+    :param manifesto: conteúdo do manifesto
+    """
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temp = caminho.with_name(f".{caminho.name}.{os.getpid()}")
+    with open(temp, "w") as f:
+        json.dump(manifesto, f, indent=2, default=str)
+    os.replace(temp, caminho)
+
+
+def le_manifesto(caminho: Path) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """
+    Lê um manifesto
+
+    :param caminho: caminho do manifesto
+    :return: conteúdo do manifesto ou None caso ele não exista ou seja inválido
+    """
+    try:
+        with open(caminho) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def entradas_atualizadas(
+    registradas: typing.Dict[str, typing.Dict[str, typing.Any]],
+    caminhos: typing.Sequence[Path],
+) -> bool:
+    """
+    Verifica se os arquivos de entrada são os mesmos registrados no manifesto.
+    Os arquivos com a mesma impressão são considerados iguais e apenas os que
+    mudaram de tamanho ou data de modificação têm o seu hash recalculado.
+    Entradas removidas após o processamento não invalidam as saídas
+
+    :param registradas: entradas registradas no manifesto
+    :param caminhos: arquivos de entrada atuais
+    :return: True se as entradas não mudaram
+    """
+    for caminho in caminhos:
+        if not caminho.exists():
+            continue
+        reg = registradas.get(str(caminho))
+        if reg is None:
+            return False
+        impressao = impressao_arquivo(caminho)
+        if all(reg.get(k) == v for k, v in impressao.items()):
+            continue
+        if reg.get("sha1") != hash_arquivo(caminho):
+            return False
+    return True
+
+
+def saidas_existem(
+    registradas: typing.Dict[str, typing.Dict[str, typing.Any]],
+    mesmas: bool = False,
+) -> bool:
+    """
+    Verifica se os arquivos de saída registrados no manifesto existem,
+    consultando cada arquivo diretamente ao invés de listar as pastas
+
+    :param registradas: saídas registradas no manifesto
+    :param mesmas: se True os arquivos também devem ter a mesma impressão
+    :return: True se todas as saídas existem
+    """
+    for saida in registradas.values():
+        if len(saida["arquivos"]) == 0:
+            return False
+        for arq, impressao in saida["arquivos"].items():
+            try:
+                atual = impressao_arquivo(Path(saida["caminho"]) / arq)
+            except FileNotFoundError:
+                return False
+            if mesmas and atual != impressao:
+                return False
+    return True
+
+
+def descreve_saida(
+    caminho: Path, df: typing.Any = None
+) -> typing.Dict[str, typing.Any]:
+    """
+    Descreve uma saída de um ETL para o manifesto: os arquivos gravados, o
+    número de linhas e o esquema (colunas e tipos) do data frame exportado
+
+    :param caminho: pasta ou arquivo da saída
+    :param df: data frame exportado (None caso não esteja disponível)
+    :return: dicionário com a descrição da saída
+    """
+    if caminho.is_dir():
+        raiz, arquivos = caminho, impressoes_pasta(caminho)
+    else:
+        raiz, arquivos = caminho.parent, {caminho.name: impressao_arquivo(caminho)}
+    descricao: typing.Dict[str, typing.Any] = dict(caminho=str(raiz), arquivos=arquivos)
+    if df is not None:
+        descricao["linhas"] = len(df)
+        descricao["esquema"] = {str(c): str(t) for c, t in df.dtypes.items()}
+    return descricao
@@ -0,0 +1,147 @@
+import logging
+import os
+import typing
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+
+# número de threads de cada processo nas etapas com paralelismo interno
+# (descompactação dos arquivos rar e pyarrow). None utiliza todos os processadores
+_THREADS: typing.Optional[int] = None
+
+
+def interpreta_anos(anos: str) -> typing.List[int]:
+    """
+    Converte uma string com anos em uma lista ordenada de anos.
+    São aceitos intervalos (2007-2021), listas (2007,2009,2011)
+    e combinações de ambos (2007-2010,2015)
+
+    :param anos: string com os anos a serem processados
+    :return: lista ordenada de anos sem repetições
+    """
+    lista: typing.Set[int] = set()
+    for parte in anos.replace(" ", "").split(","):
+        if parte == "":
+            continue
+        if "-" in parte:
+            inicio, fim = parte.split("-", 1)
+            if not (inicio.isnumeric() and fim.isnumeric()) or int(inicio) > int(fim):
+                raise ValueError(f"Não conseguimos processar o intervalo {parte}")
+            lista.update(range(int(inicio), int(fim) + 1))
+        elif parte.isnumeric():
+            lista.add(int(parte))
+        else:
+            raise ValueError(f"Não conseguimos processar ano={parte}")
+
+    if len(lista) == 0:
+        raise ValueError(f"Nenhum ano foi informado em {anos}")
+    return sorted(lista)
+
+
+def limita_threads(threads: int) -> None:
+    """
+    Limita as threads do processo nas etapas com paralelismo interno. É
+    utilizado como inicializador dos pools de processos para que o total de
+    threads (processos * threads) não ultrapasse o número de processadores
+
+    :param threads: número máximo de threads do processo
+    """
+    import pyarrow as pa
+
+    global _THREADS
+    _THREADS = max(threads, 1)
+    pa.set_cpu_count(_THREADS)
+
+
+def obtem_threads() -> int:
+    """
+    Obtém o número de threads que o processo pode utilizar
+
+    :return: número de threads
+    """
+    return _THREADS or os.cpu_count() or 1
+
+
+def executa_em_paralelo(
+    func: typing.Callable[..., typing.Any],
+    tarefas: typing.Dict[typing.Any, typing.Tuple[typing.Any, ...]],
+    processos: typing.Optional[int] = None,
+    memoria: typing.Optional[float] = None,
+    estimativas: typing.Optional[typing.Dict[typing.Any, float]] = None,
+    inicializador: typing.Optional[typing.Callable[..., None]] = None,
+    args_inicializador: typing.Tuple[typing.Any, ...] = (),
+) -> typing.Dict[typing.Any, typing.Any]:
+    """
+    Executa uma função para cada conjunto de argumentos em {tarefas} utilizando
+    um pool de processos.
+
+    Quando um orçamento de {memoria} é informado, uma nova tarefa só é submetida
+    se a soma das {estimativas} das tarefas em execução couber no orçamento
+    (sempre permitindo ao menos uma tarefa em execução)
+
+    As falhas são isoladas por tarefa: a exceção gerada é registrada no log
+    e devolvida no dicionário de resultados no lugar do retorno da função
+
+    :param func: função a ser executada (deve poder ser serializada pelo pickle)
+    :param tarefas: dicionário com chave da tarefa e tupla de argumentos
+    :param processos: número máximo de processos (padrão é o número de CPUs)
+    :param memoria: orçamento de memória em bytes
+    :param estimativas: estimativa de memória em bytes por chave de tarefa
+    :param inicializador: função executada uma vez em cada processo
+    :param args_inicializador: argumentos passados ao inicializador
+    :return: dicionário com chave da tarefa e resultado (ou exceção)
+    """
+    logger = logging.getLogger(__name__)
+    processos = processos or os.cpu_count() or 1
+    estimativas = estimativas or dict()
+    resultados: typing.Dict[typing.Any, typing.Any] = dict()
+
+    # com um único processo executamos as tarefas no processo atual
+    if processos == 1:
+        if inicializador is not None:
+            inicializador(*args_inicializador)
+        for chave, args in tarefas.items():
+            try:
+                resultados[chave] = func(*args)
+            except Exception as e:
+                logger.error(f"Falha ao executar a tarefa {chave} -> {e!r}")
+                resultados[chave] = e
+        return resultados
+
+    pendentes = list(tarefas)
+    with ProcessPoolExecutor(
+        max_workers=processos,
+        initializer=inicializador,
+        initargs=args_inicializador,
+    ) as pool:
+        em_execucao: typing.Dict[Future, typing.Any] = dict()
+        uso = 0.0
+        while len(pendentes) > 0 or len(em_execucao) > 0:
+            # submete as tarefas que cabem no orçamento de memória
+            while len(pendentes) > 0 and len(em_execucao) < processos:
+                custo = estimativas.get(pendentes[0], 0.0)
+                if (
+                    memoria is not None
+                    and len(em_execucao) > 0
+                    and uso + custo > memoria
+                ):
+                    break
+                chave = pendentes.pop(0)
+                logger.info(f"Iniciando a tarefa {chave}")
+                em_execucao[pool.submit(func, *tarefas[chave])] = chave
+                uso += custo
+
+            # aguarda a finalização de alguma tarefa para liberar o orçamento
+            feitos, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+            for fut in feitos:
+                chave = em_execucao.pop(fut)
+                uso -= estimativas.get(chave, 0.0)
+                try:
+                    resultados[chave] = fut.result()
+                    logger.info(f"Tarefa {chave} finalizada")
+                except Exception as e:
+                    logger.error(f"Falha ao executar a tarefa {chave} -> {e!r}")
+                    resultados[chave] = e
+
+    return resultados
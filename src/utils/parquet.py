@@ -0,0 +1,153 @@
+import typing
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.utils.info import carrega_yaml
+
+# perfis de escrita carregados do arquivo de configuração
+_PERFIS: typing.Optional[typing.Dict[str, typing.Dict[str, typing.Any]]] = None
+
+
+def carrega_perfil(tabela: typing.Optional[str] = None) -> typing.Dict[str, typing.Any]:
+    """
+    Carrega o perfil de escrita parquet de uma tabela, completando os
+    campos não definidos com o perfil padrão
+
+    :param tabela: nome da base (ex: escola, depara_docente_turma, dm_escola)
+    :return: dicionário com o perfil de escrita
+    """
+    global _PERFIS
+    if _PERFIS is None:
+        _PERFIS = carrega_yaml("perfis_parquet.yml")
+    tabela = (tabela or "padrao").replace(".parquet", "")
+    return {**_PERFIS["padrao"], **_PERFIS.get(tabela, dict())}
+
+
+def ordena_tabela(tabela: pa.Table, perfil: typing.Dict[str, typing.Any]) -> pa.Table:
+    """
+    Ordena uma tabela arrow pelas colunas de ordenação do perfil
+    que estiverem presentes na tabela
+
+    :param tabela: tabela a ser ordenada
+    :param perfil: perfil de escrita
+    :return: tabela ordenada
+    """
+    ordenar = [c for c in perfil["ORDENAR"] if c in tabela.column_names]
+    if len(ordenar) == 0 or tabela.num_rows == 0:
+        return tabela
+    return tabela.sort_by([(c, "ascending") for c in ordenar])
+
+
+def opcoes_escrita(
+    schema: pa.Schema, perfil: typing.Dict[str, typing.Any]
+) -> typing.Dict[str, typing.Any]:
+    """
+    Gera as opções de escrita do pyarrow para um schema: colunas de texto
+    são comprimidas com COMPRESSAO_TEXTO, colunas de ponto flutuante de
+    perfis de ALTA_ENTROPIA não são comprimidas nem codificadas por
+    dicionário e as demais colunas (incluindo as categóricas e as contagens
+    inteiras) usam COMPRESSAO com dicionário
+
+    :param schema: schema da tabela a ser escrita
+    :param perfil: perfil de escrita
+    :return: dicionário de argumentos para pq.write_table / pq.ParquetWriter
+    """
+    compressao = dict()
+    dicionario = list()
+    for campo in schema:
+        if perfil["ALTA_ENTROPIA"] and pa.types.is_floating(campo.type):
+            compressao[campo.name] = "none"
+            continue
+        if pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type):
+            compressao[campo.name] = perfil["COMPRESSAO_TEXTO"]
+        else:
+            compressao[campo.name] = perfil["COMPRESSAO"]
+        dicionario.append(campo.name)
+    return dict(compression=compressao, use_dictionary=dicionario)
+
+
+def escreve_parquet(
+    df: pd.DataFrame,
+    caminho: typing.Union[str, Path],
+    tabela: typing.Optional[str] = None,
+    index: typing.Optional[bool] = None,
+) -> None:
+    """
+    Escreve um data frame em um arquivo parquet de acordo com o perfil de
+    escrita da {tabela}: ordenado pela chave, com grupos de linhas de tamanho
+    controlado e compressão e dicionário definidos por coluna
+
+    :param df: data frame a ser escrito
+    :param caminho: caminho do arquivo parquet
+    :param tabela: nome da base para seleção do perfil de escrita
+    :param index: se o índice deve ser escrito (None segue o padrão do pandas)
+    """
+    perfil = carrega_perfil(tabela)
+    dados = ordena_tabela(pa.Table.from_pandas(df, preserve_index=index), perfil)
+    pq.write_table(
+        dados,
+        caminho,
+        row_group_size=perfil["LINHAS_GRUPO"],
+        **opcoes_escrita(dados.schema, perfil),
+    )
+
+
+def schema_pandas(df: pd.DataFrame, index: typing.Optional[bool] = None) -> pa.Schema:
+    """
+    Gera o schema arrow dos tipos de um data frame (que pode não ter linhas).
+    As colunas sem tipo definido (object sem valores não nulos) são
+    consideradas texto
+
+    :param df: data frame com os tipos das colunas
+    :param index: se o índice deve ser incluído (None segue o padrão do pandas)
+    :return: schema arrow do data frame
+    """
+    schema = pa.Schema.from_pandas(df, preserve_index=index)
+    for i, campo in enumerate(schema):
+        if pa.types.is_null(campo.type):
+            schema = schema.set(i, campo.with_type(pa.string()))
+    return schema
+
+
+def escreve_parquet_blocos(
+    blocos: typing.Iterable[pd.DataFrame],
+    caminho: typing.Union[str, Path],
+    tabela: typing.Optional[str] = None,
+    index: typing.Optional[bool] = None,
+    schema: typing.Optional[pa.Schema] = None,
+) -> None:
+    """
+    Escreve blocos de linhas de um data frame em um único arquivo parquet
+    de acordo com o perfil de escrita da {tabela}, mantendo apenas um bloco
+    em memória por vez. Cada bloco é ordenado pela chave do perfil, portanto
+    os blocos devem estar ordenados entre si.
+
+    Sem o {schema} os tipos são os do primeiro bloco, de forma que uma coluna
+    sem valores no primeiro bloco pode não ter o tipo das demais
+
+    :param blocos: blocos de linhas com as mesmas colunas
+    :param caminho: caminho do arquivo parquet
+    :param tabela: nome da base para seleção do perfil de escrita
+    :param index: se o índice deve ser escrito (None segue o padrão do pandas)
+    :param schema: schema arrow de todos os blocos (ver schema_pandas)
+    """
+    perfil = carrega_perfil(tabela)
+    escritor: typing.Optional[pq.ParquetWriter] = None
+    try:
+        for df in blocos:
+            # sem schema os blocos seguintes utilizam o schema do primeiro bloco
+            dados = pa.Table.from_pandas(df, schema=schema, preserve_index=index)
+            if escritor is None:
+                schema = dados.schema
+                escritor = pq.ParquetWriter(
+                    caminho, schema, **opcoes_escrita(schema, perfil)
+                )
+            escritor.write_table(
+                ordena_tabela(dados, perfil), row_group_size=perfil["LINHAS_GRUPO"]
+            )
+    finally:
+        if escritor is not None:
+            escritor.close()
@@ -1,22 +1,387 @@
+import asyncio
+import collections
+import functools
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
 import typing
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlparse
 
 import bs4
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 from tqdm import tqdm
 
+from src.configs import PASTA_CACHE_WEB
 
-def obtem_pagina(url: str) -> bs4.BeautifulSoup:
+# cabeçalhos enviados em todas as requisições
+CABECALHOS: typing.Dict[str, str] = {"User-Agent": "Mozilla/5.0"}
+
+# tempo limite (s) para conectar e para receber cada bloco da resposta
+TIMEOUT: float = 30.0
+
+# número de tentativas por requisição e espera base (s) entre elas, que dobra
+# a cada tentativa e é sorteada entre 0 e o valor atual (jitter)
+TENTATIVAS: int = 4
+ESPERA_RETENTATIVA: float = 1.0
+
+# status HTTP que indicam uma falha temporária do servidor
+STATUS_RETENTATIVA: typing.Set[int] = {429, 500, 502, 503, 504}
+
+# número máximo de requisições simultâneas a um mesmo servidor
+CONEXOES_POR_HOST: int = 4
+
+# idade máxima (s) de uma resposta em cache servida sem consultar o servidor
+VALIDADE_CACHE: float = 12 * 60 * 60
+
+# pasta com as respostas das páginas em cache (None desativa o cache)
+_PASTA_CACHE: typing.Optional[Path] = Path(PASTA_CACHE_WEB)
+
+# sessão HTTP do processo, que mantém as conexões abertas com cada servidor
+_SESSAO: typing.Optional[typing.Tuple[int, requests.Session]] = None
+_TRAVA = threading.Lock()
+
+
+def configura_cache_web(pasta: typing.Union[str, Path, None]) -> None:
+    """
+    Configura a pasta com as respostas das páginas em cache
+
+    :param pasta: caminho da pasta (None desativa o cache)
+    """
+    global _PASTA_CACHE
+    _PASTA_CACHE = Path(pasta) if pasta is not None else None
+
+
+def obtem_sessao() -> requests.Session:
+    """
+    Obtém a sessão HTTP do processo, com um pool de conexões por servidor.
+    Processos filhos criam a sua própria sessão ao invés de reutilizar as
+    conexões herdadas do processo pai
+
+    :return: sessão do requests
+    """
+    global _SESSAO
+    with _TRAVA:
+        if _SESSAO is None or _SESSAO[0] != os.getpid():
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_maxsize=CONEXOES_POR_HOST)
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+            sessao.headers.update(CABECALHOS)
+            _SESSAO = (os.getpid(), sessao)
+        return _SESSAO[1]
+
+
+def _caminhos_cache(url: str) -> typing.Optional[typing.Tuple[Path, Path]]:
+    """
+    Caminhos dos arquivos de metadados e de conteúdo de uma url no cache
+
+    :param url: endereço da página
+    :return: tupla com os caminhos ou None se o cache estiver desativado
+    """
+    if _PASTA_CACHE is None:
+        return None
+    chave = hashlib.sha1(url.encode()).hexdigest()
+    return _PASTA_CACHE / f"{chave}.json", _PASTA_CACHE / f"{chave}.conteudo"
+
+
+def le_cache(
+    url: str,
+) -> typing.Optional[typing.Tuple[typing.Dict[str, typing.Any], bytes]]:
+    """
+    Lê a resposta de uma url do cache
+
+    :param url: endereço da página
+    :return: tupla com os metadados e o conteúdo ou None se não houver cache
+    """
+    caminhos = _caminhos_cache(url)
+    if caminhos is None:
+        return None
+    try:
+        with open(caminhos[0]) as f:
+            meta = json.load(f)
+        with open(caminhos[1], "rb") as f:
+            conteudo = f.read()
+    except (OSError, json.JSONDecodeError):
+        return None
+    if meta.get("url") != url or meta.get("tamanho") != len(conteudo):
+        return None
+    return meta, conteudo
+
+
+def grava_cache(
+    url: str, conteudo: bytes, cabecalhos: typing.Mapping[str, str]
+) -> None:
+    """
+    Grava a resposta de uma url no cache, com os validadores (ETag e
+    Last-Modified) enviados pelo servidor
+
+    :param url: endereço da página
+    :param conteudo: conteúdo da resposta
+    :param cabecalhos: cabeçalhos da resposta
+    """
+    caminhos = _caminhos_cache(url)
+    if caminhos is None:
+        return
+    meta = dict(
+        url=url,
+        etag=cabecalhos.get("ETag"),
+        last_modified=cabecalhos.get("Last-Modified"),
+        obtido_em=time.time(),
+        tamanho=len(conteudo),
+    )
+    caminhos[0].parent.mkdir(parents=True, exist_ok=True)
+    sufixo = f".{os.getpid()}.{threading.get_ident()}"
+    for caminho, dado in zip(caminhos, [json.dumps(meta).encode(), conteudo]):
+        temp = caminho.with_name(caminho.name + sufixo)
+        with open(temp, "wb") as f:
+            f.write(dado)
+        os.replace(temp, caminho)
+
+
+def _cabecalhos_cache(meta: typing.Dict[str, typing.Any]) -> CaseInsensitiveDict:
+    """
+    Reconstrói os validadores de uma resposta em cache como cabeçalhos
+
+    :param meta: metadados da resposta em cache
+    :return: dicionário de cabeçalhos
+    """
+    nomes = dict(etag="ETag", last_modified="Last-Modified")
+    return CaseInsensitiveDict(
+        {nome: meta[chave] for chave, nome in nomes.items() if meta[chave]}
+    )
+
+
+def obtem_conteudo(
+    url: str,
+    validade: float = VALIDADE_CACHE,
+    timeout: float = TIMEOUT,
+    tentativas: int = TENTATIVAS,
+) -> bytes:
+    """
+    Obtém o conteúdo de uma url. Respostas em cache mais novas que {validade}
+    são utilizadas diretamente e as mais antigas são revalidadas com o
+    servidor (If-None-Match / If-Modified-Since). Falhas temporárias são
+    repetidas com espera exponencial e, caso todas as tentativas falhem,
+    a resposta em cache é utilizada se existir
+
+    :param url: endereço da página
+    :param validade: idade máxima (s) da resposta em cache usada sem revalidação
+    :param timeout: tempo limite (s) da requisição
+    :param tentativas: número de tentativas
+    :return: conteúdo da resposta
+    """
+    logger = logging.getLogger(__name__)
+    cache = le_cache(url)
+    if cache is not None and time.time() - cache[0]["obtido_em"] < validade:
+        return cache[1]
+
+    cabecalhos = dict()
+    if cache is not None:
+        validadores = _cabecalhos_cache(cache[0])
+        if "ETag" in validadores:
+            cabecalhos["If-None-Match"] = validadores["ETag"]
+        if "Last-Modified" in validadores:
+            cabecalhos["If-Modified-Since"] = validadores["Last-Modified"]
+
+    falha: Exception = ValueError(f"Nenhuma tentativa de acessar {url}")
+    for tentativa in range(tentativas):
+        try:
+            resposta = obtem_sessao().get(url, headers=cabecalhos, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as erro:
+            falha = erro
+        else:
+            if resposta.status_code not in STATUS_RETENTATIVA:
+                break
+            falha = requests.HTTPError(
+                f"{resposta.status_code} ao acessar {url}", response=resposta
+            )
+        if tentativa < tentativas - 1:
+            espera = random.uniform(0, ESPERA_RETENTATIVA * 2**tentativa)
+            logger.debug(
+                f"Falha ao acessar {url} ({falha}), nova tentativa em {espera:.1f}s"
+            )
+            time.sleep(espera)
+    else:
+        if cache is not None:
+            logger.warning(f"Falha ao acessar {url} ({falha}), utilizando o cache")
+            return cache[1]
+        raise falha
+
+    if resposta.status_code == 304 and cache is not None:
+        validadores = _cabecalhos_cache(cache[0])
+        validadores.update(resposta.headers)
+        grava_cache(url, cache[1], validadores)
+        return cache[1]
+    resposta.raise_for_status()
+    grava_cache(url, resposta.content, resposta.headers)
+    return resposta.content
+
+
+async def executa_por_host(
+    func: typing.Callable[[str], typing.Any],
+    urls: typing.Sequence[str],
+    conexoes_por_host: int = CONEXOES_POR_HOST,
+) -> typing.List[typing.Any]:
+    """
+    Executa uma função bloqueante de requisição para várias urls de forma
+    concorrente, em threads coordenadas pelo loop de eventos, limitando o
+    número de requisições simultâneas a cada servidor
+
+    :param func: função que recebe uma url
+    :param urls: endereços a serem consultados
+    :param conexoes_por_host: requisições simultâneas por servidor
+    :return: lista com o resultado de cada url, na ordem de {urls}
+    """
+    unicas = list(dict.fromkeys(urls))
+    if len(unicas) == 0:
+        return []
+
+    loop = asyncio.get_running_loop()
+    limites: typing.Dict[str, asyncio.Semaphore] = collections.defaultdict(
+        lambda: asyncio.Semaphore(conexoes_por_host)
+    )
+    hosts = {urlparse(u).netloc for u in unicas}
+    trabalhadores = min(32, len(hosts) * conexoes_por_host, len(unicas))
+
+    with ThreadPoolExecutor(trabalhadores) as executor:
+
+        async def executa_limitado(url: str) -> typing.Any:
+            async with limites[urlparse(url).netloc]:
+                return await loop.run_in_executor(executor, func, url)
+
+        resultados = await asyncio.gather(*[executa_limitado(u) for u in unicas])
+
+    por_url = dict(zip(unicas, resultados))
+    return [por_url[u] for u in urls]
+
+
+def executa_sincrono(corrotina: typing.Callable[[], typing.Awaitable]) -> typing.Any:
+    """
+    Executa uma corrotina de forma síncrona. Quando já existe um loop de
+    eventos em execução (ex: em um notebook) ela é executada em um loop
+    de outra thread
+
+    :param corrotina: função sem parâmetros que cria a corrotina
+    :return: resultado da corrotina
+    """
+
+    async def executa() -> typing.Any:
+        return await corrotina()
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(executa())
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, executa()).result()
+
+
+async def obtem_conteudos_async(
+    urls: typing.Sequence[str],
+    validade: float = VALIDADE_CACHE,
+    timeout: float = TIMEOUT,
+    tentativas: int = TENTATIVAS,
+    conexoes_por_host: int = CONEXOES_POR_HOST,
+) -> typing.List[bytes]:
+    """
+    Obtém o conteúdo de várias urls de forma concorrente, limitando o
+    número de requisições simultâneas a cada servidor
+
+    :param urls: endereços das páginas
+    :param validade: idade máxima (s) da resposta em cache usada sem revalidação
+    :param timeout: tempo limite (s) de cada requisição
+    :param tentativas: número de tentativas de cada requisição
+    :param conexoes_por_host: requisições simultâneas por servidor
+    :return: lista com o conteúdo de cada url, na ordem de {urls}
+    """
+    obtem = functools.partial(
+        obtem_conteudo, validade=validade, timeout=timeout, tentativas=tentativas
+    )
+    return await executa_por_host(obtem, urls, conexoes_por_host)
+
+
+def obtem_conteudos(
+    urls: typing.Sequence[str], **kwargs: typing.Any
+) -> typing.List[bytes]:
+    """
+    Interface síncrona de obtem_conteudos_async
+
+    :param urls: endereços das páginas
+    :param kwargs: parâmetros de obtem_conteudos_async
+    :return: lista com o conteúdo de cada url, na ordem de {urls}
+    """
+    return executa_sincrono(lambda: obtem_conteudos_async(urls, **kwargs))
+
+
+def obtem_cabecalho(url: str, timeout: float = TIMEOUT) -> typing.Mapping[str, str]:
+    """
+    Consulta os cabeçalhos de uma url (ex: tamanho e data de modificação de
+    um arquivo) sem baixar o seu conteúdo. Como estes dados são apenas
+    informativos, falhas retornam um dicionário vazio
+
+    :param url: endereço do arquivo
+    :param timeout: tempo limite (s) da requisição
+    :return: cabeçalhos da resposta (sem diferenciar maiúsculas e minúsculas)
+    """
+    try:
+        resposta = obtem_sessao().head(url, timeout=timeout, allow_redirects=True)
+        resposta.raise_for_status()
+    except requests.RequestException as erro:
+        logging.getLogger(__name__).debug(f"Falha ao consultar {url}: {erro}")
+        return CaseInsensitiveDict()
+    return resposta.headers
+
+
+def obtem_cabecalhos(
+    urls: typing.Sequence[str],
+    timeout: float = TIMEOUT,
+    conexoes_por_host: int = CONEXOES_POR_HOST,
+) -> typing.List[typing.Mapping[str, str]]:
+    """
+    Consulta os cabeçalhos de várias urls de forma concorrente
+
+    :param urls: endereços dos arquivos
+    :param timeout: tempo limite (s) de cada requisição
+    :param conexoes_por_host: requisições simultâneas por servidor
+    :return: lista com os cabeçalhos de cada url, na ordem de {urls}
+    """
+    consulta = functools.partial(obtem_cabecalho, timeout=timeout)
+    return executa_sincrono(lambda: executa_por_host(consulta, urls, conexoes_por_host))
+
+
+def obtem_paginas(
+    urls: typing.Sequence[str], **kwargs: typing.Any
+) -> typing.List[bs4.BeautifulSoup]:
+    """
+    Lê várias páginas Web de forma concorrente
+
+    :param urls: urls para processar
+    :param kwargs: parâmetros de obtem_conteudos_async
+    :return: lista de objetos BeautifulSoup com o resultado de cada página
+    """
+    return [
+        bs4.BeautifulSoup(c, features="html.parser")
+        for c in obtem_conteudos(urls, **kwargs)
+    ]
+
+
+def obtem_pagina(url: str, **kwargs: typing.Any) -> bs4.BeautifulSoup:
     """
     Lê uma página Web utilizando a biblioteca requests
 
     :param url: url para processar
+    :param kwargs: parâmetros de obtem_conteudos_async
     :return: objeto BeautifulSoup com resultado da página
     """
-    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-    res = urllib.request.urlopen(req).read()
-    return bs4.BeautifulSoup(res, features="html.parser")
+    return obtem_paginas([url], **kwargs)[0]
 
 
 def download_dados_web(
@@ -39,15 +404,22 @@ def download_dados_web(
     else:
         arq = caminho  # type: ignore
 
-    # gera um request para os dados
-    response = requests.get(url, stream=True)
-    total_size_in_bytes = int(response.headers.get("content-length", 0))
+    try:
+        # gera um request para os dados
+        response = requests.get(url, stream=True)
+        total_size_in_bytes = int(response.headers.get("content-length", 0))
 
-    # processa a base
-    progress_bar = tqdm(total=total_size_in_bytes, unit="iB", unit_scale=True)  # type: ignore
-    for data in response.iter_content(block_size):
-        progress_bar.update(len(data))
-        arq.write(data)
+        # processa a base
+        progress_bar = tqdm(total=total_size_in_bytes, unit="iB", unit_scale=True)  # type: ignore
+        for data in response.iter_content(block_size):
+            progress_bar.update(len(data))
+            arq.write(data)
+    except Exception:
+        # não mantém um arquivo vazio ou incompleto em caso de falha
+        if fechar:
+            arq.close()
+            os.remove(caminho)  # type: ignore
+        raise
 
     # fecha o buffer
     if fechar: